@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import os
+from pathlib import Path
 
 import requests
 
@@ -24,6 +25,13 @@ from .search import ODataProductSearcher
 from .service import CdseService
 
 
+def _index_archive(path: Path) -> None:
+    """Строит sidecar-индекс участников сразу после загрузки архива."""
+    from processing.archive import SentinelArchive
+
+    SentinelArchive(path).index()
+
+
 def build_cdse_service() -> CdseService:
     """Создаёт CDSE service из окружения и production adapters."""
     username = os.environ.get("CDSE_USERNAME")
@@ -61,7 +69,10 @@ def build_cdse_service() -> CdseService:
             client,
             chunk_days=SEARCH_CHUNK_DAYS,
         ),
-        downloader=ODataProductDownloader(client),
+        downloader=ODataProductDownloader(
+            client,
+            after_download=_index_archive,
+        ),
         fallback_collection=L1C_COLLECTION,
         preferred_product_type=L2A_PRODUCT_TYPE,
         fallback_product_type=L1C_PRODUCT_TYPE,
@@ -11,10 +11,17 @@ from time import perf_counter
 
 import requests
 
+from core.archive_manifest import build_manifest, trusted_manifest, write_manifest
 from core.logging import get_logger
 
 from .client import CdseODataClient
 from .exceptions import CdseDownloadError, CdseQueryError
+from .integrity import (
+    DEFAULT_ALGORITHM,
+    StreamingDigest,
+    expected_checksum,
+    file_digest,
+)
 from .models import ProductRecord
 from .utils import ensure_dir, normalize_tile
 
@@ -26,6 +33,7 @@ PROGRESS_LOG_INTERVAL = 30.0
 CONTENT_RANGE_RE = re.compile(r"^bytes\s+(\d+)-(\d+)/(\d+|\*)$")
 
 ProgressCallback = Callable[[int], object]
+ArchiveCallback = Callable[[Path], object]
 
 
 def _format_size(size_bytes: int | None) -> str:
@@ -82,8 +90,22 @@ class ODataProductDownloader:
     Скачивание продукта CDSE и упаковка SAFE в ZIP для долгосрочного хранения.
     """
 
-    def __init__(self, client: CdseODataClient):
+    def __init__(
+            self,
+            client: CdseODataClient,
+            after_download: ArchiveCallback | None = None,
+    ):
         self.client = client
+        self.after_download = after_download
+
+    def _catalog_archive(self, zip_path: Path) -> None:
+        """Передаёт готовый архив каталогизатору; сбой не отменяет загрузку."""
+        if self.after_download is None:
+            return
+        try:
+            self.after_download(zip_path)
+        except Exception as exc:
+            logger.warning("Архив не каталогизирован %s: %s", zip_path, exc)
 
     def _download_with_resume(
             self,
@@ -93,8 +115,14 @@ class ODataProductDownloader:
             label: str | None = None,
             expected_size: int | None = None,
             progress: ProgressCallback | None = None,
+            digest: StreamingDigest | None = None,
     ) -> tuple[int, int]:
-        """Скачивает файл с докачкой и возвращает размер и сетевой трафик."""
+        """
+        Скачивает файл с докачкой и возвращает размер и сетевой трафик.
+
+        Если передан ``digest``, контрольная сумма считается по тем же
+        байтам, что пишутся на диск, без повторного чтения готового файла.
+        """
         display_name = label or product_id
         reported_size = 0
         transferred = 0
@@ -140,12 +168,19 @@ class ODataProductDownloader:
                             )
 
                     mode = "ab" if downloaded > 0 else "wb"
+                    if digest is not None:
+                        if downloaded > 0:
+                            digest.resume_from(tmp_file, downloaded)
+                        else:
+                            digest.reset()
                     response_total = _response_total_size(response, downloaded)
                     total_size = response_total or expected_size
                     with open(tmp_file, mode) as file_obj:
                         for chunk in response.iter_content(CHUNK_SIZE):
                             if chunk:
                                 file_obj.write(chunk)
+                                if digest is not None:
+                                    digest.update(chunk)
                                 chunk_size = len(chunk)
                                 downloaded += chunk_size
                                 transferred += chunk_size
@@ -246,19 +281,44 @@ class ODataProductDownloader:
         """
         return target_dir / product.archive_name
 
+    @staticmethod
+    def _record_manifest(
+            zip_path: Path,
+            *,
+            algorithm: str,
+            digest: str,
+            verified: bool,
+    ) -> None:
+        """Сохраняет sidecar-манифест рядом с готовым архивом."""
+        write_manifest(
+            zip_path,
+            build_manifest(
+                zip_path,
+                algorithm=algorithm,
+                digest=digest,
+                verified=verified,
+            ),
+        )
+
     def download_product(
             self,
             product: ProductRecord,
             archive_root: str | Path,
             progress: ProgressCallback | None = None,
     ) -> Path:
-        """Скачивание продукта."""
+        """Скачивание продукта с потоковой проверкой контрольной суммы."""
         started = perf_counter()
         target_dir = self.build_target_dir(product, archive_root)
         zip_path = self.build_zip_path(target_dir, product)
         label = f"{product.date} T{normalize_tile(product.tile)}"
+        expected = expected_checksum(product.raw)
+        algorithm = expected.algorithm if expected else DEFAULT_ALGORITHM
 
         if zip_path.exists():
+            if trusted_manifest(zip_path) is not None:
+                _report_progress(progress, zip_path.stat().st_size)
+                logger.info("Архив уже скачан и проверен: %s", zip_path)
+                return zip_path
             if zipfile.is_zipfile(zip_path):
                 _report_progress(progress, zip_path.stat().st_size)
                 logger.info("Архив уже скачан: %s", zip_path)
@@ -274,10 +334,25 @@ class ODataProductDownloader:
 
         # Процесс мог завершиться после полной загрузки, но до rename.
         if tmp_file.exists() and zipfile.is_zipfile(tmp_file):
-            _report_progress(progress, tmp_file.stat().st_size)
-            os.replace(tmp_file, zip_path)
-            logger.info("Готовый временный архив восстановлен: %s", zip_path)
-            return zip_path
+            actual = file_digest(tmp_file, algorithm)
+            if expected is None or expected.value == actual:
+                _report_progress(progress, tmp_file.stat().st_size)
+                os.replace(tmp_file, zip_path)
+                self._record_manifest(
+                    zip_path,
+                    algorithm=algorithm,
+                    digest=actual,
+                    verified=expected is not None,
+                )
+                logger.info("Готовый временный архив восстановлен: %s", zip_path)
+                self._catalog_archive(zip_path)
+                return zip_path
+            logger.warning(
+                "Временный архив %s не совпал с контрольной суммой CDSE; "
+                "загрузка начнётся заново",
+                tmp_file,
+            )
+            tmp_file.unlink()
 
         logger.info(
             "Начинаем загрузку %s: %s (%s)",
@@ -285,15 +360,27 @@ class ODataProductDownloader:
             product.archive_name,
             _format_size(product.size_bytes),
         )
+        digest = StreamingDigest(algorithm)
         final_size, transferred = self._download_with_resume(
             product.product_id,
             tmp_file,
             label=label,
             expected_size=product.size_bytes,
             progress=progress,
+            digest=digest,
         )
 
-        if not zipfile.is_zipfile(tmp_file):
+        actual = digest.hexdigest()
+        if expected is not None and expected.value != actual:
+            tmp_file.unlink(missing_ok=True)
+            _report_progress(progress, -final_size)
+            raise CdseDownloadError(
+                f"Контрольная сумма {algorithm.upper()} архива "
+                f"{product.archive_name} не совпала: {actual} вместо "
+                f"{expected.value}"
+            )
+
+        if expected is None and not zipfile.is_zipfile(tmp_file):
             invalid_size = tmp_file.stat().st_size
             with tmp_file.open("rb") as stream:
                 head = stream.read(64)
@@ -304,6 +391,13 @@ class ODataProductDownloader:
             )
 
         os.replace(tmp_file, zip_path)
+        self._record_manifest(
+            zip_path,
+            algorithm=algorithm,
+            digest=actual,
+            verified=expected is not None,
+        )
+        self._catalog_archive(zip_path)
         elapsed = max(perf_counter() - started, 0.001)
         logger.info(
             "Загрузка завершена %s: %s за %.1f сек., средняя скорость %s/с",
@@ -0,0 +1,97 @@
+"""Потоковая проверка контрольных сумм скачиваемых продуктов CDSE."""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+try:
+    from blake3 import blake3 as _blake3
+except ImportError:
+    _blake3 = None
+
+HASH_READ_SIZE = 16 * 1024 * 1024
+DEFAULT_ALGORITHM = "md5"
+
+
+def supported_algorithms() -> tuple[str, ...]:
+    """Возвращает алгоритмы в порядке предпочтения для текущего окружения."""
+    if _blake3 is not None:
+        return "blake3", "md5"
+    return ("md5",)
+
+
+def _new_hash(algorithm: str):
+    """Создаёт объект инкрементального хеширования."""
+    if algorithm == "blake3":
+        if _blake3 is None:
+            raise ValueError("Пакет blake3 не установлен")
+        return _blake3()
+    return hashlib.new(algorithm)
+
+
+@dataclass(frozen=True)
+class ExpectedChecksum:
+    """Контрольная сумма продукта, опубликованная CDSE."""
+
+    algorithm: str
+    value: str
+
+
+def expected_checksum(item: dict[str, Any]) -> ExpectedChecksum | None:
+    """Выбирает из OData ``Checksum`` поддерживаемую контрольную сумму."""
+    available: dict[str, str] = {}
+    for entry in item.get("Checksum") or []:
+        if not isinstance(entry, dict):
+            continue
+        algorithm = str(entry.get("Algorithm") or "").strip().lower()
+        value = str(entry.get("Value") or "").strip().lower()
+        if algorithm and value:
+            available.setdefault(algorithm, value)
+    for algorithm in supported_algorithms():
+        if algorithm in available:
+            return ExpectedChecksum(algorithm, available[algorithm])
+    return None
+
+
+class StreamingDigest:
+    """Инкрементальный дайджест байт, записываемых во временный файл."""
+
+    def __init__(self, algorithm: str = DEFAULT_ALGORITHM):
+        self.algorithm = algorithm
+        self._hash = _new_hash(algorithm)
+        self.size = 0
+
+    def reset(self) -> None:
+        """Начинает дайджест заново при перезаписи файла с нуля."""
+        self._hash = _new_hash(self.algorithm)
+        self.size = 0
+
+    def update(self, chunk: bytes) -> None:
+        """Добавляет очередную часть потока."""
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def resume_from(self, path: Path, offset: int) -> None:
+        """Досчитывает дайджест уже скачанного префикса перед докачкой."""
+        if self.size == offset:
+            return
+        self.reset()
+        with path.open("rb") as stream:
+            while self.size < offset:
+                chunk = stream.read(min(HASH_READ_SIZE, offset - self.size))
+                if not chunk:
+                    break
+                self.update(chunk)
+
+    def hexdigest(self) -> str:
+        """Возвращает шестнадцатеричный дайджест в нижнем регистре."""
+        return self._hash.hexdigest().lower()
+
+
+def file_digest(path: Path, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """Вычисляет дайджест файла, уже лежащего на диске."""
+    digest = StreamingDigest(algorithm)
+    digest.resume_from(path, path.stat().st_size)
+    return digest.hexdigest()
@@ -8,6 +8,7 @@ import zipfile
 from datetime import date, timedelta
 from pathlib import Path
 
+from core.archive_manifest import trusted_manifest
 from core.logging import get_logger
 
 logger = get_logger("CdseUtils")
@@ -23,7 +24,11 @@ def build_archive_index(
         end_date: date | None = None,
         tiles: list[str] | tuple[str, ...] = (),
 ) -> set[str]:
-    """Индексирует только архивы нужного периода и тайлов."""
+    """
+    Индексирует только архивы нужного периода и тайлов.
+
+    Архив с актуальным sidecar-манифестом считается целым без чтения ZIP.
+    """
     existing: set[str] = set()
     base = Path(base_path)
 
@@ -58,7 +63,10 @@ def build_archive_index(
                     if not start_date <= acquired_on <= end_date:
                         continue
                 archive = Path(_root) / filename
-                if zipfile.is_zipfile(archive):
+                if (
+                        trusted_manifest(archive) is not None
+                        or zipfile.is_zipfile(archive)
+                ):
                     existing.add(filename)
                 else:
                     logger.warning(
@@ -0,0 +1,49 @@
+"""Команда сжатия исторического архива Sentinel ZIP."""
+from core.management.base import BaseCommand
+from core.management.validators import resolve_date_range
+
+
+class Command(BaseCommand):
+    """Переписывает архивы в ZIP только с используемыми участниками."""
+
+    help = (
+        "Сжатие ZIP в ARCHIVE_ROOT до metadata XML и каналов, которые читает "
+        "обработка. Запускайте вне ночной загрузки и обработки."
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет период, число потоков и режим dry-run."""
+        parser.add_argument("--year", type=int)
+        parser.add_argument("--month", type=int)
+        parser.add_argument("--start")
+        parser.add_argument("--end")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Количество архивов, сжимаемых одновременно (по умолчанию: 2)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только оценить экономию, не изменяя архивы",
+        )
+
+    def handle(self, *args, **options):
+        """Нормализует период и запускает сервис сжатия."""
+        start_date, end_date = resolve_date_range(
+            year=options.get("year"),
+            month=options.get("month"),
+            start=options.get("start"),
+            end=options.get("end"),
+        )
+
+        from processing.composition import build_archive_compaction_service
+
+        build_archive_compaction_service(
+            workers=options.get("workers", 2),
+        ).run(
+            start_date=start_date,
+            end_date=end_date,
+            dry_run=options.get("dry_run", False),
+        )
@@ -0,0 +1,92 @@
+"""Команда выгрузки сохранённых рядов NDVI полей."""
+from __future__ import annotations
+
+from cli.commands.processing import parse_agro_selector, parse_field_selector
+from core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Потоково выгружает ряды NDVI хозяйств в CSV либо GeoJSON."""
+
+    help = (
+        "Выгрузка рядов NDVI полей из PostGIS по хозяйствам без загрузки "
+        "архива статистики в память."
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет выбор хозяйств, полей, сезонов и формата файлов."""
+        parser.add_argument(
+            "--output",
+            required=True,
+            help="Директория файлов ndvi_a<агро>.<формат>",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "geojson"),
+            default="csv",
+            help="csv — строка на дату; geojson — Feature с контуром на сезон",
+        )
+        parser.add_argument(
+            "--agro",
+            type=parse_agro_selector,
+            help="Хозяйства через запятую, например 3,4 (по умолчанию: все)",
+        )
+        parser.add_argument(
+            "--field",
+            type=parse_field_selector,
+            action="append",
+            help="Поле по fieldcode, например A3/F100б; можно повторять",
+        )
+        parser.add_argument(
+            "--year",
+            type=int,
+            action="append",
+            help="Сезон выгрузки; можно повторять (по умолчанию: все)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Хозяйств, выгружаемых одновременно, не больше DB_POOL_SIZE "
+                "(по умолчанию: 1)"
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Строк за одно чтение курсора (по умолчанию: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        """Определяет хозяйства выгрузки и запускает сервис экспорта."""
+        from processing.domain import AGROIDS_BY_TILE
+
+        fields = options.get("field") or []
+        agroids = options.get("agro")
+        if agroids is None and fields:
+            agroids = tuple(dict.fromkeys(agroid for agroid, _code in fields))
+        if agroids is None:
+            agroids = tuple(sorted({
+                agroid
+                for tile_agroids in AGROIDS_BY_TILE.values()
+                for agroid in tile_agroids
+            }))
+        if options.get("batch_size", 2000) <= 0:
+            raise ValueError("--batch-size должен быть положительным")
+        if options.get("workers", 1) <= 0:
+            raise ValueError("--workers должен быть положительным")
+
+        from processing.composition import export_ndvi_series
+        from processing.ndvi_export import ExportFormat
+
+        export_ndvi_series(
+            options["output"],
+            agroids=agroids,
+            years=options.get("year"),
+            fieldcodes=[fieldcode for _agroid, fieldcode in fields] or None,
+            export_format=ExportFormat(options.get("format", "csv")),
+            workers=options.get("workers", 1),
+            batch_size=options.get("batch_size", 2000),
+        )
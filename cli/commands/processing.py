@@ -118,12 +118,14 @@ class Command(BaseCommand):
 
         from processing.composition import build_processing_service
 
-        build_processing_service(
-            recalculate_ndvi=recalculate_ndvi,
-        ).run(
-            debug=debug,
-            start_date=start_date,
-            end_date=end_date,
-            target_agroids=target_agroids,
-            target_fieldcodes=target_fieldcodes,
-        )
+        service = build_processing_service(recalculate_ndvi=recalculate_ndvi)
+        try:
+            service.run(
+                debug=debug,
+                start_date=start_date,
+                end_date=end_date,
+                target_agroids=target_agroids,
+                target_fieldcodes=target_fieldcodes,
+            )
+        finally:
+            service.close()
@@ -0,0 +1,128 @@
+"""Sidecar-манифест целостности ZIP-архивов Sentinel."""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ArchiveManifest:
+    """Проверенный дайджест, размер и время изменения одного архива."""
+
+    # Алгоритм дайджеста в нижнем регистре: md5 или blake3.
+    algorithm: str
+    # Шестнадцатеричный дайджест всего ZIP.
+    digest: str
+    # Размер архива в байтах на момент проверки.
+    size: int
+    # Время изменения архива в наносекундах на момент проверки.
+    mtime_ns: int
+    # Дайджест совпал с контрольной суммой, опубликованной CDSE.
+    verified: bool
+    # Время создания манифеста в UTC.
+    created_at: str
+    version: int = MANIFEST_VERSION
+    # Размер исходного полного архива, если ZIP был сжат до нужных каналов.
+    original_size: int | None = None
+    # Алгоритм и дайджест полного архива до сжатия; ``verified`` сжатой
+    # копии относится к этому дайджесту.
+    original_algorithm: str | None = None
+    original_digest: str | None = None
+
+    @property
+    def compacted(self) -> bool:
+        """Показывает, что архив переписан без неиспользуемых участников."""
+        return self.original_size is not None
+
+    def matches(self, archive_path: str | Path) -> bool:
+        """Проверяет, что архив не менялся после записи манифеста."""
+        try:
+            stat = Path(archive_path).stat()
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+
+def manifest_path(archive_path: str | Path) -> Path:
+    """Возвращает путь sidecar-манифеста рядом с архивом."""
+    path = Path(archive_path)
+    return path.with_name(path.name + MANIFEST_SUFFIX)
+
+
+def build_manifest(
+        archive_path: str | Path,
+        *,
+        algorithm: str,
+        digest: str,
+        verified: bool,
+        original_size: int | None = None,
+        original_algorithm: str | None = None,
+        original_digest: str | None = None,
+) -> ArchiveManifest:
+    """Создаёт манифест по текущему состоянию архива на диске."""
+    stat = Path(archive_path).stat()
+    return ArchiveManifest(
+        algorithm=algorithm.lower(),
+        digest=digest.lower(),
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        verified=verified,
+        created_at=datetime.now(UTC).isoformat(),
+        original_size=original_size,
+        original_algorithm=(
+            original_algorithm.lower() if original_algorithm else None
+        ),
+        original_digest=original_digest.lower() if original_digest else None,
+    )
+
+
+def write_manifest(
+        archive_path: str | Path,
+        manifest: ArchiveManifest,
+) -> Path:
+    """Атомарно записывает манифест рядом с архивом."""
+    destination = manifest_path(archive_path)
+    temporary = destination.with_name(destination.name + ".tmp")
+    temporary.write_text(
+        json.dumps(asdict(manifest), ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    os.replace(temporary, destination)
+    return destination
+
+
+def read_manifest(archive_path: str | Path) -> ArchiveManifest | None:
+    """Читает манифест архива; повреждённый манифест считается отсутствующим."""
+    path = manifest_path(archive_path)
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Манифест архива не прочитан %s: %s", path, exc)
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != MANIFEST_VERSION:
+        return None
+    try:
+        return ArchiveManifest(**payload)
+    except TypeError:
+        logger.warning("Манифест архива имеет неизвестный формат: %s", path)
+        return None
+
+
+def trusted_manifest(archive_path: str | Path) -> ArchiveManifest | None:
+    """Возвращает манифест, только если архив с тех пор не изменялся."""
+    manifest = read_manifest(archive_path)
+    if manifest is None or not manifest.matches(archive_path):
+        return None
+    return manifest
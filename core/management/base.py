@@ -4,6 +4,7 @@ import os
 from abc import ABC, abstractmethod
 
 from core.logging import get_logger
+from core.metrics import log_summaries
 
 
 class BaseCommand(ABC):
@@ -34,7 +35,11 @@ class BaseCommand(ABC):
         options = parser.parse_args(argv[2:])
         cmd_options = vars(options)
         args = cmd_options.pop("args", ())
-        self.handle(*args, **cmd_options)
+        try:
+            self.handle(*args, **cmd_options)
+        finally:
+            # Время, проведённое в БД и других замеряемых вызовах за запуск.
+            log_summaries(self.logger)
 
     @abstractmethod
     def add_arguments(self, parser: argparse.ArgumentParser) -> None:
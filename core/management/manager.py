@@ -10,9 +10,14 @@ from core.management.base import BaseCommand
 
 
 def get_command_names() -> list[str]:
-    """Возвращает доступные команды в стабильном порядке."""
+    """
+    Возвращает доступные команды в стабильном порядке.
+
+    Подчёркивание в имени модуля становится дефисом в имени команды:
+    ``compact_archive.py`` вызывается как ``compact-archive``.
+    """
     return sorted(
-        module.name
+        module.name.replace("_", "-")
         for module in pkgutil.iter_modules(commands.__path__)
         if not module.name.startswith("_")
     )
@@ -24,7 +29,7 @@ def load_command_class(name: str) -> BaseCommand:
     :param name: Название команды
     :return: Класс выбранной команды.
     """
-    module = import_module(f"cli.commands.{name}")
+    module = import_module(f"cli.commands.{name.replace('-', '_')}")
     return module.Command()
 
 
@@ -0,0 +1,129 @@
+"""Реестр метрик процесса: длительности, строки и объёмы по ключам."""
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class MetricStats:
+    """Накопленные наблюдения одного ключа метрики."""
+
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    # Переданный объём в байтах.
+    size: int = 0
+
+    def add(self, *, seconds: float, rows: int = 0, size: int = 0) -> MetricStats:
+        """Возвращает статистику с учётом ещё одного наблюдения."""
+        return MetricStats(
+            count=self.count + 1,
+            seconds=self.seconds + seconds,
+            max_seconds=max(self.max_seconds, seconds),
+            rows=self.rows + rows,
+            size=self.size + size,
+        )
+
+    def merge(self, other: MetricStats) -> MetricStats:
+        """Складывает статистику двух ключей."""
+        return MetricStats(
+            count=self.count + other.count,
+            seconds=self.seconds + other.seconds,
+            max_seconds=max(self.max_seconds, other.max_seconds),
+            rows=self.rows + other.rows,
+            size=self.size + other.size,
+        )
+
+
+class MetricsRegistry:
+    """Потокобезопасный реестр метрик одного процесса."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: dict[str, dict[str, MetricStats]] = {}
+
+    def observe(
+            self,
+            name: str,
+            key: str,
+            *,
+            seconds: float,
+            rows: int = 0,
+            size: int = 0,
+    ) -> None:
+        """Добавляет наблюдение к ключу ``key`` метрики ``name``."""
+        with self._lock:
+            series = self._series.setdefault(name, {})
+            series[key] = series.get(key, MetricStats()).add(
+                seconds=seconds,
+                rows=rows,
+                size=size,
+            )
+
+    def snapshot(self, name: str) -> dict[str, MetricStats]:
+        """Возвращает копию накопленных значений метрики."""
+        with self._lock:
+            return dict(self._series.get(name, {}))
+
+    def reset(self) -> None:
+        """Удаляет все накопленные наблюдения."""
+        with self._lock:
+            self._series.clear()
+
+
+_registry = MetricsRegistry()
+# Метрики, итог которых выводится по завершении консольной команды.
+_summaries: dict[str, str] = {}
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Возвращает реестр метрик процесса."""
+    return _registry
+
+
+def register_summary(name: str, title: str) -> None:
+    """Включает итог метрики ``name`` в сводку завершения команды."""
+    _summaries[name] = title
+
+
+def log_summaries(logger: logging.Logger) -> None:
+    """Логирует итоги всех зарегистрированных метрик."""
+    for name, title in _summaries.items():
+        log_summary(logger, name, title=title)
+
+
+def log_summary(
+        logger: logging.Logger,
+        name: str,
+        *,
+        title: str,
+        limit: int = 10,
+) -> None:
+    """Логирует итог метрики и самые долгие ключи; пустая метрика пропускается."""
+    series = get_metrics_registry().snapshot(name)
+    if not series:
+        return
+    total = MetricStats()
+    for stats in series.values():
+        total = total.merge(stats)
+    logger.info(
+        "%s SUMMARY: %d вызовов, строк %d, %.1f КБ | %.2f сек.",
+        title,
+        total.count,
+        total.rows,
+        total.size / 1024,
+        total.seconds,
+    )
+    ranked = sorted(series.items(), key=lambda item: item[1].seconds, reverse=True)
+    for key, stats in ranked[:limit]:
+        logger.info(
+            "  %s: %d вызовов, строк %d, max %.2f | %.2f сек.",
+            key,
+            stats.count,
+            stats.rows,
+            stats.max_seconds,
+            stats.seconds,
+        )
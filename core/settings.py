@@ -23,9 +23,20 @@ TEMP_PROCESSING_DIR = _path("TEMP_PROCESSING_DIR", BASE_DIR / "temp")
 INTERMEDIATE = _path("INTERMEDIATE_DIR", BASE_DIR / "intermediate")
 PROCESSED_DIR = _path("PROCESSED_DIR", BASE_DIR / "processed")
 NDVI_DIR = _path("NDVI_DIR", BASE_DIR / "ndvi")
+# Контуры полей прошлых запусков по сезону и хозяйству.
+FIELD_STORE_DIR = _path("FIELD_STORE_DIR", BASE_DIR / "field_store")
 ARCHIVE_ROOT = _path("ARCHIVE_ROOT", "/mnt/map/Snapshots")
 DESTSRID = int(os.environ.get("DESTSRID", "3857"))
 NODATA = float(os.environ.get("NODATA", "-9999"))
+# Доля ясных пикселей SCL: ниже первого порога хозяйство пропускается,
+# ниже второго считается только статистика без публикации растров.
+# По умолчанию оба порога отключены.
+CLOUD_TRIAGE_SKIP_BELOW = float(os.environ.get("CLOUD_TRIAGE_SKIP_BELOW", "0"))
+CLOUD_TRIAGE_STATISTICS_BELOW = float(
+    os.environ.get("CLOUD_TRIAGE_STATISTICS_BELOW", "0")
+)
+# Допуск упрощения контуров полей в PostGIS в единицах DESTSRID; 0 — без упрощения.
+FIELD_SIMPLIFY_TOLERANCE = float(os.environ.get("FIELD_SIMPLIFY_TOLERANCE", "0"))
 YEAR = datetime.now().year
 
 # Copernicus Data Space Ecosystem.
@@ -59,6 +70,39 @@ GS_HOST = os.environ.get("GS_HOST", "localhost")
 GS_WORKSPACE = os.environ.get("GS_WORKSPACE", "sentinel")
 GS_USERNAME = os.environ.get("GS_USERNAME", "admin")
 GS_PASSWORD = os.environ.get("GS_PASSWORD", "")
+# Одновременные записи COG и REST-цепочки GeoServer при публикации даты.
+PUBLISH_OPTIMIZE_WORKERS = int(os.environ.get("PUBLISH_OPTIMIZE_WORKERS", "2"))
+PUBLISH_CATALOG_WORKERS = int(os.environ.get("PUBLISH_CATALOG_WORKERS", "4"))
+# layers — store и слой на дату; mosaic — гранулы ImageMosaic с TIME.
+PUBLISH_MODE = os.environ.get("PUBLISH_MODE", "layers").strip().lower()
+# datastore.properties индекса гранул в PostGIS; пусто — shapefile мозаики.
+PUBLISH_MOSAIC_DATASTORE = os.environ.get("PUBLISH_MOSAIC_DATASTORE", "")
+# Прогрев GWC: задач и потоков GeoServer одновременно, опрос состояния.
+GWC_SEED_MAX_TASKS = int(os.environ.get("GWC_SEED_MAX_TASKS", "2"))
+GWC_SEED_MAX_THREADS = int(os.environ.get("GWC_SEED_MAX_THREADS", "4"))
+GWC_SEED_TASK_THREADS = int(os.environ.get("GWC_SEED_TASK_THREADS", "2"))
+GWC_SEED_POLL_SECONDS = float(os.environ.get("GWC_SEED_POLL_SECONDS", "10"))
+# Буфер контуров полей в метрах: прогреваются только их тайлы; пусто — рамка.
+_seed_footprint_buffer = os.environ.get("GWC_SEED_FOOTPRINT_BUFFER", "100")
+GWC_SEED_FOOTPRINT_BUFFER = (
+    float(_seed_footprint_buffer) if _seed_footprint_buffer.strip() else None
+)
+# Прямоугольников полей на масштаб; сверх них масштаб греется общей рамкой.
+GWC_SEED_MAX_RANGES = int(os.environ.get("GWC_SEED_MAX_RANGES", "16"))
+# Локальный рендер тайлов в файловый blob store GWC вместо seed GeoServer;
+# пусто — прогрев через GWC. Тайлы пишутся в PNG, зарегистрированном для
+# слоёв GWC; число потоков общего пула рендера делят все потоки каталога.
+GWC_BLOBSTORE_DIR = os.environ.get("GWC_BLOBSTORE_DIR", "")
+TILE_RENDER_WORKERS = int(os.environ.get("TILE_RENDER_WORKERS", "2"))
+# Профили кодирования COG по продуктам, например ndvi=int16,tci=jpeg.
+PUBLISH_COG_PROFILES = {
+    product.strip().lower(): profile.strip().lower()
+    for product, _sep, profile in (
+        item.partition("=")
+        for item in os.environ.get("PUBLISH_COG_PROFILES", "").split(",")
+        if item.strip()
+    )
+}
 
 
 def get_archive_dir(year: str | int, tile: str) -> str:
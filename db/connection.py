@@ -1,14 +1,25 @@
-"""Конфигурация и создание подключений к PostgreSQL."""
+"""Конфигурация, создание и пул подключений к PostgreSQL."""
 from __future__ import annotations
 
 import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
+from time import monotonic
 from typing import Any
 
+import psycopg2
 from dotenv import load_dotenv
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.logging import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 
 @dataclass(frozen=True)
 class DatabaseConfig:
@@ -19,6 +30,8 @@ class DatabaseConfig:
     password: str | None
     host: str = "localhost"
     port: int = 5432
+    # Предельное число одновременно открытых подключений пула процесса.
+    pool_size: int = 4
 
     @classmethod
     def from_env(cls) -> DatabaseConfig:
@@ -29,6 +42,7 @@ class DatabaseConfig:
             password=os.environ.get("DB_PASSWORD"),
             host=os.environ.get("DB_HOST", "localhost"),
             port=int(os.environ.get("DB_PORT", "5432")),
+            pool_size=int(os.environ.get("DB_POOL_SIZE", "4")),
         )
 
     def as_psycopg_kwargs(self) -> dict[str, Any]:
@@ -45,3 +59,177 @@ class DatabaseConfig:
 def get_database_config() -> dict[str, Any]:
     """Возвращает параметры в формате ``psycopg2.connect``."""
     return DatabaseConfig.from_env().as_psycopg_kwargs()
+
+
+class ConnectionPoolTimeout(RuntimeError):
+    """Свободное подключение не появилось за время ожидания."""
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул подключений PostgreSQL одного процесса.
+
+    Подключение выдаётся на одну транзакцию: при успешном выходе она
+    фиксируется, при ошибке откатывается. Простаивавшее подключение перед
+    выдачей проверяется ``SELECT 1``; разорванные подключения закрываются.
+    """
+
+    def __init__(
+            self,
+            connect: Callable[[], Any],
+            *,
+            max_size: int = 4,
+            timeout: float = 30.0,
+            check_after: float = 30.0,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("Размер пула подключений должен быть положительным")
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self._idle: deque[tuple[Any, float]] = deque()
+        self._opened = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def opened(self) -> int:
+        """Число открытых подключений, включая выданные."""
+        return self._opened
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Выдаёт подключение на одну транзакцию и возвращает его в пул."""
+        connection = self._acquire()
+        reusable = False
+        try:
+            yield connection
+            connection.commit()
+            reusable = True
+        except BaseException:
+            try:
+                connection.rollback()
+                reusable = True
+            except psycopg2.Error:
+                logger.warning("Откат транзакции не выполнен, подключение закрыто")
+            raise
+        finally:
+            self._release(connection, reusable=reusable)
+
+    def close(self) -> None:
+        """Закрывает свободные подключения и запрещает новые выдачи."""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._discard(connection)
+            self._condition.notify_all()
+
+    def _acquire(self) -> Any:
+        """Берёт живое свободное подключение или открывает новое."""
+        deadline = monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул подключений закрыт")
+                while self._idle:
+                    connection, released_at = self._idle.pop()
+                    if self._is_alive(connection, released_at):
+                        return connection
+                    self._discard(connection)
+                if self._opened < self.max_size:
+                    self._opened += 1
+                    break
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise ConnectionPoolTimeout(
+                        "Нет свободного подключения к PostgreSQL за "
+                        f"{self.timeout:.0f} сек."
+                    )
+                self._condition.wait(remaining)
+        try:
+            return self._connect()
+        except BaseException:
+            with self._condition:
+                self._opened -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, connection: Any, *, reusable: bool) -> None:
+        """Возвращает подключение в пул либо закрывает неисправное."""
+        reusable = (
+            reusable
+            and not connection.closed
+            and connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+        )
+        with self._condition:
+            if reusable and not self._closed:
+                self._idle.append((connection, monotonic()))
+            else:
+                self._discard(connection)
+            self._condition.notify()
+
+    def _is_alive(self, connection: Any, released_at: float) -> bool:
+        """Проверяет подключение, если оно долго простаивало."""
+        if connection.closed:
+            return False
+        if monotonic() - released_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except psycopg2.Error:
+            logger.warning("Подключение к PostgreSQL разорвано, открывается новое")
+            return False
+        return True
+
+    def _discard(self, connection: Any) -> None:
+        """Закрывает подключение и освобождает место в пуле."""
+        self._opened -= 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+_pool: ConnectionPool | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Возвращает пул текущего процесса.
+
+    Дочерний процесс не наследует подключения родителя и создаёт свой пул.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            config = DatabaseConfig.from_env()
+            options = config.as_psycopg_kwargs()
+            _pool = ConnectionPool(
+                lambda: psycopg2.connect(**options),
+                max_size=config.pool_size,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_connection_pool() -> None:
+    """Закрывает пул текущего процесса, если он был создан."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool_pid = None
+
+
+@contextmanager
+def pooled_connection() -> Iterator[Any]:
+    """Выдаёт подключение пула процесса на одну транзакцию."""
+    with get_connection_pool().connection() as connection:
+        yield connection
@@ -2,7 +2,11 @@
 from __future__ import annotations
 
 import dataclasses
+import itertools
 import re
+from collections.abc import Iterable, Iterator
+from datetime import date
+from time import perf_counter
 from typing import Any
 
 import psycopg2
@@ -11,16 +15,93 @@ from psycopg2.extras import DictCursor, execute_batch
 
 from core.logging import get_logger
 
+from .instrumentation import SqlInstrumentation, get_sql_instrumentation
+
 _IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Экранирование управляющих символов текстового формата COPY.
+_COPY_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+})
+COPY_READ_SIZE = 64 * 1024
+STREAM_BATCH_SIZE = 2000
+# Имена server-side cursor уникальны в пределах подключения.
+_stream_names = itertools.count(1)
+
+
+def _copy_array_item(value: Any) -> str:
+    """Форматирует элемент массива PostgreSQL в кавычках."""
+    if value is None:
+        return "NULL"
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def copy_value(value: Any) -> str:
+    """Форматирует значение для текстового формата ``COPY FROM STDIN``."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, date):
+        text = value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        text = "{" + ",".join(_copy_array_item(item) for item in value) + "}"
+    else:
+        text = str(value)
+    return text.translate(_COPY_ESCAPES)
+
+
+class _CopyStream:
+    """Файловый объект, лениво отдающий строки COPY без сборки всего пакета."""
+
+    def __init__(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        self._lines: Iterator[bytes] = (
+            ("\t".join(copy_value(value) for value in row) + "\n").encode(
+                "utf-8"
+            )
+            for row in rows
+        )
+        self._buffer = b""
+        self.rows = 0
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Возвращает очередную порцию данных COPY."""
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self.rows += 1
+            self.size += len(line)
+            chunks.append(line)
+            length += len(line)
+        data = b"".join(chunks)
+        if size < 0:
+            self._buffer = b""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
 
 
 class SqlGateway:
     """Инкапсулирует cursor, транзакции и generic batch insert."""
 
-    def __init__(self, pg_connection: connection) -> None:
+    def __init__(
+            self,
+            pg_connection: connection,
+            *,
+            instrumentation: SqlInstrumentation | None = None,
+    ) -> None:
         self.connection = pg_connection
         self.cursor = self.connection.cursor(cursor_factory=DictCursor)
         self.logger = get_logger(self.__class__.__name__)
+        # Замеры запросов; по умолчанию общие настройки процесса.
+        self.instrumentation = instrumentation or get_sql_instrumentation()
 
     def __enter__(self) -> SqlGateway:
         return self
@@ -87,28 +168,185 @@ class SqlGateway:
             f"ON CONFLICT ({conflict}) DO NOTHING;"
         )
 
+    def _copy_queries(
+            self,
+            record_type: type[Any],
+            include_id: bool,
+            conflict_fields: str,
+            update: bool,
+    ) -> tuple[str, str, str]:
+        """Строит запросы staging-таблицы, COPY и слияния с целевой."""
+        fields = self._insertable_fields(record_type, include_id)
+        columns = ", ".join(f'"{field}"' for field in fields)
+        table = self._table_name(record_type)
+        staging = f"_copy_{table}"
+        conflict = self._conflict_columns(conflict_fields)
+        conflict_names = {
+            column.strip() for column in conflict_fields.split(",")
+        }
+        assignments = ", ".join(
+            f'"{field}" = EXCLUDED."{field}"'
+            for field in fields
+            if field not in conflict_names
+        )
+        action = (
+            f"DO UPDATE SET {assignments}"
+            if update and assignments
+            else "DO NOTHING"
+        )
+        create = (
+            f'DROP TABLE IF EXISTS pg_temp."{staging}"; '
+            f'CREATE TEMP TABLE "{staging}" ON COMMIT DROP AS '
+            f'SELECT {columns} FROM "gpgeo"."{table}" WITH NO DATA;'
+        )
+        copy = f'COPY "{staging}" ({columns}) FROM STDIN'
+        merge = (
+            f'INSERT INTO "gpgeo"."{table}" ({columns}) '
+            f'SELECT {columns} FROM "{staging}" '
+            f"ON CONFLICT ({conflict}) {action};"
+        )
+        return create, copy, merge
+
+    def copy_many(
+            self,
+            record_type: type[Any],
+            records: Iterable[Any],
+            include_id: bool = False,
+            conflict_fields: str = "id",
+            *,
+            update: bool = False,
+            commit: bool = True,
+    ) -> int:
+        """
+        Записывает пакет через ``COPY`` во временную таблицу и одно слияние.
+
+        Строки передаются потоком без формирования отдельных INSERT; слияние
+        выполняет ``ON CONFLICT DO NOTHING`` либо ``DO UPDATE`` при
+        ``update=True``. Возвращает число переданных строк.
+        """
+        fields = self._insertable_fields(record_type, include_id)
+        create, copy, merge = self._copy_queries(
+            record_type,
+            include_id,
+            conflict_fields,
+            update,
+        )
+        stream = _CopyStream(
+            self.tuples_for_insert(record_type, [record], include_id)[0]
+            for record in records
+        )
+        started = perf_counter()
+        try:
+            self.cursor.execute(create)
+            self.cursor.copy_expert(copy, stream, size=COPY_READ_SIZE)
+            if stream.rows:
+                self.cursor.execute(merge)
+            if commit:
+                self.connection.commit()
+            self.instrumentation.observe(
+                self.cursor,
+                copy,
+                None,
+                seconds=perf_counter() - started,
+                rows=stream.rows,
+                size=stream.size,
+            )
+        except psycopg2.Error:
+            self.connection.rollback()
+            self.logger.exception("Ошибка пакетной записи COPY")
+            raise
+        except (TypeError, ValueError):
+            self.connection.rollback()
+            raise
+        self.logger.debug(
+            "COPY %s: строк=%d, полей=%d",
+            self._table_name(record_type),
+            stream.rows,
+            len(fields),
+        )
+        return stream.rows
+
     def rows(
             self,
             query: str,
             params: tuple[Any, ...] | None = None,
     ) -> list[dict]:
         """Выполняет запрос и возвращает все строки."""
+        started = perf_counter()
         try:
             self.cursor.execute(query, params)
-            return list(self.cursor.fetchall())
+            result = list(self.cursor.fetchall())
+            self.instrumentation.observe(
+                self.cursor,
+                query,
+                params,
+                seconds=perf_counter() - started,
+                rows=len(result),
+            )
+            return result
         except psycopg2.Error:
             self.logger.exception("Ошибка выполнения SQL-запроса")
             raise
 
+    def stream(
+            self,
+            query: str,
+            params: tuple[Any, ...] | None = None,
+            *,
+            batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[dict]:
+        """
+        Построчно читает результат через именованный server-side cursor.
+
+        На клиенте одновременно находится не более ``batch_size`` строк;
+        cursor закрывается по окончании или прерывании итерации и живёт в
+        текущей транзакции подключения.
+        """
+        if batch_size <= 0:
+            raise ValueError("Размер порции чтения должен быть положительным")
+        cursor = self.connection.cursor(
+            name=f"stream_{next(_stream_names)}",
+            cursor_factory=DictCursor,
+        )
+        started = perf_counter()
+        count = 0
+        try:
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            while batch := cursor.fetchmany(batch_size):
+                count += len(batch)
+                yield from batch
+        except psycopg2.Error:
+            self.logger.exception("Ошибка потокового SQL-запроса")
+            raise
+        finally:
+            cursor.close()
+            self.instrumentation.observe(
+                cursor,
+                query,
+                params,
+                seconds=perf_counter() - started,
+                rows=count,
+            )
+
     def row(
             self,
             query: str,
             params: tuple[Any, ...] | None = None,
     ) -> dict | None:
         """Выполняет запрос и возвращает одну строку либо ``None``."""
+        started = perf_counter()
         try:
             self.cursor.execute(query, params)
-            return self.cursor.fetchone()
+            result = self.cursor.fetchone()
+            self.instrumentation.observe(
+                self.cursor,
+                query,
+                params,
+                seconds=perf_counter() - started,
+                rows=int(result is not None),
+            )
+            return result
         except psycopg2.Error:
             self.logger.exception("Ошибка выполнения SQL-запроса")
             raise
@@ -121,10 +359,18 @@ class SqlGateway:
             commit: bool = True,
     ) -> None:
         """Выполняет изменяющий запрос с управляемой фиксацией транзакции."""
+        started = perf_counter()
         try:
             self.cursor.execute(query, params)
             if commit:
                 self.connection.commit()
+            self.instrumentation.observe(
+                self.cursor,
+                query,
+                params,
+                seconds=perf_counter() - started,
+                rows=max(getattr(self.cursor, "rowcount", 0) or 0, 0),
+            )
         except psycopg2.Error:
             self.connection.rollback()
             self.logger.exception("Ошибка изменяющего SQL-запроса")
@@ -175,9 +421,17 @@ class SqlGateway:
             include_id,
             conflict_fields,
         )
+        started = perf_counter()
         try:
             self.cursor.execute(query, values)
             self.connection.commit()
+            self.instrumentation.observe(
+                self.cursor,
+                query,
+                values,
+                seconds=perf_counter() - started,
+                rows=1,
+            )
         except psycopg2.Error:
             self.connection.rollback()
             self.logger.exception("Ошибка одиночной вставки")
@@ -203,9 +457,17 @@ class SqlGateway:
             include_id,
             conflict_fields,
         )
+        started = perf_counter()
         try:
             execute_batch(self.cursor, query, values, page_size=100)
             self.connection.commit()
+            self.instrumentation.observe(
+                self.cursor,
+                query,
+                None,
+                seconds=perf_counter() - started,
+                rows=len(values),
+            )
         except psycopg2.Error:
             self.connection.rollback()
             self.logger.exception("Ошибка пакетной вставки")
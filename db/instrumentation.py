@@ -0,0 +1,191 @@
+"""Замеры SQL-запросов: метрики по отпечатку и месту вызова, медленные запросы."""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+import psycopg2
+
+from core.logging import get_logger
+from core.metrics import MetricsRegistry, get_metrics_registry, register_summary
+
+STATEMENT_METRIC = "sql.statement"
+CALL_SITE_METRIC = "sql.call_site"
+register_summary(CALL_SITE_METRIC, "SQL")
+# Модули, кадры которых пропускаются при поиске места вызова.
+_INTERNAL_MODULES = frozenset({__name__, "db.gateway", "contextlib"})
+_WHITESPACE = re.compile(r"\s+")
+_MODIFYING = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|COPY|CREATE|DROP|ALTER|TRUNCATE)\b",
+    re.IGNORECASE,
+)
+_STATEMENT_PREVIEW = 160
+
+
+def normalize_statement(query: str) -> str:
+    """Сводит пробельные символы запроса к одному пробелу."""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def statement_fingerprint(query: str) -> str:
+    """Возвращает стабильный короткий отпечаток текста запроса."""
+    digest = hashlib.sha1(
+        normalize_statement(query).encode("utf-8"),
+        usedforsecurity=False,
+    )
+    return digest.hexdigest()[:12]
+
+
+def _redact(value: Any) -> str:
+    """Заменяет значение параметра его типом и размером."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return f"<{type(value).__name__}[{len(value)}]>"
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_params(params: Any) -> Any:
+    """Скрывает значения параметров, оставляя их типы для журнала."""
+    if params is None:
+        return None
+    if isinstance(params, Mapping):
+        return {key: _redact(value) for key, value in params.items()}
+    return tuple(_redact(value) for value in params)
+
+
+def call_site() -> str:
+    """Возвращает ``модуль:функция`` первого кадра вне SQL gateway."""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__") in _INTERNAL_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return "<unknown>"
+    return f"{frame.f_globals.get('__name__')}:{frame.f_code.co_qualname}"
+
+
+@dataclass(frozen=True)
+class SqlInstrumentation:
+    """Пишет замеры запросов в реестр метрик и журналирует медленные."""
+
+    # Порог медленного запроса в секундах.
+    slow_seconds: float = 1.0
+    # Снимать план медленных читающих запросов.
+    explain_slow: bool = False
+    # Выполнять запрос повторно под EXPLAIN (ANALYZE, BUFFERS); без флага
+    # снимается только оценочный план без повторного выполнения.
+    explain_analyze: bool = False
+    registry: MetricsRegistry = field(default_factory=get_metrics_registry)
+
+    @classmethod
+    def from_env(cls) -> SqlInstrumentation:
+        """Создаёт настройки замеров из переменных окружения."""
+        return cls(
+            slow_seconds=float(os.environ.get("DB_SLOW_QUERY_SECONDS", "1")),
+            explain_slow=os.environ.get("DB_EXPLAIN_SLOW", "0").lower()
+            in {"1", "true", "yes"},
+            explain_analyze=os.environ.get("DB_EXPLAIN_ANALYZE", "0").lower()
+            in {"1", "true", "yes"},
+        )
+
+    def observe(
+            self,
+            cursor: Any,
+            query: str,
+            params: Any,
+            *,
+            seconds: float,
+            rows: int = 0,
+            size: int = 0,
+    ) -> None:
+        """
+        Учитывает выполненный запрос.
+
+        ``size`` — объём переданных данных в байтах; его передаёт COPY по
+        размеру потока, у обычных запросов объём результата не измеряется и
+        остаётся нулевым.
+        """
+        fingerprint = statement_fingerprint(query)
+        site = call_site()
+        self.registry.observe(
+            STATEMENT_METRIC,
+            fingerprint,
+            seconds=seconds,
+            rows=rows,
+            size=size,
+        )
+        self.registry.observe(
+            CALL_SITE_METRIC,
+            site,
+            seconds=seconds,
+            rows=rows,
+            size=size,
+        )
+        if seconds < self.slow_seconds:
+            return
+        logger = get_logger("SqlGateway")
+        logger.warning(
+            "SQL SLOW: %s %s | строк=%d | %s | params=%s | %.2f сек.",
+            fingerprint,
+            site,
+            rows,
+            normalize_statement(query)[:_STATEMENT_PREVIEW],
+            redact_params(params),
+            seconds,
+        )
+        # Именованный server-side cursor из stream() уже закрыт и не
+        # выполняет других команд.
+        if (
+                self.explain_slow
+                and not getattr(cursor, "name", None)
+                and not _MODIFYING.search(query)
+        ):
+            plan = self._explain(cursor, query, params)
+            if plan:
+                logger.debug("SQL PLAN %s:\n%s", fingerprint, plan)
+
+    def _explain(self, cursor: Any, query: str, params: Any) -> str | None:
+        """
+        Снимает план читающего запроса внутри точки сохранения.
+
+        Точка сохранения всегда откатывается: побочные эффекты повторного
+        выполнения под ANALYZE не остаются в транзакции вызывающего кода.
+        """
+        options = "(ANALYZE, BUFFERS) " if self.explain_analyze else ""
+        try:
+            cursor.execute("SAVEPOINT sql_explain")
+        except psycopg2.Error as exc:
+            get_logger("SqlGateway").warning("EXPLAIN не выполнен: %s", exc)
+            return None
+        plan = None
+        try:
+            cursor.execute(f"EXPLAIN {options}{query}", params)
+            plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+        except psycopg2.Error as exc:
+            get_logger("SqlGateway").warning("EXPLAIN не выполнен: %s", exc)
+        finally:
+            try:
+                cursor.execute("ROLLBACK TO SAVEPOINT sql_explain")
+                cursor.execute("RELEASE SAVEPOINT sql_explain")
+            except psycopg2.Error as exc:
+                get_logger("SqlGateway").warning(
+                    "Точка сохранения EXPLAIN не снята: %s",
+                    exc,
+                )
+        return plan
+
+
+_instrumentation: SqlInstrumentation | None = None
+
+
+def get_sql_instrumentation() -> SqlInstrumentation:
+    """Возвращает настройки замеров процесса, читая окружение один раз."""
+    global _instrumentation
+    if _instrumentation is None:
+        _instrumentation = SqlInstrumentation.from_env()
+    return _instrumentation
@@ -57,6 +57,8 @@ class LayerRecord(DatabaseRecord):
     algorithm_version: str | None = None
     # Время формирования слоя.
     generated_at: datetime | None = None
+    # Отпечаток содержимого опубликованного растра.
+    content_fingerprint: str | None = None
     table: ClassVar[str] = "maps_layer"
 
 
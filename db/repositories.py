@@ -1,18 +1,24 @@
 """Repositories предметных данных Sentinel."""
 from __future__ import annotations
 
+import itertools
 import json
+import unicodedata
+from collections.abc import Iterable, Iterator
 from datetime import UTC, date, datetime
 from typing import Any
 
 from domain.models import (
+    AgroSnapshot,
     Field,
+    FieldNdviSeries,
+    FieldRevision,
     LayerMetadataUpdate,
     NdviStatistics,
     PublishedLayer,
 )
 
-from .gateway import SqlGateway
+from .gateway import STREAM_BATCH_SIZE, SqlGateway
 from .models import NdviRecord
 
 
@@ -57,6 +63,7 @@ class LayerRepository:
                     "generated_at": (
                         layer.generated_at or datetime.now(UTC)
                     ).isoformat(),
+                    "content_fingerprint": layer.content_fingerprint,
                 }
                 for layer in layers
             ],
@@ -81,14 +88,16 @@ class LayerRepository:
                     resolution_m smallint,
                     is_cloud_masked boolean,
                     algorithm_version varchar,
-                    generated_at timestamptz
+                    generated_at timestamptz,
+                    content_fingerprint varchar
                 )
             )
             INSERT INTO gpgeo.maps_layer (
                 date, fieldid, set, agroid, name, acquired_at, satellite,
                 source_level, processing_baseline, source_tiles,
                 cloud_coverage_percent, valid_coverage_percent,
-                resolution_m, is_cloud_masked, algorithm_version, generated_at
+                resolution_m, is_cloud_masked, algorithm_version, generated_at,
+                content_fingerprint
             )
             SELECT
                 acquired_on,
@@ -111,7 +120,8 @@ class LayerRepository:
                 resolution_m,
                 is_cloud_masked,
                 algorithm_version,
-                generated_at
+                generated_at,
+                content_fingerprint
             FROM source
             ON CONFLICT (name) DO UPDATE SET
                 acquired_at = EXCLUDED.acquired_at,
@@ -124,7 +134,11 @@ class LayerRepository:
                 resolution_m = EXCLUDED.resolution_m,
                 is_cloud_masked = EXCLUDED.is_cloud_masked,
                 algorithm_version = EXCLUDED.algorithm_version,
-                generated_at = EXCLUDED.generated_at
+                generated_at = EXCLUDED.generated_at,
+                content_fingerprint = COALESCE(
+                    EXCLUDED.content_fingerprint,
+                    maps_layer.content_fingerprint
+                )
             """,
             (payload,),
         )
@@ -167,6 +181,26 @@ class LayerRepository:
             for acquired_on in dates
         }
 
+    def quality_totals(
+            self,
+            *,
+            agroids: list[int],
+            acquired_on: date,
+    ) -> list[dict]:
+        """Читает сводку пиксельных показателей NDVI хозяйств за дату."""
+        return self.gateway.rows(
+            """
+            SELECT
+                quality.agroid,
+                quality.cloud_pixel_count AS cloud_pixels,
+                quality.valid_pixel_count AS valid_pixels,
+                quality.total_pixel_count AS total_pixels
+            FROM gpgeo.maps_ndvi_agro_quality AS quality
+            WHERE quality.date = %s AND quality.agroid = ANY (%s)
+            """,
+            (acquired_on, agroids),
+        )
+
     def refresh_metadata(
             self,
             updates: list[LayerMetadataUpdate],
@@ -194,6 +228,10 @@ class LayerRepository:
             ],
             ensure_ascii=False,
         )
+        # Явный диапазон дат позволяет планировщику отсечь годовые секции
+        # maps_ndvi_values до обновления времени съёмки.
+        dates = [item.acquired_on for item in updates]
+        period = (min(dates), max(dates))
         row = self.gateway.row(
             """
             WITH source AS (
@@ -223,6 +261,7 @@ class LayerRepository:
                 SET acquired_at = acquisition.acquired_at
                 FROM acquisition
                 WHERE ndvi.date = acquisition.acquired_on
+                  AND ndvi.date BETWEEN %s AND %s
                   AND ndvi.acquired_at IS DISTINCT FROM acquisition.acquired_at
                 RETURNING ndvi.id
             ),
@@ -230,26 +269,13 @@ class LayerRepository:
                 SELECT
                     source.acquired_on,
                     source.agroid,
-                    SUM(ndvi.cloud_pixel_count) AS cloud_pixels,
-                    SUM(ndvi.valid_pixel_count) AS valid_pixels,
-                    SUM(ndvi.total_pixel_count) AS total_pixels
+                    rollup.cloud_pixel_count AS cloud_pixels,
+                    rollup.valid_pixel_count AS valid_pixels,
+                    rollup.total_pixel_count AS total_pixels
                 FROM source
-                LEFT JOIN LATERAL
-                    (
-                        SELECT DISTINCT field.id
-                        FROM gpgeo.maps_field AS field
-                        INNER JOIN gpgeo.maps_field_shape AS shape
-                            ON shape.fieldid = field.id
-                        WHERE field.agroid = source.agroid
-                          AND shape.year = EXTRACT(
-                              YEAR FROM source.acquired_on
-                          )::integer
-                    ) AS field
-                    ON true
-                LEFT JOIN gpgeo.maps_ndvi_values AS ndvi
-                    ON ndvi.date = source.acquired_on
-                    AND ndvi.fieldid = field.id
-                GROUP BY source.acquired_on, source.agroid
+                LEFT JOIN gpgeo.maps_ndvi_agro_quality AS rollup
+                    ON rollup.date = source.acquired_on
+                    AND rollup.agroid = source.agroid
             ),
             updated AS (
                 UPDATE gpgeo.maps_layer AS layer
@@ -296,7 +322,7 @@ class LayerRepository:
             )
             SELECT COUNT(*) AS updated_count FROM updated
             """,
-            (payload,),
+            (payload, *period),
         )
         return int(row["updated_count"] if row else 0)
 
@@ -368,28 +394,124 @@ class FieldRepository:
             )
         return rows[0][0], rows[0][1], rows[0][2], rows[0][3]
 
+    def tiles(
+            self,
+            *,
+            year: int,
+            agroid: int,
+            zoom_start: int,
+            zoom_stop: int,
+            buffer: float = 0.0,
+    ) -> list[tuple[int, int, int]]:
+        """
+        Возвращает тайлы WebMercatorQuad ``(z, x, y)``, задевающие поля.
+
+        Кандидаты перебираются только в пределах рамки каждого поля, затем
+        отбрасываются тайлы, не пересекающие контур, расширенный на
+        ``buffer`` метров. Буфер строится в geography: метры EPSG:3857 на
+        широтах полей короче земных почти вдвое. Строка ``y`` отсчитывается
+        от севера, как в ``ST_TileEnvelope``.
+        """
+        rows = self.gateway.rows(
+            """
+            WITH fields AS (
+                SELECT public.ST_Transform(
+                    public.ST_Buffer(
+                        public.ST_Transform(
+                            shape.fieldgeometry,
+                            4326
+                        )::public.geography,
+                        %s
+                    )::public.geometry,
+                    3857
+                ) AS geom
+                FROM gpgeo.maps_field_shape AS shape
+                INNER JOIN gpgeo.maps_field AS field
+                    ON field.id = shape.fieldid
+                WHERE shape.year = %s
+                  AND field.agroid = %s
+            ),
+            grid AS (
+                SELECT
+                    zoom,
+                    40075016.68557849 / (2 ^ zoom) AS size,
+                    (1 << zoom) - 1 AS last
+                FROM generate_series(%s, %s) AS zoom
+            )
+            SELECT DISTINCT grid.zoom, x, y
+            FROM fields
+            CROSS JOIN grid
+            CROSS JOIN LATERAL generate_series(
+                GREATEST(0, floor(
+                    (public.ST_XMin(fields.geom) + 20037508.342789244)
+                    / grid.size
+                )::integer),
+                LEAST(grid.last, floor(
+                    (public.ST_XMax(fields.geom) + 20037508.342789244)
+                    / grid.size
+                )::integer)
+            ) AS x
+            CROSS JOIN LATERAL generate_series(
+                GREATEST(0, floor(
+                    (20037508.342789244 - public.ST_YMax(fields.geom))
+                    / grid.size
+                )::integer),
+                LEAST(grid.last, floor(
+                    (20037508.342789244 - public.ST_YMin(fields.geom))
+                    / grid.size
+                )::integer)
+            ) AS y
+            WHERE public.ST_Intersects(
+                fields.geom,
+                public.ST_TileEnvelope(grid.zoom, x, y)
+            )
+            ORDER BY grid.zoom, y, x
+            """,
+            (buffer, year, agroid, zoom_start, zoom_stop),
+        )
+        return [(int(row[0]), int(row[1]), int(row[2])) for row in rows]
+
+    @staticmethod
+    def _geometry_sql(
+            column: str,
+            tolerance: float | None,
+    ) -> tuple[str, tuple[Any, ...]]:
+        """
+        Возвращает выражение WKB контура в целевой системе координат.
+
+        При ``tolerance`` контур упрощается на сервере до размера пикселя,
+        сохраняя топологию.
+        """
+        transformed = f"public.ST_Transform({column}, %s)"
+        if tolerance is None:
+            return f"public.ST_AsBinary({transformed})", ()
+        return (
+            "public.ST_AsBinary(public.ST_SimplifyPreserveTopology("
+            f"{transformed}, %s))",
+            (tolerance,),
+        )
+
     def geometries(
             self,
             field_ids: list[int],
             year: int,
-    ) -> dict[int, Any]:
-        """Возвращает геометрии полей одним запросом к PostGIS."""
+            *,
+            srid: int,
+            tolerance: float | None = None,
+    ) -> dict[int, bytes]:
+        """Возвращает WKB-контуры полей в ``srid`` одним запросом к PostGIS."""
         if not field_ids:
             return {}
+        expression, extra = self._geometry_sql("shape.fieldgeometry", tolerance)
         rows = self.gateway.rows(
-            """
-            SELECT
-                shape.fieldid,
-                json_build_object(
-                    'type', 'Feature',
-                    'geometry', public.ST_AsGeoJSON(shape.fieldgeometry)::json
-                )
+            f"""
+            SELECT shape.fieldid, {expression}
             FROM gpgeo.maps_field_shape AS shape
             WHERE shape.fieldid = ANY (%s) AND shape.year = %s
             """,
-            (field_ids, year),
+            (srid, *extra, field_ids, year),
         )
-        result = {row[0]: row[1] for row in rows}
+        result = {row[0]: bytes(row[1]) for row in rows}
         missing = set(field_ids).difference(result)
         if missing:
             raise LookupError(
@@ -398,6 +520,222 @@ class FieldRepository:
             )
         return result
 
+    def snapshots(
+            self,
+            *,
+            agroids: list[int],
+            year: int,
+            srid: int,
+            acquired_on: date,
+            tolerance: float | None = None,
+    ) -> dict[int, AgroSnapshot]:
+        """
+        Читает поля, геометрии, границы и полноту NDVI хозяйств одним SQL.
+
+        Хозяйство без контуров за сезон возвращается с пустым набором полей.
+        """
+        selected = sorted(set(agroids))
+        if not selected:
+            return {}
+        expression, extra = self._geometry_sql("shapes.fieldgeometry", tolerance)
+        rows = self.gateway.rows(
+            f"""
+            WITH requested AS (
+                SELECT unnest(%s::integer[]) AS agroid
+            ),
+            shapes AS (
+                SELECT
+                    field.agroid,
+                    field.id,
+                    field.name,
+                    field.fieldcode,
+                    shape.fieldgeometry
+                FROM requested
+                INNER JOIN gpgeo.maps_field AS field
+                    ON field.agroid = requested.agroid
+                INNER JOIN gpgeo.maps_field_shape AS shape
+                    ON shape.fieldid = field.id
+                WHERE shape.year = %s
+            ),
+            extents AS (
+                SELECT
+                    shapes.agroid,
+                    public.ST_Extent(
+                        public.ST_Transform(shapes.fieldgeometry, %s)
+                    ) AS extent
+                FROM shapes
+                GROUP BY shapes.agroid
+            )
+            SELECT
+                shapes.agroid,
+                shapes.id,
+                shapes.name,
+                shapes.fieldcode,
+                {expression} AS geometry,
+                public.ST_XMin(extents.extent) AS xmin,
+                public.ST_YMin(extents.extent) AS ymin,
+                public.ST_XMax(extents.extent) AS xmax,
+                public.ST_YMax(extents.extent) AS ymax,
+                EXISTS (
+                    SELECT 1
+                    FROM gpgeo.maps_ndvi_values AS ndvi
+                    WHERE ndvi.date = %s AND ndvi.fieldid = shapes.id
+                ) AS has_ndvi
+            FROM shapes
+            INNER JOIN extents ON extents.agroid = shapes.agroid
+            ORDER BY shapes.agroid, shapes.fieldcode, shapes.name
+            """,
+            (selected, year, srid, srid, *extra, acquired_on),
+        )
+        grouped: dict[int, dict[str, Any]] = {
+            agroid: {
+                "fields": {},
+                "geometries": {},
+                "bounds": None,
+                "complete": True,
+            }
+            for agroid in selected
+        }
+        for row in rows:
+            state = grouped[int(row["agroid"])]
+            field_id = int(row["id"])
+            state["fields"].setdefault(
+                field_id,
+                Field(
+                    id=field_id,
+                    name=str(row["name"]),
+                    fieldcode=(
+                        str(row["fieldcode"])
+                        if row["fieldcode"] is not None
+                        else None
+                    ),
+                ),
+            )
+            state["geometries"][field_id] = bytes(row["geometry"])
+            state["bounds"] = (
+                row["xmin"],
+                row["ymin"],
+                row["xmax"],
+                row["ymax"],
+            )
+            state["complete"] = state["complete"] and bool(row["has_ndvi"])
+        return {
+            agroid: AgroSnapshot(
+                agroid=agroid,
+                fields=tuple(state["fields"].values()),
+                bounds=state["bounds"],
+                geometries=state["geometries"],
+                ndvi_complete=bool(state["fields"]) and state["complete"],
+            )
+            for agroid, state in grouped.items()
+        }
+
+    def revisions(
+            self,
+            *,
+            agroids: list[int],
+            year: int,
+            acquired_on: date,
+    ) -> list[FieldRevision]:
+        """
+        Читает версии, названия полей хозяйств и наличие NDVI без геометрий.
+
+        Версия строится из системного столбца ``xmin`` обеих таблиц, поэтому
+        запрос не трансформирует и не передаёт контуры. Порядок полей внутри
+        хозяйства совпадает с ``list_for_agro``.
+        """
+        selected = sorted(set(agroids))
+        if not selected:
+            return []
+        rows = self.gateway.rows(
+            """
+            SELECT
+                field.agroid,
+                field.id,
+                field.name,
+                field.fieldcode,
+                field.xmin::text || ':' || shape.xmin::text AS revision,
+                EXISTS (
+                    SELECT 1
+                    FROM gpgeo.maps_ndvi_values AS ndvi
+                    WHERE ndvi.date = %s AND ndvi.fieldid = field.id
+                ) AS has_ndvi
+            FROM gpgeo.maps_field AS field
+            INNER JOIN gpgeo.maps_field_shape AS shape
+                ON shape.fieldid = field.id
+            WHERE field.agroid = ANY (%s) AND shape.year = %s
+            ORDER BY field.agroid, field.fieldcode, field.name, field.id
+            """,
+            (acquired_on, selected, year),
+        )
+        return [
+            FieldRevision(
+                agroid=int(row["agroid"]),
+                field_id=int(row["id"]),
+                revision=str(row["revision"]),
+                has_ndvi=bool(row["has_ndvi"]),
+                name=str(row["name"]),
+                fieldcode=(
+                    str(row["fieldcode"])
+                    if row["fieldcode"] is not None
+                    else None
+                ),
+            )
+            for row in rows
+        ]
+
+    def extents(
+            self,
+            *,
+            agroids: list[int],
+            year: int,
+            srids: list[int],
+    ) -> dict[int, dict[int, tuple[float, float, float, float]]]:
+        """
+        Возвращает границы хозяйств сразу в нескольких SRID одним запросом.
+
+        Хозяйство без контуров за сезон в результат не попадает.
+        """
+        selected = sorted(set(agroids))
+        targets = list(dict.fromkeys(srids))
+        if not selected or not targets:
+            return {}
+        rows = self.gateway.rows(
+            """
+            SELECT
+                bounds.agroid,
+                bounds.srid,
+                public.ST_XMin(bounds.extent),
+                public.ST_YMin(bounds.extent),
+                public.ST_XMax(bounds.extent),
+                public.ST_YMax(bounds.extent)
+            FROM (
+                SELECT
+                    field.agroid,
+                    target.srid,
+                    public.ST_Extent(
+                        public.ST_Transform(shape.fieldgeometry, target.srid)
+                    ) AS extent
+                FROM gpgeo.maps_field_shape AS shape
+                INNER JOIN gpgeo.maps_field AS field
+                    ON field.id = shape.fieldid
+                CROSS JOIN unnest(%s::integer[]) AS target(srid)
+                WHERE field.agroid = ANY (%s) AND shape.year = %s
+                GROUP BY field.agroid, target.srid
+            ) AS bounds
+            """,
+            (targets, selected, year),
+        )
+        result: dict[int, dict[int, tuple[float, float, float, float]]] = {}
+        for row in rows:
+            result.setdefault(int(row[0]), {})[int(row[1])] = (
+                row[2],
+                row[3],
+                row[4],
+                row[5],
+            )
+        return result
+
 
 class NdviRepository:
     """Хранение статистики NDVI."""
@@ -438,12 +776,125 @@ class NdviRepository:
             for item in values
         ]
 
+    def ensure_partitions(self, years: Iterable[int]) -> None:
+        """
+        Создаёт годовые секции ``maps_ndvi_values`` записываемых сезонов.
+
+        Без секции строки нового года попадают в DEFAULT. До миграции
+        секционирования функции нет, и вызов ничего не делает.
+        """
+        seasons = sorted(set(years))
+        if not seasons:
+            return
+        row = self.gateway.row(
+            "SELECT to_regprocedure(%s) IS NOT NULL AS partitioned",
+            ("gpgeo.maps_ndvi_values_add_partition(integer)",),
+        )
+        if row is None or not row["partitioned"]:
+            return
+        self.gateway.execute(
+            """
+            SELECT gpgeo.maps_ndvi_values_add_partition(season)
+            FROM unnest(%s::integer[]) AS season
+            """,
+            (seasons,),
+        )
+
     def add_many(self, values: list[NdviStatistics]) -> None:
-        """Сохраняет пакет доменных значений статистики NDVI."""
-        self.gateway.insert_many(
+        """
+        Сохраняет пакет статистики NDVI через COPY.
+
+        Сводка качества затронутых хозяйств пересчитывается в той же
+        транзакции.
+        """
+        if not values:
+            return
+        self.gateway.copy_many(
             NdviRecord,
             self._rows(values),
             conflict_fields="date, fieldid",
+            commit=False,
+        )
+        self._refresh_quality(
+            [item.acquired_on for item in values],
+            [item.field_id for item in values],
+        )
+
+    def _refresh_quality(
+            self,
+            dates: list[date],
+            field_ids: list[int],
+    ) -> None:
+        """
+        Пересчитывает сводку качества хозяйств, чьи поля изменились.
+
+        Агрегат строится только для пар (дата, хозяйство) изменённых полей и
+        фиксирует транзакцию вместе с записью статистики. Advisory-блокировка
+        ключей берётся отдельным запросом: агрегат читает снимок после
+        фиксации параллельного писателя того же хозяйства и не затирает его
+        поля своими. Перенос полей между хозяйствами и смена контуров сезона
+        требуют ``gpgeo.maps_ndvi_agro_quality_rebuild``.
+        """
+        self.gateway.execute(
+            """
+            SELECT pg_advisory_xact_lock(
+                hashtext('maps_ndvi_agro_quality'),
+                hashtext(affected.date::text || ':' || affected.agroid::text)
+            )
+            FROM (
+                SELECT DISTINCT item.date, field.agroid
+                FROM unnest(%s::date[], %s::bigint[]) AS item(date, fieldid)
+                INNER JOIN gpgeo.maps_field AS field
+                    ON field.id = item.fieldid
+                ORDER BY item.date, field.agroid
+            ) AS affected
+            """,
+            (dates, field_ids),
+            commit=False,
+        )
+        self.gateway.execute(
+            """
+            WITH affected AS (
+                SELECT DISTINCT item.date, field.agroid
+                FROM unnest(%s::date[], %s::bigint[]) AS item(date, fieldid)
+                INNER JOIN gpgeo.maps_field AS field
+                    ON field.id = item.fieldid
+            )
+            INSERT INTO gpgeo.maps_ndvi_agro_quality (
+                date, agroid, cloud_pixel_count, valid_pixel_count,
+                total_pixel_count, field_count, updated_at
+            )
+            SELECT
+                affected.date,
+                affected.agroid,
+                SUM(ndvi.cloud_pixel_count),
+                SUM(ndvi.valid_pixel_count),
+                SUM(ndvi.total_pixel_count),
+                COUNT(ndvi.fieldid),
+                now()
+            FROM affected
+            LEFT JOIN LATERAL
+                (
+                    SELECT DISTINCT field.id
+                    FROM gpgeo.maps_field AS field
+                    INNER JOIN gpgeo.maps_field_shape AS shape
+                        ON shape.fieldid = field.id
+                    WHERE field.agroid = affected.agroid
+                      AND shape.year = EXTRACT(YEAR FROM affected.date)::integer
+                ) AS field
+                ON true
+            LEFT JOIN gpgeo.maps_ndvi_values AS ndvi
+                ON ndvi.date = affected.date
+                AND ndvi.fieldid = field.id
+            GROUP BY affected.date, affected.agroid
+            ON CONFLICT (date, agroid) DO UPDATE SET
+                cloud_pixel_count = EXCLUDED.cloud_pixel_count,
+                valid_pixel_count = EXCLUDED.valid_pixel_count,
+                total_pixel_count = EXCLUDED.total_pixel_count,
+                field_count = EXCLUDED.field_count,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (dates, field_ids),
         )
 
     def replace_many(
@@ -473,14 +924,19 @@ class NdviRepository:
             WHERE date = %s AND fieldid = ANY (%s)
             """,
             (acquired_on, selected_ids),
-            commit=not rows,
+            commit=False,
         )
         if rows:
-            self.gateway.insert_many(
+            self.gateway.copy_many(
                 NdviRecord,
                 rows,
                 conflict_fields="date, fieldid",
+                commit=False,
             )
+        self._refresh_quality(
+            [acquired_on] * len(selected_ids),
+            selected_ids,
+        )
 
     def is_complete(
             self,
@@ -501,3 +957,154 @@ class NdviRepository:
         )
         existing = {row["fieldid"] for row in rows}
         return set(field_ids).issubset(existing)
+
+    @staticmethod
+    def _statistics(row: dict) -> NdviStatistics:
+        """Преобразует строку ``maps_ndvi_values`` в доменную статистику."""
+        return NdviStatistics(
+            acquired_on=row["date"],
+            field_id=int(row["fieldid"]),
+            mean=row["ndvimean"],
+            maximum=row["ndvimax"],
+            minimum=row["ndvimin"],
+            growth_percent=row["growth_percent"],
+            coefficient_of_variation=row["ndvi_cv"],
+            is_uniform=bool(row["is_uniform"]),
+            acquired_at=row["acquired_at"],
+            valid_pixel_count=row["valid_pixel_count"],
+            total_pixel_count=row["total_pixel_count"],
+            cloud_pixel_count=row["cloud_pixel_count"],
+            nodata_pixel_count=row["nodata_pixel_count"],
+            shadow_pixel_count=row["shadow_pixel_count"],
+            snow_pixel_count=row["snow_pixel_count"],
+            valid_coverage_percent=row["valid_coverage_percent"],
+            cloud_coverage_percent=row["cloud_coverage_percent"],
+            standard_deviation=row["ndvi_stddev"],
+            median=row["ndvi_median"],
+            percentile_10=row["ndvi_p10"],
+            percentile_90=row["ndvi_p90"],
+            source_level=row["source_level"],
+            algorithm_version=row["algorithm_version"],
+            calculated_at=row["calculated_at"],
+        )
+
+    def series(
+            self,
+            *,
+            agroid: int,
+            years: list[int] | None = None,
+            fieldcodes: list[str] | None = None,
+            with_geometry: bool = False,
+            batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[FieldNdviSeries]:
+        """
+        Потоково читает сезонные ряды NDVI полей хозяйства.
+
+        Строки идут через server-side cursor порциями ``batch_size``, поэтому
+        в памяти находится только ряд текущего поля. Годы ограничивают
+        диапазон дат и отсекают лишние секции ``maps_ndvi_values``;
+        fieldcode сравнивается без учёта регистра. Контур сезона в
+        EPSG:4326 читается один раз на ряд.
+        """
+        conditions = ["field.agroid = %s"]
+        params: list[Any] = [agroid]
+        if years:
+            selected = sorted(set(years))
+            conditions.append(
+                "ndvi.date >= %s AND ndvi.date < %s "
+                "AND EXTRACT(YEAR FROM ndvi.date)::integer = ANY (%s)"
+            )
+            params.extend([
+                date(selected[0], 1, 1),
+                date(selected[-1] + 1, 1, 1),
+                selected,
+            ])
+        if fieldcodes:
+            conditions.append("lower(field.fieldcode) = ANY (%s)")
+            params.append(sorted({
+                unicodedata.normalize("NFC", fieldcode.strip()).lower()
+                for fieldcode in fieldcodes
+            }))
+        geometry = (
+            """
+                CASE WHEN row_number() OVER (
+                    PARTITION BY ndvi.fieldid, EXTRACT(YEAR FROM ndvi.date)
+                    ORDER BY ndvi.date
+                ) = 1 THEN public.ST_AsGeoJSON(
+                    public.ST_Transform(shape.fieldgeometry, 4326)
+                ) END
+            """
+            if with_geometry
+            else "NULL::text"
+        )
+        shape_join = (
+            """
+            LEFT JOIN gpgeo.maps_field_shape AS shape
+                ON shape.fieldid = field.id
+                AND shape.year = EXTRACT(YEAR FROM ndvi.date)::integer
+            """
+            if with_geometry
+            else ""
+        )
+        rows = self.gateway.stream(
+            f"""
+            SELECT
+                field.name,
+                field.fieldcode,
+                EXTRACT(YEAR FROM ndvi.date)::integer AS year,
+                ndvi.date,
+                ndvi.acquired_at,
+                ndvi.fieldid,
+                ndvi.ndvimean,
+                ndvi.ndvimax,
+                ndvi.ndvimin,
+                ndvi.growth_percent,
+                ndvi.ndvi_cv,
+                ndvi.is_uniform,
+                ndvi.valid_pixel_count,
+                ndvi.total_pixel_count,
+                ndvi.cloud_pixel_count,
+                ndvi.nodata_pixel_count,
+                ndvi.shadow_pixel_count,
+                ndvi.snow_pixel_count,
+                ndvi.valid_coverage_percent,
+                ndvi.cloud_coverage_percent,
+                ndvi.ndvi_stddev,
+                ndvi.ndvi_median,
+                ndvi.ndvi_p10,
+                ndvi.ndvi_p90,
+                ndvi.source_level,
+                ndvi.algorithm_version,
+                ndvi.calculated_at,
+                {geometry} AS geometry
+            FROM gpgeo.maps_field AS field
+            INNER JOIN gpgeo.maps_ndvi_values AS ndvi
+                ON ndvi.fieldid = field.id
+            {shape_join}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY ndvi.fieldid, ndvi.date
+            """,
+            tuple(params),
+            batch_size=batch_size,
+        )
+        for (field_id, year), group in itertools.groupby(
+                rows,
+                key=lambda row: (int(row["fieldid"]), int(row["year"])),
+        ):
+            group_rows = list(group)
+            first = group_rows[0]
+            yield FieldNdviSeries(
+                agroid=agroid,
+                field=Field(
+                    id=field_id,
+                    name=str(first["name"]),
+                    fieldcode=(
+                        str(first["fieldcode"])
+                        if first["fieldcode"] is not None
+                        else None
+                    ),
+                ),
+                year=year,
+                points=tuple(self._statistics(row) for row in group_rows),
+                geometry=first["geometry"],
+            )
@@ -0,0 +1,26 @@
+-- Добавляет составные индексы частых запросов обработки и публикации.
+BEGIN;
+
+-- Полнота и качество NDVI: дата, затем поля хозяйства; пиксельные счётчики
+-- включены в индекс, чтобы агрегаты качества читались index-only scan.
+CREATE INDEX IF NOT EXISTS maps_ndvi_values_date_fieldid_quality_index
+    ON gpgeo.maps_ndvi_values (date, fieldid)
+    INCLUDE (cloud_pixel_count, valid_pixel_count, total_pixel_count);
+
+-- Незавершённые хозяйства и обновление метаданных слоёв по дате и хозяйству.
+CREATE INDEX IF NOT EXISTS maps_layer_date_agroid_index
+    ON gpgeo.maps_layer (date, agroid)
+    INCLUDE (set);
+
+-- Поля хозяйства и их контуры за сезон в CTE качества и снимках хозяйств.
+CREATE INDEX IF NOT EXISTS maps_field_agroid_id_index
+    ON gpgeo.maps_field (agroid, id);
+CREATE INDEX IF NOT EXISTS maps_field_shape_year_fieldid_index
+    ON gpgeo.maps_field_shape (year, fieldid);
+
+ANALYZE gpgeo.maps_ndvi_values;
+ANALYZE gpgeo.maps_layer;
+ANALYZE gpgeo.maps_field;
+ANALYZE gpgeo.maps_field_shape;
+
+COMMIT;
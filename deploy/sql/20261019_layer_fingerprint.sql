@@ -0,0 +1,13 @@
+-- Добавляет отпечаток содержимого опубликованного растра.
+--
+-- Публикация сравнивает его с отпечатком рядом с COG и при совпадении
+-- не перекодирует растр и не прогревает кэш GeoWebCache повторно.
+BEGIN;
+
+ALTER TABLE gpgeo.maps_layer
+    ADD COLUMN IF NOT EXISTS content_fingerprint varchar(64);
+
+COMMENT ON COLUMN gpgeo.maps_layer.content_fingerprint IS
+    'SHA-256 пикселей, геопривязки и профиля COG опубликованного растра';
+
+COMMIT;
@@ -0,0 +1,96 @@
+-- Добавляет сводку пиксельного качества NDVI по хозяйству и дате.
+--
+-- Сводку поддерживает NdviRepository в транзакции записи статистики под
+-- advisory-блокировкой ключа (дата, хозяйство); публикация и обновление
+-- метаданных слоёв читают её по первичному ключу.
+--
+-- Запись статистики пересчитывает только хозяйства записанных полей.
+-- Сезон перестраивается целиком вызовом
+-- SELECT gpgeo.maps_ndvi_agro_quality_rebuild(<год>); после переноса полей
+-- между хозяйствами (maps_field.agroid), изменения состава контуров сезона
+-- (maps_field_shape) и ручной правки или удаления строк maps_ndvi_values.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS gpgeo.maps_ndvi_agro_quality (
+    date date NOT NULL,
+    agroid integer NOT NULL,
+    cloud_pixel_count bigint,
+    valid_pixel_count bigint,
+    total_pixel_count bigint,
+    field_count integer NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    CONSTRAINT maps_ndvi_agro_quality_pkey PRIMARY KEY (date, agroid),
+    CONSTRAINT maps_ndvi_agro_quality_field_count_check
+        CHECK (field_count >= 0)
+);
+
+COMMENT ON TABLE gpgeo.maps_ndvi_agro_quality IS
+    'Сумма пиксельных показателей NDVI полей хозяйства за дату съёмки';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.date IS
+    'Календарная дата спутниковой съёмки';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.agroid IS
+    'Хозяйство, по полям которого суммированы показатели';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.cloud_pixel_count IS
+    'Сумма облачных пикселей полей по SCL; NULL для L1C';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.valid_pixel_count IS
+    'Сумма валидных пикселей полей';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.total_pixel_count IS
+    'Сумма всех пикселей внутри геометрий полей';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.field_count IS
+    'Количество полей хозяйства со статистикой за дату';
+COMMENT ON COLUMN gpgeo.maps_ndvi_agro_quality.updated_at IS
+    'Время последнего пересчёта сводки';
+
+CREATE OR REPLACE FUNCTION gpgeo.maps_ndvi_agro_quality_rebuild(season integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Блокировка ждёт транзакции записи статистики и не пускает новые,
+    -- пока сводка сезона строится заново.
+    LOCK TABLE gpgeo.maps_ndvi_agro_quality IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM gpgeo.maps_ndvi_agro_quality
+    WHERE date >= make_date(season, 1, 1)
+      AND date < make_date(season + 1, 1, 1);
+
+    INSERT INTO gpgeo.maps_ndvi_agro_quality (
+        date, agroid, cloud_pixel_count, valid_pixel_count,
+        total_pixel_count, field_count
+    )
+    SELECT
+        ndvi.date,
+        field.agroid,
+        SUM(ndvi.cloud_pixel_count),
+        SUM(ndvi.valid_pixel_count),
+        SUM(ndvi.total_pixel_count),
+        COUNT(*)
+    FROM gpgeo.maps_ndvi_values AS ndvi
+    INNER JOIN gpgeo.maps_field AS field
+        ON field.id = ndvi.fieldid
+    WHERE ndvi.date >= make_date(season, 1, 1)
+      AND ndvi.date < make_date(season + 1, 1, 1)
+      AND EXISTS (
+          SELECT 1
+          FROM gpgeo.maps_field_shape AS shape
+          WHERE shape.fieldid = field.id
+            AND shape.year = season
+      )
+    GROUP BY ndvi.date, field.agroid;
+END;
+$$;
+
+COMMENT ON FUNCTION gpgeo.maps_ndvi_agro_quality_rebuild(integer) IS
+    'Перестраивает сводку качества NDVI хозяйств за сезон';
+
+-- Заполнение по уже рассчитанной статистике всех сезонов.
+SELECT gpgeo.maps_ndvi_agro_quality_rebuild(season)
+FROM (
+    SELECT DISTINCT EXTRACT(YEAR FROM date)::integer AS season
+    FROM gpgeo.maps_ndvi_values
+) AS seasons
+ORDER BY season;
+
+ANALYZE gpgeo.maps_ndvi_agro_quality;
+
+COMMIT;
@@ -0,0 +1,215 @@
+-- Переводит статистику NDVI на годовые секции по дате съёмки.
+--
+-- Прежняя таблица сохраняется как maps_ndvi_values_legacy и удаляется вручную
+-- после проверки scripts/explain_hot_queries.py. Секции создаются до текущего
+-- года включительно и на год вперёд; секцию записываемого сезона приложение
+-- создаёт само через gpgeo.maps_ndvi_values_add_partition(<год>) перед
+-- записью статистики. Строки, успевшие попасть в maps_ndvi_values_default,
+-- функция переносит в созданную секцию.
+--
+-- Внешние ключи и обычные индексы прежней таблицы переносятся на новую;
+-- ссылки других таблиц на maps_ndvi_values(id) секционированием не
+-- поддерживаются, поэтому при их наличии миграция прерывается.
+BEGIN;
+
+LOCK TABLE gpgeo.maps_ndvi_values IN ACCESS EXCLUSIVE MODE;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM pg_constraint
+        WHERE confrelid = 'gpgeo.maps_ndvi_values'::regclass
+          AND contype = 'f'
+    ) THEN
+        RAISE EXCEPTION
+            'На gpgeo.maps_ndvi_values ссылаются внешние ключи других таблиц';
+    END IF;
+END;
+$$;
+
+ALTER TABLE gpgeo.maps_ndvi_values RENAME TO maps_ndvi_values_legacy;
+
+CREATE TABLE gpgeo.maps_ndvi_values (
+    LIKE gpgeo.maps_ndvi_values_legacy
+        INCLUDING DEFAULTS
+        INCLUDING IDENTITY
+        INCLUDING CONSTRAINTS
+        INCLUDING COMMENTS
+) PARTITION BY RANGE (date);
+
+-- Уникальность секционированной таблицы обязана включать ключ секции.
+ALTER TABLE gpgeo.maps_ndvi_values
+    ADD CONSTRAINT maps_ndvi_values_partitioned_pkey PRIMARY KEY (id, date),
+    ADD CONSTRAINT maps_ndvi_values_partitioned_date_fieldid_key
+        UNIQUE (date, fieldid);
+
+-- LIKE не копирует обычные индексы: они переименовываются у прежней таблицы
+-- и создаются заново под исходными именами. Уникальные индексы без ключа
+-- секции перенести нельзя; уникальность задают ограничения выше.
+DO $$
+DECLARE
+    legacy_index record;
+BEGIN
+    FOR legacy_index IN
+        SELECT
+            index_class.relname AS name,
+            pg_get_indexdef(item.indexrelid) AS definition
+        FROM pg_index AS item
+        INNER JOIN pg_class AS index_class
+            ON index_class.oid = item.indexrelid
+        WHERE item.indrelid = 'gpgeo.maps_ndvi_values_legacy'::regclass
+          AND NOT item.indisunique
+          AND NOT EXISTS (
+              SELECT 1
+              FROM pg_constraint
+              WHERE pg_constraint.conindid = item.indexrelid
+          )
+    LOOP
+        EXECUTE format(
+            'ALTER INDEX gpgeo.%I RENAME TO %I',
+            legacy_index.name,
+            left(legacy_index.name, 56) || '_legacy'
+        );
+        EXECUTE regexp_replace(
+            legacy_index.definition,
+            ' ON (gpgeo\.)?maps_ndvi_values_legacy ',
+            ' ON gpgeo.maps_ndvi_values '
+        );
+    END LOOP;
+END;
+$$;
+
+-- Индексы частых запросов нужны и там, где их миграция ещё не применялась.
+CREATE INDEX IF NOT EXISTS maps_ndvi_values_date_fieldid_quality_index
+    ON gpgeo.maps_ndvi_values (date, fieldid)
+    INCLUDE (cloud_pixel_count, valid_pixel_count, total_pixel_count);
+CREATE INDEX IF NOT EXISTS maps_ndvi_values_acquired_at_index
+    ON gpgeo.maps_ndvi_values (acquired_at);
+
+CREATE OR REPLACE FUNCTION gpgeo.maps_ndvi_values_add_partition(season integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    partition_name text := 'maps_ndvi_values_' || season;
+    lower_bound date := make_date(season, 1, 1);
+    upper_bound date := make_date(season + 1, 1, 1);
+BEGIN
+    IF to_regclass(format('gpgeo.%I', partition_name)) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    -- Секцию нельзя создать, пока строки её диапазона лежат в DEFAULT:
+    -- они временно выносятся и возвращаются через родительскую таблицу.
+    IF to_regclass('gpgeo.maps_ndvi_values_default') IS NOT NULL THEN
+        LOCK TABLE gpgeo.maps_ndvi_values_default IN ACCESS EXCLUSIVE MODE;
+        DROP TABLE IF EXISTS pg_temp.maps_ndvi_values_moved;
+        CREATE TEMPORARY TABLE maps_ndvi_values_moved (
+            LIKE gpgeo.maps_ndvi_values_default
+        ) ON COMMIT DROP;
+        WITH moved AS (
+            DELETE FROM gpgeo.maps_ndvi_values_default
+            WHERE date >= lower_bound
+              AND date < upper_bound
+            RETURNING *
+        )
+        INSERT INTO pg_temp.maps_ndvi_values_moved
+        SELECT * FROM moved;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE gpgeo.%I '
+        'PARTITION OF gpgeo.maps_ndvi_values '
+        'FOR VALUES FROM (%L) TO (%L)',
+        partition_name,
+        lower_bound,
+        upper_bound
+    );
+
+    IF to_regclass('pg_temp.maps_ndvi_values_moved') IS NOT NULL THEN
+        INSERT INTO gpgeo.maps_ndvi_values
+        SELECT * FROM pg_temp.maps_ndvi_values_moved;
+        DROP TABLE pg_temp.maps_ndvi_values_moved;
+    END IF;
+END;
+$$;
+
+COMMENT ON FUNCTION gpgeo.maps_ndvi_values_add_partition(integer) IS
+    'Создаёт годовую секцию статистики NDVI и переносит в неё строки DEFAULT';
+
+DO $$
+DECLARE
+    first_season integer;
+BEGIN
+    SELECT COALESCE(
+        MIN(EXTRACT(YEAR FROM date))::integer,
+        EXTRACT(YEAR FROM now())::integer
+    )
+    INTO first_season
+    FROM gpgeo.maps_ndvi_values_legacy;
+
+    FOR season IN first_season..EXTRACT(YEAR FROM now())::integer + 1 LOOP
+        PERFORM gpgeo.maps_ndvi_values_add_partition(season);
+    END LOOP;
+END;
+$$;
+
+CREATE TABLE gpgeo.maps_ndvi_values_default
+    PARTITION OF gpgeo.maps_ndvi_values DEFAULT;
+
+INSERT INTO gpgeo.maps_ndvi_values
+SELECT * FROM gpgeo.maps_ndvi_values_legacy;
+
+-- LIKE не копирует внешние ключи; они добавляются после переноса строк,
+-- чтобы проверка выполнялась один раз.
+DO $$
+DECLARE
+    foreign_key record;
+BEGIN
+    FOR foreign_key IN
+        SELECT conname AS name, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = 'gpgeo.maps_ndvi_values_legacy'::regclass
+          AND contype = 'f'
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE gpgeo.maps_ndvi_values ADD CONSTRAINT %I %s',
+            foreign_key.name,
+            foreign_key.definition
+        );
+    END LOOP;
+END;
+$$;
+
+-- serial-последовательность прежней таблицы переходит к новой, identity
+-- продолжает нумерацию после перенесённых строк.
+DO $$
+DECLARE
+    legacy_sequence text := pg_get_serial_sequence(
+        'gpgeo.maps_ndvi_values_legacy',
+        'id'
+    );
+    current_sequence text := pg_get_serial_sequence(
+        'gpgeo.maps_ndvi_values',
+        'id'
+    );
+BEGIN
+    IF current_sequence IS NULL AND legacy_sequence IS NOT NULL THEN
+        EXECUTE format(
+            'ALTER SEQUENCE %s OWNED BY gpgeo.maps_ndvi_values.id',
+            legacy_sequence
+        );
+    ELSIF current_sequence IS NOT NULL THEN
+        PERFORM setval(
+            current_sequence,
+            COALESCE((SELECT MAX(id) FROM gpgeo.maps_ndvi_values), 0) + 1,
+            false
+        );
+    END IF;
+END;
+$$;
+
+ANALYZE gpgeo.maps_ndvi_values;
+
+COMMIT;
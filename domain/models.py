@@ -1,7 +1,7 @@
 """Предметные сущности, не зависящие от БД и внешних API."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
 
 
@@ -17,6 +17,40 @@ class Field:
     fieldcode: str | None = None
 
 
+@dataclass(frozen=True)
+class AgroSnapshot:
+    """Состояние хозяйства на дату, прочитанное одним запросом к PostGIS."""
+
+    # Идентификатор хозяйства.
+    agroid: int
+    # Поля хозяйства с контурами за сезон.
+    fields: tuple[Field, ...] = ()
+    # Границы хозяйства в запрошенной системе координат; None без контуров.
+    bounds: tuple[float, float, float, float] | None = None
+    # WKB-контуры полей в запрошенной системе координат по id поля.
+    geometries: dict[int, bytes] = field(default_factory=dict)
+    # Рассчитана ли статистика NDVI за дату для каждого поля.
+    ndvi_complete: bool = False
+
+
+@dataclass(frozen=True)
+class FieldRevision:
+    """Версия строк поля и его контура за сезон без чтения геометрии."""
+
+    # Идентификатор хозяйства.
+    agroid: int
+    # Идентификатор поля.
+    field_id: int
+    # xmin строк maps_field и maps_field_shape; меняется при любом UPDATE.
+    revision: str
+    # Есть ли статистика NDVI поля за запрошенную дату.
+    has_ndvi: bool = False
+    # Пользовательское название поля.
+    name: str = ""
+    # Код поля, например A3/F100б.
+    fieldcode: str | None = None
+
+
 @dataclass(frozen=True)
 class NdviStatistics:
     """Статистика NDVI одного поля за дату."""
@@ -71,6 +105,21 @@ class NdviStatistics:
     calculated_at: datetime | None = None
 
 
+@dataclass(frozen=True)
+class FieldNdviSeries:
+    """Временной ряд NDVI одного поля за сезон."""
+
+    # Хозяйство поля.
+    agroid: int
+    field: Field
+    # Сезон, к которому относятся даты ряда и контур.
+    year: int
+    # Статистика по датам съёмки в порядке возрастания.
+    points: tuple[NdviStatistics, ...]
+    # GeoJSON сезонного контура в EPSG:4326; None, если не запрошен.
+    geometry: str | None = None
+
+
 @dataclass(frozen=True)
 class PublishedLayer:
     """Опубликованный слой и метаданные, которые получает интерактивная карта."""
@@ -105,6 +154,8 @@ class PublishedLayer:
     algorithm_version: str | None = None
     # Время формирования либо последнего обновления слоя.
     generated_at: datetime | None = None
+    # SHA-256 пикселей, геопривязки и профиля COG опубликованного растра.
+    content_fingerprint: str | None = None
 
 
 @dataclass(frozen=True)
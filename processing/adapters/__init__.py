@@ -1,5 +1,5 @@
 """Инфраструктурные адаптеры processing ports."""
 
-from .postgis import PostgisFieldDataProvider
+from .postgis import PostgisFieldDataProvider, PostgisNdviSeriesSource
 
-__all__ = ["PostgisFieldDataProvider"]
+__all__ = ["PostgisFieldDataProvider", "PostgisNdviSeriesSource"]
@@ -1,27 +1,220 @@
 """PostGIS-реализации processing ports."""
 from __future__ import annotations
 
+import threading
+from collections.abc import Iterator
 from datetime import date
-from typing import Any
 
-import psycopg2
-
-from db.connection import get_database_config
-from db.gateway import SqlGateway
+from core.logging import get_logger
+from db.connection import pooled_connection
+from db.gateway import STREAM_BATCH_SIZE, SqlGateway
 from db.repositories import FieldRepository, NdviRepository
-from domain.models import Field, NdviStatistics
+from domain.models import AgroSnapshot, Field, FieldNdviSeries, NdviStatistics
+from processing.field_store import (
+    COMMON_SRIDS,
+    FieldGeometryStore,
+    StoredAgroFields,
+    fingerprint,
+)
 
 
 class PostgisFieldDataProvider:
     """Читает PostGIS короткими scope и кеширует сезонные справочники."""
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            *,
+            simplify_tolerance: float | None = None,
+            geometry_store: FieldGeometryStore | None = None,
+    ) -> None:
+        # Допуск серверного упрощения контуров в единицах целевого SRID.
+        self.simplify_tolerance = simplify_tolerance
+        # Контуры прошлых запусков; None — каждый процесс читает их из PostGIS.
+        self.geometry_store = geometry_store
+        self.logger = get_logger(self.__class__.__name__)
         self._bounds: dict[
             tuple[int, int, int],
             tuple[float, float, float, float],
         ] = {}
         self._fields: dict[tuple[int, int], list[Field]] = {}
-        self._geometries: dict[tuple[int, int], Any] = {}
+        self._geometries: dict[tuple[int, int, int], bytes] = {}
+        self._ndvi_complete: dict[tuple[int, int, date], bool] = {}
+        # Полноту NDVI сбрасывает фоновый писатель статистики.
+        self._ndvi_lock = threading.Lock()
+        # Сезоны, секции которых уже проверены этим процессом.
+        self._partitioned_years: set[int] = set()
+
+    def prefetch(
+            self,
+            *,
+            year: int,
+            agroids: tuple[int, ...],
+            srid: int,
+            acquired_on: date,
+    ) -> None:
+        """Одним запросом заполняет кеши полей, геометрий, границ и NDVI."""
+        with self._ndvi_lock:
+            missing = [
+                agroid
+                for agroid in dict.fromkeys(agroids)
+                if (agroid, year, acquired_on) not in self._ndvi_complete
+                or (year, agroid, srid) not in self._bounds
+            ]
+        if not missing:
+            return
+        with pooled_connection() as connection:
+            repository = FieldRepository(SqlGateway(connection))
+            if self.geometry_store is None:
+                snapshots = repository.snapshots(
+                    agroids=missing,
+                    year=year,
+                    srid=srid,
+                    acquired_on=acquired_on,
+                    tolerance=self.simplify_tolerance,
+                )
+            else:
+                snapshots = self._stored_snapshots(
+                    repository,
+                    agroids=missing,
+                    year=year,
+                    srid=srid,
+                    acquired_on=acquired_on,
+                )
+        for agroid, snapshot in snapshots.items():
+            self._fields[(agroid, year)] = list(snapshot.fields)
+            self._geometries.update(
+                ((year, srid, field_id), geometry)
+                for field_id, geometry in snapshot.geometries.items()
+            )
+            if snapshot.bounds is not None:
+                self._bounds[(year, agroid, srid)] = snapshot.bounds
+            with self._ndvi_lock:
+                self._ndvi_complete[(agroid, year, acquired_on)] = (
+                    snapshot.ndvi_complete
+                )
+
+    def _stored_snapshots(
+            self,
+            repository: FieldRepository,
+            *,
+            agroids: list[int],
+            year: int,
+            srid: int,
+            acquired_on: date,
+    ) -> dict[int, AgroSnapshot]:
+        """
+        Собирает снимки из локального хранилища, сверяя версии полей с PostGIS.
+
+        Список полей приходит вместе с версиями. Контуры перечитываются
+        только для новых и изменённых полей, границы — одним запросом для
+        всех хозяйств, где что-то изменилось.
+        """
+        revisions: dict[int, dict[int, str]] = {agroid: {} for agroid in agroids}
+        fields: dict[int, dict[int, Field]] = {agroid: {} for agroid in agroids}
+        complete = dict.fromkeys(agroids, True)
+        for item in repository.revisions(
+                agroids=agroids,
+                year=year,
+                acquired_on=acquired_on,
+        ):
+            revisions[item.agroid][item.field_id] = item.revision
+            fields[item.agroid].setdefault(
+                item.field_id,
+                Field(id=item.field_id, name=item.name, fieldcode=item.fieldcode),
+            )
+            complete[item.agroid] = complete[item.agroid] and item.has_ndvi
+
+        stored: dict[int, StoredAgroFields] = {}
+        stale: dict[int, list[int]] = {}
+        for agroid, current in revisions.items():
+            previous = self.geometry_store.read(
+                year=year,
+                agroid=agroid,
+                srid=srid,
+                tolerance=self.simplify_tolerance,
+            )
+            if (
+                    previous is not None
+                    and previous.fingerprint == fingerprint(current)
+                    and srid in previous.bounds
+            ):
+                stored[agroid] = previous
+                continue
+            if previous is not None:
+                stored[agroid] = previous
+            stale[agroid] = [
+                field_id
+                for field_id, revision in current.items()
+                if previous is None
+                or previous.revisions.get(field_id) != revision
+            ]
+
+        if not stale:
+            loaded = {}
+            extents = {}
+        else:
+            loaded = repository.geometries(
+                [field_id for changed in stale.values() for field_id in changed],
+                year,
+                srid=srid,
+                tolerance=self.simplify_tolerance,
+            )
+            extents = repository.extents(
+                agroids=[agroid for agroid in stale if revisions[agroid]],
+                year=year,
+                srids=list(dict.fromkeys((srid, *COMMON_SRIDS))),
+            )
+        for agroid, changed in stale.items():
+            current = revisions[agroid]
+            previous = stored.get(agroid)
+            geometries = {
+                field_id: (
+                    loaded[field_id]
+                    if field_id in loaded
+                    else previous.geometries[field_id]
+                )
+                for field_id in current
+            }
+            refreshed = StoredAgroFields(
+                agroid=agroid,
+                year=year,
+                srid=srid,
+                tolerance=self.simplify_tolerance,
+                fields=tuple(fields[agroid].values()),
+                geometries=geometries,
+                revisions=current,
+                bounds=extents.get(agroid, {}),
+            )
+            if current:
+                try:
+                    self.geometry_store.write(refreshed)
+                except OSError as exc:
+                    self.logger.warning(
+                        "Контуры хозяйства %s не сохранены: %s",
+                        agroid,
+                        exc,
+                    )
+            self.logger.info(
+                "FIELD STORE: a%s обновлено полей %s из %s",
+                agroid,
+                len(changed),
+                len(current),
+            )
+            stored[agroid] = refreshed
+
+        for agroid, item in stored.items():
+            for target, value in item.bounds.items():
+                self._bounds[(year, agroid, target)] = value
+        return {
+            agroid: AgroSnapshot(
+                agroid=agroid,
+                fields=item.fields,
+                bounds=item.bounds.get(srid),
+                geometries=item.geometries,
+                ndvi_complete=bool(item.fields) and complete[agroid],
+            )
+            for agroid, item in stored.items()
+        }
 
     def bounds(
             self,
@@ -34,7 +227,7 @@ class PostgisFieldDataProvider:
         key = (year, agroid, srid)
         if key in self._bounds:
             return self._bounds[key]
-        with psycopg2.connect(**get_database_config()) as connection:
+        with pooled_connection() as connection:
             value = FieldRepository(SqlGateway(connection)).bounds(
                 srid=srid,
                 year=year,
@@ -48,7 +241,7 @@ class PostgisFieldDataProvider:
         key = (agroid, year)
         if key in self._fields:
             return self._fields[key]
-        with psycopg2.connect(**get_database_config()) as connection:
+        with pooled_connection() as connection:
             values = FieldRepository(SqlGateway(connection)).list_for_agro(
                 agroid,
                 year,
@@ -61,27 +254,30 @@ class PostgisFieldDataProvider:
             *,
             field_ids: list[int],
             year: int,
-    ) -> dict[int, Any]:
-        """Читает набор геометрий в одном connection scope."""
+            srid: int,
+    ) -> dict[int, bytes]:
+        """Читает WKB-контуры полей в ``srid`` в одном connection scope."""
         missing = [
             field_id
             for field_id in field_ids
-            if (year, field_id) not in self._geometries
+            if (year, srid, field_id) not in self._geometries
         ]
         if missing:
-            with psycopg2.connect(**get_database_config()) as connection:
+            with pooled_connection() as connection:
                 loaded = FieldRepository(
                     SqlGateway(connection)
                 ).geometries(
                     missing,
                     year,
+                    srid=srid,
+                    tolerance=self.simplify_tolerance,
                 )
             self._geometries.update(
-                ((year, field_id), geometry)
+                ((year, srid, field_id), geometry)
                 for field_id, geometry in loaded.items()
             )
         return {
-            field_id: self._geometries[(year, field_id)]
+            field_id: self._geometries[(year, srid, field_id)]
             for field_id in field_ids
         }
 
@@ -93,8 +289,12 @@ class PostgisFieldDataProvider:
             acquired_on: date,
     ) -> bool:
         """Проверяет полноту NDVI-статистики хозяйства за дату."""
+        with self._ndvi_lock:
+            cached = self._ndvi_complete.get((agroid, year, acquired_on))
+        if cached is not None:
+            return cached
         fields = self.fields(agroid=agroid, year=year)
-        with psycopg2.connect(**get_database_config()) as connection:
+        with pooled_connection() as connection:
             gateway = SqlGateway(connection)
             return NdviRepository(gateway).is_complete(fields, acquired_on)
 
@@ -107,13 +307,72 @@ class PostgisFieldDataProvider:
             overwrite: bool = False,
     ) -> None:
         """Сохраняет либо полностью заменяет рассчитанную статистику NDVI."""
-        with psycopg2.connect(**get_database_config()) as connection:
-            repository = NdviRepository(SqlGateway(connection))
-            if overwrite:
-                repository.replace_many(
-                    values,
-                    field_ids=field_ids,
-                    acquired_on=acquired_on,
-                )
-            else:
-                repository.add_many(values)
+        try:
+            with pooled_connection() as connection:
+                repository = NdviRepository(SqlGateway(connection))
+                years = {
+                    acquired_on.year,
+                    *(value.acquired_on.year for value in values),
+                } - self._partitioned_years
+                if years:
+                    repository.ensure_partitions(years)
+                    self._partitioned_years.update(years)
+                if overwrite:
+                    repository.replace_many(
+                        values,
+                        field_ids=field_ids,
+                        acquired_on=acquired_on,
+                    )
+                else:
+                    repository.add_many(values)
+        finally:
+            self._invalidate_ndvi(
+                {*field_ids, *(value.field_id for value in values)},
+                acquired_on,
+            )
+
+    def _invalidate_ndvi(self, field_ids: set[int], acquired_on: date) -> None:
+        """
+        Сбрасывает полноту NDVI только хозяйств с записанными полями даты.
+
+        Хозяйство с неизвестным списком полей сбрасывается целиком:
+        без него нельзя проверить, затронула ли его запись.
+        """
+        with self._ndvi_lock:
+            for key in [
+                key
+                for key in self._ndvi_complete
+                if key[2] == acquired_on
+            ]:
+                agroid, year, _acquired_on = key
+                fields = self._fields.get((agroid, year))
+                if fields is None or any(
+                        field.id in field_ids for field in fields
+                ):
+                    del self._ndvi_complete[key]
+
+
+class PostgisNdviSeriesSource:
+    """Читает ряды NDVI через server-side cursor отдельного подключения."""
+
+    def __init__(self, *, batch_size: int = STREAM_BATCH_SIZE) -> None:
+        # Число строк, передаваемых сервером за одно обращение.
+        self.batch_size = batch_size
+
+    def series(
+            self,
+            *,
+            agroid: int,
+            years: list[int] | None = None,
+            fieldcodes: list[str] | None = None,
+            with_geometry: bool = False,
+    ) -> Iterator[FieldNdviSeries]:
+        """Держит подключение пула, пока потребитель читает ряды хозяйства."""
+        with pooled_connection() as connection:
+            yield from NdviRepository(SqlGateway(connection)).series(
+                agroid=agroid,
+                years=years,
+                fieldcodes=fieldcodes,
+                with_geometry=with_geometry,
+                batch_size=self.batch_size,
+            )
@@ -1,6 +1,8 @@
 """Чтение метаданных и безопасная распаковка Sentinel SAFE ZIP."""
 from __future__ import annotations
 
+import hashlib
+import os
 import re
 import shutil
 import zipfile
@@ -9,7 +11,22 @@ from datetime import date, datetime
 from pathlib import Path, PurePosixPath
 from xml.etree import ElementTree
 
+from core.archive_manifest import (
+    build_manifest,
+    trusted_manifest,
+    write_manifest,
+)
 from core.logging import get_logger
+from processing.archive_index import (
+    SUPPORTED_COMPRESSION,
+    ArchiveIndex,
+    ArchiveIndexError,
+    IndexedMember,
+    index_path,
+    iter_member_chunks,
+    read_index,
+    write_index,
+)
 from processing.domain import BandOffsets
 
 
@@ -28,6 +45,25 @@ class ArchiveMetadata:
     processing_baseline: int | None = None
 
 
+@dataclass(frozen=True)
+class ArchiveCompaction:
+    """Итог переписывания архива только с используемыми участниками."""
+
+    path: Path
+    # Размер полного продукта до первого сжатия.
+    original_size: int
+    # Размер компактного ZIP; в dry-run — оценка по сжатым участникам.
+    compacted_size: int
+    kept_members: int
+    dropped_members: int
+    # Архив был фактически переписан в этом вызове.
+    changed: bool
+
+
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+INDEXED_BANDS = ("TCI", "B03", "B04", "B08", "SCL")
+
+
 class SentinelArchive:
     """Один Sentinel ZIP: метаданные и атомарная выборочная распаковка."""
 
@@ -81,33 +117,118 @@ class SentinelArchive:
         """Удаляет XML namespace из имени элемента метаданных."""
         return tag.rsplit("}", 1)[-1]
 
+    def _is_valid_zip(self) -> bool:
+        """Доверяет манифесту загрузки, иначе проверяет структуру ZIP."""
+        return (
+            trusted_manifest(self.path) is not None
+            or zipfile.is_zipfile(self.path)
+        )
+
+    @property
+    def _level(self) -> str:
+        """Возвращает уровень продукта в обозначении правил выбора каналов."""
+        return "L1C" if self.metadata.level == "MSIL1C" else "L2A"
+
+    def index(self) -> ArchiveIndex:
+        """
+        Возвращает sidecar-индекс участников, при необходимости строит его.
+
+        Индекс строится за один проход central directory и metadata XML и
+        используется повторными запусками, пока размер и mtime ZIP неизменны.
+        """
+        cached = read_index(self.path)
+        if cached is not None:
+            return cached
+        if not self.path.is_file() or not self._is_valid_zip():
+            raise ArchiveError(f"Файл повреждён или не является ZIP: {self.path}")
+
+        stat = self.path.stat()
+        level = self._level
+        with zipfile.ZipFile(self.path) as source_zip:
+            members = [
+                member
+                for member in source_zip.infolist()
+                if not member.is_dir()
+                and (
+                    self._is_metadata_member(member.filename)
+                    or (
+                        "IMG_DATA" in member.filename
+                        and member.filename.lower().endswith(".jp2")
+                    )
+                )
+            ]
+            try:
+                band_offsets = self._parse_band_offsets(source_zip)
+            except (ArchiveError, ElementTree.ParseError, ValueError):
+                band_offsets = None
+
+        bands = {}
+        for band in INDEXED_BANDS:
+            for member in members:
+                if member.filename.lower().endswith(".jp2") and self._matches_band(
+                        member.filename,
+                        band,
+                        level,
+                ):
+                    bands[band] = member.filename
+                    break
+
+        built = ArchiveIndex(
+            archive_size=stat.st_size,
+            archive_mtime_ns=stat.st_mtime_ns,
+            level=level,
+            members=tuple(
+                IndexedMember(
+                    name=member.filename,
+                    header_offset=member.header_offset,
+                    compress_size=member.compress_size,
+                    file_size=member.file_size,
+                    compress_type=member.compress_type,
+                    crc=member.CRC,
+                )
+                for member in members
+            ),
+            bands=bands,
+            band_offsets=band_offsets,
+        )
+        try:
+            write_index(self.path, built)
+        except OSError as exc:
+            self.logger.warning("Индекс архива не сохранён %s: %s", self.path, exc)
+        return built
+
     def read_band_offsets(self) -> BandOffsets:
-        """Читает radiometric offset B03/B04/B08 из metadata XML."""
-        if not self.path.is_file() or not zipfile.is_zipfile(self.path):
+        """Читает radiometric offset B03/B04/B08 из индекса или metadata XML."""
+        if not self.path.is_file():
             raise ArchiveError(f"Некорректный ZIP: {self.path}")
+        index = self.index()
+        if index.band_offsets is not None:
+            return index.band_offsets
+        with zipfile.ZipFile(self.path) as source_zip:
+            return self._parse_band_offsets(source_zip)
 
+    def _parse_band_offsets(self, source_zip: zipfile.ZipFile) -> BandOffsets:
+        """Разбирает radiometric offset из MTD_MSIL metadata XML."""
         expected_tag = (
             "RADIO_ADD_OFFSET"
             if self.metadata.level == "MSIL1C"
             else "BOA_ADD_OFFSET"
         )
-        with zipfile.ZipFile(self.path) as source_zip:
-            metadata_members = [
-                member
-                for member in source_zip.infolist()
-                if Path(member.filename).name.upper().startswith("MTD_MSIL")
-                and member.filename.lower().endswith(".xml")
-            ]
-            if not metadata_members:
-                if (self.metadata.processing_baseline or 0) >= 400:
-                    raise ArchiveError(
-                        "В продукте с baseline >= 04.00 отсутствует "
-                        "MTD_MSIL metadata XML"
-                    )
-                return BandOffsets()
+        metadata_members = [
+            member
+            for member in source_zip.infolist()
+            if self._is_metadata_member(member.filename)
+        ]
+        if not metadata_members:
+            if (self.metadata.processing_baseline or 0) >= 400:
+                raise ArchiveError(
+                    "В продукте с baseline >= 04.00 отсутствует "
+                    "MTD_MSIL metadata XML"
+                )
+            return BandOffsets()
 
-            with source_zip.open(metadata_members[0]) as metadata_stream:
-                root = ElementTree.parse(metadata_stream).getroot()
+        with source_zip.open(metadata_members[0]) as metadata_stream:
+            root = ElementTree.parse(metadata_stream).getroot()
 
         band_by_id = {2: "b03", 3: "b04", 7: "b08"}
         offsets = {"b03": 0.0, "b04": 0.0, "b08": 0.0}
@@ -136,6 +257,14 @@ class SentinelArchive:
             )
         return BandOffsets(**offsets)
 
+    @staticmethod
+    def _is_metadata_member(member_name: str) -> bool:
+        """Проверяет, что участник является MTD_MSIL metadata XML."""
+        return (
+            Path(member_name).name.upper().startswith("MTD_MSIL")
+            and member_name.lower().endswith(".xml")
+        )
+
     @staticmethod
     def _matches_band(
             member_name: str,
@@ -157,22 +286,78 @@ class SentinelArchive:
             return expected_resolution in member
         return target != "scl"
 
+    @staticmethod
+    def _member_target(root: Path, member_name: str) -> Path:
+        """Строит путь распаковки участника и запрещает выход за каталог."""
+        parts = PurePosixPath(member_name).parts
+        if ".." in parts:
+            raise ArchiveError(f"Небезопасный путь внутри ZIP: {member_name}")
+        if parts and parts[0].upper().endswith(".SAFE"):
+            parts = parts[1:]
+        target = (root / Path(*parts)).resolve()
+        if root.resolve() not in target.parents:
+            raise ArchiveError(f"Небезопасный путь внутри ZIP: {member_name}")
+        return target
+
     def _existing_is_complete(
             self,
             destination: Path,
+            members: list[IndexedMember],
+    ) -> bool:
+        """Сверяет ранее распакованные файлы с размерами из индекса."""
+        for member in members:
+            target = self._member_target(destination, member.name)
+            if not target.is_file() or target.stat().st_size != member.file_size:
+                return False
+        return bool(members)
+
+    def _copy_member(self, member: IndexedMember, target: Path) -> None:
+        """Копирует участника, позиционируясь по смещению из индекса."""
+        with target.open("wb") as output:
+            if member.compress_type not in SUPPORTED_COMPRESSION:
+                with zipfile.ZipFile(self.path) as source_zip, source_zip.open(
+                        member.name
+                ) as source:
+                    shutil.copyfileobj(source, output, length=COPY_BUFFER_SIZE)
+                return
+            try:
+                for chunk in iter_member_chunks(self.path, member):
+                    output.write(chunk)
+            except ArchiveIndexError as exc:
+                index_path(self.path).unlink(missing_ok=True)
+                raise ArchiveError(
+                    f"Участник не прочитан по индексу {self.path.name}: {exc}"
+                ) from exc
+
+    def _selected_members(
+            self,
+            index: ArchiveIndex,
             required_bands: tuple[str, ...],
             level: str,
-    ) -> bool:
-        """Проверяет полноту ранее распакованного каталога."""
-        files = [
-            path.as_posix()
-            for path in destination.rglob("*.jp2")
-            if path.is_file()
+    ) -> list[IndexedMember]:
+        """
+        Возвращает участников требуемых каналов.
+
+        Каналы из ``index.bands`` берутся по сохранённому имени участника;
+        имена сопоставляются заново только для каналов вне индекса.
+        """
+        names = [
+            index.bands[band] for band in required_bands if band in index.bands
         ]
-        return bool(files) and all(
-            any(self._matches_band(path, band, level) for path in files)
-            for band in required_bands
-        )
+        unindexed = [band for band in required_bands if band not in index.bands]
+        if unindexed:
+            names.extend(
+                member.name
+                for member in index.members
+                if "IMG_DATA" in member.name
+                and member.name.lower().endswith(".jp2")
+                and member.name not in names
+                and any(
+                    self._matches_band(member.name, band, level)
+                    for band in unindexed
+                )
+            )
+        return [index.member(name) for name in dict.fromkeys(names)]
 
     def extract(
             self,
@@ -182,17 +367,19 @@ class SentinelArchive:
         """Безопасно и атомарно распаковывает необходимые JP2-каналы."""
         if not self.path.is_file() or self.path.stat().st_size == 0:
             raise ArchiveError(f"ZIP не найден или пуст: {self.path}")
-        if not zipfile.is_zipfile(self.path):
-            raise ArchiveError(f"Файл повреждён или не является ZIP: {self.path}")
+        index = self.index()
 
-        level = "L1C" if self.metadata.level == "MSIL1C" else "L2A"
+        level = self._level
         stem = self.path.stem
         safe_name = stem if stem.upper().endswith(".SAFE") else f"{stem}.SAFE"
         destination = Path(destination_root) / safe_name
         required = tuple(required_bands)
+        selected = self._selected_members(index, required, level)
+        for member in index.members:
+            self._member_target(destination, member.name)
 
         if destination.exists():
-            if self._existing_is_complete(destination, required, level):
+            if self._existing_is_complete(destination, selected):
                 return destination
             self.logger.warning(
                 "Удаляется неполная распаковка: %s",
@@ -200,61 +387,200 @@ class SentinelArchive:
             )
             shutil.rmtree(destination)
 
+        if not selected:
+            raise ArchiveError(
+                f"В архиве не найдены требуемые каналы: {required}"
+            )
+
         partial = destination.with_name(f"{destination.name}.partial")
         if partial.exists():
             shutil.rmtree(partial)
         partial.mkdir(parents=True)
-        extracted = 0
 
         try:
-            with zipfile.ZipFile(self.path) as source_zip:
-                for member in source_zip.infolist():
-                    parts = PurePosixPath(member.filename).parts
-                    if ".." in parts:
-                        raise ArchiveError(
-                            f"Небезопасный путь внутри ZIP: {member.filename}"
-                        )
-                    if (
-                            "IMG_DATA" not in member.filename
-                            or not member.filename.lower().endswith(".jp2")
-                    ):
-                        continue
-                    if not any(
-                            self._matches_band(
-                                member.filename,
-                                band,
-                                level,
-                            )
-                            for band in required
-                    ):
-                        continue
-
-                    if parts and parts[0].upper().endswith(".SAFE"):
-                        parts = parts[1:]
-                    target = (partial / Path(*parts)).resolve()
-                    partial_root = partial.resolve()
-                    if partial_root not in target.parents:
-                        raise ArchiveError(
-                            f"Небезопасный путь внутри ZIP: {member.filename}"
-                        )
+            for member in selected:
+                target = self._member_target(partial, member.name)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                self._copy_member(member, target)
+            partial.replace(destination)
+            return destination
+        except Exception:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
 
-                    target.parent.mkdir(parents=True, exist_ok=True)
-                    with source_zip.open(member) as source, target.open(
-                            "wb"
-                    ) as output:
-                        shutil.copyfileobj(
-                            source,
-                            output,
-                            length=16 * 1024 * 1024,
-                        )
-                    extracted += 1
+    def _pipeline_members(
+            self,
+            members: list[zipfile.ZipInfo],
+            required_bands: tuple[str, ...],
+            level: str,
+    ) -> list[zipfile.ZipInfo]:
+        """Отбирает metadata XML и JP2 требуемых каналов."""
+        return [
+            member
+            for member in members
+            if not member.is_dir()
+            and (
+                self._is_metadata_member(member.filename)
+                or (
+                    "IMG_DATA" in member.filename
+                    and member.filename.lower().endswith(".jp2")
+                    and any(
+                        self._matches_band(member.filename, band, level)
+                        for band in required_bands
+                    )
+                )
+            )
+        ]
 
-            if extracted == 0:
+    @staticmethod
+    def _verify_copy(
+            path: Path,
+            expected: list[zipfile.ZipInfo],
+    ) -> None:
+        """Сверяет CRC нового ZIP с исходными участниками и перечитывает его."""
+        with zipfile.ZipFile(path) as written:
+            for member in expected:
+                copied = written.getinfo(member.filename)
+                if (
+                        copied.CRC != member.CRC
+                        or copied.file_size != member.file_size
+                ):
+                    raise ArchiveError(
+                        f"CRC компактной копии не совпал: {member.filename}"
+                    )
+            broken = written.testzip()
+        if broken is not None:
+            raise ArchiveError(f"Повреждён участник компактного ZIP: {broken}")
+
+    @staticmethod
+    def _md5(path: Path) -> str:
+        """Считает MD5 компактного архива для sidecar-манифеста."""
+        digest = hashlib.md5()
+        with path.open("rb") as stream:
+            while chunk := stream.read(COPY_BUFFER_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def compact(
+            self,
+            required_bands: tuple[str, ...],
+            *,
+            dry_run: bool = False,
+    ) -> ArchiveCompaction:
+        """
+        Переписывает ZIP, оставляя только metadata XML и нужные каналы.
+
+        Каждый участник копируется с проверкой CRC исходника, новый архив
+        перечитывается целиком и атомарно заменяет старый. Манифест хранит
+        размер полного продукта, чтобы выбор повторных публикаций не менялся,
+        а также дайджест полного архива и результат его проверки.
+        """
+        if not self.path.is_file() or not self._is_valid_zip():
+            raise ArchiveError(f"Некорректный ZIP: {self.path}")
+
+        level = "L1C" if self.metadata.level == "MSIL1C" else "L2A"
+        required = tuple(required_bands)
+        current_size = self.path.stat().st_size
+        manifest = trusted_manifest(self.path)
+        original_size = (
+            manifest.original_size
+            if manifest is not None and manifest.original_size is not None
+            else current_size
+        )
+
+        with zipfile.ZipFile(self.path) as source_zip:
+            members = [
+                member
+                for member in source_zip.infolist()
+                if not member.is_dir()
+            ]
+            kept = self._pipeline_members(members, required, level)
+            missing = [
+                band
+                for band in required
+                if not any(
+                    member.filename.lower().endswith(".jp2")
+                    and self._matches_band(member.filename, band, level)
+                    for member in kept
+                )
+            ]
+            if missing:
                 raise ArchiveError(
-                    f"В архиве не найдены требуемые каналы: {required}"
+                    f"В архиве отсутствуют каналы {', '.join(missing)}; "
+                    "сжатие отменено"
                 )
-            partial.replace(destination)
-            return destination
+            unchanged = ArchiveCompaction(
+                path=self.path,
+                original_size=original_size,
+                compacted_size=(
+                    current_size
+                    if len(kept) == len(members)
+                    else sum(member.compress_size for member in kept)
+                ),
+                kept_members=len(kept),
+                dropped_members=len(members) - len(kept),
+                changed=False,
+            )
+            if len(kept) == len(members) or dry_run:
+                return unchanged
+
+            temporary = self.path.with_name(f"{self.path.name}.compact.tmp")
+            try:
+                with zipfile.ZipFile(temporary, "w") as target_zip:
+                    for member in kept:
+                        info = zipfile.ZipInfo(
+                            member.filename,
+                            date_time=member.date_time,
+                        )
+                        info.compress_type = member.compress_type
+                        info.external_attr = member.external_attr
+                        info.file_size = member.file_size
+                        with source_zip.open(member) as source, target_zip.open(
+                                info,
+                                "w",
+                        ) as output:
+                            shutil.copyfileobj(
+                                source,
+                                output,
+                                length=COPY_BUFFER_SIZE,
+                            )
+            except Exception:
+                temporary.unlink(missing_ok=True)
+                raise
+
+        try:
+            self._verify_copy(temporary, kept)
+            write_manifest(
+                self.path,
+                build_manifest(
+                    temporary,
+                    algorithm="md5",
+                    digest=self._md5(temporary),
+                    verified=manifest.verified if manifest else False,
+                    original_size=original_size,
+                    original_algorithm=(
+                        manifest.original_algorithm or manifest.algorithm
+                        if manifest
+                        else None
+                    ),
+                    original_digest=(
+                        manifest.original_digest or manifest.digest
+                        if manifest
+                        else None
+                    ),
+                ),
+            )
+            os.replace(temporary, self.path)
         except Exception:
-            shutil.rmtree(partial, ignore_errors=True)
+            temporary.unlink(missing_ok=True)
             raise
+        self.index()
+
+        return ArchiveCompaction(
+            path=self.path,
+            original_size=original_size,
+            compacted_size=self.path.stat().st_size,
+            kept_members=len(kept),
+            dropped_members=len(members) - len(kept),
+            changed=True,
+        )
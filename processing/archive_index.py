@@ -0,0 +1,184 @@
+"""Sidecar-индекс участников Sentinel ZIP для чтения без central directory."""
+from __future__ import annotations
+
+import json
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from core.logging import get_logger
+
+from .domain import BandOffsets
+
+logger = get_logger(__name__)
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+READ_CHUNK_SIZE = 16 * 1024 * 1024
+SUPPORTED_COMPRESSION = (0, 8)
+
+# Local file header ZIP: сигнатура, версии, флаги, метод, время, CRC,
+# размеры, длины имени и extra-поля.
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+class ArchiveIndexError(RuntimeError):
+    """Индекс не соответствует содержимому архива."""
+
+
+@dataclass(frozen=True)
+class IndexedMember:
+    """Положение и контрольные данные одного участника ZIP."""
+
+    name: str
+    header_offset: int
+    compress_size: int
+    file_size: int
+    compress_type: int
+    crc: int
+
+
+@dataclass(frozen=True)
+class ArchiveIndex:
+    """Участники, соответствие каналов и radiometric offset одного архива."""
+
+    # Размер и mtime архива, по которым индекс проверяется на актуальность.
+    archive_size: int
+    archive_mtime_ns: int
+    level: str
+    members: tuple[IndexedMember, ...]
+    # Канал (TCI, B03, ...) → имя участника с нужным разрешением.
+    bands: dict[str, str] = field(default_factory=dict)
+    # Offset из metadata XML; None, если XML отсутствует или неполон.
+    band_offsets: BandOffsets | None = None
+    version: int = INDEX_VERSION
+
+    def matches(self, archive_path: Path) -> bool:
+        """Проверяет, что архив не менялся после построения индекса."""
+        try:
+            stat = archive_path.stat()
+        except OSError:
+            return False
+        return (
+            stat.st_size == self.archive_size
+            and stat.st_mtime_ns == self.archive_mtime_ns
+        )
+
+    def member(self, name: str) -> IndexedMember:
+        """Возвращает участника по имени."""
+        for member in self.members:
+            if member.name == name:
+                return member
+        raise KeyError(name)
+
+
+def index_path(archive_path: str | Path) -> Path:
+    """Возвращает путь sidecar-индекса рядом с архивом."""
+    path = Path(archive_path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def write_index(archive_path: str | Path, index: ArchiveIndex) -> Path:
+    """Атомарно записывает индекс рядом с архивом."""
+    destination = index_path(archive_path)
+    temporary = destination.with_name(destination.name + ".tmp")
+    temporary.write_text(
+        json.dumps(asdict(index), ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(temporary, destination)
+    return destination
+
+
+def read_index(archive_path: str | Path) -> ArchiveIndex | None:
+    """Читает актуальный индекс; устаревший или повреждённый игнорируется."""
+    path = index_path(archive_path)
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Индекс архива не прочитан %s: %s", path, exc)
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != INDEX_VERSION:
+        return None
+    try:
+        offsets = payload.get("band_offsets")
+        index = ArchiveIndex(
+            archive_size=payload["archive_size"],
+            archive_mtime_ns=payload["archive_mtime_ns"],
+            level=payload["level"],
+            members=tuple(
+                IndexedMember(**member) for member in payload["members"]
+            ),
+            bands=dict(payload.get("bands") or {}),
+            band_offsets=BandOffsets(**offsets) if offsets else None,
+        )
+    except (KeyError, TypeError) as exc:
+        logger.warning("Индекс архива имеет неизвестный формат %s: %s", path, exc)
+        return None
+    return index if index.matches(Path(archive_path)) else None
+
+
+def iter_member_chunks(
+        archive_path: Path,
+        member: IndexedMember,
+        chunk_size: int = READ_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Читает участника по сохранённому смещению с проверкой CRC.
+
+    Central directory не разбирается: выполняется одно позиционирование на
+    local header и последовательное чтение сжатых данных участника.
+    """
+    if member.compress_type not in SUPPORTED_COMPRESSION:
+        raise ArchiveIndexError(
+            f"Неподдерживаемый метод сжатия {member.compress_type}: {member.name}"
+        )
+    decompressor = (
+        zlib.decompressobj(-zlib.MAX_WBITS)
+        if member.compress_type == 8
+        else None
+    )
+    crc = 0
+    produced = 0
+    with archive_path.open("rb") as stream:
+        stream.seek(member.header_offset)
+        header = stream.read(_LOCAL_HEADER.size)
+        if len(header) != _LOCAL_HEADER.size:
+            raise ArchiveIndexError(f"Обрезанный local header: {member.name}")
+        fields = _LOCAL_HEADER.unpack(header)
+        if fields[0] != _LOCAL_SIGNATURE:
+            raise ArchiveIndexError(f"Неверная сигнатура участника: {member.name}")
+        name_length, extra_length = fields[10], fields[11]
+        name = stream.read(name_length)
+        if name.decode("utf-8", errors="replace") != member.name and (
+                name.decode("cp437", errors="replace") != member.name
+        ):
+            raise ArchiveIndexError(f"Смещение указывает на другой участник: {member.name}")
+        stream.seek(extra_length, os.SEEK_CUR)
+
+        remaining = member.compress_size
+        while remaining > 0:
+            raw = stream.read(min(chunk_size, remaining))
+            if not raw:
+                raise ArchiveIndexError(f"Участник обрезан: {member.name}")
+            remaining -= len(raw)
+            chunk = decompressor.decompress(raw) if decompressor else raw
+            if chunk:
+                crc = zlib.crc32(chunk, crc)
+                produced += len(chunk)
+                yield chunk
+        if decompressor is not None:
+            tail = decompressor.flush()
+            if tail:
+                crc = zlib.crc32(tail, crc)
+                produced += len(tail)
+                yield tail
+
+    if produced != member.file_size or crc != member.crc:
+        raise ArchiveIndexError(f"CRC участника не совпал: {member.name}")
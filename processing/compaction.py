@@ -0,0 +1,160 @@
+"""Сжатие исторического архива до участников, используемых обработкой."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+from core.logging import get_logger
+
+from .archive import ArchiveCompaction, ArchiveError, SentinelArchive
+from .discovery import (
+    ZipIterator,
+    ZipNameParser,
+    iter_archive_files,
+    iter_period_archives,
+    parse_archive_name,
+)
+
+ArchiveFactory = Callable[[Path], SentinelArchive]
+
+
+@dataclass(frozen=True)
+class ArchiveCompactionSummary:
+    """Итог сжатия архивов выбранного периода."""
+
+    scanned: int
+    compacted: int
+    unchanged: int
+    bytes_before: int
+    bytes_after: int
+
+
+class ArchiveCompactionService:
+    """Параллельно переписывает полные SAFE ZIP в компактные копии."""
+
+    def __init__(
+            self,
+            archive_root: str | Path,
+            *,
+            workers: int = 2,
+            zip_iterator: ZipIterator = iter_archive_files,
+            name_parser: ZipNameParser = parse_archive_name,
+            archive_factory: ArchiveFactory = SentinelArchive,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("Число потоков сжатия должно быть положительным")
+        self.archive_root = Path(archive_root)
+        self.workers = workers
+        self._zip_iterator = zip_iterator
+        self._name_parser = name_parser
+        self._archive_factory = archive_factory
+        self.logger = get_logger(self.__class__.__name__)
+
+    def _select(
+            self,
+            start_date: datetime | None,
+            end_date: datetime | None,
+    ) -> list[tuple[Path, tuple[str, ...]]]:
+        """Находит архивы периода и набор каналов для их уровня."""
+        selected = [
+            (zip_path, parsed.level.required_bands)
+            for zip_path, parsed in iter_period_archives(
+                self.archive_root,
+                start_date=start_date,
+                end_date=end_date,
+                zip_iterator=self._zip_iterator,
+                name_parser=self._name_parser,
+            )
+        ]
+        return sorted(selected)
+
+    def _compact_one(
+            self,
+            path: Path,
+            required_bands: tuple[str, ...],
+            dry_run: bool,
+    ) -> ArchiveCompaction:
+        """Сжимает один архив и пишет строку лога с длительностью."""
+        started = perf_counter()
+        result = self._archive_factory(path).compact(
+            required_bands,
+            dry_run=dry_run,
+        )
+        if result.dropped_members:
+            self.logger.info(
+                "COMPACT %s: %s | %d → %d байт, удалено участников=%d | %.2f сек.",
+                "DRY-RUN" if dry_run else "OK",
+                path.name,
+                result.original_size,
+                result.compacted_size,
+                result.dropped_members,
+                perf_counter() - started,
+            )
+        return result
+
+    def run(
+            self,
+            *,
+            start_date: datetime | None = None,
+            end_date: datetime | None = None,
+            dry_run: bool = False,
+    ) -> ArchiveCompactionSummary:
+        """Сжимает архивы периода; ошибки отдельных ZIP агрегируются."""
+        started = perf_counter()
+        selected = self._select(start_date, end_date)
+        self.logger.info(
+            "Сжатие архива %s: найдено ZIP=%d, потоков=%d%s",
+            self.archive_root,
+            len(selected),
+            self.workers,
+            " (dry-run)" if dry_run else "",
+        )
+
+        results: list[ArchiveCompaction] = []
+        failed: list[str] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(
+                    self._compact_one,
+                    path,
+                    required_bands,
+                    dry_run,
+                ): path
+                for path, required_bands in selected
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    failed.append(path.name)
+                    self.logger.error("COMPACT FAIL %s: %s", path.name, exc)
+
+        summary = ArchiveCompactionSummary(
+            scanned=len(selected),
+            compacted=sum(result.dropped_members > 0 for result in results),
+            unchanged=sum(result.dropped_members == 0 for result in results),
+            bytes_before=sum(result.original_size for result in results),
+            bytes_after=sum(result.compacted_size for result in results),
+        )
+        self.logger.info(
+            "COMPACT RUN %s: ZIP=%d сжато=%d без изменений=%d ошибок=%d "
+            "| %d → %d байт | %.2f сек.",
+            "FAIL" if failed else "OK",
+            summary.scanned,
+            summary.compacted,
+            summary.unchanged,
+            len(failed),
+            summary.bytes_before,
+            summary.bytes_after,
+            perf_counter() - started,
+        )
+        if failed:
+            raise ArchiveError(
+                "Не удалось сжать архивы: " + ", ".join(sorted(failed))
+            )
+        return summary
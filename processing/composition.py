@@ -5,25 +5,32 @@ from datetime import date, datetime
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-import psycopg2
-
 from core import settings
 from core.filesystem import clear_directory_entries_matching
-from db.connection import get_database_config
+from core.logging import get_logger
+from db.connection import get_connection_pool, pooled_connection
 from db.gateway import SqlGateway
 from db.repositories import LayerRepository
 
-from .adapters import PostgisFieldDataProvider
+from .adapters import PostgisFieldDataProvider, PostgisNdviSeriesSource
+from .compaction import ArchiveCompactionService
 from .discovery import ArchivePairFinder
 from .layer_metadata import (
     LayerMetadataRefreshService,
     LayerMetadataRefreshSummary,
 )
+from .ndvi_export import (
+    ExportFormat,
+    NdviExportSummary,
+    NdviSeriesExportService,
+)
 from .service import ProcessingService
 
 if TYPE_CHECKING:
     from .pair_processor import SentinelPairProcessor
 
+logger = get_logger(__name__)
+
 
 class PostgisProcessingStatusReader:
     """PostGIS-адаптер порта статуса обработки."""
@@ -35,7 +42,7 @@ class PostgisProcessingStatusReader:
         """Одним подключением читает статус опубликованных слоёв набора дат."""
         if not acquired_dates:
             return {}
-        with psycopg2.connect(**get_database_config()) as connection:
+        with pooled_connection() as connection:
             repository = LayerRepository(SqlGateway(connection))
             return repository.missing_agroids_many(acquired_dates)
 
@@ -64,8 +71,10 @@ def build_pair_processor(
         recalculate_ndvi: bool = False,
 ) -> SentinelPairProcessor:
     """Собирает единый обработчик пары из конкретных GIS-зависимостей."""
+    from .field_store import FieldGeometryStore
     from .pair_processor import SentinelPairProcessor
     from .storage import FieldGeometryExporter
+    from .triage import CloudTriagePolicy
     from .workspace import ProcessingOptions, WorkspacePaths
 
     workspace = WorkspacePaths(
@@ -78,7 +87,10 @@ def build_pair_processor(
         destination_srid=settings.DESTSRID,
         nodata=settings.NODATA,
     )
-    field_data = PostgisFieldDataProvider()
+    field_data = PostgisFieldDataProvider(
+        simplify_tolerance=settings.FIELD_SIMPLIFY_TOLERANCE or None,
+        geometry_store=FieldGeometryStore(settings.FIELD_STORE_DIR),
+    )
     geometry_exporter = FieldGeometryExporter()
     selected_products = (
         frozenset({"ndvi", "scl"})
@@ -95,6 +107,15 @@ def build_pair_processor(
         products=selected_products,
         ndvi_only=recalculate_ndvi,
         overwrite_statistics=recalculate_ndvi,
+        # При пересчёте NDVI сохранённые результаты не пропускаются.
+        triage_policy=(
+            None
+            if recalculate_ndvi
+            else CloudTriagePolicy(
+                skip_below=settings.CLOUD_TRIAGE_SKIP_BELOW,
+                statistics_only_below=settings.CLOUD_TRIAGE_STATISTICS_BELOW,
+            )
+        ),
     )
 
 
@@ -105,19 +126,19 @@ def build_processing_service(
     """Composition root production-сценария обработки."""
     from satgeo.composition import build_raster_publisher
 
+    pair_processor = build_pair_processor(recalculate_ndvi=recalculate_ndvi)
     return ProcessingService(
         archive_root=settings.ARCHIVE_ROOT,
         pair_finder=ArchivePairFinder(),
         status_reader=PostgisProcessingStatusReader(),
-        pair_processor=build_pair_processor(
-            recalculate_ndvi=recalculate_ndvi,
-        ),
+        pair_processor=pair_processor,
         publisher=build_raster_publisher(
             refresh_products={"ndvi"} if recalculate_ndvi else (),
         ),
         cleaner=ProcessingWorkspaceCleaner(),
         process_completed=recalculate_ndvi,
         clean_before_each=recalculate_ndvi,
+        triage_reader=pair_processor,
     )
 
 
@@ -127,7 +148,7 @@ def refresh_layer_metadata(
         end_date: datetime | None = None,
 ) -> LayerMetadataRefreshSummary:
     """Обновляет метаданные слоёв в одном подключении без запуска GDAL."""
-    with psycopg2.connect(**get_database_config()) as connection:
+    with pooled_connection() as connection:
         service = LayerMetadataRefreshService(
             archive_root=settings.ARCHIVE_ROOT,
             pair_finder=ArchivePairFinder(),
@@ -137,3 +158,52 @@ def refresh_layer_metadata(
             start_date=start_date,
             end_date=end_date,
         )
+
+
+def build_archive_compaction_service(
+        *,
+        workers: int = 2,
+) -> ArchiveCompactionService:
+    """Собирает сервис сжатия архива ``ARCHIVE_ROOT`` без доступа к БД."""
+    return ArchiveCompactionService(
+        archive_root=settings.ARCHIVE_ROOT,
+        workers=workers,
+    )
+
+
+def export_ndvi_series(
+        output_dir: str | Path,
+        *,
+        agroids: tuple[int, ...],
+        years: list[int] | None = None,
+        fieldcodes: list[str] | None = None,
+        export_format: ExportFormat = ExportFormat.CSV,
+        workers: int = 1,
+        batch_size: int = 2000,
+) -> NdviExportSummary:
+    """
+    Выгружает ряды NDVI хозяйств, читая PostGIS server-side cursor.
+
+    Каждый поток держит подключение пула на всё время выгрузки хозяйства,
+    поэтому потоков не больше ``DB_POOL_SIZE``: лишние ждали бы подключения
+    и падали по таймауту пула.
+    """
+    pool_size = get_connection_pool().max_size
+    if workers > pool_size:
+        logger.warning(
+            "EXPORT: потоков %d больше DB_POOL_SIZE=%d; используется %d",
+            workers,
+            pool_size,
+            pool_size,
+        )
+        workers = pool_size
+    return NdviSeriesExportService(
+        PostgisNdviSeriesSource(batch_size=batch_size),
+        output_dir,
+        export_format=export_format,
+        workers=workers,
+    ).run(
+        agroids=agroids,
+        years=years,
+        fieldcodes=fieldcodes,
+    )
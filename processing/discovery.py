@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
+from core.archive_manifest import trusted_manifest
+
 from .domain import ArchivePair, ProductLevel
 
 ZipIterator = Callable[..., Iterable[str]]
@@ -86,6 +88,46 @@ def iter_archive_files(
                     yield str(Path(current_root) / filename)
 
 
+def period_years(
+        start_date: datetime | None,
+        end_date: datetime | None,
+) -> tuple[int, ...]:
+    """Возвращает каталоги лет, которые могут пересекать период."""
+    if start_date is None or end_date is None:
+        return ()
+    return tuple(range(start_date.year, end_date.year + 1))
+
+
+def iter_period_archives(
+        archive_root: str | Path,
+        *,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        zip_iterator: ZipIterator = iter_archive_files,
+        name_parser: ZipNameParser = parse_archive_name,
+) -> Iterable[tuple[Path, ArchiveName]]:
+    """Перечисляет архивы с разобранным именем, снятые в пределах периода."""
+    for zip_path in zip_iterator(
+            str(archive_root),
+            years=period_years(start_date, end_date),
+    ):
+        parsed = name_parser(zip_path)
+        if parsed is None:
+            continue
+        acquired_on = parsed.acquired_at.replace(
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+            tzinfo=None,
+        )
+        if start_date is not None and acquired_on < start_date:
+            continue
+        if end_date is not None and acquired_on >= end_date:
+            continue
+        yield Path(zip_path), parsed
+
+
 class ArchivePairFinder:
     """Находит полные пары ULA/ULB и не знает ничего о БД или GDAL."""
 
@@ -110,26 +152,13 @@ class ArchivePairFinder:
             dict[str, list[Path]],
         ] = defaultdict(lambda: defaultdict(list))
 
-        years = self._period_years(start_date, end_date)
-        for zip_path in self._zip_iterator(
-                str(archive_root),
-                years=years,
+        for zip_path, parsed in iter_period_archives(
+                archive_root,
+                start_date=start_date,
+                end_date=end_date,
+                zip_iterator=self._zip_iterator,
+                name_parser=self._name_parser,
         ):
-            parsed = self._name_parser(zip_path)
-            if parsed is None:
-                continue
-            acquired_on = parsed.acquired_at.replace(
-                hour=0,
-                minute=0,
-                second=0,
-                microsecond=0,
-                tzinfo=None,
-            )
-            if start_date is not None and acquired_on < start_date:
-                continue
-            if end_date is not None and acquired_on >= end_date:
-                continue
-
             tile = parsed.tile
             if tile.endswith("ula"):
                 side = "ula"
@@ -147,7 +176,7 @@ class ArchivePairFinder:
                     parsed.level,
                     parsed.processing_baseline,
                 )
-            ][side].append(Path(zip_path))
+            ][side].append(zip_path)
 
         candidates = [
             ArchivePair(
@@ -177,19 +206,17 @@ class ArchivePairFinder:
                 best[key] = pair
         return sorted(best.values(), key=lambda pair: pair.acquired_at)
 
-    @staticmethod
-    def _period_years(
-            start_date: datetime | None,
-            end_date: datetime | None,
-    ) -> tuple[int, ...]:
-        """Возвращает каталоги лет, которые могут пересекать период."""
-        if start_date is None or end_date is None:
-            return ()
-        return tuple(range(start_date.year, end_date.year + 1))
-
     @staticmethod
     def _archive_rank(path: Path) -> tuple[int, str]:
-        """Сравнивает повторные публикации по размеру и стабильному имени."""
+        """
+        Сравнивает повторные публикации по размеру и стабильному имени.
+
+        Для сжатого архива используется размер полного продукта из манифеста,
+        иначе компактная копия проигрывала бы несжатой повторной публикации.
+        """
+        manifest = trusted_manifest(path)
+        if manifest is not None and manifest.original_size is not None:
+            return manifest.original_size, path.name
         try:
             size = path.stat().st_size
         except OSError:
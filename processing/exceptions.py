@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
+from datetime import date
 
 
 class ProcessingError(RuntimeError):
@@ -17,6 +18,15 @@ class ProcessingStepError(ProcessingError):
         super().__init__(f"{step}: {reason}")
 
 
+class NdviWriteError(ProcessingError):
+    """Фоновая запись NDVI-статистики даты завершилась ошибкой."""
+
+    def __init__(self, acquired_on: date, reason: str):
+        self.acquired_on = acquired_on
+        self.reason = reason
+        super().__init__(f"Запись NDVI за {acquired_on} не выполнена: {reason}")
+
+
 class ProcessingRunError(ProcessingError):
     """Составная ошибка обработки нескольких дат."""
 
@@ -0,0 +1,162 @@
+"""Локальное хранилище сезонных контуров полей между запусками."""
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from core.logging import get_logger
+from domain.models import Field
+
+logger = get_logger(__name__)
+
+FIELD_STORE_VERSION = 1
+FIELD_STORE_SUFFIX = ".fields.json.gz"
+# Системы координат, границы в которых сохраняются вместе с контурами.
+COMMON_SRIDS = (3857, 4326)
+
+Bounds = tuple[float, float, float, float]
+
+
+def fingerprint(revisions: Mapping[int, str]) -> str:
+    """Возвращает отпечаток набора полей: число строк и хеш их версий."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for field_id in sorted(revisions):
+        digest.update(f"{field_id}={revisions[field_id]};".encode())
+    return f"{len(revisions)}:{digest.hexdigest()}"
+
+
+@dataclass(frozen=True)
+class StoredAgroFields:
+    """Поля, WKB-контуры и границы одного хозяйства за сезон."""
+
+    agroid: int
+    year: int
+    # Система координат WKB-контуров.
+    srid: int
+    # Допуск серверного упрощения, с которым получены контуры.
+    tolerance: float | None
+    fields: tuple[Field, ...] = ()
+    # WKB-контуры полей в ``srid`` по id поля.
+    geometries: dict[int, bytes] = field(default_factory=dict)
+    # Версии строк PostGIS, из которых получены контуры, по id поля.
+    revisions: dict[int, str] = field(default_factory=dict)
+    # Границы хозяйства по системе координат.
+    bounds: dict[int, Bounds] = field(default_factory=dict)
+
+    @property
+    def fingerprint(self) -> str:
+        """Отпечаток сохранённых версий полей."""
+        return fingerprint(self.revisions)
+
+
+class FieldGeometryStore:
+    """
+    Файлы контуров полей по паре (год, хозяйство).
+
+    Файл заменяется атомарно, поэтому параллельные процессы обработки могут
+    читать его без блокировок; при гонке записи выигрывает последний полный
+    файл.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def path(self, *, year: int, agroid: int) -> Path:
+        """Возвращает путь файла хозяйства за сезон."""
+        return self.root / str(year) / f"a{agroid}{FIELD_STORE_SUFFIX}"
+
+    def read(
+            self,
+            *,
+            year: int,
+            agroid: int,
+            srid: int,
+            tolerance: float | None,
+    ) -> StoredAgroFields | None:
+        """Читает файл; другой SRID, допуск или формат считаются промахом."""
+        path = self.path(year=year, agroid=agroid)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as stream:
+                payload = json.load(stream)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Контуры полей не прочитаны %s: %s", path, exc)
+            return None
+        if (
+                not isinstance(payload, dict)
+                or payload.get("version") != FIELD_STORE_VERSION
+                or payload.get("srid") != srid
+                or payload.get("tolerance") != tolerance
+        ):
+            return None
+        try:
+            items = payload["fields"]
+            return StoredAgroFields(
+                agroid=agroid,
+                year=year,
+                srid=srid,
+                tolerance=tolerance,
+                fields=tuple(
+                    Field(
+                        id=int(item["id"]),
+                        name=str(item["name"]),
+                        fieldcode=item["fieldcode"],
+                    )
+                    for item in items
+                ),
+                geometries={
+                    int(item["id"]): base64.b64decode(item["geometry"])
+                    for item in items
+                },
+                revisions={
+                    int(item["id"]): str(item["revision"])
+                    for item in items
+                },
+                bounds={
+                    int(key): tuple(value)
+                    for key, value in payload["bounds"].items()
+                },
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("Контуры полей имеют неизвестный формат %s: %s", path, exc)
+            return None
+
+    def write(self, stored: StoredAgroFields) -> Path:
+        """Атомарно сохраняет контуры и границы хозяйства."""
+        destination = self.path(year=stored.year, agroid=stored.agroid)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": FIELD_STORE_VERSION,
+            "srid": stored.srid,
+            "tolerance": stored.tolerance,
+            "bounds": {
+                str(srid): list(bounds)
+                for srid, bounds in stored.bounds.items()
+            },
+            "fields": [
+                {
+                    "id": item.id,
+                    "name": item.name,
+                    "fieldcode": item.fieldcode,
+                    "revision": stored.revisions[item.id],
+                    "geometry": base64.b64encode(
+                        stored.geometries[item.id]
+                    ).decode("ascii"),
+                }
+                for item in stored.fields
+            ],
+        }
+        temporary = destination.with_name(
+            f"{destination.name}.{os.getpid()}.tmp"
+        )
+        with gzip.open(temporary, "wt", encoding="utf-8") as stream:
+            json.dump(payload, stream, ensure_ascii=False)
+        os.replace(temporary, destination)
+        return destination
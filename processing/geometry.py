@@ -1,7 +1,8 @@
-"""Пересечение границ хозяйства с экстентом растра."""
+"""Пересечение границ хозяйства с экстентом и сеткой растра."""
 
 from __future__ import annotations
 
+from math import ceil, floor
 from pathlib import Path
 
 from osgeo import osr
@@ -53,3 +54,66 @@ def intersect_raster_bounds(
         min(bounds[2], max(x_coordinates)),
         min(bounds[3], max(y_coordinates)),
     )
+
+
+def pixel_window(
+        points: list[tuple[float, float]],
+        geotransform: tuple[float, ...],
+        width: int,
+        height: int,
+        *,
+        margin: int = 0,
+) -> tuple[int, int, int, int] | None:
+    """
+    Возвращает окно ``(xoff, yoff, width, height)``, покрывающее точки.
+
+    Точки задаются в системе координат растра; ``margin`` расширяет окно на
+    указанное число пикселей для ядра интерполяции и обрезается экстентом.
+    """
+    if geotransform[2] or geotransform[4]:
+        raise ValueError("Повёрнутая геопривязка не поддерживается")
+    columns = [(x - geotransform[0]) / geotransform[1] for x, _y in points]
+    rows = [(y - geotransform[3]) / geotransform[5] for _x, y in points]
+    x_start = max(0, floor(min(columns)) - margin)
+    y_start = max(0, floor(min(rows)) - margin)
+    x_end = min(width, ceil(max(columns)) + margin)
+    y_end = min(height, ceil(max(rows)) + margin)
+    if x_start >= x_end or y_start >= y_end:
+        return None
+    return x_start, y_start, x_end - x_start, y_end - y_start
+
+
+def source_window(
+        bounds: tuple[float, float, float, float],
+        dataset,
+        destination_srid: int,
+        *,
+        margin: int = 0,
+        edge_points: int = 21,
+) -> tuple[int, int, int, int] | None:
+    """
+    Находит окно пикселей растра под bounds целевой системы координат.
+
+    Границы уплотняются точками, потому что при перепроецировании стороны
+    прямоугольника искривляются и углов недостаточно.
+    """
+    source_srs = osr.SpatialReference(wkt=dataset.GetProjection())
+    destination_srs = osr.SpatialReference()
+    destination_srs.ImportFromEPSG(destination_srid)
+    transformer = osr.CoordinateTransformation(destination_srs, source_srs)
+    min_x, min_y, max_x, max_y = bounds
+    steps = max(2, edge_points)
+    outline = []
+    for index in range(steps):
+        ratio = index / (steps - 1)
+        x = min_x + (max_x - min_x) * ratio
+        y = min_y + (max_y - min_y) * ratio
+        outline.extend(((x, min_y), (x, max_y), (min_x, y), (max_x, y)))
+    transformed = transformer.TransformPoints(outline)
+    return pixel_window(
+        [(point[0], point[1]) for point in transformed],
+        dataset.GetGeoTransform(),
+        dataset.RasterXSize,
+        dataset.RasterYSize,
+        margin=margin,
+    )
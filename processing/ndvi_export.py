@@ -0,0 +1,244 @@
+"""Выгрузка сохранённых рядов NDVI полей в CSV и GeoJSON."""
+from __future__ import annotations
+
+import csv
+import json
+import os
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import StrEnum
+from pathlib import Path
+from time import perf_counter
+from typing import Any, TextIO
+
+from core.logging import get_logger
+from domain.models import FieldNdviSeries, NdviStatistics
+
+from .exceptions import ProcessingError
+from .ports import NdviSeriesSource
+
+# Поля статистики в порядке столбцов выгрузки.
+POINT_COLUMNS = (
+    "acquired_on",
+    "acquired_at",
+    "mean",
+    "maximum",
+    "minimum",
+    "median",
+    "standard_deviation",
+    "percentile_10",
+    "percentile_90",
+    "coefficient_of_variation",
+    "growth_percent",
+    "is_uniform",
+    "valid_coverage_percent",
+    "cloud_coverage_percent",
+    "valid_pixel_count",
+    "total_pixel_count",
+    "cloud_pixel_count",
+    "source_level",
+)
+FIELD_COLUMNS = ("agroid", "field_id", "fieldcode", "name", "year")
+
+
+class ExportFormat(StrEnum):
+    """Формат файла выгрузки."""
+
+    CSV = "csv"
+    GEOJSON = "geojson"
+
+
+@dataclass(frozen=True)
+class NdviExportSummary:
+    """Итог выгрузки рядов NDVI."""
+
+    files: tuple[Path, ...]
+    series: int
+    points: int
+
+
+def _json_value(value: Any) -> Any:
+    """Приводит дату и время к ISO-строке."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _point_values(point: NdviStatistics) -> list[Any]:
+    """Возвращает значения столбцов одной даты ряда."""
+    return [_json_value(getattr(point, column)) for column in POINT_COLUMNS]
+
+
+def _field_values(series: FieldNdviSeries) -> list[Any]:
+    """Возвращает значения столбцов поля ряда."""
+    return [
+        series.agroid,
+        series.field.id,
+        series.field.fieldcode,
+        series.field.name,
+        series.year,
+    ]
+
+
+def write_csv(series: Iterable[FieldNdviSeries], stream: TextIO) -> int:
+    """Пишет по строке на дату каждого ряда; возвращает число строк."""
+    writer = csv.writer(stream)
+    writer.writerow(FIELD_COLUMNS + POINT_COLUMNS)
+    written = 0
+    for item in series:
+        field_values = _field_values(item)
+        for point in item.points:
+            writer.writerow(field_values + _point_values(point))
+            written += 1
+    return written
+
+
+def write_geojson(series: Iterable[FieldNdviSeries], stream: TextIO) -> int:
+    """
+    Пишет FeatureCollection по одному Feature на сезонный ряд поля.
+
+    Features дописываются по мере чтения, поэтому коллекция не собирается в
+    памяти; контур берётся готовым GeoJSON из PostGIS.
+    """
+    stream.write('{"type": "FeatureCollection", "features": [\n')
+    written = 0
+    for index, item in enumerate(series):
+        properties = dict(zip(FIELD_COLUMNS, _field_values(item), strict=True))
+        properties["series"] = [
+            dict(zip(POINT_COLUMNS, _point_values(point), strict=True))
+            for point in item.points
+        ]
+        if index:
+            stream.write(",\n")
+        stream.write(
+            '{"type": "Feature", "geometry": '
+            f"{item.geometry or 'null'}, \"properties\": "
+            f"{json.dumps(properties, ensure_ascii=False)}}}"
+        )
+        written += len(item.points)
+    stream.write("\n]}\n")
+    return written
+
+
+class NdviSeriesExportService:
+    """Выгружает ряды NDVI каждого хозяйства в отдельный файл."""
+
+    def __init__(
+            self,
+            source: NdviSeriesSource,
+            output_dir: str | Path,
+            *,
+            export_format: ExportFormat = ExportFormat.CSV,
+            workers: int = 1,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("Число потоков выгрузки должно быть положительным")
+        self.source = source
+        self.output_dir = Path(output_dir)
+        self.export_format = export_format
+        self.workers = workers
+        self.logger = get_logger(self.__class__.__name__)
+
+    def path(self, agroid: int) -> Path:
+        """Возвращает файл выгрузки хозяйства."""
+        return self.output_dir / f"ndvi_a{agroid}.{self.export_format.value}"
+
+    def _export_agro(
+            self,
+            agroid: int,
+            years: list[int] | None,
+            fieldcodes: list[str] | None,
+    ) -> tuple[Path, int, int]:
+        """Пишет ряды хозяйства во временный файл и атомарно публикует его."""
+        started = perf_counter()
+        destination = self.path(agroid)
+        temporary = destination.with_name(
+            f".{destination.name}.{os.getpid()}.tmp"
+        )
+        counted = 0
+
+        def counting(items: Iterable[FieldNdviSeries]):
+            """Считает ряды, проходящие через writer."""
+            nonlocal counted
+            for item in items:
+                counted += 1
+                yield item
+
+        geojson = self.export_format is ExportFormat.GEOJSON
+        series = counting(self.source.series(
+            agroid=agroid,
+            years=years,
+            fieldcodes=fieldcodes,
+            with_geometry=geojson,
+        ))
+        try:
+            with temporary.open("w", encoding="utf-8", newline="") as stream:
+                points = (write_geojson if geojson else write_csv)(
+                    series,
+                    stream,
+                )
+            os.replace(temporary, destination)
+        finally:
+            temporary.unlink(missing_ok=True)
+        self.logger.info(
+            "EXPORT OK: a%s → %s | рядов=%d дат=%d | %.2f сек.",
+            agroid,
+            destination,
+            counted,
+            points,
+            perf_counter() - started,
+        )
+        return destination, counted, points
+
+    def run(
+            self,
+            *,
+            agroids: tuple[int, ...],
+            years: list[int] | None = None,
+            fieldcodes: list[str] | None = None,
+    ) -> NdviExportSummary:
+        """Выгружает хозяйства; ошибки отдельных хозяйств агрегируются."""
+        started = perf_counter()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        results: list[tuple[Path, int, int]] = []
+        failed: list[int] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(
+                    self._export_agro,
+                    agroid,
+                    years,
+                    fieldcodes,
+                ): agroid
+                for agroid in agroids
+            }
+            for future in as_completed(futures):
+                agroid = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    failed.append(agroid)
+                    self.logger.error("EXPORT FAIL a%s: %s", agroid, exc)
+
+        summary = NdviExportSummary(
+            files=tuple(sorted(path for path, _series, _points in results)),
+            series=sum(series for _path, series, _points in results),
+            points=sum(points for _path, _series, points in results),
+        )
+        self.logger.info(
+            "EXPORT RUN %s: файлов=%d рядов=%d дат=%d ошибок=%d | %.2f сек.",
+            "FAIL" if failed else "OK",
+            len(summary.files),
+            summary.series,
+            summary.points,
+            len(failed),
+            perf_counter() - started,
+        )
+        if failed:
+            raise ProcessingError(
+                "Не удалось выгрузить NDVI хозяйств: "
+                + ", ".join(map(str, sorted(failed)))
+            )
+        return summary
@@ -0,0 +1,176 @@
+"""Фоновая запись NDVI-статистики, не останавливающая расчёт полей."""
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
+from datetime import date
+from time import perf_counter
+
+from core.logging import get_logger
+from domain.models import NdviStatistics
+
+from .exceptions import NdviWriteError
+from .ports import FieldDataProvider
+
+
+@dataclass(frozen=True)
+class NdviWriteBatch:
+    """Статистика набора полей одной даты, ожидающая записи."""
+
+    acquired_on: date
+    values: tuple[NdviStatistics, ...]
+    # Поля, статистика которых заменяется целиком при overwrite.
+    field_ids: tuple[int, ...]
+    overwrite: bool = False
+
+    @property
+    def key(self) -> tuple[date, bool]:
+        """Пакеты с одинаковым ключом записываются одним вызовом."""
+        return self.acquired_on, self.overwrite
+
+
+_STOP = object()
+
+
+class BackgroundNdviWriter:
+    """
+    Записывает статистику хозяйств в отдельном потоке через bulk-путь порта.
+
+    Пакеты записываются строго в порядке передачи одним потоком; подряд
+    идущие пакеты одной даты и режима объединяются в один ``save_ndvi``,
+    поэтому замена статистики полей выполняется одной транзакцией. Очередь
+    ограничена: при отставании БД расчёт ждёт освобождения места. Ошибка
+    записи запоминается и выбрасывается из ``flush``/``close`` владельцу
+    даты; пакеты после ошибки не записываются.
+    """
+
+    def __init__(
+            self,
+            field_data: FieldDataProvider,
+            *,
+            max_pending: int = 4,
+            max_batch_rows: int = 50_000,
+    ) -> None:
+        self.field_data = field_data
+        # Не более max_batch_rows строк в одном объединённом save_ndvi.
+        self.max_batch_rows = max_batch_rows
+        self.logger = get_logger(self.__class__.__name__)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: NdviWriteError | None = None
+        self._thread = threading.Thread(
+            target=self._work,
+            name="ndvi-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def __enter__(self) -> BackgroundNdviWriter:
+        """Возвращает запущенный writer."""
+        return self
+
+    def __exit__(self, exc_type, _exc_val, _exc_tb) -> None:
+        """Дожидается записи; ошибка расчёта важнее ошибки записи."""
+        try:
+            self.close()
+        except NdviWriteError:
+            if exc_type is None:
+                raise
+            self.logger.exception("Запись NDVI прервана ошибкой расчёта")
+
+    def submit(
+            self,
+            values: list[NdviStatistics],
+            *,
+            field_ids: list[int],
+            acquired_on: date,
+            overwrite: bool = False,
+    ) -> None:
+        """Ставит статистику хозяйства в очередь записи."""
+        self._raise_error()
+        self._queue.put(NdviWriteBatch(
+            acquired_on=acquired_on,
+            values=tuple(values),
+            field_ids=tuple(field_ids),
+            overwrite=overwrite,
+        ))
+
+    def flush(self) -> None:
+        """Ждёт записи всех переданных пакетов и сообщает об ошибке."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Записывает оставшиеся пакеты и останавливает поток."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        """Выбрасывает запомненную ошибку записи."""
+        if self._error is not None:
+            raise self._error
+
+    def _work(self) -> None:
+        """Забирает пакеты из очереди и объединяет соседние пакеты даты."""
+        pending: NdviWriteBatch | None = None
+        while True:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batches = [item]
+            rows = len(item.values)
+            while rows < self.max_batch_rows:
+                try:
+                    following = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if following is _STOP or following.key != item.key:
+                    pending = following
+                    break
+                batches.append(following)
+                rows += len(following.values)
+            try:
+                if self._error is None:
+                    self._write(batches)
+            finally:
+                for _batch in batches:
+                    self._queue.task_done()
+
+    def _write(self, batches: list[NdviWriteBatch]) -> None:
+        """Выполняет один save_ndvi для пакетов одной даты и режима."""
+        first = batches[0]
+        started = perf_counter()
+        values = [value for batch in batches for value in batch.values]
+        try:
+            self.field_data.save_ndvi(
+                values,
+                field_ids=[
+                    field_id
+                    for batch in batches
+                    for field_id in batch.field_ids
+                ],
+                acquired_on=first.acquired_on,
+                overwrite=first.overwrite,
+            )
+        except Exception as exc:
+            self.logger.exception(
+                "NDVI WRITE FAIL: %s пакетов=%d | %s",
+                first.acquired_on,
+                len(batches),
+                exc,
+            )
+            error = NdviWriteError(first.acquired_on, str(exc))
+            error.__cause__ = exc
+            self._error = error
+            return
+        self.logger.info(
+            "NDVI WRITE OK: %s пакетов=%d значений=%d | %.2f сек.",
+            first.acquired_on,
+            len(batches),
+            len(values),
+            perf_counter() - started,
+        )
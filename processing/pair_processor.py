@@ -18,13 +18,24 @@ from .paths import (
     L2AProductPaths,
     MosaicPaths,
     NdviStatisticsPaths,
+    PublishedRasterPaths,
     SentinelCropPaths,
 )
 from .processors.cloudmask import RescaleSCLProcessor
 from .processors.combine import MosaicProcessor
+from .processors.footprint import AGRO_PRODUCTS, FootprintProductProcessor
 from .processors.ndvistat import NdviStatisticsProcessor
-from .processors.sentinel import AgroCropProcessor
-from .processors.tiles import TileImageProcessor
+from .processors.triage import CloudTriageProcessor
+from .triage import (
+    AgroCloudTriage,
+    CloudTriagePolicy,
+    PairProcessingResult,
+    TriageMode,
+    read_triage,
+)
+
+# Продукты хозяйства, которое сортировка оставила только для статистики.
+STATISTICS_PRODUCTS = frozenset({"ndvi", "scl"})
 
 
 class SentinelPairProcessor:
@@ -41,6 +52,7 @@ class SentinelPairProcessor:
             products=None,
             ndvi_only: bool = False,
             overwrite_statistics: bool = False,
+            triage_policy: CloudTriagePolicy | None = None,
     ) -> None:
         self.temporary_root = Path(temporary_root)
         self.workspace = workspace
@@ -50,6 +62,7 @@ class SentinelPairProcessor:
         self.products = products
         self.ndvi_only = ndvi_only
         self.overwrite_statistics = overwrite_statistics
+        self.triage_policy = triage_policy
         self.logger = get_logger(self.__class__.__name__)
 
     def process(
@@ -57,10 +70,10 @@ class SentinelPairProcessor:
             pair: ArchivePair,
             target_agroids: tuple[int, ...] | None = None,
             target_fieldcodes: tuple[str, ...] | None = None,
-    ) -> None:
+    ) -> PairProcessingResult:
         """Обрабатывает выбранные хозяйства и статистику выбранных полей."""
         pair_started = perf_counter()
-        scenes = []
+        inspected = []
         targets = set(target_agroids) if target_agroids is not None else None
         for side, archive_path in zip(
                 ("ula", "ulb"),
@@ -90,30 +103,78 @@ class SentinelPairProcessor:
                         if agroid in targets
                     ),
                 )
+            inspected.append((archive, scene))
+
+        self._run_step(
+            "prefetch",
+            str(pair.acquired_on),
+            lambda: self._prefetch(pair, inspected),
+        )
+        modes = self._triage(inspected)
+        skipped = tuple(
+            agroid for agroid, mode in modes.items() if mode is TriageMode.SKIP
+        )
+        statistics_only = {
+            agroid
+            for agroid, mode in modes.items()
+            if mode is TriageMode.STATISTICS
+        }
+        scenes = []
+        for archive, scene in inspected:
+            if skipped:
+                scene = replace(
+                    scene,
+                    agroids=tuple(
+                        agroid
+                        for agroid in scene.agroids
+                        if agroid not in skipped
+                    ),
+                )
+            if not scene.agroids:
+                self.logger.info(
+                    "TILE SKIP: %s → все хозяйства отсечены облачностью",
+                    scene.tile,
+                )
+                continue
             self._run_step(
                 "extract",
-                archive_path.name,
+                archive.path.name,
                 lambda current_archive=archive, current=scene: (
-                    self._extract_bands(current_archive, current)
+                    self._extract_bands(
+                        current_archive,
+                        current,
+                        statistics_only=set(current.agroids) <= statistics_only,
+                    )
                 ),
             )
             self._run_step(
-                "tile",
+                "footprint",
                 self._scene_label(scene),
-                lambda current=scene: self._process_tile(current),
-            )
-            self._run_step(
-                "crop",
-                self._scene_label(scene),
-                lambda current=scene: self._crop_agroids(current),
+                lambda current=scene: self._build_agro_products(
+                    current,
+                    statistics_only,
+                ),
             )
             scenes.append(scene)
 
+        if not scenes and skipped:
+            self.logger.info(
+                "PAIR SKIP: %s → облачность выше порога для хозяйств %s | %.2f сек.",
+                pair.acquired_on,
+                ", ".join(map(str, skipped)),
+                perf_counter() - pair_started,
+            )
+            return PairProcessingResult(
+                processed_agroids=(),
+                published_agroids=(),
+                skipped_agroids=skipped,
+            )
+
         final_scene = self._build_final_scene(pair, scenes)
         self._run_step(
             "combine",
             self._scene_label(final_scene),
-            lambda: self._combine(final_scene),
+            lambda: self._combine(final_scene, statistics_only),
         )
         self._run_step(
             "scl-rescale",
@@ -133,6 +194,129 @@ class SentinelPairProcessor:
             pair.acquired_on,
             perf_counter() - pair_started,
         )
+        published = tuple(
+            agroid
+            for agroid in final_scene.agroids
+            if agroid not in statistics_only
+        )
+        return PairProcessingResult(
+            processed_agroids=final_scene.agroids,
+            published_agroids=published,
+            skipped_agroids=skipped,
+            outputs=self._outputs(final_scene, published),
+        )
+
+    def _outputs(
+            self,
+            scene: SceneContext,
+            agroids: tuple[int, ...],
+    ) -> tuple[Path, ...]:
+        """Возвращает манифест растров публикуемых хозяйств даты."""
+        paths = PublishedRasterPaths(scene, self.workspace)
+        return tuple(
+            Path(path)
+            for agroid in agroids
+            for path in paths.rasters(agroid)
+            if Path(path).exists()
+        )
+
+    def _prefetch(
+            self,
+            pair: ArchivePair,
+            inspected: list[tuple[SentinelArchive, SceneContext]],
+    ) -> None:
+        """Одним запросом читает поля, геометрии, границы и полноту NDVI."""
+        agroids = tuple(dict.fromkeys(
+            agroid
+            for _archive, scene in inspected
+            for agroid in scene.agroids
+        ))
+        if agroids:
+            self.field_data.prefetch(
+                year=pair.acquired_on.year,
+                agroids=agroids,
+                srid=self.options.destination_srid,
+                acquired_on=pair.acquired_on,
+            )
+
+    def triaged_agroids(self, pair: ArchivePair) -> tuple[int, ...]:
+        """
+        Возвращает хозяйства пары, исключённые сортировкой из публикации.
+
+        Решение принимается по сохранённым счётчикам без чтения ZIP. Такие
+        хозяйства не получают слоёв и без этого выбирались бы недостающими
+        при каждом запуске. Хозяйство без счётчиков хотя бы одного своего
+        тайла не исключается.
+        """
+        if self.triage_policy is None:
+            return ()
+        totals: dict[int, AgroCloudTriage] = {}
+        incomplete = set()
+        for side, archive_path in zip(
+                ("ula", "ulb"),
+                pair.archives,
+                strict=True,
+        ):
+            counts = read_triage(archive_path)
+            incomplete.update(
+                agroid
+                for agroid in AGROIDS_BY_TILE.get(f"{pair.prefix}{side}".lower(), ())
+                if agroid not in counts
+            )
+            for agroid, (_bounds, triage) in counts.items():
+                totals[agroid] = (
+                    totals[agroid].merge(triage)
+                    if agroid in totals
+                    else triage
+                )
+        return tuple(sorted(
+            agroid
+            for agroid, triage in totals.items()
+            if agroid not in incomplete
+            and self.triage_policy.decide(triage) is not TriageMode.FULL
+        ))
+
+    def _triage(
+            self,
+            inspected: list[tuple[SentinelArchive, SceneContext]],
+    ) -> dict[int, TriageMode]:
+        """Оценивает облачность хозяйств пары по SCL без распаковки архивов."""
+        if self.triage_policy is None:
+            return {}
+        totals: dict[int, AgroCloudTriage] = {}
+        for archive, scene in inspected:
+            if scene.level is not ProductLevel.L2A:
+                continue
+            counts = self._run_step(
+                "triage",
+                self._scene_label(scene),
+                lambda current_archive=archive, current=scene: (
+                    CloudTriageProcessor(
+                        current,
+                        current_archive,
+                        self.field_data,
+                        self.options,
+                    ).run()
+                ),
+            )
+            for agroid, triage in counts.items():
+                totals[agroid] = (
+                    totals[agroid].merge(triage)
+                    if agroid in totals
+                    else triage
+                )
+
+        modes = {}
+        for agroid, triage in totals.items():
+            modes[agroid] = self.triage_policy.decide(triage)
+            fraction = triage.clear_fraction
+            self.logger.info(
+                "TRIAGE a%s: ясных пикселей %s → %s",
+                agroid,
+                "нет данных" if fraction is None else f"{fraction:.1%}",
+                modes[agroid].value,
+            )
+        return modes
 
     def _inspect_scene(
             self,
@@ -151,10 +335,17 @@ class SentinelPairProcessor:
             self,
             archive: SentinelArchive,
             scene: SceneContext,
+            *,
+            statistics_only: bool = False,
     ) -> None:
-        """Извлекает минимальный набор каналов ещё не кешированной сцены."""
+        """
+        Извлекает минимальный набор каналов ещё не кешированной сцены.
+
+        Сцене, все хозяйства которой идут только в статистику, как и
+        NDVI-перерасчёту, нужны лишь B04, B08 и SCL.
+        """
         required_bands = scene.level.required_bands
-        if self.ndvi_only:
+        if self.ndvi_only or statistics_only:
             required_bands = ("B04", "B08")
             if scene.level is ProductLevel.L2A:
                 required_bands += ("SCL",)
@@ -168,38 +359,62 @@ class SentinelPairProcessor:
             extracted_path,
         )
 
-    def _process_tile(self, scene: SceneContext) -> None:
-        """Создаёт tile-level продукты одной сцены."""
+    def _agro_products(
+            self,
+            agroid: int,
+            statistics_only: set[int],
+    ) -> frozenset[str]:
+        """Возвращает продукты хозяйства; без публикации — только NDVI и SCL."""
+        products = frozenset(self.products or AGRO_PRODUCTS)
+        if agroid in statistics_only:
+            return products & STATISTICS_PRODUCTS
+        return products
+
+    def _build_agro_products(
+            self,
+            scene: SceneContext,
+            statistics_only: set[int],
+    ) -> None:
+        """Строит продукты хозяйств сцены из окон JP2 под их границами."""
         path_type = (
             L1CProductPaths
             if scene.level is ProductLevel.L1C
             else L2AProductPaths
         )
-        TileImageProcessor(
-            scene,
-            path_type(scene, self.workspace),
-            self.options,
-            products=self.products,
-        ).run()
-
-    def _crop_agroids(self, scene: SceneContext) -> None:
-        """Обрезает продукты одной сцены по хозяйствам её тайла."""
-        AgroCropProcessor(
-            scene,
-            SentinelCropPaths(scene, self.workspace),
-            self.field_data,
-            self.options,
-            products=self.products,
-        ).run()
+        groups: dict[frozenset[str], list[int]] = {}
+        for agroid in scene.agroids:
+            groups.setdefault(
+                self._agro_products(agroid, statistics_only),
+                [],
+            ).append(agroid)
+        for products, agroids in groups.items():
+            if not products:
+                continue
+            group_scene = replace(scene, agroids=tuple(agroids))
+            FootprintProductProcessor(
+                group_scene,
+                path_type(group_scene, self.workspace),
+                SentinelCropPaths(group_scene, self.workspace),
+                self.field_data,
+                self.options,
+                products=products,
+            ).run()
 
-    def _combine(self, scene: SceneContext) -> None:
+    def _combine(
+            self,
+            scene: SceneContext,
+            statistics_only: set[int],
+    ) -> None:
         """Один раз объединяет фрагменты хозяйства на границе тайлов."""
         if 1 not in scene.agroids:
             return
+        products = self._agro_products(1, statistics_only)
+        if not products:
+            return
         MosaicProcessor(
             scene,
             MosaicPaths(scene, self.workspace),
-            products=self.products,
+            products=products,
         ).run()
 
     def _prepare_scl(self, scene: SceneContext) -> None:
@@ -224,6 +439,7 @@ class SentinelPairProcessor:
             self.options.nodata,
             overwrite=self.overwrite_statistics,
             target_fieldcodes=target_fieldcodes,
+            srid=self.options.destination_srid,
         ).run()
 
     @staticmethod
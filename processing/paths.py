@@ -24,7 +24,7 @@ class ScenePaths:
 
 
 class L2AProductPaths(ScenePaths):
-    """Исходные SAFE-файлы и tile-level результаты L2A."""
+    """Исходные каналы L2A в распакованной SAFE-структуре."""
 
     _BANDS = {
         "tci": "TCI",
@@ -53,19 +53,9 @@ class L2AProductPaths(ScenePaths):
         )
         return sorted(glob(str(pattern)))
 
-    def destination(self, product: str) -> str:
-        """Возвращает путь tile-level результата в исходной проекции."""
-        return str(
-            self.workspace.intermediate
-            / (
-                f"{self.scene.satellite}_{self.scene.tile}_"
-                f"{self.scene.date_label}_{product}_native.tif"
-            )
-        )
-
 
 class L1CProductPaths(ScenePaths):
-    """Исходные SAFE-файлы и tile-level результаты L1C."""
+    """Исходные каналы L1C в распакованной SAFE-структуре."""
 
     _BANDS = {
         "tci": "TCI",
@@ -93,35 +83,12 @@ class L1CProductPaths(ScenePaths):
         )
         return sorted(glob(str(pattern)))
 
-    def destination(self, product: str) -> str:
-        """Возвращает путь tile-level результата L1C в исходной проекции."""
-        return str(
-            self.workspace.intermediate
-            / (
-                f"{self.scene.satellite}_{self.scene.tile}_"
-                f"{self.scene.date_label}_{product}_native.tif"
-            )
-        )
-
 
 class SentinelCropPaths(ScenePaths):
-    """Tile-level источники и результаты вырезки по агропредприятиям."""
+    """Результаты продуктов, вырезанных по агропредприятиям."""
 
     _SIZES = {"tci": 10, "ndvi": 10, "ndwi": 10, "scl": 20}
 
-    def sources(self, product: str) -> list[str]:
-        """Возвращает tile-level растр продукта для вырезки."""
-        if product not in self._SIZES:
-            raise ValueError(f"Неизвестный продукт: {product}")
-        path = (
-            self.workspace.intermediate
-            / (
-                f"{self.scene.satellite}_{self.scene.tile}_"
-                f"{self.scene.date_label}_{product}_native.tif"
-            )
-        )
-        return sorted(glob(str(path)))
-
     def destination(self, product: str, agroid: int) -> str:
         """Строит путь результата хозяйства с фактическим разрешением и SRID."""
         if product == "scl" and self.scene.level is ProductLevel.L1C:
@@ -230,3 +197,20 @@ class NdviStatisticsPaths(ScenePaths):
             self.workspace.processed
             / self._name(f"a{agroid}_scl_10m_3857.tif")
         )
+
+
+class PublishedRasterPaths(ScenePaths):
+    """Готовые растры хозяйства, которые передаются на публикацию."""
+
+    _PRODUCTS = ("tci", "ndvi", "ndwi", "scl")
+
+    def rasters(self, agroid: int) -> list[str]:
+        """Возвращает пути растров продуктов хозяйства в processed."""
+        return [
+            str(
+                self.workspace.processed
+                / self._name(f"a{agroid}_{product}_10m_3857.tif")
+            )
+            for product in self._PRODUCTS
+            if product != "scl" or self.scene.level is ProductLevel.L2A
+        ]
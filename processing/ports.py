@@ -1,15 +1,27 @@
 """Порты processing domain к внешним системам."""
 from __future__ import annotations
 
+from collections.abc import Iterator
 from datetime import date
-from typing import Any, Protocol
+from typing import Protocol
 
-from domain.models import Field, NdviStatistics
+from domain.models import Field, FieldNdviSeries, NdviStatistics
 
 
 class FieldDataProvider(Protocol):
     """Данные полей и статистики без привязки к драйверу БД."""
 
+    def prefetch(
+            self,
+            *,
+            year: int,
+            agroids: tuple[int, ...],
+            srid: int,
+            acquired_on: date,
+    ) -> None:
+        """Заранее читает состояние хозяйств даты одним обращением к БД."""
+        ...
+
     def bounds(
             self,
             *,
@@ -29,8 +41,9 @@ class FieldDataProvider(Protocol):
             *,
             field_ids: list[int],
             year: int,
-    ) -> dict[int, Any]:
-        """Возвращает геометрии полей одним инфраструктурным вызовом."""
+            srid: int,
+    ) -> dict[int, bytes]:
+        """Возвращает WKB-контуры полей в ``srid`` одним вызовом."""
         ...
 
     def ndvi_is_complete(
@@ -53,3 +66,18 @@ class FieldDataProvider(Protocol):
     ) -> None:
         """Сохраняет либо полностью заменяет статистику выбранных полей."""
         ...
+
+
+class NdviSeriesSource(Protocol):
+    """Потоковое чтение сохранённых рядов NDVI полей."""
+
+    def series(
+            self,
+            *,
+            agroid: int,
+            years: list[int] | None = None,
+            fieldcodes: list[str] | None = None,
+            with_geometry: bool = False,
+    ) -> Iterator[FieldNdviSeries]:
+        """Отдаёт сезонные ряды полей хозяйства без загрузки архива целиком."""
+        ...
@@ -0,0 +1,227 @@
+"""Продукты хозяйств из окон каналов JP2 без tile-level промежуточных файлов."""
+from __future__ import annotations
+
+import os
+from contextlib import ExitStack
+from time import perf_counter
+
+import numpy as np
+from osgeo import gdal
+
+from processing.calculations import normalized_difference
+from processing.dataset import ensure_same_grid, open_raster
+from processing.domain import ProductLevel
+from processing.geometry import source_window
+from processing.ports import FieldDataProvider
+
+from .sentinel import AgroCropProcessor
+
+# Продукты хозяйства, которые строит процессор.
+AGRO_PRODUCTS = frozenset({"tci", "scl", "ndvi", "ndwi"})
+# Вторичный канал нормализованной разности для каждого индекса.
+_INDEX_BANDS = {"ndvi": "b04", "ndwi": "b03"}
+
+
+class FootprintProductProcessor(AgroCropProcessor):
+    """
+    Строит TCI, SCL, NDVI и NDWI хозяйств за один проход по окнам JP2.
+
+    TCI и SCL перепроецируются прямо из JP2: GDAL декодирует только блоки под
+    границами хозяйства. Индексы рассчитываются на окне каналов с запасом для
+    ядра Lanczos и из памяти сразу перепроецируются в результат хозяйства.
+    """
+
+    PRODUCTS = AGRO_PRODUCTS
+    # Запас окна в исходных пикселях: радиус ядра Lanczos равен трём.
+    WINDOW_MARGIN = 4
+
+    def __init__(
+            self,
+            scene,
+            source_paths,
+            crop_paths,
+            field_data: FieldDataProvider,
+            options,
+            products=None,
+    ):
+        super().__init__(
+            scene,
+            crop_paths,
+            field_data,
+            options,
+            products=products,
+        )
+        unknown = self.products - self.PRODUCTS
+        if unknown:
+            raise ValueError(
+                "Неизвестные продукты хозяйства: " + ", ".join(sorted(unknown))
+            )
+        self.source_paths = source_paths
+
+    def run(self) -> None:
+        """Создаёт отсутствующие продукты каждого хозяйства сцены."""
+        stages = [
+            product
+            for product in ("tci", "ndvi", "ndwi", "scl")
+            if product in self.products and not (
+                product == "scl"
+                and self.scene.level is ProductLevel.L1C
+            )
+        ]
+        pending = {}
+        for agroid in self.scene.agroids:
+            outputs = {}
+            for stage in stages:
+                destination = self.paths.destination(stage, agroid)
+                if os.path.exists(destination):
+                    self.logger.info("%s уже есть — пропуск", destination)
+                else:
+                    outputs[stage] = destination
+            if outputs:
+                pending[agroid] = outputs
+        if not pending:
+            return
+
+        sources = self._sources(
+            {stage for outputs in pending.values() for stage in outputs}
+        )
+        for agroid, outputs in pending.items():
+            started = perf_counter()
+            for stage in ("tci", "scl"):
+                if stage in outputs:
+                    self._warp(sources[stage], outputs[stage], agroid, stage)
+            indices = {
+                product: outputs[product]
+                for product in _INDEX_BANDS
+                if product in outputs
+            }
+            if indices:
+                self._warp_indices(sources, indices, agroid)
+            self.logger.info(
+                "FOOTPRINT OK: a%s %s → %s | %.2f сек.",
+                agroid,
+                self.scene.tile,
+                ", ".join(product.upper() for product in outputs),
+                perf_counter() - started,
+            )
+
+    def _sources(self, stages: set[str]) -> dict[str, str]:
+        """Находит JP2 каналов, необходимых для выбранных продуктов."""
+        bands = {stage for stage in stages if stage in ("tci", "scl")}
+        for product, band in _INDEX_BANDS.items():
+            if product in stages:
+                bands.update({"b08", band})
+        sources = {}
+        missing = []
+        for band in sorted(bands):
+            band_sources = self.source_paths.sources(band)
+            if band_sources:
+                sources[band] = band_sources[0]
+            else:
+                missing.append(band.upper())
+        if missing:
+            raise FileNotFoundError(
+                "Не найдены каналы сцены: " + ", ".join(missing)
+            )
+        return sources
+
+    def _warp_indices(
+            self,
+            sources: dict[str, str],
+            outputs: dict[str, str],
+            agroid: int,
+    ) -> None:
+        """Считает индексы на окне под хозяйством и вырезает их из памяти."""
+        bounds = self._get_bounds(agroid, sources["b08"])
+        if not bounds:
+            return
+
+        with ExitStack() as stack:
+            b08 = stack.enter_context(open_raster(sources["b08"]))
+            window = source_window(
+                bounds,
+                b08,
+                self.options.destination_srid,
+                margin=self.WINDOW_MARGIN,
+            )
+            if window is None:
+                self.logger.warning(
+                    "Агро %s: окно каналов пустое → пропуск",
+                    agroid,
+                )
+                return
+            b08_array = _read_window(b08, window)
+            offsets = self.scene.band_offsets
+            for product, destination in outputs.items():
+                band = _INDEX_BANDS[product]
+                secondary = stack.enter_context(open_raster(sources[band]))
+                ensure_same_grid(b08, secondary, band.upper())
+                secondary_array = _read_window(secondary, window)
+                if product == "ndvi":
+                    values = normalized_difference(
+                        b08_array,
+                        secondary_array,
+                        primary_offset=offsets.b08,
+                        secondary_offset=offsets.b04,
+                        nodata=self.options.nodata,
+                    )
+                else:
+                    values = normalized_difference(
+                        secondary_array,
+                        b08_array,
+                        primary_offset=offsets.b03,
+                        secondary_offset=offsets.b08,
+                        nodata=self.options.nodata,
+                    )
+                index_dataset = self._window_dataset(b08, window, values)
+                try:
+                    self._warp_dataset(
+                        index_dataset,
+                        destination,
+                        bounds,
+                        agroid,
+                        product,
+                    )
+                finally:
+                    index_dataset = None
+
+    def _window_dataset(
+            self,
+            reference,
+            window: tuple[int, int, int, int],
+            values: np.ndarray,
+    ):
+        """Создаёт MEM dataset окна с геопривязкой исходного канала."""
+        x_offset, y_offset, width, height = window
+        transform = reference.GetGeoTransform()
+        dataset = gdal.GetDriverByName("MEM").Create(
+            "",
+            width,
+            height,
+            1,
+            gdal.GDT_Float32,
+        )
+        if dataset is None:
+            raise RuntimeError("Не удалось создать MEM dataset окна")
+        dataset.SetGeoTransform((
+            transform[0] + x_offset * transform[1],
+            transform[1],
+            transform[2],
+            transform[3] + y_offset * transform[5],
+            transform[4],
+            transform[5],
+        ))
+        dataset.SetProjection(reference.GetProjection())
+        band = dataset.GetRasterBand(1)
+        band.SetNoDataValue(self.options.nodata)
+        band.WriteArray(values)
+        band = None
+        return dataset
+
+
+def _read_window(dataset, window: tuple[int, int, int, int]) -> np.ndarray:
+    """Читает окно первого канала как ``float32``."""
+    array = dataset.GetRasterBand(1).ReadAsArray(*window)
+    if array is None:
+        raise RuntimeError(f"GDAL не смог прочитать окно {window}")
+    return np.asarray(array, dtype=np.float32)
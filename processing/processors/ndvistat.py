@@ -9,6 +9,7 @@ from core.logging import get_logger
 from domain.models import Field
 from processing.domain import ProductLevel
 from processing.ndvi import NdviFieldAnalyzer
+from processing.ndvi_writer import BackgroundNdviWriter
 from processing.ports import FieldDataProvider
 from processing.raster import FieldRasterReader
 from processing.storage import FieldGeometryExporter
@@ -25,6 +26,7 @@ class NdviStatisticsProcessor:
                  nodata: float,
                  overwrite: bool = False,
                  target_fieldcodes: tuple[str, ...] | None = None,
+                 srid: int = 3857,
                  ) -> None:
         self.scene = scene
         self.paths = paths
@@ -34,6 +36,8 @@ class NdviStatisticsProcessor:
         self.nodata = nodata
         self.overwrite = overwrite
         self.target_fieldcodes = target_fieldcodes
+        # Система координат NDVI, в которой запрашиваются контуры полей.
+        self.srid = srid
         self.analyzer = NdviFieldAnalyzer(nodata_value=nodata)
 
     @staticmethod
@@ -66,6 +70,7 @@ class NdviStatisticsProcessor:
         geometries = self.field_data.geometries(
             field_ids=field_ids,
             year=self.scene.acquired_on.year,
+            srid=self.srid,
         )
         for field in missing:
             try:
@@ -77,135 +82,143 @@ class NdviStatisticsProcessor:
             self.geometry_exporter.export(
                 geometry,
                 self.paths.field_geojson(agroid, field.name),
+                srid=self.srid,
             )
 
     def run(self) -> None:
-        """Рассчитывает и сохраняет NDVI-статистику всех доступных полей."""
-        for agroid in self.scene.agroids:
-            agro_started = perf_counter()
-            src_ndvi = self.paths.ndvi_source(agroid)
-            self.logger.info("Агро %s: проверка %s", agroid, src_ndvi)
-            if not os.path.exists(src_ndvi):
-                self.logger.warning("NDVI не найден → пропуск: %s", src_ndvi)
-                continue
-
-            year = self.scene.acquired_on.year
-            if not self.overwrite and self.field_data.ndvi_is_complete(
-                    agroid=agroid,
-                    year=year,
-                    acquired_on=self.scene.acquired_on,
-            ):
-                self.logger.info(
-                    "Агро %s: NDVI уже рассчитан за %s — пропуск",
-                    agroid, self.scene.date_label
-                )
-                continue
+        """Рассчитывает NDVI-статистику полей, записывая её в фоне."""
+        # Запись хозяйства идёт параллельно расчёту следующего; ошибка
+        # записи выбрасывается до завершения шага и помечает дату ошибочной.
+        with BackgroundNdviWriter(self.field_data) as writer:
+            for agroid in self.scene.agroids:
+                self._run_agro(agroid, writer)
+
+    def _run_agro(self, agroid: int, writer: BackgroundNdviWriter) -> None:
+        """Рассчитывает статистику полей хозяйства и передаёт её на запись."""
+        agro_started = perf_counter()
+        src_ndvi = self.paths.ndvi_source(agroid)
+        self.logger.info("Агро %s: проверка %s", agroid, src_ndvi)
+        if not os.path.exists(src_ndvi):
+            self.logger.warning("NDVI не найден → пропуск: %s", src_ndvi)
+            return
 
-            fields = self.field_data.fields(
+        year = self.scene.acquired_on.year
+        if not self.overwrite and self.field_data.ndvi_is_complete(
                 agroid=agroid,
                 year=year,
-            )
-            if self.target_fieldcodes is not None:
-                requested = {
-                    self._normalize_fieldcode(fieldcode): fieldcode
-                    for fieldcode in self.target_fieldcodes
-                }
-                available = {
-                    self._normalize_fieldcode(field.fieldcode): field
-                    for field in fields
-                    if field.fieldcode is not None
-                }
-                missing = set(requested).difference(available)
-                if missing:
-                    self.logger.warning(
-                        "Агро %s: нет контуров за %s для fieldcode %s "
-                        "→ пропуск",
-                        agroid,
-                        year,
-                        ", ".join(
-                            requested[fieldcode]
-                            for fieldcode in sorted(missing)
-                        ),
-                    )
-                    continue
-                fields = [available[fieldcode] for fieldcode in requested]
+                acquired_on=self.scene.acquired_on,
+        ):
             self.logger.info(
-                "Агро %s: полей для анализа — %d",
-                agroid,
-                len(fields),
+                "Агро %s: NDVI уже рассчитан за %s — пропуск",
+                agroid, self.scene.date_label
             )
-            self._save_field_geojsons(fields, agroid)
-            ndvi_values = []
-            scl_path = None
-            if self.scene.level is ProductLevel.L2A:
-                scl_path = self.paths.scl_source(agroid)
-                if not os.path.exists(scl_path):
-                    raise FileNotFoundError(
-                        f"SCL не найден для метаданных NDVI: {scl_path}"
-                    )
-
-            # Исходные растры открываются один раз на хозяйство, а NDVI и SCL
-            # вырезаются одним Warp для каждого поля.
-            with FieldRasterReader(
-                    src_ndvi,
-                    scl_path=scl_path,
-                    nodata=self.nodata,
-            ) as raster_reader:
-                for field in fields:
-                    if field.id is None:
-                        raise ValueError(
-                            f"У поля {field.name} отсутствует id"
-                        )
-                    geojson = self.paths.field_geojson(
-                        agroid,
-                        field.name,
-                    )
-                    if not os.path.exists(geojson):
-                        self.logger.warning(
-                            "GeoJSON не найден → %s",
-                            geojson,
-                        )
-                        continue
-
-                    clip = raster_reader.clip(geojson)
-                    val = self.analyzer.analyze(
-                        ndvi=clip.values,
-                        acquired_on=self.scene.acquired_on,
-                        acquired_at=self.scene.acquired_at,
-                        field_id=field.id,
-                        coverage_mask=clip.coverage,
-                        scl=clip.scl,
-                        source_level=self.scene.level.value.upper(),
-                    )
-                    if val is not None:
-                        ndvi_values.append(val)
+            return
 
-            field_ids = [
-                field.id
+        fields = self.field_data.fields(
+            agroid=agroid,
+            year=year,
+        )
+        if self.target_fieldcodes is not None:
+            requested = {
+                self._normalize_fieldcode(fieldcode): fieldcode
+                for fieldcode in self.target_fieldcodes
+            }
+            available = {
+                self._normalize_fieldcode(field.fieldcode): field
                 for field in fields
-                if field.id is not None
-            ]
-            if ndvi_values or self.overwrite:
-                self.logger.info(
-                    "Агро %s: %s %s записей в БД",
+                if field.fieldcode is not None
+            }
+            missing = set(requested).difference(available)
+            if missing:
+                self.logger.warning(
+                    "Агро %s: нет контуров за %s для fieldcode %s "
+                    "→ пропуск",
                     agroid,
-                    (
-                        "полностью заменяем"
-                        if self.overwrite
-                        else "сохраняем"
+                    year,
+                    ", ".join(
+                        requested[fieldcode]
+                        for fieldcode in sorted(missing)
                     ),
-                    len(ndvi_values),
                 )
-                self.field_data.save_ndvi(
-                    ndvi_values,
-                    field_ids=field_ids,
+                return
+            fields = [available[fieldcode] for fieldcode in requested]
+        self.logger.info(
+            "Агро %s: полей для анализа — %d",
+            agroid,
+            len(fields),
+        )
+        self._save_field_geojsons(fields, agroid)
+        ndvi_values = []
+        scl_path = None
+        if self.scene.level is ProductLevel.L2A:
+            scl_path = self.paths.scl_source(agroid)
+            if not os.path.exists(scl_path):
+                raise FileNotFoundError(
+                    f"SCL не найден для метаданных NDVI: {scl_path}"
+                )
+
+        # Исходные растры открываются один раз на хозяйство, а NDVI и SCL
+        # вырезаются одним Warp для каждого поля.
+        with FieldRasterReader(
+                src_ndvi,
+                scl_path=scl_path,
+                nodata=self.nodata,
+        ) as raster_reader:
+            for field in fields:
+                if field.id is None:
+                    raise ValueError(
+                        f"У поля {field.name} отсутствует id"
+                    )
+                geojson = self.paths.field_geojson(
+                    agroid,
+                    field.name,
+                )
+                if not os.path.exists(geojson):
+                    self.logger.warning(
+                        "GeoJSON не найден → %s",
+                        geojson,
+                    )
+                    continue
+
+                clip = raster_reader.clip(geojson)
+                val = self.analyzer.analyze(
+                    ndvi=clip.values,
                     acquired_on=self.scene.acquired_on,
-                    overwrite=self.overwrite,
+                    acquired_at=self.scene.acquired_at,
+                    field_id=field.id,
+                    coverage_mask=clip.coverage,
+                    scl=clip.scl,
+                    source_level=self.scene.level.value.upper(),
                 )
+                if val is not None:
+                    ndvi_values.append(val)
+
+        field_ids = [
+            field.id
+            for field in fields
+            if field.id is not None
+        ]
+        if ndvi_values or self.overwrite:
             self.logger.info(
-                "NDVI STATS OK: агро=%s полей=%d значений=%d | %.2f сек.",
+                "Агро %s: %s %s записей в БД (в фоне)",
                 agroid,
-                len(fields),
+                (
+                    "полностью заменяем"
+                    if self.overwrite
+                    else "сохраняем"
+                ),
                 len(ndvi_values),
-                perf_counter() - agro_started,
             )
+            writer.submit(
+                ndvi_values,
+                field_ids=field_ids,
+                acquired_on=self.scene.acquired_on,
+                overwrite=self.overwrite,
+            )
+        self.logger.info(
+            "NDVI STATS OK: агро=%s полей=%d значений=%d | %.2f сек.",
+            agroid,
+            len(fields),
+            len(ndvi_values),
+            perf_counter() - agro_started,
+        )
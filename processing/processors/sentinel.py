@@ -1,19 +1,16 @@
 """Класс для нарезания спутниковых снимков по агропредприятиями."""
 from __future__ import annotations
 
-import os
-
 from osgeo import gdal, osr
 
 from core.logging import get_logger
 from processing.dataset import atomic_raster_path, open_raster
-from processing.domain import ProductLevel
 from processing.geometry import intersect_raster_bounds
 from processing.ports import FieldDataProvider
 
 
 class AgroCropProcessor:
-    """Вырезает продукты сцены по границам связанных хозяйств."""
+    """Вырезка растров по границам хозяйств для процессоров продуктов сцены."""
 
     def __init__(
             self,
@@ -40,52 +37,6 @@ class AgroCropProcessor:
             tuple[float, float, float, float] | None,
         ] = {}
 
-    def run(self) -> None:
-        """Обрабатывает все допустимые продукты каждого хозяйства сцены."""
-        warp_keys = [
-            product
-            for product in ("tci", "ndvi", "ndwi", "scl")
-            if product in self.products and not (
-                product == "scl"
-                and self.scene.level is ProductLevel.L1C
-            )
-        ]
-
-        sources = {}
-        for stage in warp_keys:
-            stage_sources = self.paths.sources(stage)
-            if not stage_sources:
-                raise FileNotFoundError(
-                    f"{stage}: исходники не найдены"
-                )
-            sources[stage] = stage_sources[0]
-
-        for agroid in self.scene.agroids:
-            for stage in warp_keys:
-                self.logger.info(
-                    "%s_a%s_%s - обработка %s",
-                    stage,
-                    agroid,
-                    self.scene.date_label,
-                    self.scene.level.value,
-                )
-                self._process_stage(stage, agroid, sources[stage])
-
-    def _process_stage(
-            self,
-            stage: str,
-            agroid: int,
-            src: str,
-    ) -> None:
-        """Запускает пространственную вырезку заранее найденного продукта."""
-        dst = self.paths.destination(stage, agroid)
-
-        if os.path.exists(dst):
-            self.logger.info("%s уже есть — пропуск", dst)
-            return
-
-        self._warp(src, dst, agroid, stage)
-
     def _get_bounds(
             self,
             agroid: int,
@@ -130,41 +81,52 @@ class AgroCropProcessor:
             return
 
         with open_raster(src) as ds:
-            src_srs = osr.SpatialReference(wkt=ds.GetProjection())
-            dst_srs = osr.SpatialReference()
-            dst_srs.ImportFromEPSG(self.options.destination_srid)
-            res = ds.GetGeoTransform()[1]
-            resample_algorithm = (
-                gdal.GRA_NearestNeighbour
-                if stage == "scl"
-                else gdal.GRA_Lanczos
-            )
+            self._warp_dataset(ds, dst, bounds, agroid, stage)
+
+    def _warp_dataset(
+            self,
+            ds,
+            dst: str,
+            bounds: tuple[float, float, float, float],
+            agroid: int,
+            stage: str,
+    ) -> None:
+        """Перепроецирует открытый dataset в границы хозяйства."""
+        src_srs = osr.SpatialReference(wkt=ds.GetProjection())
+        dst_srs = osr.SpatialReference()
+        dst_srs.ImportFromEPSG(self.options.destination_srid)
+        res = ds.GetGeoTransform()[1]
+        resample_algorithm = (
+            gdal.GRA_NearestNeighbour
+            if stage == "scl"
+            else gdal.GRA_Lanczos
+        )
 
-            with atomic_raster_path(dst) as temporary:
-                result = gdal.Warp(
-                    temporary,
-                    ds,
-                    format="GTiff",
-                    outputBounds=bounds,
-                    outputBoundsSRS=dst_srs,
-                    srcSRS=src_srs,
-                    dstSRS=dst_srs,
-                    xRes=res,
-                    yRes=res,
-                    resampleAlg=resample_algorithm,
-                    srcNodata=self.options.nodata,
-                    dstNodata=self.options.nodata,
-                    multithread=True,
-                    warpOptions=[
-                        "NUM_THREADS=ALL_CPUS",
-                        "INIT_DEST=NO_DATA",
-                    ],
-                    creationOptions=["TILED=YES", "BIGTIFF=IF_SAFER"],
+        with atomic_raster_path(dst) as temporary:
+            result = gdal.Warp(
+                temporary,
+                ds,
+                format="GTiff",
+                outputBounds=bounds,
+                outputBoundsSRS=dst_srs,
+                srcSRS=src_srs,
+                dstSRS=dst_srs,
+                xRes=res,
+                yRes=res,
+                resampleAlg=resample_algorithm,
+                srcNodata=self.options.nodata,
+                dstNodata=self.options.nodata,
+                multithread=True,
+                warpOptions=[
+                    "NUM_THREADS=ALL_CPUS",
+                    "INIT_DEST=NO_DATA",
+                ],
+                creationOptions=["TILED=YES", "BIGTIFF=IF_SAFER"],
+            )
+            if result is None:
+                raise RuntimeError(
+                    f"Не удалось создать {dst} для агро {agroid}"
                 )
-                if result is None:
-                    raise RuntimeError(
-                        f"Не удалось создать {dst} для агро {agroid}"
-                    )
-                result.FlushCache()
-                result = None
+            result.FlushCache()
+            result = None
         self.logger.info("Нарезка для агро %s готова: %s", agroid, dst)
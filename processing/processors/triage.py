@@ -0,0 +1,125 @@
+"""Подсчёт ясных пикселей SCL по хозяйствам прямо из Sentinel ZIP."""
+from __future__ import annotations
+
+import numpy as np
+from osgeo import gdal, osr
+
+from core.logging import get_logger
+from processing.archive import SentinelArchive
+from processing.dataset import open_raster
+from processing.geometry import intersect_raster_bounds
+from processing.ports import FieldDataProvider
+from processing.triage import AgroCloudTriage, read_triage, write_triage
+
+
+class CloudTriageProcessor:
+    """Читает только 20-метровый SCL внутри границ хозяйств сцены."""
+
+    def __init__(
+            self,
+            scene,
+            archive: SentinelArchive,
+            field_data: FieldDataProvider,
+            options,
+    ):
+        self.scene = scene
+        self.archive = archive
+        self.field_data = field_data
+        self.options = options
+        self.logger = get_logger(self.__class__.__name__)
+
+    def run(self) -> dict[int, AgroCloudTriage]:
+        """Возвращает счётчики хозяйств, переиспользуя сохранённый результат."""
+        member = self.archive.index().bands.get("SCL")
+        if member is None:
+            self.logger.warning(
+                "SCL отсутствует в %s; сортировка пропущена",
+                self.archive.path.name,
+            )
+            return {}
+
+        cached = read_triage(self.archive.path)
+        # Счётчики хозяйств вне текущей выборки сохраняются: по ним
+        # обработка исключает отсортированные хозяйства из недостающих.
+        entries = {
+            agroid: entry
+            for agroid, entry in cached.items()
+            if agroid not in self.scene.agroids
+        }
+        computed = 0
+        for agroid in self.scene.agroids:
+            bounds = tuple(
+                float(value)
+                for value in self.field_data.bounds(
+                    year=self.scene.acquired_on.year,
+                    agroid=agroid,
+                    srid=self.options.destination_srid,
+                )
+            )
+            previous = cached.get(agroid)
+            if previous is not None and previous[0] == bounds:
+                entries[agroid] = previous
+                continue
+            entries[agroid] = (
+                bounds,
+                self._count(f"/vsizip/{self.archive.path}/{member}", agroid, bounds),
+            )
+            computed += 1
+
+        if computed:
+            try:
+                write_triage(self.archive.path, entries)
+            except OSError as exc:
+                self.logger.warning(
+                    "Результаты сортировки не сохранены для %s: %s",
+                    self.archive.path.name,
+                    exc,
+                )
+        return {
+            agroid: entries[agroid][1]
+            for agroid in self.scene.agroids
+            if agroid in entries
+        }
+
+    def _count(
+            self,
+            source: str,
+            agroid: int,
+            bounds: tuple[float, float, float, float],
+    ) -> AgroCloudTriage:
+        """Вырезает SCL хозяйства в памяти и считает ясные пиксели."""
+        crop = intersect_raster_bounds(
+            bounds,
+            source,
+            self.options.destination_srid,
+        )
+        if crop[0] >= crop[2] or crop[1] >= crop[3]:
+            return AgroCloudTriage(agroid, 0, 0)
+
+        with open_raster(source) as dataset:
+            source_srs = osr.SpatialReference(wkt=dataset.GetProjection())
+            destination_srs = osr.SpatialReference()
+            destination_srs.ImportFromEPSG(self.options.destination_srid)
+            resolution = dataset.GetGeoTransform()[1]
+            result = gdal.Warp(
+                "",
+                dataset,
+                format="MEM",
+                outputBounds=crop,
+                outputBoundsSRS=destination_srs,
+                srcSRS=source_srs,
+                dstSRS=destination_srs,
+                xRes=resolution,
+                yRes=resolution,
+                resampleAlg=gdal.GRA_NearestNeighbour,
+                srcNodata=0,
+                dstNodata=0,
+            )
+            if result is None:
+                raise RuntimeError(f"Не удалось прочитать SCL агро {agroid}")
+            scl = result.GetRasterBand(1).ReadAsArray()
+            result = None
+
+        observed = int(np.count_nonzero(scl))
+        clear = int(np.count_nonzero((scl >= 4) & (scl <= 7)))
+        return AgroCloudTriage(agroid, clear, observed)
@@ -15,6 +15,7 @@ from .domain import (
     build_layer_source_metadata,
 )
 from .exceptions import ProcessingRunError
+from .triage import PairProcessingResult
 
 
 class ProcessingStatusReader(Protocol):
@@ -36,8 +37,20 @@ class ArchivePairProcessor(Protocol):
             pair,
             target_agroids: tuple[int, ...] | None = None,
             target_fieldcodes: tuple[str, ...] | None = None,
-    ) -> None:
-        """Обрабатывает архивы для выбранных хозяйств и полей даты."""
+    ) -> PairProcessingResult | None:
+        """
+        Обрабатывает архивы для выбранных хозяйств и полей даты.
+
+        ``None`` означает, что публикуются все результаты даты.
+        """
+        ...
+
+
+class TriageOutcomeReader(Protocol):
+    """Порт чтения сохранённых решений облачной сортировки."""
+
+    def triaged_agroids(self, pair) -> tuple[int, ...]:
+        """Возвращает хозяйства пары, которые сортировка не публикует."""
         ...
 
 
@@ -48,8 +61,19 @@ class ResultPublisher(Protocol):
             self,
             acquired_on: date,
             source: LayerSourceMetadata,
+            agroids: tuple[int, ...] | None = None,
+            files: tuple[Path, ...] | None = None,
     ) -> None:
-        """Публикует готовые результаты даты вместе с метаданными источника."""
+        """
+        Публикует результаты даты; ``agroids`` ограничивает хозяйства.
+
+        ``files`` — манифест растров обработки; без него публикатор сам
+        находит растры даты.
+        """
+        ...
+
+    def close(self) -> None:
+        """Дожидается фоновых работ публикации, например прогрева кэша."""
         ...
 
 
@@ -74,6 +98,7 @@ class ProcessingService:
             cleaner: WorkspaceCleaner,
             process_completed: bool = False,
             clean_before_each: bool = False,
+            triage_reader: TriageOutcomeReader | None = None,
     ):
         self.archive_root = Path(archive_root)
         self.pair_finder = pair_finder
@@ -83,8 +108,13 @@ class ProcessingService:
         self.cleaner = cleaner
         self.process_completed = process_completed
         self.clean_before_each = clean_before_each
+        self.triage_reader = triage_reader
         self.logger = get_logger(self.__class__.__name__)
 
+    def close(self) -> None:
+        """Завершает фоновые работы публикатора после запуска."""
+        self.publisher.close()
+
     def run(
             self,
             archive_root: str | Path | None = None,
@@ -142,10 +172,17 @@ class ProcessingService:
                     missing = [
                         agroid for agroid in missing if agroid in requested
                     ]
+                if missing and self.triage_reader is not None:
+                    # Отсортированные хозяйства не получают слоёв и иначе
+                    # отбирались бы недостающими при каждом запуске.
+                    triaged = set(self.triage_reader.triaged_agroids(pair))
+                    missing = [
+                        agroid for agroid in missing if agroid not in triaged
+                    ]
                 if not missing:
                     skipped += 1
                     self.logger.info(
-                        "SKIP %s → все результаты уже существуют",
+                        "SKIP %s → результаты существуют или отсечены облачностью",
                         pair.acquired_on,
                     )
                     continue
@@ -189,22 +226,34 @@ class ProcessingService:
                 process_options = {"target_agroids": target_agroids}
                 if target_fieldcodes is not None:
                     process_options["target_fieldcodes"] = target_fieldcodes
-                self.pair_processor.process(pair, **process_options)
+                outcome = self.pair_processor.process(pair, **process_options)
                 self.logger.info(
                     "PROCESSING OK: %s | %.2f сек.",
                     date_label,
                     perf_counter() - processing_started,
                 )
-                publish_started = perf_counter()
-                self.publisher.publish_date(
-                    pair.acquired_on,
-                    build_layer_source_metadata(pair),
-                )
-                self.logger.info(
-                    "PUBLISH OK: %s | %.2f сек.",
-                    date_label,
-                    perf_counter() - publish_started,
-                )
+                publish_options = {}
+                if outcome is not None:
+                    publish_options["agroids"] = outcome.published_agroids
+                    if outcome.outputs:
+                        publish_options["files"] = outcome.outputs
+                if publish_options.get("agroids") == ():
+                    self.logger.info(
+                        "PUBLISH SKIP: %s → нет хозяйств для публикации",
+                        date_label,
+                    )
+                else:
+                    publish_started = perf_counter()
+                    self.publisher.publish_date(
+                        pair.acquired_on,
+                        build_layer_source_metadata(pair),
+                        **publish_options,
+                    )
+                    self.logger.info(
+                        "PUBLISH OK: %s | %.2f сек.",
+                        date_label,
+                        perf_counter() - publish_started,
+                    )
                 processed += 1
                 self.logger.info(
                     "SUCCESS %s | %.2f сек.",
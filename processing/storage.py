@@ -3,20 +3,48 @@ from __future__ import annotations
 
 from pathlib import Path
 
-import geojson
+from osgeo import ogr, osr
 
 
 class FieldGeometryExporter:
-    """Сериализует полученную из repository геометрию поля."""
+    """Записывает WKB-контур поля маской GeoJSON средствами OGR."""
+
+    def export(
+            self,
+            geometry: bytes,
+            destination: str | Path,
+            *,
+            srid: int,
+    ) -> Path:
+        """Атомарно записывает контур поля с CRS ``srid`` в GeoJSON."""
+        shape = ogr.CreateGeometryFromWkb(bytes(geometry))
+        if shape is None:
+            raise ValueError(f"Некорректный WKB контура: {destination}")
+        reference = osr.SpatialReference()
+        reference.ImportFromEPSG(srid)
+        reference.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
 
-    def export(self, geometry, destination: str | Path) -> Path:
-        """Атомарно записывает геометрию поля в GeoJSON."""
         path = Path(destination)
         path.parent.mkdir(parents=True, exist_ok=True)
         temporary = path.with_suffix(path.suffix + ".tmp")
         try:
-            with temporary.open("w", encoding="utf-8") as stream:
-                geojson.dump(geometry, stream)
+            dataset = ogr.GetDriverByName("GeoJSON").CreateDataSource(
+                str(temporary)
+            )
+            if dataset is None:
+                raise RuntimeError(f"OGR не смог создать маску {destination}")
+            layer = dataset.CreateLayer(
+                "field",
+                reference,
+                shape.GetGeometryType(),
+            )
+            feature = ogr.Feature(layer.GetLayerDefn())
+            feature.SetGeometry(shape)
+            if layer.CreateFeature(feature) != 0:
+                raise RuntimeError(f"OGR не смог записать маску {destination}")
+            feature = None
+            layer = None
+            dataset = None
             temporary.replace(path)
         finally:
             temporary.unlink(missing_ok=True)
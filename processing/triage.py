@@ -0,0 +1,164 @@
+"""Облачная сортировка хозяйств по SCL до тяжёлых этапов обработки."""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+TRIAGE_SUFFIX = ".triage.json"
+TRIAGE_ALGORITHM_VERSION = "1.0.0"
+
+Bounds = tuple[float, float, float, float]
+
+
+class TriageMode(StrEnum):
+    """Режим обработки хозяйства по доле ясных пикселей."""
+
+    FULL = "full"
+    # Только статистика NDVI, без публикации растров.
+    STATISTICS = "statistics"
+    SKIP = "skip"
+
+
+@dataclass(frozen=True)
+class AgroCloudTriage:
+    """Счётчики SCL одного хозяйства внутри одной или нескольких сцен."""
+
+    agroid: int
+    # Пиксели классов 4–7: растительность, почва, вода, неклассифицировано.
+    clear_pixels: int
+    # Пиксели SCL с данными, т.е. все классы кроме 0 (nodata).
+    observed_pixels: int
+
+    @property
+    def clear_fraction(self) -> float | None:
+        """Доля ясных пикселей или None, если хозяйство вне кадра."""
+        if self.observed_pixels <= 0:
+            return None
+        return self.clear_pixels / self.observed_pixels
+
+    def merge(self, other: AgroCloudTriage) -> AgroCloudTriage:
+        """Складывает счётчики хозяйства, попавшего в оба тайла пары."""
+        if other.agroid != self.agroid:
+            raise ValueError("Складываются счётчики разных хозяйств")
+        return AgroCloudTriage(
+            agroid=self.agroid,
+            clear_pixels=self.clear_pixels + other.clear_pixels,
+            observed_pixels=self.observed_pixels + other.observed_pixels,
+        )
+
+
+@dataclass(frozen=True)
+class CloudTriagePolicy:
+    """Пороги доли ясных пикселей для пропуска и сокращённой обработки."""
+
+    skip_below: float = 0.0
+    statistics_only_below: float = 0.0
+
+    def __post_init__(self) -> None:
+        """Проверяет, что пороги являются долями от 0 до 1."""
+        for value in (self.skip_below, self.statistics_only_below):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError("Пороги облачной сортировки задаются долей 0..1")
+
+    def decide(self, triage: AgroCloudTriage | None) -> TriageMode:
+        """Выбирает режим; без данных SCL хозяйство обрабатывается полностью."""
+        fraction = triage.clear_fraction if triage is not None else None
+        if fraction is None:
+            return TriageMode.FULL
+        if fraction < self.skip_below:
+            return TriageMode.SKIP
+        if fraction < self.statistics_only_below:
+            return TriageMode.STATISTICS
+        return TriageMode.FULL
+
+
+@dataclass(frozen=True)
+class PairProcessingResult:
+    """Хозяйства пары, разделённые облачной сортировкой."""
+
+    # Хозяйства, для которых рассчитана статистика NDVI.
+    processed_agroids: tuple[int, ...]
+    # Хозяйства, растры которых следует опубликовать.
+    published_agroids: tuple[int, ...]
+    skipped_agroids: tuple[int, ...] = ()
+    # Растры публикуемых хозяйств, записанные обработкой даты.
+    outputs: tuple[Path, ...] = ()
+
+
+def triage_path(archive_path: str | Path) -> Path:
+    """Возвращает путь sidecar-файла результатов сортировки архива."""
+    path = Path(archive_path)
+    return path.with_name(path.name + TRIAGE_SUFFIX)
+
+
+def _archive_signature(archive_path: Path) -> tuple[int, int]:
+    """Возвращает размер и mtime архива для проверки актуальности."""
+    stat = archive_path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_triage(
+        archive_path: str | Path,
+) -> dict[int, tuple[Bounds, AgroCloudTriage]]:
+    """Читает сохранённые счётчики; устаревший файл считается пустым."""
+    path = triage_path(archive_path)
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        signature = _archive_signature(Path(archive_path))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.warning("Результаты сортировки не прочитаны %s: %s", path, exc)
+        return {}
+    if (
+            not isinstance(payload, dict)
+            or payload.get("version") != TRIAGE_ALGORITHM_VERSION
+            or tuple(payload.get("archive", ())) != signature
+    ):
+        return {}
+    result = {}
+    try:
+        for item in payload["agros"]:
+            triage = AgroCloudTriage(
+                agroid=int(item["agroid"]),
+                clear_pixels=int(item["clear_pixels"]),
+                observed_pixels=int(item["observed_pixels"]),
+            )
+            result[triage.agroid] = (tuple(item["bounds"]), triage)
+    except (KeyError, TypeError, ValueError) as exc:
+        logger.warning("Результаты сортировки имеют неизвестный формат %s: %s", path, exc)
+        return {}
+    return result
+
+
+def write_triage(
+        archive_path: str | Path,
+        entries: dict[int, tuple[Bounds, AgroCloudTriage]],
+) -> Path:
+    """Атомарно сохраняет счётчики хозяйств рядом с архивом."""
+    archive = Path(archive_path)
+    destination = triage_path(archive)
+    payload = {
+        "version": TRIAGE_ALGORITHM_VERSION,
+        "archive": list(_archive_signature(archive)),
+        "agros": [
+            {
+                "agroid": triage.agroid,
+                "bounds": list(bounds),
+                "clear_pixels": triage.clear_pixels,
+                "observed_pixels": triage.observed_pixels,
+            }
+            for bounds, triage in entries.values()
+        ],
+    }
+    temporary = destination.with_name(destination.name + ".tmp")
+    temporary.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(temporary, destination)
+    return destination
@@ -2,7 +2,11 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
 
 import requests
 from geoserver.catalog import Catalog, FailedRequestError
@@ -10,6 +14,8 @@ from geoserver.store import UnsavedCoverageStore
 
 from core.logging import get_logger
 
+from .seeding import GWC_TILE_FORMAT, SeedTaskStatus
+
 
 @dataclass(frozen=True)
 class GeoServerConfig:
@@ -26,8 +32,30 @@ class GeoServerConfig:
         return f"http://{self.host}/geoserver"
 
 
+@dataclass
+class CatalogSnapshot:
+    """Имена ресурсов рабочей области, прочитанные одним списком на вид."""
+
+    stores: set[str] = field(default_factory=set)
+    layers: set[str] = field(default_factory=set)
+    # Слои GWC без префикса рабочей области.
+    gwc_layers: set[str] = field(default_factory=set)
+
+
+def _listed_names(payload: Any, collection: str, item: str) -> set[str]:
+    """Извлекает имена из списка REST GeoServer; пустой список — строка."""
+    listed = payload.get(collection) or {}
+    return {entry["name"] for entry in listed.get(item) or ()}
+
+
 class GeoServerClient:
-    """Клиент для GeoServer на основе geoserver-rest."""
+    """
+    Клиент для GeoServer на основе geoserver-rest.
+
+    Внутри ``catalog_snapshot()`` проверки существования store, слоя и
+    слоя GWC отвечаются по снимку рабочей области, прочитанному один раз,
+    а созданные ресурсы дописываются в снимок.
+    """
 
     def __init__(
             self,
@@ -42,8 +70,65 @@ class GeoServerClient:
         )
         self.workspace = config.workspace
         self.http = http or requests.Session()
+        self.snapshot: CatalogSnapshot | None = None
         self.logger = get_logger(__class__.__name__)
 
+    def _get_json(self, url: str) -> Any:
+        """Читает JSON-ответ REST GeoServer."""
+        resp = self.http.get(
+            url,
+            auth=(self.config.username, self.config.password),
+            headers={"Accept": "application/json"},
+            timeout=60,
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"GeoServer REST {url}: {resp.status_code} {resp.text}"
+            )
+        return resp.json()
+
+    def load_snapshot(self) -> CatalogSnapshot:
+        """Читает coverage store, слои и слои GWC рабочей области."""
+        started = perf_counter()
+        rest = f"{self.config.base_url}/rest/workspaces/{self.workspace}"
+        prefix = f"{self.workspace}:"
+        snapshot = CatalogSnapshot(
+            stores=_listed_names(
+                self._get_json(f"{rest}/coveragestores.json"),
+                "coverageStores",
+                "coverageStore",
+            ),
+            layers=_listed_names(
+                self._get_json(f"{rest}/layers.json"),
+                "layers",
+                "layer",
+            ),
+            gwc_layers={
+                name.removeprefix(prefix)
+                for name in self._get_json(
+                    f"{self.config.base_url}/gwc/rest/layers.json"
+                )
+                if name.startswith(prefix)
+            },
+        )
+        self.logger.info(
+            "GeoServer SNAPSHOT: stores=%d layers=%d gwc=%d | %.2f сек.",
+            len(snapshot.stores),
+            len(snapshot.layers),
+            len(snapshot.gwc_layers),
+            perf_counter() - started,
+        )
+        return snapshot
+
+    @contextmanager
+    def catalog_snapshot(self) -> Iterator[CatalogSnapshot]:
+        """Держит снимок каталога на время пакета публикации."""
+        self.snapshot = self.load_snapshot()
+        try:
+            yield self.snapshot
+        finally:
+            self.snapshot = None
+
     def create_coveragestore(
             self,
             store_name: str,
@@ -76,9 +161,8 @@ class GeoServerClient:
         Текущий верхнеуровневый метод можно использовать вместо стандартного
         метода библиотеки в high-load сценариях.
         """
-        store = self.cat.get_store(name=store_name, workspace=self.workspace)
-
-        if store:
+        snapshot = self.snapshot
+        if self._store_exists(store_name):
             self.logger.info(
                 "%s уже существует - пропуск создания...",
                 store_name
@@ -122,25 +206,158 @@ class GeoServerClient:
                     f"{resp.status_code}, {resp.text}"
                 )
 
-        self.cat._cache.clear()
+        if snapshot is None:
+            self.cat._cache.clear()
+        else:
+            snapshot.stores.add(store_name)
+            if create_layer:
+                snapshot.layers.add(layer_name)
 
         self.logger.info("Store %s успешно создан", store_name)
         return True
 
     def set_layer_style(self, layer_name: str, style_name: str) -> None:
-        """Устанавливаем стиль для слоя."""
-        layer = self.cat.get_layer(layer_name)
-        if not layer:
+        """Устанавливаем стиль для слоя одним PUT без чтения слоя."""
+        snapshot = self.snapshot
+        if snapshot is not None and layer_name not in snapshot.layers:
+            raise RuntimeError(f"Слой {layer_name} не найден в GeoServer")
+
+        url = (
+            f"{self.config.base_url}/rest/layers/"
+            f"{self.workspace}:{layer_name}.xml"
+        )
+        payload = (
+            f"<layer><defaultStyle><name>{style_name}</name>"
+            f"</defaultStyle></layer>"
+        )
+        resp = self.http.put(
+            url,
+            data=payload.encode("utf-8"),
+            auth=(self.config.username, self.config.password),
+            headers={"Content-Type": "application/xml"},
+            timeout=30,
+        )
+        if resp.status_code == 404:
             raise RuntimeError(f"Слой {layer_name} не найден в GeoServer")
+        if resp.status_code not in (200, 201):
+            raise RuntimeError(
+                f"Стиль {style_name} не назначен {layer_name}: "
+                f"{resp.status_code} {resp.text}"
+            )
 
-        layer._set_default_style(style_name)
-        self.cat.save(layer)
+    def _store_exists(self, store_name: str) -> bool:
+        """Проверяет store по снимку либо запросом каталога."""
+        if self.snapshot is not None:
+            return store_name in self.snapshot.stores
+        return bool(
+            self.cat.get_store(name=store_name, workspace=self.workspace)
+        )
 
-    def enable_gwc_gridset_3857(self, layer_name: str) -> bool:
+    def _send(
+            self,
+            method: str,
+            url: str,
+            payload: str,
+            content_type: str,
+            expected: tuple[int, ...],
+    ) -> None:
+        """Отправляет тело в REST GeoServer и проверяет код ответа."""
+        resp = self.http.request(
+            method,
+            url,
+            data=payload.encode("utf-8"),
+            auth=(self.config.username, self.config.password),
+            headers={"Content-Type": content_type},
+            timeout=120,
+        )
+        if resp.status_code not in expected:
+            raise RuntimeError(
+                f"GeoServer REST {method} {url}: "
+                f"{resp.status_code} {resp.text}"
+            )
+
+    def create_imagemosaic(
+            self,
+            store_name: str,
+            container_directory: str,
+    ) -> bool:
+        """
+        Создаёт пустой ImageMosaic из каталога с indexer.properties.
+
+        Покрытие не настраивается: слой с измерением TIME создаёт
+        ``configure_time_coverage`` после добавления первого гранула.
+        """
+        if self._store_exists(store_name):
+            return False
+        self._send(
+            "PUT",
+            f"{self.config.base_url}/rest/workspaces/{self.workspace}"
+            f"/coveragestores/{store_name}/external.imagemosaic"
+            "?configure=none",
+            f"file:{container_directory}",
+            "text/plain",
+            (200, 201),
+        )
+        if self.snapshot is not None:
+            self.snapshot.stores.add(store_name)
+        self.logger.info("ImageMosaic %s успешно создан", store_name)
+        return True
+
+    def harvest_granule(self, store_name: str, container_path: str) -> None:
+        """Добавляет COG гранулой в индекс ImageMosaic."""
+        self._send(
+            "POST",
+            f"{self.config.base_url}/rest/workspaces/{self.workspace}"
+            f"/coveragestores/{store_name}/external.imagemosaic",
+            f"file:{container_path}",
+            "text/plain",
+            (200, 201, 202),
+        )
+
+    def configure_time_coverage(self, store_name: str, layer_name: str) -> None:
+        """Публикует покрытие мозаики слоем с измерением TIME."""
+        payload = (
+            f"<coverage><name>{layer_name}</name>"
+            f"<nativeName>{layer_name}</nativeName>"
+            f"<nativeCoverageName>{layer_name}</nativeCoverageName>"
+            "<metadata><entry key=\"time\"><dimensionInfo>"
+            "<enabled>true</enabled><presentation>LIST</presentation>"
+            "<units>ISO8601</units><defaultValue>"
+            "<strategy>MAXIMUM</strategy></defaultValue>"
+            "</dimensionInfo></entry></metadata></coverage>"
+        )
+        self._send(
+            "POST",
+            f"{self.config.base_url}/rest/workspaces/{self.workspace}"
+            f"/coveragestores/{store_name}/coverages.xml",
+            payload,
+            "application/xml",
+            (200, 201),
+        )
+        if self.snapshot is not None:
+            self.snapshot.layers.add(layer_name)
+
+    def enable_gwc_gridset_3857(
+            self,
+            layer_name: str,
+            *,
+            time_dimension: bool = False,
+    ) -> bool:
         """
         Включить тайловый кэш для слоя и задать GridSet EPSG:3857.
+
+        Слой GWC, известный по снимку, изменяется POST, новый создаётся PUT.
+        ``time_dimension`` кэширует тайлы отдельно для каждого TIME.
         """
         full_layer = f"{self.workspace}:{layer_name}"
+        parameter_filters = (
+            "<parameterFilters><regexParameterFilter><key>TIME</key>"
+            "<defaultValue></defaultValue>"
+            "<regex>(\\d{4}-\\d{2}-\\d{2}.*)?</regex>"
+            "</regexParameterFilter></parameterFilters>"
+            if time_dimension
+            else ""
+        )
 
         url = f"{self.config.base_url}/gwc/rest/layers/{full_layer}.xml"
 
@@ -158,20 +375,25 @@ class GeoServerClient:
             <int>1</int>
           </metaWidthHeight>
           <mimeFormats>
-            <string>image/png</string>
+            <string>{GWC_TILE_FORMAT}</string>
           </mimeFormats>
+          {parameter_filters}
         </GeoServerLayer>
         """
 
         headers = {"Content-Type": "application/xml"}
 
-        resp = self.http.put(
+        snapshot = self.snapshot
+        exists = snapshot is not None and layer_name in snapshot.gwc_layers
+        resp = (self.http.post if exists else self.http.put)(
             url, data=payload.encode("utf-8"),
             auth=(self.config.username, self.config.password),
             headers=headers, timeout=30
         )
 
         if resp.status_code in (200, 201, 204):
+            if snapshot is not None:
+                snapshot.gwc_layers.add(layer_name)
             self.logger.info(
                 "GWC: успешно включён кеш для %s (GridSet EPSG:3857)",
                 layer_name
@@ -182,18 +404,40 @@ class GeoServerClient:
             f"GWC GridSet установка провалена: {resp.status_code} {resp.text}"
         )
 
+    def seed_status(self, layer_name: str) -> list[SeedTaskStatus]:
+        """Возвращает задачи прогрева слоя из GWC."""
+        payload = self._get_json(
+            f"{self.config.base_url}/gwc/rest/seed/"
+            f"{self.workspace}:{layer_name}.json"
+        )
+        return [
+            SeedTaskStatus(
+                tiles_done=int(done),
+                tiles_total=int(total),
+                task_id=int(task_id),
+                status=int(status),
+            )
+            for done, total, _remaining, task_id, status in payload.get(
+                "long-array-array",
+                (),
+            )
+        ]
+
     def seed_gwc_cache(
             self,
             layer_name: str,
             bbox: tuple[float, float, float, float],
             zoom_start: int = 0,
             zoom_stop: int = 14,
-            image_format: str = "image/png",
+            image_format: str = GWC_TILE_FORMAT,
             threads: int = 4,
             reseed: bool = False,
+            time: str | None = None,
     ) -> bool:
         """
         Прогревает либо принудительно обновляет тайлы GeoWebCache.
+
+        ``time`` ограничивает прогрев одной датой слоя с измерением TIME.
         """
         if zoom_start < 0 or zoom_stop < 0 or zoom_start > zoom_stop:
             raise ValueError("Неверный диапазон zoom_start/zoom_stop")
@@ -205,6 +449,12 @@ class GeoServerClient:
         full_layer = f"{self.workspace}:{layer_name}"
 
         url = f"{self.config.base_url}/gwc/rest/seed/{full_layer}.xml"
+        parameters = (
+            "<parameters><entry><string>TIME</string>"
+            f"<string>{time}</string></entry></parameters>"
+            if time
+            else ""
+        )
 
         payload = f"""<?xml version="1.0" encoding="UTF-8"?>
                 <seedRequest>
@@ -215,6 +465,7 @@ class GeoServerClient:
                   <type>{"reseed" if reseed else "seed"}</type>
                   <format>{image_format}</format>
                   <threadCount>{threads}</threadCount>
+                  {parameters}
                   <metaWidthHeight>
                     <int>8</int>
                     <int>8</int>
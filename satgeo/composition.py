@@ -1,14 +1,20 @@
 """Сборка production-зависимостей публикации."""
 from collections.abc import Iterable
+from functools import partial
+from pathlib import Path
 
 from core import settings
 
 from .client import GeoServerClient, GeoServerConfig
+from .mosaic import MosaicRasterPublisher
+from .optimizer import cog_threads, optimize_geotiff, product_cog_profiles
 from .publisher import (
     PostgisPublicationRepository,
     PublicationPlanner,
     RasterPublisher,
 )
+from .renderer import LocalTileSeeder, TileRenderer
+from .seeding import GwcSeedQueue
 
 
 def build_raster_publisher(
@@ -16,7 +22,34 @@ def build_raster_publisher(
         refresh_products: Iterable[str] = (),
 ) -> RasterPublisher:
     """Собирает production-сервис публикации из настроек окружения."""
-    return RasterPublisher(
+    if settings.PUBLISH_MODE not in {"layers", "mosaic"}:
+        raise ValueError(
+            f"Неизвестный PUBLISH_MODE: {settings.PUBLISH_MODE}; "
+            "ожидается layers или mosaic"
+        )
+    options = {}
+    publisher_class = RasterPublisher
+    if settings.PUBLISH_MODE == "mosaic":
+        publisher_class = MosaicRasterPublisher
+        if settings.PUBLISH_MOSAIC_DATASTORE:
+            options["datastore_properties"] = Path(
+                settings.PUBLISH_MOSAIC_DATASTORE
+            ).read_text(encoding="utf-8")
+    client = GeoServerClient(
+        GeoServerConfig(
+            host=settings.GS_HOST,
+            workspace=settings.GS_WORKSPACE,
+            username=settings.GS_USERNAME,
+            password=settings.GS_PASSWORD,
+        )
+    )
+    if settings.GWC_BLOBSTORE_DIR:
+        options["tile_seeder"] = LocalTileSeeder(
+            TileRenderer(workers=settings.TILE_RENDER_WORKERS),
+            settings.GWC_BLOBSTORE_DIR,
+            settings.GS_WORKSPACE,
+        )
+    return publisher_class(
         source_root=settings.PROCESSED_DIR,
         workspace=settings.GS_WORKSPACE,
         current_year=settings.YEAR,
@@ -24,14 +57,25 @@ def build_raster_publisher(
             settings.GS_DATA_ROOT,
             settings.GS_DATA_DIR,
         ),
-        client=GeoServerClient(
-            GeoServerConfig(
-                host=settings.GS_HOST,
-                workspace=settings.GS_WORKSPACE,
-                username=settings.GS_USERNAME,
-                password=settings.GS_PASSWORD,
-            )
-        ),
+        client=client,
         repository=PostgisPublicationRepository(),
+        # Потоки сжатия делятся между одновременно записываемыми COG.
+        optimizer=partial(
+            optimize_geotiff,
+            threads=cog_threads(settings.PUBLISH_OPTIMIZE_WORKERS),
+        ),
         refresh_products=refresh_products,
+        cog_profiles=product_cog_profiles(settings.PUBLISH_COG_PROFILES),
+        optimize_workers=settings.PUBLISH_OPTIMIZE_WORKERS,
+        catalog_workers=settings.PUBLISH_CATALOG_WORKERS,
+        seeder=GwcSeedQueue(
+            client,
+            max_tasks=settings.GWC_SEED_MAX_TASKS,
+            max_threads=settings.GWC_SEED_MAX_THREADS,
+            task_threads=settings.GWC_SEED_TASK_THREADS,
+            poll_seconds=settings.GWC_SEED_POLL_SECONDS,
+            max_ranges=settings.GWC_SEED_MAX_RANGES,
+        ),
+        seed_footprint_buffer=settings.GWC_SEED_FOOTPRINT_BUFFER,
+        **options,
     )
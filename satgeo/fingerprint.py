@@ -0,0 +1,83 @@
+"""Отпечатки содержимого растров для пропуска неизменных публикаций."""
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+from osgeo import gdal
+
+from .optimizer import COG_CREATION_OPTIONS, CogProfile
+
+gdal.UseExceptions()
+
+# Отпечаток хранится рядом с COG в файле <имя COG>.fingerprint.
+FINGERPRINT_SUFFIX = ".fingerprint"
+# Строк растра за одно чтение при хешировании пикселей.
+FINGERPRINT_ROWS = 256
+
+
+def raster_fingerprint(source: str | Path, profile: CogProfile) -> str:
+    """
+    Возвращает SHA-256 пикселей и геопривязки растра вместе с профилем COG.
+
+    Профиль входит в отпечаток, чтобы смена кодирования продукта
+    перезаписывала COG даже при неизменном исходном растре.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((profile, COG_CREATION_OPTIONS)).encode())
+    dataset = gdal.Open(str(source), gdal.GA_ReadOnly)
+    if dataset is None:
+        raise RuntimeError(f"Не удалось открыть {source}")
+    try:
+        width = dataset.RasterXSize
+        height = dataset.RasterYSize
+        digest.update(repr((
+            width,
+            height,
+            dataset.RasterCount,
+            dataset.GetGeoTransform(),
+            dataset.GetProjection(),
+        )).encode())
+        for index in range(1, dataset.RasterCount + 1):
+            band = dataset.GetRasterBand(index)
+            digest.update(repr((
+                band.DataType,
+                band.GetNoDataValue(),
+                band.GetScale(),
+                band.GetOffset(),
+            )).encode())
+            for row in range(0, height, FINGERPRINT_ROWS):
+                digest.update(band.ReadRaster(
+                    0,
+                    row,
+                    width,
+                    min(FINGERPRINT_ROWS, height - row),
+                ))
+    finally:
+        dataset = None
+    return digest.hexdigest()
+
+
+def fingerprint_path(cog: Path) -> Path:
+    """Возвращает путь файла отпечатка опубликованного COG."""
+    return cog.with_name(cog.name + FINGERPRINT_SUFFIX)
+
+
+def read_fingerprint(cog: Path) -> str | None:
+    """Читает отпечаток опубликованного COG, если он сохранён."""
+    try:
+        return fingerprint_path(cog).read_text(encoding="ascii").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_fingerprint(cog: Path, fingerprint: str | None) -> None:
+    """Атомарно сохраняет отпечаток COG; ``None`` удаляет устаревший."""
+    path = fingerprint_path(cog)
+    if fingerprint is None:
+        path.unlink(missing_ok=True)
+        return
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary.write_text(fingerprint + "\n", encoding="ascii")
+    os.replace(temporary, path)
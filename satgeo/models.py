@@ -51,6 +51,23 @@ class PublicationPlan:
     store_name: str
     style_name: str | None
     info: FileInfo
+    # Отпечаток содержимого COG; None — не рассчитан.
+    fingerprint: str | None = None
+    # False, если перерасчёт дал растр с прежним отпечатком.
+    content_changed: bool = True
+
+
+@dataclass(frozen=True)
+class MosaicPlan:
+    """ImageMosaic хозяйства и продукта, в который добавляются даты."""
+
+    # Слой с измерением TIME, например a3_ndvi.
+    layer_name: str
+    store_name: str
+    # Каталог конфигурации и индекса мозаики на хосте.
+    directory: Path
+    # Тот же каталог в файловой системе GeoServer.
+    container_directory: str
 
 
 def split_file_name(layer_name: str) -> FileInfo:
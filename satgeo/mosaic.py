@@ -0,0 +1,155 @@
+"""Публикация дат гранулами ImageMosaic с измерением TIME."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Protocol
+
+from domain.models import LayerSourceMetadata, PublishedLayer
+
+from .models import MosaicPlan, PublicationPlan
+from .publisher import GeoServerCatalog, RasterPublisher
+
+# Дата гранула берётся из имени COG a<агро>_<продукт>_<YYYY-MM-DD>.tif.
+TIMEREGEX_PROPERTIES = "regex=[0-9]{4}-[0-9]{2}-[0-9]{2},format=yyyy-MM-dd\n"
+
+
+class GeoServerMosaicCatalog(GeoServerCatalog, Protocol):
+    """Операции GeoServer, необходимые публикации в ImageMosaic."""
+
+    def create_imagemosaic(
+            self,
+            store_name: str,
+            container_directory: str,
+    ) -> bool:
+        """Создаёт пустую мозаику и сообщает, был ли создан новый store."""
+        ...
+
+    def harvest_granule(self, store_name: str, container_path: str) -> None:
+        """Добавляет COG гранулой в индекс мозаики."""
+        ...
+
+    def configure_time_coverage(self, store_name: str, layer_name: str) -> None:
+        """Публикует покрытие мозаики слоем с измерением TIME."""
+        ...
+
+
+def indexer_properties(layer_name: str) -> str:
+    """Возвращает indexer.properties мозаики с временем из имени гранула."""
+    return (
+        f"Name={layer_name}\n"
+        "TimeAttribute=ingestion\n"
+        "Schema=*the_geom:Polygon,location:String,ingestion:java.util.Date\n"
+        "PropertyCollectors=TimestampFileNameExtractorSPI[timeregex]"
+        "(ingestion)\n"
+        "AbsolutePath=true\n"
+        "CanBeEmpty=true\n"
+        "Caching=false\n"
+    )
+
+
+def _write_if_changed(path: Path, content: str) -> None:
+    """Атомарно записывает файл, если его содержимое отличается."""
+    if path.exists() and path.read_text(encoding="utf-8") == content:
+        return
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary.write_text(content, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def write_mosaic_config(
+        mosaic: MosaicPlan,
+        datastore_properties: str | None = None,
+) -> None:
+    """
+    Готовит каталог конфигурации мозаики.
+
+    Без ``datastore_properties`` GeoServer ведёт индекс гранул в shapefile
+    каталога, иначе — в таблице PostGIS с именем слоя.
+    """
+    mosaic.directory.mkdir(parents=True, exist_ok=True)
+    _write_if_changed(
+        mosaic.directory / "indexer.properties",
+        indexer_properties(mosaic.layer_name),
+    )
+    _write_if_changed(
+        mosaic.directory / "timeregex.properties",
+        TIMEREGEX_PROPERTIES,
+    )
+    if datastore_properties is not None:
+        _write_if_changed(
+            mosaic.directory / "datastore.properties",
+            datastore_properties,
+        )
+
+
+class MosaicRasterPublisher(RasterPublisher):
+    """
+    Публикует растры гранулами одной ImageMosaic на хозяйство и продукт.
+
+    Store, слой и GWC создаются один раз для мозаики; публикация даты
+    сводится к добавлению гранула и прогреву тайлов с TIME этой даты.
+    Имя записи maps_layer — ``<слой>@<дата>``: карта запрашивает слой
+    ``<слой>`` с ``TIME=<дата>``.
+    """
+
+    client: GeoServerMosaicCatalog
+
+    def __init__(
+            self,
+            *args,
+            datastore_properties: str | None = None,
+            **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        # Содержимое datastore.properties индекса PostGIS; None — shapefile.
+        self.datastore_properties = datastore_properties
+
+    def _register_file(
+            self,
+            plan: PublicationPlan,
+            source: LayerSourceMetadata | None = None,
+            quality: tuple[float | None, float | None] = (None, None),
+    ) -> PublishedLayer:
+        """Добавляет COG гранулой мозаики и прогревает тайлы его даты."""
+        refresh = self._refresh(plan)
+        mosaic = self.planner.mosaic(plan.info)
+        write_mosaic_config(mosaic, self.datastore_properties)
+        created = self.client.create_imagemosaic(
+            mosaic.store_name,
+            mosaic.container_directory,
+        )
+        if created or plan.content_changed:
+            self.client.harvest_granule(mosaic.store_name, plan.container_path)
+        if created:
+            self.client.configure_time_coverage(
+                mosaic.store_name,
+                mosaic.layer_name,
+            )
+            if plan.style_name:
+                self.client.set_layer_style(
+                    mosaic.layer_name,
+                    plan.style_name,
+                )
+            self.client.enable_gwc_gridset_3857(
+                mosaic.layer_name,
+                time_dimension=True,
+            )
+
+        acquired_on = plan.info.date()
+        if refresh or (
+                plan.content_changed
+                and self.current_year == acquired_on.year
+        ):
+            self._seed_layer(
+                plan,
+                mosaic.layer_name,
+                reseed=refresh,
+                time=acquired_on.isoformat(),
+            )
+        return self._published_layer(
+            plan,
+            f"{self.workspace}:{mosaic.layer_name}@{acquired_on.isoformat()}",
+            source,
+            quality,
+        )
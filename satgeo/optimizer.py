@@ -1,16 +1,135 @@
 """Оптимизация GeoTIFF для публикации."""
 from __future__ import annotations
 
-import subprocess
+import errno
+import os
 import time
+from collections.abc import Mapping
+from dataclasses import dataclass
 from pathlib import Path
 from time import perf_counter
+from typing import Any
 from uuid import uuid4
 
+from osgeo import gdal
+
 from core.logging import get_logger
+from core.metrics import get_metrics_registry, register_summary
+
+gdal.UseExceptions()
 
 logger = get_logger(__name__)
 
+COG_CREATION_OPTIONS = (
+    "BLOCKSIZE=256",
+    "OVERVIEWS=IGNORE_EXISTING",
+)
+# Время и размер COG по файлам публикации.
+COG_METRIC = "publish.cog"
+register_summary(COG_METRIC, "COG")
+
+
+@dataclass(frozen=True)
+class CogProfile:
+    """Кодирование COG одного вида продукта."""
+
+    name: str
+    # Опции сжатия драйвера COG поверх COG_CREATION_OPTIONS.
+    compression: tuple[str, ...]
+    # Тип данных результата по имени GDAL; None — тип источника.
+    output_type: str | None = None
+    # Линейное отображение (src_min, src_max, dst_min, dst_max) значений;
+    # обратные scale/offset записываются в метаданные канала.
+    scale: tuple[float, float, float, float] | None = None
+    # NoData результата; None — NoData источника.
+    no_data: float | None = None
+
+    @property
+    def creation_options(self) -> list[str]:
+        """Возвращает полный список опций драйвера COG."""
+        return [*self.compression, *COG_CREATION_OPTIONS]
+
+    def translate_options(self, threads: int | None = None) -> dict[str, Any]:
+        """
+        Возвращает аргументы ``gdal.Translate`` профиля.
+
+        ``threads`` ограничивает потоки сжатия GDAL; ``None`` — все CPU.
+        """
+        options: dict[str, Any] = {
+            "format": "COG",
+            "creationOptions": [
+                *self.creation_options,
+                f"NUM_THREADS={threads or 'ALL_CPUS'}",
+            ],
+        }
+        if self.output_type is not None:
+            options["outputType"] = gdal.GetDataTypeByName(self.output_type)
+        if self.no_data is not None:
+            options["noData"] = self.no_data
+        if self.scale is not None:
+            src_min, src_max, dst_min, dst_max = self.scale
+            factor = (src_max - src_min) / (dst_max - dst_min)
+            options["scaleParams"] = [list(self.scale)]
+            options["options"] = [
+                "-a_scale",
+                repr(factor),
+                "-a_offset",
+                repr(src_min - dst_min * factor),
+            ]
+        return options
+
+
+COG_PROFILES = {
+    profile.name: profile
+    for profile in (
+        # Без потерь для любых типов; прежнее кодирование всех продуктов.
+        CogProfile("deflate", ("COMPRESS=DEFLATE", "PREDICTOR=2")),
+        # Индекс [-1, 1] в Int16 с шагом 1e-4 вместо float32.
+        CogProfile(
+            "int16",
+            ("COMPRESS=DEFLATE", "PREDICTOR=2"),
+            output_type="Int16",
+            scale=(-1.0, 1.0, -10000.0, 10000.0),
+            no_data=-32768,
+        ),
+        # float32 с ограниченной абсолютной ошибкой.
+        CogProfile("lerc", ("COMPRESS=LERC_DEFLATE", "MAX_Z_ERROR=0.001")),
+        # RGB с потерями; драйвер COG кодирует три канала JPEG в YCbCr.
+        CogProfile("jpeg", ("COMPRESS=JPEG", "QUALITY=85")),
+        CogProfile("webp", ("COMPRESS=WEBP", "QUALITY=85")),
+        # Классы: обзоры ближайшим соседом не смешивают коды.
+        CogProfile(
+            "categorical",
+            ("COMPRESS=DEFLATE", "PREDICTOR=NO", "RESAMPLING=NEAREST"),
+        ),
+    )
+}
+DEFAULT_COG_PROFILE = COG_PROFILES["deflate"]
+# Профили продуктов по умолчанию; остальные используют DEFAULT_COG_PROFILE.
+DEFAULT_PRODUCT_PROFILES = {"scl": "categorical"}
+
+
+def get_cog_profile(name: str) -> CogProfile:
+    """Возвращает профиль COG по имени."""
+    try:
+        return COG_PROFILES[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный профиль COG: {name}; "
+            f"доступны: {', '.join(COG_PROFILES)}"
+        ) from None
+
+
+def product_cog_profiles(
+        overrides: Mapping[str, str] | None = None,
+) -> dict[str, CogProfile]:
+    """Собирает профили продуктов из умолчаний и переопределений."""
+    names = {**DEFAULT_PRODUCT_PROFILES, **(overrides or {})}
+    return {
+        product.lower(): get_cog_profile(name)
+        for product, name in names.items()
+    }
+
 
 def _temporary_cog_path(destination: Path) -> Path:
     """Возвращает уникальный временный TIFF рядом с итоговым файлом."""
@@ -30,13 +149,47 @@ def _remove_gdal_artifacts(temporary: Path) -> None:
         artifact.unlink(missing_ok=True)
 
 
+def cog_threads(workers: int) -> int:
+    """Делит CPU между параллельно записываемыми COG."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _write_cog(
+        source: Path | Any,
+        temporary: Path,
+        profile: CogProfile,
+        threads: int | None = None,
+) -> None:
+    """Записывает COG средствами GDAL текущего процесса."""
+    result = gdal.Translate(
+        str(temporary),
+        str(source) if isinstance(source, Path) else source,
+        **profile.translate_options(threads),
+    )
+    if result is None:
+        raise RuntimeError(f"GDAL не создал COG: {temporary}")
+    result.FlushCache()
+    result = None
+
+
 def optimize_geotiff(
-        src: Path,
+        src: Path | Any,
         dst: Path,
+        profile: CogProfile = DEFAULT_COG_PROFILE,
         retries: int = 5,
         delay: float = 5.0,
+        *,
+        threads: int | None = None,
 ) -> None:
-    """Создаёт COG во временном файле и атомарно заменяет результат."""
+    """
+    Создаёт COG во временном файле и атомарно заменяет результат.
+
+    ``src`` — путь к растру либо открытый GDAL dataset или VRT: COG пишется
+    напрямую из него без промежуточного файла. ``profile`` задаёт сжатие,
+    тип данных и передискретизацию обзоров, ``threads`` — потоки сжатия.
+    Повторяется только замена файла, занятого другим процессом (EBUSY);
+    ошибки GDAL не временные и поднимаются сразу.
+    """
     if retries < 1:
         raise ValueError("retries должен быть положительным")
 
@@ -45,45 +198,31 @@ def optimize_geotiff(
         temporary = _temporary_cog_path(dst)
         attempt_started = perf_counter()
         try:
-            subprocess.check_call(
-                [
-                    "gdal_translate",
-                    "-of",
-                    "COG",
-                    "-co",
-                    "COMPRESS=DEFLATE",
-                    "-co",
-                    "PREDICTOR=2",
-                    "-co",
-                    "BLOCKSIZE=256",
-                    "-co",
-                    "OVERVIEWS=IGNORE_EXISTING",
-                    "-co",
-                    "NUM_THREADS=ALL_CPUS",
-                    str(src),
-                    str(temporary),
-                ]
-            )
+            _write_cog(src, temporary, profile, threads)
             temporary.replace(dst)
+            seconds = perf_counter() - attempt_started
+            size = dst.stat().st_size
+            get_metrics_registry().observe(
+                COG_METRIC,
+                dst.name,
+                seconds=seconds,
+                size=size,
+            )
             logger.info(
-                "COG TIFF записан: %s | %.1f → %.1f МиБ | %.2f сек.",
+                "COG TIFF записан: %s [%s] | %s → %.1f МиБ | %.2f сек.",
                 dst,
-                src.stat().st_size / 1024 / 1024,
-                dst.stat().st_size / 1024 / 1024,
-                perf_counter() - attempt_started,
+                profile.name,
+                (
+                    f"{src.stat().st_size / 1024 / 1024:.1f} МиБ"
+                    if isinstance(src, Path)
+                    else "dataset"
+                ),
+                size / 1024 / 1024,
+                seconds,
             )
             return
-        except subprocess.CalledProcessError:
-            logger.exception(
-                "gdal_translate: неудачная попытка %d/%d",
-                attempt,
-                retries,
-            )
-            if attempt == retries:
-                raise
-            time.sleep(delay)
         except OSError as exc:
-            if exc.errno != 16 or attempt == retries:
+            if exc.errno != errno.EBUSY or attempt == retries:
                 raise
             logger.warning(
                 "Файл %s занят, повтор через %s сек.",
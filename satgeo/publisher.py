@@ -1,22 +1,38 @@
 """Application service публикации готовых растров."""
 from __future__ import annotations
 
-import os
-from collections.abc import Callable, Iterable
+import itertools
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import AbstractContextManager
+from dataclasses import replace
 from datetime import UTC, date, datetime
 from pathlib import Path
+from time import perf_counter
 from typing import Protocol
 
-import psycopg2
-
 from core.logging import get_logger
-from db.connection import get_database_config
+from db.connection import pooled_connection
 from db.gateway import SqlGateway
 from db.repositories import FieldRepository, LayerRepository
 from domain.models import LayerSourceMetadata, PublishedLayer
 
-from .models import PublicationPlan, split_file_name
-from .optimizer import optimize_geotiff
+from .fingerprint import raster_fingerprint, read_fingerprint, write_fingerprint
+from .models import FileInfo, MosaicPlan, PublicationPlan, split_file_name
+from .optimizer import (
+    DEFAULT_COG_PROFILE,
+    CogProfile,
+    optimize_geotiff,
+    product_cog_profiles,
+)
+from .renderer import LocalTileSeeder, tiles_for_bounds
+from .seeding import GWC_TILE_FORMAT, GwcSeedQueue, merge_tiles
+from .sources import PublicationSourceIndex
+
+# Уровни масштаба, прогреваемые после публикации слоя.
+SEED_ZOOM_START = 8
+SEED_ZOOM_STOP = 14
 
 
 class PublicationRepository(Protocol):
@@ -35,6 +51,17 @@ class PublicationRepository(Protocol):
         """Возвращает границы хозяйства для прогрева кэша."""
         ...
 
+    def field_tiles(
+            self,
+            year: int,
+            agroid: int,
+            zoom_start: int,
+            zoom_stop: int,
+            buffer: float,
+    ) -> list[tuple[int, int, int]]:
+        """Возвращает тайлы ``(z, x, y)``, задевающие поля хозяйства."""
+        ...
+
     def quality_many(
             self,
             year: int,
@@ -48,6 +75,10 @@ class PublicationRepository(Protocol):
 class GeoServerCatalog(Protocol):
     """Минимальный контракт GeoServer, необходимый publisher."""
 
+    def catalog_snapshot(self) -> AbstractContextManager[object]:
+        """Кэширует существующие ресурсы каталога на время пакета."""
+        ...
+
     def create_coveragestore(
             self,
             store_name: str,
@@ -126,6 +157,19 @@ class PublicationPlanner:
             info=info,
         )
 
+    def mosaic(self, info: FileInfo) -> MosaicPlan:
+        """Строит имена ImageMosaic хозяйства и продукта растра."""
+        layer_name = f"a{info.agroid}_{info.img_type}"
+        relative = Path("mosaic") / f"a{info.agroid}" / info.img_type
+        return MosaicPlan(
+            layer_name=layer_name,
+            store_name=f"{layer_name}_mosaic",
+            directory=self.host_data_root / relative,
+            container_directory=(
+                self.container_data_root / relative
+            ).as_posix(),
+        )
+
     @staticmethod
     def _existing_or_canonical(canonical: Path, legacy: Path) -> Path:
         """Переиспользует существующую схему месяца, не создавая дубль."""
@@ -142,7 +186,7 @@ class PostgisPublicationRepository:
     """PostGIS-адаптер publication persistence port."""
 
     def __init__(self) -> None:
-        """Создаёт кэш неизменных границ хозяйств одного запуска."""
+        """Создаёт кэш неизменных границ и качества хозяйств одного запуска."""
         self._bounds: dict[
             tuple[int, int, int],
             tuple[float, float, float, float],
@@ -156,7 +200,7 @@ class PostgisPublicationRepository:
         """Сохраняет все слои даты одним подключением к PostGIS."""
         if not layers:
             return
-        with psycopg2.connect(**get_database_config()) as connection:
+        with pooled_connection() as connection:
             LayerRepository(SqlGateway(connection)).add_many(layers)
 
     def bounds(
@@ -169,7 +213,7 @@ class PostgisPublicationRepository:
         key = (year, agroid, srid)
         if key in self._bounds:
             return self._bounds[key]
-        with psycopg2.connect(**get_database_config()) as connection:
+        with pooled_connection() as connection:
             bounds = FieldRepository(SqlGateway(connection)).bounds(
                 srid=srid,
                 year=year,
@@ -178,13 +222,31 @@ class PostgisPublicationRepository:
         self._bounds[key] = bounds
         return bounds
 
+    def field_tiles(
+            self,
+            year: int,
+            agroid: int,
+            zoom_start: int,
+            zoom_stop: int,
+            buffer: float,
+    ) -> list[tuple[int, int, int]]:
+        """Читает тайлы полей хозяйства; кэш ведёт публикация даты."""
+        with pooled_connection() as connection:
+            return FieldRepository(SqlGateway(connection)).tiles(
+                year=year,
+                agroid=agroid,
+                zoom_start=zoom_start,
+                zoom_stop=zoom_stop,
+                buffer=buffer,
+            )
+
     def quality_many(
             self,
             year: int,
             agroids: tuple[int, ...],
             acquired_on: date,
     ) -> dict[int, tuple[float | None, float | None]]:
-        """Агрегирует пиксельные показатели всех хозяйств одним SQL."""
+        """Читает сводку пиксельных показателей всех хозяйств одним SQL."""
         selected = tuple(dict.fromkeys(agroids))
         missing = [
             agroid
@@ -196,35 +258,10 @@ class PostgisPublicationRepository:
                 agroid: self._quality[(year, agroid, acquired_on)]
                 for agroid in selected
             }
-        with psycopg2.connect(**get_database_config()) as connection:
-            gateway = SqlGateway(connection)
-            rows = gateway.rows(
-                """
-                WITH requested AS (
-                    SELECT unnest(%s::integer[]) AS agroid
-                )
-                SELECT
-                    requested.agroid,
-                    SUM(ndvi.cloud_pixel_count) AS cloud_pixels,
-                    SUM(ndvi.valid_pixel_count) AS valid_pixels,
-                    SUM(ndvi.total_pixel_count) AS total_pixels
-                FROM requested
-                LEFT JOIN LATERAL
-                    (
-                        SELECT DISTINCT field.id
-                        FROM gpgeo.maps_field AS field
-                        INNER JOIN gpgeo.maps_field_shape AS shape
-                            ON shape.fieldid = field.id
-                        WHERE field.agroid = requested.agroid
-                          AND shape.year = %s
-                    ) AS field
-                    ON true
-                LEFT JOIN gpgeo.maps_ndvi_values AS ndvi
-                    ON ndvi.fieldid = field.id
-                    AND ndvi.date = %s
-                GROUP BY requested.agroid
-                """,
-                (missing, year, acquired_on),
+        with pooled_connection() as connection:
+            rows = LayerRepository(SqlGateway(connection)).quality_totals(
+                agroids=missing,
+                acquired_on=acquired_on,
             )
         by_agroid = {row["agroid"]: row for row in rows}
         for agroid in missing:
@@ -257,10 +294,25 @@ class RasterPublisher:
             planner: PublicationPlanner,
             client: GeoServerCatalog,
             repository: PublicationRepository,
-            optimizer: Callable[[Path, Path], None] = optimize_geotiff,
+            optimizer: Callable[[Path, Path, CogProfile], None] = (
+                optimize_geotiff
+            ),
             refresh_products: Iterable[str] = (),
+            cog_profiles: Mapping[str, CogProfile] | None = None,
+            optimize_workers: int = 2,
+            catalog_workers: int = 4,
+            seeder: GwcSeedQueue | None = None,
+            seed_footprint_buffer: float | None = None,
+            tile_seeder: LocalTileSeeder | None = None,
+            fingerprinter: Callable[[Path, CogProfile], str] | None = (
+                raster_fingerprint
+            ),
     ):
+        if optimize_workers <= 0 or catalog_workers <= 0:
+            raise ValueError("Число потоков публикации должно быть положительным")
         self.source_root = Path(source_root)
+        # Запасной поиск растров даты, если обработка не передала манифест.
+        self.source_index = PublicationSourceIndex(self.source_root)
         self.workspace = workspace
         self.current_year = current_year
         self.planner = planner
@@ -270,44 +322,101 @@ class RasterPublisher:
         self.refresh_products = frozenset(
             product.lower() for product in refresh_products
         )
+        # Кодирование COG по продуктам; по умолчанию — product_cog_profiles().
+        self.cog_profiles = (
+            product_cog_profiles() if cog_profiles is None else dict(cog_profiles)
+        )
+        # Одновременные записи COG (CPU) и цепочки REST GeoServer (сеть).
+        self.optimize_workers = optimize_workers
+        self.catalog_workers = catalog_workers
+        # Очередь прогрева GWC; None — прогрев запускается сразу при регистрации.
+        self.seeder = seeder
+        # Буфер полей в метрах для прогрева только их тайлов; None — рамка.
+        self.seed_footprint_buffer = seed_footprint_buffer
+        # Локальный рендер в blob store GWC; None — прогрев силами GeoServer.
+        self.tile_seeder = tile_seeder
+        # Отпечаток исходного растра; None — COG перезаписывается всегда.
+        self.fingerprinter = fingerprinter
+        # Тайлы полей хозяйств, общие для продуктов одной publish_date.
+        self._tiles_lock = threading.Lock()
+        self._tiles: dict[tuple[int, int], list[tuple[int, int, int]]] = {}
+        self._tiles_loading: dict[tuple[int, int], threading.Lock] = {}
         self.logger = get_logger(self.__class__.__name__)
 
-    def _publish_file(
+    def cog_profile(self, product: str) -> CogProfile:
+        """Возвращает профиль кодирования COG продукта."""
+        return self.cog_profiles.get(product.lower(), DEFAULT_COG_PROFILE)
+
+    def _fingerprint(
             self,
-            file_path: Path,
-            source: LayerSourceMetadata | None = None,
-            quality: tuple[float | None, float | None] = (None, None),
-    ) -> tuple[bool, str, PublishedLayer | None]:
-        """Оптимизирует и публикует файл, возвращая запись для БД."""
-        plan = self.planner.build(file_path)
-        refresh = plan.info.img_type in self.refresh_products
+            source: Path,
+            profile: CogProfile,
+    ) -> str | None:
+        """Рассчитывает отпечаток растра; ошибка не мешает публикации."""
+        if self.fingerprinter is None:
+            return None
         try:
-            if refresh or not plan.destination.exists():
-                self.optimizer(plan.source, plan.destination)
+            return self.fingerprinter(source, profile)
         except Exception as exc:
-            self.logger.error(
-                "Ошибка оптимизации %s: %s",
-                file_path,
+            self.logger.warning(
+                "Не удалось рассчитать отпечаток %s: %s",
+                source.name,
                 exc,
-                exc_info=True,
             )
-            return False, f"optimize_failed: {file_path.name}", None
+            return None
 
-        created = self.client.create_coveragestore(
-            store_name=plan.store_name,
-            container_path=plan.container_path,
-            layer_name=plan.layer_name,
-            source_name=plan.layer_name,
+    def _refresh(self, plan: PublicationPlan) -> bool:
+        """Проверяет, требует ли слой обновления кэша после перерасчёта."""
+        return (
+            plan.info.img_type in self.refresh_products
+            and plan.content_changed
         )
-        if created and plan.style_name:
-            self.client.set_layer_style(
-                plan.layer_name,
-                plan.style_name,
+
+    def _optimize_file(self, file_path: Path) -> PublicationPlan:
+        """
+        Строит план и при необходимости формирует COG в GS_DATA_ROOT.
+
+        Готовый COG без обновления продукта и перерасчитанный растр с
+        отпечатком, совпадающим с сохранённым рядом с COG, не перекодируются,
+        а план помечается неизменным: повторная публикация не добавляет
+        гранулу заново и не прогревает кэш.
+        """
+        plan = self.planner.build(file_path)
+        refresh = plan.info.img_type in self.refresh_products
+        exists = plan.destination.exists()
+        if exists and not refresh:
+            return replace(
+                plan,
+                fingerprint=read_fingerprint(plan.destination),
+                content_changed=False,
+            )
+        profile = self.cog_profile(plan.info.img_type)
+        fingerprint = self._fingerprint(plan.source, profile)
+        if (
+                exists
+                and fingerprint is not None
+                and fingerprint == read_fingerprint(plan.destination)
+        ):
+            self.logger.info(
+                "COG SKIP: %s → содержимое не изменилось",
+                plan.destination.name,
             )
+            return replace(plan, fingerprint=fingerprint, content_changed=False)
+        self.optimizer(plan.source, plan.destination, profile)
+        write_fingerprint(plan.destination, fingerprint)
+        return replace(plan, fingerprint=fingerprint)
 
+    def _published_layer(
+            self,
+            plan: PublicationPlan,
+            name: str,
+            source: LayerSourceMetadata | None,
+            quality: tuple[float | None, float | None],
+    ) -> PublishedLayer:
+        """Собирает запись maps_layer опубликованного растра."""
         cloud_percent, valid_percent = quality
-        layer = PublishedLayer(
-            name=f"{self.workspace}:{plan.layer_name}",
+        return PublishedLayer(
+            name=name,
             acquired_on=plan.info.date(),
             product=plan.info.img_type,
             agroid=plan.info.agroid_number,
@@ -337,6 +446,34 @@ class RasterPublisher:
                 source.algorithm_version if source else None
             ),
             generated_at=datetime.now(UTC),
+            content_fingerprint=plan.fingerprint,
+        )
+
+    def _register_file(
+            self,
+            plan: PublicationPlan,
+            source: LayerSourceMetadata | None = None,
+            quality: tuple[float | None, float | None] = (None, None),
+    ) -> PublishedLayer:
+        """Регистрирует готовый COG в GeoServer и GWC."""
+        refresh = self._refresh(plan)
+        created = self.client.create_coveragestore(
+            store_name=plan.store_name,
+            container_path=plan.container_path,
+            layer_name=plan.layer_name,
+            source_name=plan.layer_name,
+        )
+        if created and plan.style_name:
+            self.client.set_layer_style(
+                plan.layer_name,
+                plan.style_name,
+            )
+
+        layer = self._published_layer(
+            plan,
+            f"{self.workspace}:{plan.layer_name}",
+            source,
+            quality,
         )
         if created:
             self.client.enable_gwc_gridset_3857(plan.layer_name)
@@ -345,46 +482,196 @@ class RasterPublisher:
         if refresh or (
                 created and self.current_year == acquired_on.year
         ):
-            bbox = self.repository.bounds(
-                year=acquired_on.year,
-                agroid=plan.info.agroid_number,
-                srid=3857,
+            self._seed_layer(plan, plan.layer_name, reseed=refresh)
+        return layer
+
+    def _seed_layer(
+            self,
+            plan: PublicationPlan,
+            layer_name: str,
+            *,
+            reseed: bool,
+            time: str | None = None,
+    ) -> None:
+        """
+        Прогревает тайлы слоя в границах полей хозяйства растра.
+
+        С локальным рендером тайлы слоя без TIME пишутся прямо в blob store
+        GWC. С очередью прогрева задача выполняется её фоновым потоком; при
+        заданном ``seed_footprint_buffer`` очередь получает только
+        прямоугольники тайлов, задевающих поля, вместо рамки хозяйства.
+        """
+        acquired_on = plan.info.date()
+        if (
+                self.tile_seeder is not None
+                and time is None
+                and self.tile_seeder.supports(plan.info.img_type)
+                and self._render_layer(plan, layer_name, reseed=reseed)
+        ):
+            return
+        options = {"time": time} if time else {}
+        if self.seeder is not None and self.seed_footprint_buffer is not None:
+            tiles = self._field_tiles(plan)
+            self.seeder.add_ranges(
+                layer_name=layer_name,
+                ranges=[
+                    tile_range
+                    for zoom, zoom_tiles in itertools.groupby(
+                        tiles,
+                        key=lambda tile: tile[0],
+                    )
+                    for tile_range in merge_tiles(
+                        zoom,
+                        ((x, y) for _zoom, x, y in zoom_tiles),
+                    )
+                ],
+                acquired_on=acquired_on,
+                reseed=reseed,
+                **options,
             )
-            self.client.seed_gwc_cache(
-                layer_name=plan.layer_name,
-                zoom_start=8,
-                zoom_stop=14,
-                threads=4,
-                image_format="image/png",
+            return
+        bbox = self.repository.bounds(
+            year=acquired_on.year,
+            agroid=plan.info.agroid_number,
+            srid=3857,
+        )
+        if self.seeder is not None:
+            self.seeder.add(
+                layer_name=layer_name,
                 bbox=bbox,
-                reseed=refresh,
+                acquired_on=acquired_on,
+                zoom_start=SEED_ZOOM_START,
+                zoom_stop=SEED_ZOOM_STOP,
+                reseed=reseed,
+                **options,
             )
-        return True, plan.layer_name, layer
+            return
+        self.client.seed_gwc_cache(
+            layer_name=layer_name,
+            zoom_start=SEED_ZOOM_START,
+            zoom_stop=SEED_ZOOM_STOP,
+            threads=4,
+            image_format=GWC_TILE_FORMAT,
+            bbox=bbox,
+            reseed=reseed,
+            **options,
+        )
+
+    def _field_tiles(self, plan: PublicationPlan) -> list[tuple[int, int, int]]:
+        """
+        Возвращает тайлы полей хозяйства растра.
+
+        Продукты хозяйства читают тайлы из PostGIS один раз за
+        ``publish_date``: потоки каталога ждут первое чтение ключа.
+        """
+        acquired_on = plan.info.date()
+        key = (acquired_on.year, plan.info.agroid_number)
+        with self._tiles_lock:
+            loading = self._tiles_loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._tiles_lock:
+                tiles = self._tiles.get(key)
+            if tiles is None:
+                tiles = self.repository.field_tiles(
+                    year=acquired_on.year,
+                    agroid=plan.info.agroid_number,
+                    zoom_start=SEED_ZOOM_START,
+                    zoom_stop=SEED_ZOOM_STOP,
+                    buffer=self.seed_footprint_buffer,
+                )
+                with self._tiles_lock:
+                    self._tiles[key] = tiles
+        return tiles
+
+    def _seed_tiles(self, plan: PublicationPlan) -> list[tuple[int, int, int]]:
+        """Возвращает тайлы ``(z, x, y)`` прогрева хозяйства растра."""
+        acquired_on = plan.info.date()
+        if self.seed_footprint_buffer is not None:
+            return self._field_tiles(plan)
+        bbox = self.repository.bounds(
+            year=acquired_on.year,
+            agroid=plan.info.agroid_number,
+            srid=3857,
+        )
+        return [
+            (zoom, x, y)
+            for zoom in range(SEED_ZOOM_START, SEED_ZOOM_STOP + 1)
+            for x, y in tiles_for_bounds(bbox, zoom)
+        ]
+
+    def _render_layer(
+            self,
+            plan: PublicationPlan,
+            layer_name: str,
+            *,
+            reseed: bool,
+    ) -> bool:
+        """
+        Рендерит тайлы слоя локально и сообщает об успехе.
+
+        При ошибке рендера слой прогревается через GWC, как без него.
+        """
+        try:
+            self.tile_seeder.seed(
+                layer_name=layer_name,
+                source=plan.destination,
+                product=plan.info.img_type,
+                tiles=self._seed_tiles(plan),
+                reseed=reseed,
+            )
+        except Exception as exc:
+            self.logger.error(
+                "Локальный рендер %s не удался, прогрев через GWC: %s",
+                layer_name,
+                exc,
+            )
+            return False
+        return True
 
     def publish_date(
             self,
             acquired_on: date,
             source: LayerSourceMetadata | None = None,
+            agroids: tuple[int, ...] | None = None,
+            files: Iterable[str | Path] | None = None,
     ) -> None:
-        """Публикует TIFF указанной даты и агрегирует ошибки."""
+        """
+        Публикует TIFF указанной даты и агрегирует ошибки.
+
+        ``files`` — манифест растров, созданных обработкой даты; без него
+        растры даты берутся из индекса ``source_root``. ``agroids``
+        ограничивает публикацию хозяйствами, прошедшими облачную
+        сортировку; остальные растры даты остаются только для статистики.
+        Прогрев кэша идёт в фоне и завершается в ``close``.
+        """
         failures = []
+        if files is None:
+            candidates, invalid = self.source_index.files(acquired_on)
+            for file_path in invalid:
+                self.logger.error(
+                    "Ошибка публикации %s: некорректное имя слоя",
+                    file_path.name,
+                )
+                failures.append(file_path.name)
+        else:
+            candidates = [Path(file_path) for file_path in files]
         matched_files = []
-        for root, _, files in os.walk(self.source_root):
-            for filename in files:
-                if not filename.lower().endswith(".tif"):
-                    continue
-                file_path = Path(root) / filename
-                try:
-                    if split_file_name(filename).date() != acquired_on:
-                        continue
-                    matched_files.append(file_path)
-                except Exception as exc:
-                    self.logger.exception(
-                        "Ошибка публикации %s: %s",
-                        filename,
-                        exc,
-                    )
-                    failures.append(filename)
+        for file_path in candidates:
+            try:
+                info = split_file_name(file_path.name)
+            except ValueError as exc:
+                self.logger.error(
+                    "Ошибка публикации %s: %s",
+                    file_path.name,
+                    exc,
+                )
+                failures.append(file_path.name)
+                continue
+            if info.date() != acquired_on:
+                continue
+            if agroids is not None and info.agroid_number not in agroids:
+                continue
+            matched_files.append(file_path)
 
         if not matched_files:
             raise RuntimeError(
@@ -394,47 +681,122 @@ class RasterPublisher:
 
         quality_by_agroid = {}
         if source is not None:
-            agroids = tuple(dict.fromkeys(
+            matched_agroids = tuple(dict.fromkeys(
                 split_file_name(path.name).agroid_number
                 for path in matched_files
             ))
             quality_by_agroid = self.repository.quality_many(
                 year=acquired_on.year,
-                agroids=agroids,
+                agroids=matched_agroids,
                 acquired_on=acquired_on,
             )
 
-        published_layers = []
-        for file_path in matched_files:
-            filename = file_path.name
-            agroid = split_file_name(filename).agroid_number
-            try:
-                success, reason, layer = self._publish_file(
-                    file_path,
+        try:
+            with self.client.catalog_snapshot():
+                published = self._publish_pipeline(
+                    matched_files,
                     source,
-                    quality_by_agroid.get(agroid, (None, None)),
+                    quality_by_agroid,
                 )
-            except Exception as exc:
-                self.logger.exception(
-                    "Ошибка публикации %s: %s",
-                    filename,
-                    exc,
-                )
-                failures.append(filename)
-                continue
-            if not success:
-                self.logger.warning(
-                    "Файл не опубликован: %s (%s)",
-                    filename,
-                    reason,
-                )
-                failures.append(filename)
-            elif layer is not None:
+        finally:
+            # Контуры полей могут измениться до публикации следующей даты.
+            self._tiles, self._tiles_loading = {}, {}
+        published_layers = []
+        for file_path in matched_files:
+            layer = published.get(file_path)
+            if layer is None:
+                failures.append(file_path.name)
+            else:
                 published_layers.append(layer)
 
         if published_layers:
             self.repository.add_layers(published_layers)
+        if self.seeder is not None:
+            self.seeder.start()
         if failures:
             raise RuntimeError(
                 "Не удалось опубликовать файлы: " + ", ".join(failures)
             )
+
+    def close(self) -> None:
+        """
+        Дожидается прогрева кэша, накопленного за запуск.
+
+        Ошибки прогрева журналируются очередью и не считаются ошибками
+        публикации: кэш догревается по запросам.
+        """
+        if self.seeder is not None:
+            self.seeder.close()
+        if self.tile_seeder is not None:
+            self.tile_seeder.close()
+
+    def _publish_pipeline(
+            self,
+            matched_files: list[Path],
+            source: LayerSourceMetadata | None,
+            quality_by_agroid: dict[int, tuple[float | None, float | None]],
+    ) -> dict[Path, PublishedLayer]:
+        """
+        Конвейером формирует COG и регистрирует слои в GeoServer.
+
+        Оптимизация и REST-цепочки выполняются в отдельных пулах со своими
+        ограничениями, поэтому слой регистрируется, как только готов его
+        COG, не дожидаясь остальных файлов. Возвращает слои успешно
+        опубликованных файлов; ошибки остальных журналируются.
+        """
+        started = perf_counter()
+        published: dict[Path, PublishedLayer] = {}
+        with (
+            ThreadPoolExecutor(
+                max_workers=self.optimize_workers,
+                thread_name_prefix="publish-cog",
+            ) as optimizing,
+            ThreadPoolExecutor(
+                max_workers=self.catalog_workers,
+                thread_name_prefix="publish-rest",
+            ) as registering,
+        ):
+            optimized = {
+                optimizing.submit(self._optimize_file, file_path): file_path
+                for file_path in matched_files
+            }
+            registered = {}
+            for future in as_completed(optimized):
+                file_path = optimized[future]
+                try:
+                    plan = future.result()
+                except Exception as exc:
+                    self.logger.error(
+                        "Ошибка оптимизации %s: %s",
+                        file_path,
+                        exc,
+                        exc_info=True,
+                    )
+                    continue
+                agroid = split_file_name(file_path.name).agroid_number
+                registered[registering.submit(
+                    self._register_file,
+                    plan,
+                    source,
+                    quality_by_agroid.get(agroid, (None, None)),
+                )] = file_path
+            for future in as_completed(registered):
+                file_path = registered[future]
+                try:
+                    published[file_path] = future.result()
+                except Exception as exc:
+                    self.logger.exception(
+                        "Ошибка публикации %s: %s",
+                        file_path.name,
+                        exc,
+                    )
+        self.logger.info(
+            "PUBLISH FILES: %d из %d | COG потоков=%d REST потоков=%d "
+            "| %.2f сек.",
+            len(published),
+            len(matched_files),
+            self.optimize_workers,
+            self.catalog_workers,
+            perf_counter() - started,
+        )
+        return published
@@ -0,0 +1,635 @@
+"""Локальный рендер тайлов WebMercator из опубликованных COG."""
+from __future__ import annotations
+
+import itertools
+import os
+import shutil
+import sqlite3
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from math import floor
+from pathlib import Path
+from time import perf_counter
+from typing import Protocol
+from uuid import uuid4
+
+import numpy as np
+from osgeo import gdal
+
+from core.logging import get_logger
+from core.metrics import get_metrics_registry, register_summary
+
+from .seeding import (
+    GWC_TILE_FORMAT,
+    WEB_MERCATOR_ORIGIN,
+    WEB_MERCATOR_WORLD,
+    TileRange,
+)
+
+gdal.UseExceptions()
+
+TILE_SIZE = 256
+# Сторона метатайла: блок тайлов читается из COG одним Warp.
+METATILE = 8
+# Точек таблицы цветов непрерывной шкалы.
+RAMP_LUT_SIZE = 1024
+GWC_GRIDSET = "WebMercatorQuad"
+# Тайлы и байты локального рендера по растрам.
+RENDER_METRIC = "tiles.render"
+register_summary(RENDER_METRIC, "TILES")
+
+Rgba = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class ColorRamp:
+    """Окраска одноканального продукта, повторяющая ColorMap стиля GeoServer."""
+
+    name: str
+    # Опорные значения по возрастанию и их цвета RGBA.
+    stops: tuple[tuple[float, Rgba], ...]
+    # Классы окрашиваются точным значением, иначе цвет интерполируется.
+    categorical: bool = False
+
+    def lookup_table(self) -> np.ndarray:
+        """Строит таблицу цветов для векторной окраски."""
+        if self.categorical:
+            table = np.zeros((256, 4), dtype=np.uint8)
+            for value, color in self.stops:
+                table[int(value)] = color
+            return table
+        values = np.array([value for value, _color in self.stops])
+        colors = np.array([color for _value, color in self.stops], dtype=float)
+        samples = np.linspace(values[0], values[-1], RAMP_LUT_SIZE)
+        return np.stack(
+            [np.interp(samples, values, colors[:, channel]) for channel in range(4)],
+            axis=1,
+        ).round().astype(np.uint8)
+
+
+# Шкалы стилей GeoServer ndvi, ndwi и scl; tci выводится как RGB.
+COLOR_RAMPS = {
+    "ndvi": ColorRamp("ndvi", (
+        (-0.2, (165, 0, 38, 255)),
+        (0.0, (215, 48, 39, 255)),
+        (0.2, (244, 109, 67, 255)),
+        (0.3, (253, 174, 97, 255)),
+        (0.4, (254, 224, 139, 255)),
+        (0.5, (217, 239, 139, 255)),
+        (0.6, (166, 217, 106, 255)),
+        (0.7, (102, 189, 99, 255)),
+        (0.8, (26, 152, 80, 255)),
+        (1.0, (0, 104, 55, 255)),
+    )),
+    "ndwi": ColorRamp("ndwi", (
+        (-0.5, (140, 81, 10, 255)),
+        (-0.2, (216, 179, 101, 255)),
+        (0.0, (246, 232, 195, 255)),
+        (0.2, (199, 234, 229, 255)),
+        (0.4, (90, 180, 172, 255)),
+        (0.6, (1, 102, 94, 255)),
+        (1.0, (0, 60, 48, 255)),
+    )),
+    "scl": ColorRamp("scl", (
+        (1, (255, 0, 0, 255)),
+        (2, (47, 47, 47, 255)),
+        (3, (100, 50, 0, 255)),
+        (4, (0, 160, 0, 255)),
+        (5, (255, 230, 90, 255)),
+        (6, (0, 0, 255, 255)),
+        (7, (128, 128, 128, 255)),
+        (8, (192, 192, 192, 255)),
+        (9, (255, 255, 255, 255)),
+        (10, (100, 200, 255, 255)),
+        (11, (255, 150, 255, 255)),
+    ), categorical=True),
+}
+
+
+def colorize(
+        values: np.ndarray,
+        valid: np.ndarray,
+        ramp: ColorRamp | None,
+        table: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Окрашивает блок в RGBA одной выборкой из таблицы цветов.
+
+    ``values`` — каналы ``(bands, height, width)``; без шкалы первые три
+    канала считаются RGB. Невалидные пиксели прозрачны.
+    """
+    height, width = valid.shape
+    if ramp is None:
+        rgba = np.empty((height, width, 4), dtype=np.uint8)
+        rgba[..., :3] = np.moveaxis(values[:3], 0, -1).clip(0, 255)
+        rgba[..., 3] = 255
+    else:
+        table = ramp.lookup_table() if table is None else table
+        band = values[0]
+        if ramp.categorical:
+            index = np.clip(band, 0, 255).astype(np.intp)
+        else:
+            low = ramp.stops[0][0]
+            high = ramp.stops[-1][0]
+            scaled = (np.nan_to_num(band, nan=low) - low) / (high - low)
+            index = np.clip(
+                np.rint(scaled * (len(table) - 1)),
+                0,
+                len(table) - 1,
+            ).astype(np.intp)
+        rgba = table[index]
+    rgba[~valid] = 0
+    return rgba
+
+
+def tiles_for_bounds(
+        bounds: tuple[float, float, float, float],
+        zoom: int,
+) -> list[tuple[int, int]]:
+    """Возвращает тайлы ``(x, y)`` масштаба, покрывающие рамку EPSG:3857."""
+    minx, miny, maxx, maxy = bounds
+    size = WEB_MERCATOR_WORLD / 2 ** zoom
+    last = 2 ** zoom - 1
+
+    def column(value: float) -> int:
+        """Возвращает номер столбца для абсциссы."""
+        return min(last, max(0, floor((value + WEB_MERCATOR_ORIGIN) / size)))
+
+    def row(value: float) -> int:
+        """Возвращает номер строки от севера для ординаты."""
+        return min(last, max(0, floor((WEB_MERCATOR_ORIGIN - value) / size)))
+
+    return [
+        (x, y)
+        for y in range(row(maxy), row(miny) + 1)
+        for x in range(column(minx), column(maxx) + 1)
+    ]
+
+
+@dataclass(frozen=True)
+class TileBlock:
+    """Тайлы одного метатайла, читаемые из растра одним запросом."""
+
+    zoom: int
+    tiles: tuple[tuple[int, int], ...]
+
+    @property
+    def extent(self) -> TileRange:
+        """Возвращает прямоугольник тайлов, охватывающий блок."""
+        return TileRange(
+            self.zoom,
+            min(x for x, _y in self.tiles),
+            min(y for _x, y in self.tiles),
+            max(x for x, _y in self.tiles),
+            max(y for _x, y in self.tiles),
+        )
+
+
+def tile_blocks(
+        tiles: Iterable[tuple[int, int, int]],
+        size: int = METATILE,
+) -> list[TileBlock]:
+    """Группирует тайлы ``(z, x, y)`` в метатайлы ``size``×``size``."""
+    def block_key(tile):
+        """Возвращает метатайл тайла."""
+        return tile[0], tile[2] // size, tile[1] // size
+
+    return [
+        TileBlock(zoom, tuple((x, y) for _zoom, x, y in grouped))
+        for (zoom, _row, _column), grouped in itertools.groupby(
+            sorted(set(tiles), key=lambda tile: (block_key(tile), tile)),
+            key=block_key,
+        )
+    ]
+
+
+def read_block(
+        source: Path,
+        bbox: tuple[float, float, float, float],
+        width: int,
+        height: int,
+        *,
+        categorical: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Читает рамку COG в сетку тайлов.
+
+    Warp выбирает подходящий обзор COG сам; альфа-канал отмечает пиксели
+    внутри растра и вне NoData. Значения переводятся через scale/offset
+    канала, поэтому профиль int16 окрашивается так же, как float32.
+    """
+    dataset = gdal.Warp(
+        "",
+        str(source),
+        format="MEM",
+        outputBounds=bbox,
+        width=width,
+        height=height,
+        dstSRS="EPSG:3857",
+        resampleAlg="near" if categorical else "bilinear",
+        dstAlpha=True,
+    )
+    if dataset is None:
+        raise RuntimeError(f"Не удалось прочитать блок {source}")
+    try:
+        bands = dataset.RasterCount - 1
+        values = np.stack([
+            dataset.GetRasterBand(index + 1).ReadAsArray()
+            for index in range(bands)
+        ])
+        valid = dataset.GetRasterBand(bands + 1).ReadAsArray() > 0
+        band = dataset.GetRasterBand(1)
+        scale = band.GetScale()
+        offset = band.GetOffset()
+        if scale not in (None, 1) or offset not in (None, 0):
+            values = values * (scale or 1) + (offset or 0)
+        return values, valid
+    finally:
+        dataset = None
+
+
+def encode_tile(rgba: np.ndarray, image_format: str) -> bytes:
+    """Кодирует RGBA тайл в PNG либо WEBP средствами GDAL."""
+    height, width, _bands = rgba.shape
+    memory = gdal.GetDriverByName("MEM").Create("", width, height, 4, gdal.GDT_Byte)
+    for index in range(4):
+        memory.GetRasterBand(index + 1).WriteArray(rgba[..., index])
+    path = f"/vsimem/tile-{uuid4().hex}.{image_format}"
+    try:
+        gdal.Translate(
+            path,
+            memory,
+            format=image_format.upper(),
+            creationOptions=["QUALITY=85"] if image_format == "webp" else [],
+        )
+        handle = gdal.VSIFOpenL(path, "rb")
+        try:
+            return bytes(gdal.VSIFReadL(1, gdal.VSIStatL(path).size, handle))
+        finally:
+            gdal.VSIFCloseL(handle)
+    finally:
+        memory = None
+        gdal.Unlink(path)
+
+
+class TileSink(Protocol):
+    """Хранилище готовых тайлов."""
+
+    def write(self, zoom: int, x: int, y: int, data: bytes) -> None:
+        """Сохраняет тайл XYZ, строка которого отсчитывается от севера."""
+        ...
+
+
+def _padded(value: int, digits: int) -> str:
+    """Дополняет число нулями слева, как zeroPadder GeoWebCache."""
+    return str(value).zfill(digits)
+
+
+class GwcFileBlobStore:
+    """
+    Пишет тайлы в раскладке файлового blob store GeoWebCache.
+
+    Путь повторяет FilePathGenerator GWC:
+    ``<слой>/<gridset>_<z>/<x/half>_<y/half>/<x>_<y>.<ext>``, где строка
+    отсчитывается от юга. Слои с параметрами (TIME) не поддерживаются:
+    их каталог зависит от хеша параметров. Тайлы пишутся только в формате
+    ``GWC_TILE_FORMAT``: других GWC у слоя не знает и не отдаёт.
+    """
+
+    image_format = GWC_TILE_FORMAT.removeprefix("image/")
+
+    def __init__(
+            self,
+            root: str | Path,
+            layer_name: str,
+            *,
+            gridset: str = GWC_GRIDSET,
+    ) -> None:
+        self.root = Path(root)
+        self.layer_dir = self.root / layer_name.replace(":", "_")
+        self.gridset = gridset
+
+    def path(self, zoom: int, x: int, y: int) -> Path:
+        """Возвращает файл тайла XYZ в blob store."""
+        row = 2 ** zoom - 1 - y
+        half = 2 << (zoom // 2)
+        digits = int(np.log10(half)) + 1 if half > 10 else 1
+        return (
+            self.layer_dir
+            / f"{self.gridset}_{_padded(zoom, 2)}"
+            / f"{_padded(x // half, digits)}_{_padded(row // half, digits)}"
+            / f"{_padded(x, 2 * digits)}_{_padded(row, 2 * digits)}"
+              f".{self.image_format}"
+        )
+
+    def write(self, zoom: int, x: int, y: int, data: bytes) -> None:
+        """Атомарно записывает тайл, заменяя прежний."""
+        path = self.path(zoom, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+    def truncate(self, zooms: Iterable[int]) -> None:
+        """
+        Удаляет кэш слоя на указанных масштабах.
+
+        Каталог масштаба сначала переименовывается, поэтому GWC не отдаёт
+        смесь старых и новых тайлов; удалённые тайлы вне рендера GWC
+        построит заново по запросу.
+        """
+        for zoom in zooms:
+            directory = self.layer_dir / f"{self.gridset}_{_padded(zoom, 2)}"
+            if not directory.exists():
+                continue
+            stale = directory.with_name(
+                f".{directory.name}.{threading.get_ident()}.stale"
+            )
+            os.replace(directory, stale)
+            shutil.rmtree(stale)
+
+
+class MBTilesSink:
+    """Пишет тайлы в MBTiles; строки MBTiles отсчитываются от юга."""
+
+    def __init__(
+            self,
+            path: str | Path,
+            *,
+            name: str,
+            image_format: str = "png",
+            batch_size: int = 500,
+    ) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: list[tuple[int, int, int, bytes]] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (name text PRIMARY KEY, value text);
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level integer,
+                tile_column integer,
+                tile_row integer,
+                tile_data blob,
+                PRIMARY KEY (zoom_level, tile_column, tile_row)
+            );
+            """
+        )
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+            [("name", name), ("format", image_format), ("type", "overlay")],
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> MBTilesSink:
+        """Возвращает открытое хранилище."""
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        """Сохраняет оставшиеся тайлы и закрывает базу."""
+        self.close()
+
+    def write(self, zoom: int, x: int, y: int, data: bytes) -> None:
+        """Добавляет тайл в пакет записи."""
+        with self._lock:
+            self._pending.append((zoom, x, 2 ** zoom - 1 - y, data))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        """Записывает пакет одной транзакцией; вызывается под блокировкой."""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+            self._pending,
+        )
+        self.connection.commit()
+        self._pending.clear()
+
+    def close(self) -> None:
+        """Сохраняет оставшиеся тайлы и закрывает базу."""
+        with self._lock:
+            if self._pending:
+                self._flush()
+            self.connection.close()
+
+
+@dataclass(frozen=True)
+class TileRenderSummary:
+    """Итог рендера тайлов одного растра."""
+
+    tiles: int
+    # Полностью прозрачные тайлы, которые не записывались.
+    empty: int
+    size: int
+
+
+class TileRenderer:
+    """
+    Рендерит тайлы COG локально, без WMS GeoServer.
+
+    Тайлы группируются в метатайлы, каждый читается одним Warp с
+    подходящего обзора, окрашивается таблицей цветов NumPy целиком и
+    режется на тайлы; метатайлы всех масштабов обрабатываются параллельно.
+    Пул из ``workers`` потоков общий для всех растров: одновременные
+    публикации из потоков каталога делят его, а не умножают потоки рендера.
+    """
+
+    def __init__(
+            self,
+            *,
+            workers: int = 2,
+            image_format: str = "png",
+            reader: Callable[..., tuple[np.ndarray, np.ndarray]] = read_block,
+            encoder: Callable[[np.ndarray, str], bytes] = encode_tile,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("Число потоков рендера должно быть положительным")
+        if image_format not in {"png", "webp"}:
+            raise ValueError(f"Неподдерживаемый формат тайлов: {image_format}")
+        self.workers = workers
+        self.image_format = image_format
+        self.reader = reader
+        self.encoder = encoder
+        self.logger = get_logger(self.__class__.__name__)
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """Возвращает общий пул рендера, создавая его при первом вызове."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="render-tiles",
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """Завершает потоки рендера; следующий рендер создаст пул заново."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _render_block(
+            self,
+            source: Path,
+            ramp: ColorRamp | None,
+            table: np.ndarray | None,
+            block: TileBlock,
+            sink: TileSink,
+    ) -> tuple[int, int, int]:
+        """Рендерит метатайл и возвращает число тайлов, пустых и байт."""
+        extent = block.extent
+        columns = extent.max_x - extent.min_x + 1
+        rows = extent.max_y - extent.min_y + 1
+        values, valid = self.reader(
+            source,
+            extent.bbox(inset=0),
+            columns * TILE_SIZE,
+            rows * TILE_SIZE,
+            categorical=bool(ramp and ramp.categorical),
+        )
+        rgba = colorize(values, valid, ramp, table)
+        written = empty = size = 0
+        for x, y in block.tiles:
+            left = (x - extent.min_x) * TILE_SIZE
+            top = (y - extent.min_y) * TILE_SIZE
+            tile = rgba[top:top + TILE_SIZE, left:left + TILE_SIZE]
+            if not tile[..., 3].any():
+                empty += 1
+                continue
+            data = self.encoder(np.ascontiguousarray(tile), self.image_format)
+            sink.write(block.zoom, x, y, data)
+            written += 1
+            size += len(data)
+        return written, empty, size
+
+    def render(
+            self,
+            source: Path,
+            ramp: ColorRamp | None,
+            tiles: Iterable[tuple[int, int, int]],
+            sink: TileSink,
+    ) -> TileRenderSummary:
+        """Рендерит тайлы ``(z, x, y)`` растра в хранилище."""
+        started = perf_counter()
+        table = ramp.lookup_table() if ramp is not None else None
+        blocks = tile_blocks(tiles)
+        written = empty = size = 0
+        failed = 0
+        executor = self._pool()
+        futures = {
+            executor.submit(
+                self._render_block,
+                source,
+                ramp,
+                table,
+                block,
+                sink,
+            ): block
+            for block in blocks
+        }
+        for future in as_completed(futures):
+            block = futures[future]
+            try:
+                block_written, block_empty, block_size = future.result()
+            except Exception as exc:
+                failed += 1
+                self.logger.error(
+                    "TILES FAIL %s z%d: %s",
+                    source.name,
+                    block.zoom,
+                    exc,
+                )
+                continue
+            written += block_written
+            empty += block_empty
+            size += block_size
+
+        seconds = perf_counter() - started
+        get_metrics_registry().observe(
+            RENDER_METRIC,
+            source.name,
+            seconds=seconds,
+            rows=written,
+            size=size,
+        )
+        self.logger.info(
+            "TILES %s: %s блоков=%d тайлов=%d пустых=%d %.1f МиБ | %.2f сек.",
+            "FAIL" if failed else "OK",
+            source.name,
+            len(blocks),
+            written,
+            empty,
+            size / 1024 / 1024,
+            seconds,
+        )
+        if failed:
+            raise RuntimeError(
+                f"Не удалось отрендерить {failed} блоков тайлов {source.name}"
+            )
+        return TileRenderSummary(tiles=written, empty=empty, size=size)
+
+
+class LocalTileSeeder:
+    """Заполняет файловый blob store GWC локальным рендером вместо seed."""
+
+    def __init__(
+            self,
+            renderer: TileRenderer,
+            blobstore_root: str | Path,
+            workspace: str,
+    ) -> None:
+        if renderer.image_format != GwcFileBlobStore.image_format:
+            raise ValueError(
+                f"Blob store GWC хранит только {GWC_TILE_FORMAT}, "
+                f"а не {renderer.image_format}"
+            )
+        self.renderer = renderer
+        self.blobstore_root = Path(blobstore_root)
+        self.workspace = workspace
+
+    @staticmethod
+    def supports(product: str) -> bool:
+        """Проверяет, известна ли окраска продукта."""
+        return product in COLOR_RAMPS or product == "tci"
+
+    def seed(
+            self,
+            *,
+            layer_name: str,
+            source: Path,
+            product: str,
+            tiles: Iterable[tuple[int, int, int]],
+            reseed: bool = False,
+    ) -> TileRenderSummary:
+        """
+        Рендерит тайлы опубликованного COG в каталог слоя GWC.
+
+        Пустые тайлы не записываются, поэтому при ``reseed`` кэш слоя на
+        рендеримых масштабах сначала удаляется: иначе в нём остались бы
+        тайлы прежнего растра там, где новый прозрачен.
+        """
+        tiles = list(tiles)
+        store = GwcFileBlobStore(
+            self.blobstore_root,
+            f"{self.workspace}:{layer_name}",
+        )
+        if reseed:
+            store.truncate(sorted({zoom for zoom, _x, _y in tiles}))
+        return self.renderer.render(
+            source,
+            COLOR_RAMPS.get(product),
+            tiles,
+            store,
+        )
+
+    def close(self) -> None:
+        """Завершает потоки рендера."""
+        self.renderer.close()
@@ -0,0 +1,515 @@
+"""Очередь прогрева GeoWebCache с ограничением нагрузки на GeoServer."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date
+from time import perf_counter
+from typing import Protocol
+
+from core.logging import get_logger
+from core.metrics import get_metrics_registry, register_summary
+
+# Время и тайлы завершённых задач прогрева по слоям.
+SEED_METRIC = "gwc.seed"
+register_summary(SEED_METRIC, "GWC SEED")
+# Единственный формат тайлов слоёв GWC: его регистрирует клиент, его
+# прогревает очередь и пишет локальный рендер.
+GWC_TILE_FORMAT = "image/png"
+# Коды состояния задачи в /gwc/rest/seed/<слой>.json.
+SEED_PENDING = 0
+SEED_RUNNING = 1
+
+
+@dataclass(frozen=True)
+class SeedTaskStatus:
+    """Состояние одной задачи GWC из ответа REST."""
+
+    tiles_done: int
+    tiles_total: int
+    task_id: int
+    status: int
+
+    @property
+    def active(self) -> bool:
+        """Задача ожидает запуска либо выполняется."""
+        return self.status in (SEED_PENDING, SEED_RUNNING)
+
+
+class GwcSeedClient(Protocol):
+    """Операции GWC, необходимые очереди прогрева."""
+
+    def seed_gwc_cache(
+            self,
+            layer_name: str,
+            bbox: tuple[float, float, float, float],
+            reseed: bool = False,
+            **kwargs,
+    ) -> bool:
+        """Запускает прогрев тайлов слоя в указанной области."""
+        ...
+
+    def seed_status(self, layer_name: str) -> list[SeedTaskStatus]:
+        """Возвращает задачи прогрева слоя."""
+        ...
+
+
+# Половина длины экватора в EPSG:3857 и сторона мира в метрах.
+WEB_MERCATOR_ORIGIN = 20037508.342789244
+WEB_MERCATOR_WORLD = 2 * WEB_MERCATOR_ORIGIN
+
+
+@dataclass(frozen=True)
+class TileRange:
+    """Прямоугольник тайлов WebMercatorQuad одного масштаба."""
+
+    zoom: int
+    min_x: int
+    min_y: int
+    max_x: int
+    max_y: int
+
+    @property
+    def tiles(self) -> int:
+        """Возвращает число тайлов прямоугольника."""
+        return (self.max_x - self.min_x + 1) * (self.max_y - self.min_y + 1)
+
+    def bbox(self, inset: float = 1e-6) -> tuple[float, float, float, float]:
+        """
+        Возвращает рамку EPSG:3857 прямоугольника.
+
+        По умолчанию рамка сжата на миллионную долю тайла, чтобы GWC не
+        добавил соседние тайлы, которых она касается границей.
+        """
+        size = WEB_MERCATOR_WORLD / 2 ** self.zoom
+        inset = size * inset
+        return (
+            -WEB_MERCATOR_ORIGIN + self.min_x * size + inset,
+            WEB_MERCATOR_ORIGIN - (self.max_y + 1) * size + inset,
+            -WEB_MERCATOR_ORIGIN + (self.max_x + 1) * size - inset,
+            WEB_MERCATOR_ORIGIN - self.min_y * size - inset,
+        )
+
+
+def merge_tiles(
+        zoom: int,
+        tiles: Iterable[tuple[int, int]],
+) -> list[TileRange]:
+    """
+    Объединяет тайлы ``(x, y)`` одного масштаба в прямоугольники.
+
+    Соседние тайлы строки сливаются в отрезки, а одинаковые отрезки
+    последовательных строк — в прямоугольники; прямоугольники покрывают
+    ровно переданные тайлы.
+    """
+    runs_by_row: dict[int, list[tuple[int, int]]] = {}
+    for x, y in sorted(set(tiles), key=lambda tile: (tile[1], tile[0])):
+        runs = runs_by_row.setdefault(y, [])
+        if runs and runs[-1][1] == x - 1:
+            runs[-1] = (runs[-1][0], x)
+        else:
+            runs.append((x, x))
+
+    ranges: list[TileRange] = []
+    # Прямоугольники, которые ещё можно продлить строкой ниже.
+    open_ranges: dict[tuple[int, int], TileRange] = {}
+    for y in sorted(runs_by_row):
+        extended = {}
+        for run in runs_by_row[y]:
+            previous = open_ranges.pop(run, None)
+            if previous is not None and previous.max_y == y - 1:
+                extended[run] = TileRange(
+                    zoom,
+                    previous.min_x,
+                    previous.min_y,
+                    previous.max_x,
+                    y,
+                )
+            else:
+                if previous is not None:
+                    ranges.append(previous)
+                extended[run] = TileRange(zoom, run[0], y, run[1], y)
+        ranges.extend(open_ranges.values())
+        open_ranges = extended
+    ranges.extend(open_ranges.values())
+    return sorted(ranges, key=lambda item: (item.min_y, item.min_x))
+
+
+@dataclass(frozen=True, order=True)
+class SeedTask:
+    """Прогрев диапазона масштабов слоя в одной рамке."""
+
+    # Свежие даты и крупные масштабы идут раньше: ключ сортировки кучи.
+    priority: tuple[int, int]
+    sequence: int
+    layer_name: str = field(compare=False)
+    bbox: tuple[float, float, float, float] = field(compare=False)
+    zoom_start: int = field(compare=False)
+    zoom_stop: int = field(compare=False)
+    reseed: bool = field(compare=False)
+    time: str | None = field(compare=False, default=None)
+    # Число тайлов, если рамка построена по сетке; иначе — по ответу GWC.
+    tiles: int | None = field(compare=False, default=None)
+
+
+@dataclass
+class _RunningLayer:
+    """Задачи слоя, отправленные в GWC и ожидающие завершения."""
+
+    tasks: list[SeedTask]
+    started: float
+    tiles_done: int = 0
+    tiles_total: int = 0
+
+
+class GwcSeedQueue:
+    """
+    Накапливает прогрев слоёв и выполняет его с ограничениями.
+
+    Рамка слоя прогревается одной задачей на весь диапазон масштабов, а при
+    известном покрытии полей — задачами по прямоугольникам тайлов.
+    Очередь выполняется либо синхронно через ``run``, либо фоновым потоком
+    между ``start`` и ``close``, не задерживая публикацию следующих дат.
+    Одновременно в GWC находится
+    не более ``max_tasks`` задач и ``max_threads`` потоков. GWC сообщает
+    состояние по слою целиком, поэтому задачи слоя освобождают места вместе,
+    когда в ``/gwc/rest/seed/<слой>.json`` не остаётся активных. Свежие даты
+    и крупные масштабы, которые пользователи открывают первыми, прогреваются
+    раньше архивных.
+    """
+
+    def __init__(
+            self,
+            client: GwcSeedClient,
+            *,
+            max_tasks: int = 2,
+            max_threads: int = 4,
+            task_threads: int = 2,
+            poll_seconds: float = 10.0,
+            max_ranges: int = 16,
+    ) -> None:
+        if min(max_tasks, max_threads, task_threads, max_ranges) <= 0:
+            raise ValueError("Ограничения прогрева должны быть положительными")
+        if task_threads > max_threads:
+            raise ValueError("task_threads не может превышать max_threads")
+        self.client = client
+        self.max_tasks = max_tasks
+        self.max_threads = max_threads
+        self.task_threads = task_threads
+        self.poll_seconds = poll_seconds
+        # Прямоугольников на масштаб, сверх которых масштаб греется рамкой.
+        self.max_ranges = max_ranges
+        self.logger = get_logger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        # Будит фоновый поток при новых задачах и закрытии очереди.
+        self._changed = threading.Condition(self._lock)
+        self._pending: list[SeedTask] = []
+        self._sequence = itertools.count()
+        self._worker: threading.Thread | None = None
+        self._closed = False
+        self._worker_failed = 0
+
+    def __len__(self) -> int:
+        """Возвращает число ожидающих задач."""
+        with self._lock:
+            return len(self._pending)
+
+    def _push(
+            self,
+            *,
+            layer_name: str,
+            bbox: tuple[float, float, float, float],
+            acquired_on: date,
+            zoom_start: int,
+            zoom_stop: int,
+            reseed: bool,
+            time: str | None,
+            tiles: int | None = None,
+    ) -> None:
+        """Добавляет задачу в кучу; вызывается под блокировкой."""
+        heapq.heappush(self._pending, SeedTask(
+            priority=(-acquired_on.toordinal(), -zoom_stop),
+            sequence=next(self._sequence),
+            layer_name=layer_name,
+            bbox=bbox,
+            zoom_start=zoom_start,
+            zoom_stop=zoom_stop,
+            reseed=reseed,
+            time=time,
+            tiles=tiles,
+        ))
+        self._changed.notify_all()
+
+    def add(
+            self,
+            *,
+            layer_name: str,
+            bbox: tuple[float, float, float, float],
+            acquired_on: date,
+            zoom_start: int = 8,
+            zoom_stop: int = 14,
+            reseed: bool = False,
+            time: str | None = None,
+    ) -> None:
+        """Ставит прогрев рамки слоя в очередь одной задачей GWC."""
+        if zoom_start < 0 or zoom_start > zoom_stop:
+            raise ValueError("Неверный диапазон zoom_start/zoom_stop")
+        with self._lock:
+            self._push(
+                layer_name=layer_name,
+                bbox=bbox,
+                acquired_on=acquired_on,
+                zoom_start=zoom_start,
+                zoom_stop=zoom_stop,
+                reseed=reseed,
+                time=time,
+            )
+
+    def add_ranges(
+            self,
+            *,
+            layer_name: str,
+            ranges: Iterable[TileRange],
+            acquired_on: date,
+            reseed: bool = False,
+            time: str | None = None,
+    ) -> None:
+        """
+        Ставит прогрев слоя в очередь по задаче на прямоугольник тайлов.
+
+        Масштабы, где прямоугольников больше ``max_ranges``, и все более
+        крупные прогреваются одной задачей GWC в общей рамке их тайлов:
+        лишние тайлы дешевле сотен мелких запросов.
+        """
+        by_zoom: dict[int, list[TileRange]] = {}
+        for tile_range in ranges:
+            by_zoom.setdefault(tile_range.zoom, []).append(tile_range)
+        fallback_zoom = min(
+            (
+                zoom
+                for zoom, zoom_ranges in by_zoom.items()
+                if len(zoom_ranges) > self.max_ranges
+            ),
+            default=None,
+        )
+        exact = [
+            tile_range
+            for zoom in sorted(by_zoom)
+            if fallback_zoom is None or zoom < fallback_zoom
+            for tile_range in by_zoom[zoom]
+        ]
+        with self._lock:
+            if fallback_zoom is not None:
+                bboxes = [
+                    tile_range.bbox()
+                    for zoom, zoom_ranges in by_zoom.items()
+                    if zoom >= fallback_zoom
+                    for tile_range in zoom_ranges
+                ]
+                self._push(
+                    layer_name=layer_name,
+                    bbox=(
+                        min(bbox[0] for bbox in bboxes),
+                        min(bbox[1] for bbox in bboxes),
+                        max(bbox[2] for bbox in bboxes),
+                        max(bbox[3] for bbox in bboxes),
+                    ),
+                    acquired_on=acquired_on,
+                    zoom_start=fallback_zoom,
+                    zoom_stop=max(by_zoom),
+                    reseed=reseed,
+                    time=time,
+                )
+            for tile_range in exact:
+                self._push(
+                    layer_name=layer_name,
+                    bbox=tile_range.bbox(),
+                    acquired_on=acquired_on,
+                    zoom_start=tile_range.zoom,
+                    zoom_stop=tile_range.zoom,
+                    reseed=reseed,
+                    time=time,
+                    tiles=tile_range.tiles,
+                )
+
+    def _next_task(self) -> SeedTask | None:
+        """Извлекает самую приоритетную задачу."""
+        with self._lock:
+            return heapq.heappop(self._pending) if self._pending else None
+
+    def _submit(self, task: SeedTask) -> None:
+        """Отправляет задачу прогрева в GWC."""
+        options = {"time": task.time} if task.time else {}
+        self.client.seed_gwc_cache(
+            layer_name=task.layer_name,
+            zoom_start=task.zoom_start,
+            zoom_stop=task.zoom_stop,
+            threads=self.task_threads,
+            image_format=GWC_TILE_FORMAT,
+            bbox=task.bbox,
+            reseed=task.reseed,
+            **options,
+        )
+
+    def _finished(self, layer_name: str, running: _RunningLayer) -> bool:
+        """Обновляет прогресс задач слоя и сообщает об их завершении."""
+        statuses = self.client.seed_status(layer_name)
+        active = [status for status in statuses if status.active]
+        if active:
+            running.tiles_done = sum(status.tiles_done for status in active)
+            running.tiles_total = max(
+                running.tiles_total,
+                sum(status.tiles_total for status in active),
+            )
+            return False
+        return True
+
+    def _wait_for_tasks(self, until_closed: bool) -> bool:
+        """
+        Сообщает, остались ли задачи в очереди.
+
+        При ``until_closed`` пустая очередь ждёт новых задач либо закрытия.
+        """
+        with self._lock:
+            while until_closed and not self._pending and not self._closed:
+                self._changed.wait()
+            return bool(self._pending)
+
+    def run(self) -> int:
+        """
+        Выполняет очередь до конца и возвращает число неудачных задач.
+
+        Ошибки отдельных задач журналируются и не прерывают прогрев
+        остальных: кэш лишь ускоряет карту и догревается по запросам.
+        """
+        return self._drain(until_closed=False)
+
+    def start(self) -> None:
+        """Запускает фоновое выполнение очереди, если оно ещё не идёт."""
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._closed = False
+            self._worker_failed = 0
+            self._worker = threading.Thread(
+                target=self._work,
+                name="gwc-seed",
+                daemon=True,
+            )
+            self._worker.start()
+
+    def close(self) -> int:
+        """
+        Дожидается фонового прогрева всей очереди.
+
+        Возвращает число неудачных задач; без запущенного потока очередь
+        выполняется синхронно.
+        """
+        with self._lock:
+            worker = self._worker
+            self._closed = True
+            self._changed.notify_all()
+        if worker is None:
+            return self.run()
+        worker.join()
+        with self._lock:
+            self._worker = None
+        return self._worker_failed
+
+    def _work(self) -> None:
+        """Выполняет очередь в фоне до её закрытия."""
+        try:
+            self._worker_failed = self._drain(until_closed=True)
+        except Exception as exc:
+            self._worker_failed = len(self) or 1
+            self.logger.exception("GWC SEED WORKER FAIL: %s", exc)
+
+    def _drain(self, *, until_closed: bool) -> int:
+        """
+        Отправляет задачи в GWC и ждёт их завершения.
+
+        При ``until_closed`` опустевшая очередь ждёт новых задач до
+        ``close``; иначе выполнение заканчивается на пустой очереди.
+        """
+        started = perf_counter()
+        running: dict[str, _RunningLayer] = {}
+        completed = failed = 0
+        registry = get_metrics_registry()
+        while True:
+            for layer_name, item in list(running.items()):
+                try:
+                    if not self._finished(layer_name, item):
+                        continue
+                except Exception as exc:
+                    del running[layer_name]
+                    failed += len(item.tasks)
+                    self.logger.error(
+                        "GWC SEED STATUS FAIL %s: %s",
+                        layer_name,
+                        exc,
+                    )
+                    continue
+                del running[layer_name]
+                completed += len(item.tasks)
+                planned = [task.tiles for task in item.tasks]
+                registry.observe(
+                    SEED_METRIC,
+                    layer_name,
+                    seconds=perf_counter() - item.started,
+                    rows=(
+                        sum(planned)
+                        if None not in planned
+                        else item.tiles_total
+                    ),
+                )
+
+            active = sum(len(item.tasks) for item in running.values())
+            while active < self.max_tasks and (
+                    (active + 1) * self.task_threads <= self.max_threads
+            ):
+                task = self._next_task()
+                if task is None:
+                    break
+                try:
+                    self._submit(task)
+                except Exception as exc:
+                    failed += 1
+                    self.logger.error(
+                        "GWC SEED FAIL %s z%d-%d: %s",
+                        task.layer_name,
+                        task.zoom_start,
+                        task.zoom_stop,
+                        exc,
+                    )
+                    continue
+                running.setdefault(
+                    task.layer_name,
+                    _RunningLayer([], perf_counter()),
+                ).tasks.append(task)
+                active += 1
+
+            if not running:
+                if self._wait_for_tasks(until_closed):
+                    continue
+                break
+            self.logger.info(
+                "GWC SEED: активных=%d в очереди=%d тайлов=%d/%d",
+                active,
+                len(self),
+                sum(item.tiles_done for item in running.values()),
+                sum(item.tiles_total for item in running.values()),
+            )
+            time.sleep(self.poll_seconds)
+
+        self.logger.info(
+            "GWC SEED RUN %s: задач=%d ошибок=%d | %.2f сек.",
+            "FAIL" if failed else "OK",
+            completed,
+            failed,
+            perf_counter() - started,
+        )
+        return failed
@@ -0,0 +1,104 @@
+"""Индекс готовых растров публикации по датам съёмки."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+
+from .models import split_file_name
+
+# Каталог, изменённый позже этого срока до сканирования, перечитывается
+# снова: отметка mtime грубее времени создания файлов в нём.
+RACY_NANOSECONDS = 2_000_000_000
+
+
+@dataclass
+class _ScannedDirectory:
+    """Снимок одного каталога дерева результатов."""
+
+    mtime_ns: int
+    stable: bool
+    files_by_date: dict[date, list[Path]] = field(default_factory=dict)
+    # TIFF с неразборчивым именем: раньше они срывали публикацию любой даты.
+    invalid: list[Path] = field(default_factory=list)
+    directories: list[Path] = field(default_factory=list)
+
+
+class PublicationSourceIndex:
+    """
+    Находит TIFF даты без разбора имён всего дерева при каждой публикации.
+
+    Каталоги сканируются один раз; при следующих запросах перечитываются
+    только те, у которых изменился mtime, то есть добавлены, удалены или
+    переименованы файлы. Используется, когда обработка не передала
+    манифест результатов, например при публикации в debug-режиме.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._directories: dict[Path, _ScannedDirectory] = {}
+
+    def _scan(self, directory: Path) -> _ScannedDirectory | None:
+        """Возвращает снимок каталога, перечитывая его при изменении."""
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._directories.get(directory)
+        if cached is not None and cached.stable and cached.mtime_ns == mtime_ns:
+            return cached
+
+        scanned = _ScannedDirectory(
+            mtime_ns=mtime_ns,
+            stable=time.time_ns() - mtime_ns > RACY_NANOSECONDS,
+        )
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    scanned.directories.append(Path(entry.path))
+                    continue
+                if not entry.name.lower().endswith(".tif"):
+                    continue
+                path = Path(entry.path)
+                try:
+                    acquired_on = split_file_name(entry.name).date()
+                except ValueError:
+                    scanned.invalid.append(path)
+                    continue
+                scanned.files_by_date.setdefault(acquired_on, []).append(path)
+        self._directories[directory] = scanned
+        return scanned
+
+    def _walk(self) -> list[_ScannedDirectory]:
+        """Обновляет снимки дерева и возвращает актуальные каталоги."""
+        current = []
+        visited = set()
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            scanned = self._scan(directory)
+            if scanned is None:
+                continue
+            visited.add(directory)
+            current.append(scanned)
+            pending.extend(scanned.directories)
+        for directory in set(self._directories) - visited:
+            del self._directories[directory]
+        return current
+
+    def files(self, acquired_on: date) -> tuple[list[Path], list[Path]]:
+        """Возвращает TIFF даты и TIFF с неразборчивыми именами."""
+        with self._lock:
+            scanned = self._walk()
+        return (
+            sorted(
+                path
+                for directory in scanned
+                for path in directory.files_by_date.get(acquired_on, ())
+            ),
+            sorted(path for directory in scanned for path in directory.invalid),
+        )
@@ -0,0 +1,207 @@
+"""Сравнение профилей COG по размеру, времени кодирования и чтению тайлов."""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+# Профили, осмысленные для каждого продукта; первый — текущий базовый.
+CANDIDATE_PROFILES = {
+    "ndvi": ("deflate", "int16", "lerc"),
+    "ndwi": ("deflate", "int16", "lerc"),
+    "tci": ("deflate", "jpeg", "webp"),
+    "scl": ("deflate", "categorical"),
+}
+TILE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class ProfileResult:
+    """Замер одного профиля на одном растре."""
+
+    source: str
+    profile: str
+    size: int
+    encode_seconds: float
+    # Медианы чтения окна 256×256 полного разрешения и самого грубого обзора:
+    # столько GeoServer тратит на чтение одного тайла при крупном и мелком
+    # масштабе.
+    tile_ms: float
+    overview_tile_ms: float
+
+
+def _window_latency_ms(
+        band,
+        samples: int,
+        rng: random.Random,
+) -> float:
+    """Возвращает медиану чтения случайных окон одного уровня канала."""
+    width = min(TILE_SIZE, band.XSize)
+    height = min(TILE_SIZE, band.YSize)
+    timings = []
+    for _sample in range(samples):
+        x = rng.randrange(band.XSize - width + 1)
+        y = rng.randrange(band.YSize - height + 1)
+        started = perf_counter()
+        band.ReadRaster(x, y, width, height)
+        timings.append((perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def tile_latency(path: Path, samples: int = 32) -> tuple[float, float]:
+    """Замеряет чтение тайлов COG на полном разрешении и грубом обзоре."""
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+    # Кэш блоков исказил бы повторные чтения одного файла.
+    gdal.SetCacheMax(0)
+    rng = random.Random(path.name)
+    dataset = gdal.Open(str(path))
+    try:
+        band = dataset.GetRasterBand(1)
+        overviews = band.GetOverviewCount()
+        coarse = band.GetOverview(overviews - 1) if overviews else band
+        return (
+            _window_latency_ms(band, samples, rng),
+            _window_latency_ms(coarse, samples, rng),
+        )
+    finally:
+        dataset = None
+
+
+def candidate_profiles(source: Path) -> tuple[str, ...]:
+    """Возвращает профили, сравниваемые для продукта растра."""
+    from satgeo.models import split_file_name
+
+    try:
+        product = split_file_name(source.name).img_type
+    except ValueError:
+        return ("deflate",)
+    return CANDIDATE_PROFILES.get(product, ("deflate",))
+
+
+def benchmark(
+        sources: Iterable[Path],
+        workdir: Path,
+        *,
+        profiles: tuple[str, ...] | None = None,
+        encode: Callable[[Path, Path, str], None],
+        measure: Callable[[Path], tuple[float, float]] = tile_latency,
+) -> list[ProfileResult]:
+    """Кодирует каждый растр всеми профилями и замеряет результат."""
+    results = []
+    for source in sources:
+        for profile in profiles or candidate_profiles(source):
+            destination = workdir / f"{source.stem}.{profile}.tif"
+            started = perf_counter()
+            encode(source, destination, profile)
+            encode_seconds = perf_counter() - started
+            tile_ms, overview_tile_ms = measure(destination)
+            results.append(ProfileResult(
+                source=source.name,
+                profile=profile,
+                size=destination.stat().st_size,
+                encode_seconds=encode_seconds,
+                tile_ms=tile_ms,
+                overview_tile_ms=overview_tile_ms,
+            ))
+    return results
+
+
+def format_results(results: list[ProfileResult]) -> list[str]:
+    """Форматирует замеры таблицей относительно первого профиля растра."""
+    lines = [
+        f"{'растр':<44} {'профиль':<12} {'МиБ':>8} {'доля':>6} "
+        f"{'кодир., с':>10} {'тайл, мс':>9} {'обзор, мс':>10}"
+    ]
+    baseline: dict[str, int] = {}
+    for result in results:
+        base = baseline.setdefault(result.source, result.size)
+        lines.append(
+            f"{result.source:<44} {result.profile:<12} "
+            f"{result.size / 1024 / 1024:>8.2f} "
+            f"{result.size / base if base else 0:>6.2f} "
+            f"{result.encode_seconds:>10.2f} {result.tile_ms:>9.2f} "
+            f"{result.overview_tile_ms:>10.2f}"
+        )
+    return lines
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Создаёт CLI сравнения профилей."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Кодирует обработанные растры профилями COG и сравнивает размер, "
+            "время кодирования и чтение тайлов. GeoServer не затрагивается."
+        ),
+    )
+    parser.add_argument("sources", nargs="+", type=Path)
+    parser.add_argument(
+        "--profile",
+        action="append",
+        help="Профиль для всех растров; можно повторять "
+        "(по умолчанию: профили продукта)",
+    )
+    parser.add_argument("--samples", type=int, default=32)
+    parser.add_argument(
+        "--keep",
+        type=Path,
+        help="Сохранить закодированные COG в директории",
+    )
+    parser.add_argument("--report", type=Path, help="JSON-отчёт замеров")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Сравнивает профили и печатает таблицу замеров."""
+    from satgeo.optimizer import get_cog_profile, optimize_geotiff
+
+    options = build_parser().parse_args(argv)
+    if options.samples <= 0:
+        raise ValueError("--samples должен быть положительным")
+    profiles = tuple(options.profile) if options.profile else None
+    for name in profiles or ():
+        get_cog_profile(name)
+
+    def encode(source: Path, destination: Path, profile: str) -> None:
+        """Кодирует растр профилем без повторов публикации."""
+        optimize_geotiff(
+            source,
+            destination,
+            get_cog_profile(profile),
+            retries=1,
+        )
+
+    with TemporaryDirectory(prefix="cog-benchmark-") as temporary:
+        workdir = options.keep or Path(temporary)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = benchmark(
+            options.sources,
+            workdir,
+            profiles=profiles,
+            encode=encode,
+            measure=lambda path: tile_latency(path, options.samples),
+        )
+    for line in format_results(results):
+        print(line)
+    if options.report:
+        options.report.parent.mkdir(parents=True, exist_ok=True)
+        options.report.write_text(
+            json.dumps(
+                [asdict(result) for result in results],
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
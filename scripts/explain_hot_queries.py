@@ -0,0 +1,252 @@
+"""EXPLAIN частых запросов обработки и публикации к PostGIS."""
+from __future__ import annotations
+
+import argparse
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time
+from typing import Any
+
+from db.gateway import SqlGateway
+from db.repositories import FieldRepository, LayerRepository, NdviRepository
+from domain.models import Field, LayerMetadataUpdate
+
+# Растущие таблицы, последовательное чтение которых считается регрессией.
+GROWING_TABLES = ("maps_ndvi_values", "maps_layer")
+_NDVI_PARTITION = re.compile(r"^maps_ndvi_values_(\d{4}|default)$")
+
+
+class ExplainGateway(SqlGateway):
+    """Gateway, который вместо выполнения запроса сохраняет его план."""
+
+    def __init__(self, pg_connection: Any, *, analyze: bool = False) -> None:
+        super().__init__(pg_connection)
+        self.analyze = analyze
+        self.plans: list[dict[str, Any]] = []
+
+    def _explain(self, query: str, params: tuple[Any, ...] | None) -> None:
+        """Выполняет EXPLAIN запроса и запоминает корневой узел плана."""
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if self.analyze else "FORMAT JSON"
+        self.cursor.execute(f"EXPLAIN ({options}) {query}", params)
+        self.plans.append(self.cursor.fetchone()[0][0])
+
+    def rows(
+            self,
+            query: str,
+            params: tuple[Any, ...] | None = None,
+    ) -> list[dict]:
+        """Сохраняет план и возвращает пустой результат."""
+        self._explain(query, params)
+        return []
+
+    def row(
+            self,
+            query: str,
+            params: tuple[Any, ...] | None = None,
+    ) -> dict | None:
+        """Сохраняет план и возвращает отсутствие строки."""
+        self._explain(query, params)
+        return None
+
+    def execute(
+            self,
+            query: str,
+            params: tuple[Any, ...] | None = None,
+            *,
+            commit: bool = True,
+    ) -> None:
+        """Сохраняет план изменяющего запроса, не фиксируя транзакцию."""
+        self._explain(query, params)
+
+
+@dataclass(frozen=True)
+class PlanSummary:
+    """Признаки плана, по которым видна деградация частого запроса."""
+
+    name: str
+    total_cost: float
+    # Растущие таблицы и секции, прочитанные последовательным сканированием.
+    sequential: tuple[str, ...]
+    # Секции maps_ndvi_values, оставшиеся в плане после отсечения.
+    ndvi_partitions: tuple[str, ...]
+    # Фактическое время выполнения; None без ANALYZE.
+    execution_ms: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        """План не читает растущие таблицы целиком и затрагивает один сезон."""
+        return not self.sequential and len(self.ndvi_partitions) <= 1
+
+
+def _nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Обходит узлы плана в глубину."""
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def summarize(name: str, explained: dict[str, Any]) -> PlanSummary:
+    """Сводит JSON-план EXPLAIN к признакам регрессии."""
+    root = explained["Plan"]
+    sequential = []
+    partitions = []
+    for node in _nodes(root):
+        relation = node.get("Relation Name")
+        if relation is None:
+            continue
+        if _NDVI_PARTITION.match(relation) and relation not in partitions:
+            partitions.append(relation)
+        if node.get("Node Type") == "Seq Scan" and relation.startswith(
+                GROWING_TABLES
+        ):
+            sequential.append(relation)
+    return PlanSummary(
+        name=name,
+        total_cost=float(root.get("Total Cost", 0.0)),
+        sequential=tuple(dict.fromkeys(sequential)),
+        ndvi_partitions=tuple(partitions),
+        execution_ms=explained.get("Execution Time"),
+    )
+
+
+def hot_queries(
+        *,
+        acquired_on: date,
+        agroids: list[int],
+        fields: list[Field],
+) -> list[tuple[str, Callable[[SqlGateway], Any]]]:
+    """Возвращает частые запросы репозиториев с типичными параметрами."""
+    year = acquired_on.year
+    update = LayerMetadataUpdate(
+        acquired_on=acquired_on,
+        agroid=agroids[0],
+        acquired_at=datetime.combine(acquired_on, time(8), tzinfo=UTC),
+        satellite="S2A",
+        source_level="L2A",
+        processing_baseline=None,
+        source_tiles=(),
+    )
+    return [
+        (
+            "NdviRepository.is_complete",
+            lambda gateway: NdviRepository(gateway).is_complete(
+                fields,
+                acquired_on,
+            ),
+        ),
+        (
+            "LayerRepository.missing_agroids_many",
+            lambda gateway: LayerRepository(gateway).missing_agroids_many(
+                [acquired_on]
+            ),
+        ),
+        (
+            "LayerRepository.quality_totals",
+            lambda gateway: LayerRepository(gateway).quality_totals(
+                agroids=agroids,
+                acquired_on=acquired_on,
+            ),
+        ),
+        (
+            "LayerRepository.refresh_metadata",
+            lambda gateway: LayerRepository(gateway).refresh_metadata([update]),
+        ),
+        (
+            "FieldRepository.revisions",
+            lambda gateway: FieldRepository(gateway).revisions(
+                agroids=agroids,
+                year=year,
+                acquired_on=acquired_on,
+            ),
+        ),
+        (
+            "FieldRepository.extents",
+            lambda gateway: FieldRepository(gateway).extents(
+                agroids=agroids,
+                year=year,
+                srids=[3857, 4326],
+            ),
+        ),
+        (
+            "FieldRepository.snapshots",
+            lambda gateway: FieldRepository(gateway).snapshots(
+                agroids=agroids,
+                year=year,
+                srid=3857,
+                acquired_on=acquired_on,
+            ),
+        ),
+    ]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Создаёт CLI проверки планов."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Печатает планы частых запросов и завершается с кодом 1, если "
+            "растущие таблицы читаются целиком или не отсекаются секции NDVI."
+        ),
+    )
+    parser.add_argument(
+        "--date",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="Дата съёмки в формате YYYY-MM-DD (по умолчанию: сегодня)",
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="EXPLAIN ANALYZE; изменения откатываются вместе с транзакцией",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Выполняет EXPLAIN каждого частого запроса и печатает сводку."""
+    import psycopg2
+
+    from db.connection import get_database_config
+
+    options = build_parser().parse_args(argv)
+    agroids = list(LayerRepository.REQUIRED_AGROIDS)
+    connection = psycopg2.connect(**get_database_config())
+    summaries = []
+    try:
+        with SqlGateway(connection) as reader:
+            fields = FieldRepository(reader).list_for_agro(
+                agroids[0],
+                options.date.year,
+            ) or [Field(id=0, name="")]
+        for name, run in hot_queries(
+                acquired_on=options.date,
+                agroids=agroids,
+                fields=fields,
+        ):
+            with ExplainGateway(connection, analyze=options.analyze) as gateway:
+                run(gateway)
+                summaries.extend(
+                    summarize(name, plan)
+                    for plan in gateway.plans
+                )
+    finally:
+        connection.rollback()
+        connection.close()
+
+    for summary in summaries:
+        timing = (
+            f" | {summary.execution_ms:.2f} мс"
+            if summary.execution_ms is not None
+            else ""
+        )
+        print(
+            f"{'OK  ' if summary.ok else 'WARN'} {summary.name}: "
+            f"cost={summary.total_cost:.0f}, "
+            f"seq={','.join(summary.sequential) or '-'}, "
+            f"ndvi={','.join(summary.ndvi_partitions) or '-'}{timing}"
+        )
+    return 0 if all(summary.ok for summary in summaries) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
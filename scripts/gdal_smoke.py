@@ -11,10 +11,9 @@ import numpy as np
 from osgeo import gdal, osr
 
 from processing.domain import ProductLevel, SceneContext
-from processing.indexes import SpectralIndexProcessor
 from processing.processors.cloudmask import RescaleSCLProcessor
 from processing.processors.combine import MosaicProcessor
-from processing.processors.sentinel import AgroCropProcessor
+from processing.processors.footprint import FootprintProductProcessor
 from processing.raster import FieldRasterReader
 
 gdal.UseExceptions()
@@ -86,23 +85,18 @@ class SmokeCloudMaskPaths:
         return str(self._scl_10m)
 
 class SmokeCropPaths:
-    """Пути одного синтетического растра и результатов crop."""
+    """Пути результатов хозяйства синтетической сцены."""
 
-    def __init__(self, root: Path, source: Path):
+    def __init__(self, root: Path):
         self._root = root
-        self._source = source
-
-    def sources(self, _stage: str) -> list[str]:
-        """Возвращает общий тестовый источник для любого продукта."""
-        return [str(self._source)]
 
     def destination(self, stage: str, agroid: int) -> str:
-        """Возвращает отдельный crop-результат продукта."""
+        """Возвращает отдельный результат продукта."""
         return str(self._root / f"{stage}_a{agroid}.tif")
 
 
 class SmokeFieldData:
-    """Фиксированные границы хозяйства для crop smoke-test."""
+    """Фиксированные границы хозяйства для footprint smoke-test."""
 
     def __init__(self):
         self.bounds_calls = 0
@@ -116,7 +110,7 @@ class SmokeFieldData:
     ) -> tuple[float, float, float, float]:
         """Возвращает центральную область синтетического растра."""
         if (year, agroid, srid) != (2026, 3, 3857):
-            raise AssertionError("Crop processor передал неверный контекст")
+            raise AssertionError("Footprint processor передал неверный контекст")
         self.bounds_calls += 1
         return 10.0, 10.0, 30.0, 30.0
 
@@ -199,100 +193,54 @@ def run_cloud_mask_smoke(root: Path) -> None:
         raise AssertionError("NearestNeighbour изменил классы SCL")
 
 
-def run_spectral_index_smoke(root: Path) -> None:
-    """Проверяет чтение каналов и запись Float32 спектрального индекса."""
+def run_footprint_smoke(root: Path) -> None:
+    """Проверяет продукты хозяйства по окну каналов без tile-level TIFF."""
     root.mkdir()
-    b03 = root / "b03.tif"
-    b04 = root / "b04.tif"
-    b08 = root / "b08.tif"
-    ndvi_destination = root / "ndvi.tif"
-    ndwi_destination = root / "ndwi.tif"
-    write_raster(
-        b03,
-        np.full((4, 4), 3, dtype=np.int16),
-        pixel_size=10,
-        data_type=gdal.GDT_Int16,
-    )
-    write_raster(
-        b04,
-        np.full((4, 4), 2, dtype=np.int16),
-        pixel_size=10,
-        data_type=gdal.GDT_Int16,
-    )
-    write_raster(
-        b08,
-        np.full((4, 4), 4, dtype=np.int16),
-        pixel_size=10,
-        data_type=gdal.GDT_Int16,
-    )
-
-    processor = SpectralIndexProcessor(
-        b03_file=str(b03),
-        b04_file=str(b04),
-        b08_file=str(b08),
-    )
-    original_reader = processor._read_window
-    loaded_paths = []
-
-    def counting_reader(dataset, window) -> np.ndarray:
-        """Запоминает канал каждого фактического оконного чтения."""
-        loaded_paths.append(dataset.GetDescription())
-        return original_reader(dataset, window)
-
-    processor._read_window = counting_reader
-    processor.create(
-        {
-            "ndvi": str(ndvi_destination),
-            "ndwi": str(ndwi_destination),
-        }
-    )
-
-    ndvi = read_raster(ndvi_destination)
-    ndwi = read_raster(ndwi_destination)
-    if not np.allclose(ndvi, 1 / 3):
-        raise AssertionError("NDVI рассчитан неверно")
-    if not np.allclose(ndwi, -1 / 7):
-        raise AssertionError("NDWI рассчитан неверно")
-    read_counts = {
-        path: loaded_paths.count(str(path))
-        for path in (b03, b04, b08)
-    }
-    if len(set(read_counts.values())) != 1:
-        raise AssertionError(
-            "Общий канал B08 был прочитан чаще вторичных каналов: "
-            f"{read_counts}"
+    bands = {"b03": 3, "b04": 2, "b08": 4, "tci": 7}
+    for band, value in bands.items():
+        write_raster(
+            root / f"{band}.tif",
+            np.full((4, 4), value, dtype=np.int16),
+            pixel_size=10,
+            data_type=gdal.GDT_Int16,
         )
 
+    class SourcePaths:
+        """Синтетические каналы сцены."""
 
-def run_crop_smoke(root: Path) -> None:
-    """Проверяет crop по bounds и кеширование границ хозяйства."""
-    root.mkdir()
-    source = root / "source.tif"
-    write_raster(
-        source,
-        np.arange(16, dtype=np.float32).reshape(4, 4),
-        pixel_size=10,
-        data_type=gdal.GDT_Float32,
-    )
-    paths = SmokeCropPaths(root, source)
+        def sources(self, band: str) -> list[str]:
+            """Возвращает тестовый канал."""
+            return [str(root / f"{band}.tif")]
+
+    paths = SmokeCropPaths(root)
     field_data = SmokeFieldData()
-    AgroCropProcessor(
+    FootprintProductProcessor(
         make_scene(level=ProductLevel.L1C, agroids=(3,)),
+        SourcePaths(),
         paths,
         field_data,
         SimpleNamespace(destination_srid=3857, nodata=-9999.0),
+        products={"tci", "ndvi", "ndwi"},
     ).run()
 
     for product in ("tci", "ndvi", "ndwi"):
         result = read_raster(Path(paths.destination(product, 3)))
         if result.shape != (2, 2):
             raise AssertionError(
-                f"Crop {product} имеет неверный размер: {result.shape}"
+                f"Продукт {product} имеет неверный размер: {result.shape}"
             )
+    ndvi = read_raster(Path(paths.destination("ndvi", 3)))
+    if not np.allclose(ndvi, 1 / 3):
+        raise AssertionError("NDVI хозяйства по окну каналов рассчитан неверно")
+    ndwi = read_raster(Path(paths.destination("ndwi", 3)))
+    if not np.allclose(ndwi, -1 / 7):
+        raise AssertionError("NDWI хозяйства по окну каналов рассчитан неверно")
     if field_data.bounds_calls != 1:
         raise AssertionError(
             "Границы хозяйства были повторно прочитаны для каждого продукта"
         )
+    if list(root.glob("*_native.tif")):
+        raise AssertionError("Созданы tile-level промежуточные растры")
 
 
 def run_field_reader_smoke(root: Path) -> None:
@@ -391,8 +339,7 @@ def run_smoke_test() -> None:
     with TemporaryDirectory(prefix="sentinel-gdal-smoke-") as temporary:
         root = Path(temporary)
         run_cloud_mask_smoke(root / "cloud-mask")
-        run_spectral_index_smoke(root / "spectral-index")
-        run_crop_smoke(root / "crop")
+        run_footprint_smoke(root / "footprint")
         run_field_reader_smoke(root / "field-reader")
         run_mosaic_smoke(root / "mosaic")
 
@@ -0,0 +1,96 @@
+"""Рендер пирамиды тайлов опубликованного COG в MBTiles."""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Создаёт CLI рендера тайлов."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Рендерит тайлы WebMercatorQuad растра COG с окраской стиля "
+            "продукта в MBTiles. GeoServer не затрагивается."
+        ),
+    )
+    parser.add_argument("source", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument(
+        "--product",
+        help="Продукт для окраски (по умолчанию: из имени растра)",
+    )
+    parser.add_argument("--zoom-start", type=int, default=8)
+    parser.add_argument("--zoom-stop", type=int, default=14)
+    parser.add_argument("--format", choices=("png", "webp"), default="png")
+    parser.add_argument("--workers", type=int, default=2)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Рендерит тайлы рамки растра и печатает итог."""
+    from osgeo import gdal, osr
+
+    from satgeo.models import split_file_name
+    from satgeo.renderer import (
+        COLOR_RAMPS,
+        MBTilesSink,
+        TileRenderer,
+        tiles_for_bounds,
+    )
+
+    options = build_parser().parse_args(argv)
+    if options.zoom_start < 0 or options.zoom_start > options.zoom_stop:
+        raise ValueError("Неверный диапазон --zoom-start/--zoom-stop")
+    product = options.product or split_file_name(options.source.name).img_type
+    if product not in COLOR_RAMPS and product != "tci":
+        raise ValueError(f"Нет окраски для продукта {product}")
+
+    dataset = gdal.Open(str(options.source))
+    try:
+        minx, xres, _xrot, maxy, _yrot, yres = dataset.GetGeoTransform()
+        maxx = minx + xres * dataset.RasterXSize
+        miny = maxy + yres * dataset.RasterYSize
+        source_srs = osr.SpatialReference(wkt=dataset.GetProjection())
+    finally:
+        dataset = None
+    mercator = osr.SpatialReference()
+    mercator.ImportFromEPSG(3857)
+    source_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    mercator.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    bounds = osr.CoordinateTransformation(source_srs, mercator).TransformBounds(
+        minx,
+        miny,
+        maxx,
+        maxy,
+        21,
+    )
+
+    tiles = [
+        (zoom, x, y)
+        for zoom in range(options.zoom_start, options.zoom_stop + 1)
+        for x, y in tiles_for_bounds(bounds, zoom)
+    ]
+    renderer = TileRenderer(workers=options.workers, image_format=options.format)
+    try:
+        with MBTilesSink(
+                options.output,
+                name=options.source.stem,
+                image_format=options.format,
+        ) as sink:
+            summary = renderer.render(
+                options.source,
+                COLOR_RAMPS.get(product),
+                tiles,
+                sink,
+            )
+    finally:
+        renderer.close()
+    print(
+        f"{options.output}: тайлов={summary.tiles} пустых={summary.empty} "
+        f"{summary.size / 1024 / 1024:.1f} МиБ"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
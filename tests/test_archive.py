@@ -1,11 +1,23 @@
 """Тесты безопасной и атомарной распаковки Sentinel-архивов."""
 
+import os
 import zipfile
 from pathlib import Path
 
 import pytest
 
+from core.archive_manifest import build_manifest, trusted_manifest, write_manifest
 from processing.archive import ArchiveError, SentinelArchive
+from processing.archive_index import index_path
+from processing.compaction import ArchiveCompactionService
+from processing.discovery import ArchivePairFinder
+from processing.triage import (
+    AgroCloudTriage,
+    CloudTriagePolicy,
+    TriageMode,
+    read_triage,
+    write_triage,
+)
 
 ARCHIVE_NAME = (
     "S2A_MSIL2A_20260701T081611_N0511_R121_T38ULA_"
@@ -122,3 +134,259 @@ def test_new_baseline_requires_radiometric_metadata(tmp_path):
 
     with pytest.raises(ArchiveError, match="metadata XML"):
         SentinelArchive(archive_path).read_band_offsets()
+
+
+L2A_MEMBERS = {
+    "PRODUCT.SAFE/MTD_MSIL2A.xml": b"<Level-2A_User_Product/>",
+    "PRODUCT.SAFE/manifest.safe": b"manifest",
+    "PRODUCT.SAFE/GRANULE/L2A/QI_DATA/MSK_CLDPRB_20m.jp2": b"unused" * 100,
+    "PRODUCT.SAFE/GRANULE/L2A/IMG_DATA/R20m/T38ULA_B04_20m.jp2": b"unused",
+    "PRODUCT.SAFE/GRANULE/L2A/IMG_DATA/R10m/T38ULA_TCI_10m.jp2": b"tci",
+    "PRODUCT.SAFE/GRANULE/L2A/IMG_DATA/R10m/T38ULA_B03_10m.jp2": b"b03",
+    "PRODUCT.SAFE/GRANULE/L2A/IMG_DATA/R10m/T38ULA_B04_10m.jp2": b"b04",
+    "PRODUCT.SAFE/GRANULE/L2A/IMG_DATA/R10m/T38ULA_B08_10m.jp2": b"b08",
+    "PRODUCT.SAFE/GRANULE/L2A/IMG_DATA/R20m/T38ULA_SCL_20m.jp2": b"scl",
+}
+L2A_BANDS = ("TCI", "B03", "B04", "B08", "SCL")
+
+
+def make_l2a_zip(path: Path) -> None:
+    """Создаёт полный L2A ZIP с используемыми и лишними участниками."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in L2A_MEMBERS.items():
+            archive.writestr(name, content)
+
+
+def test_archive_compaction_keeps_only_pipeline_members(tmp_path):
+    """Сжатие оставляет metadata XML и каналы, которые читает обработка."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    make_l2a_zip(archive_path)
+    original_size = archive_path.stat().st_size
+
+    result = SentinelArchive(archive_path).compact(L2A_BANDS)
+
+    with zipfile.ZipFile(archive_path) as archive:
+        names = set(archive.namelist())
+        assert archive.testzip() is None
+    assert names == {
+        name
+        for name in L2A_MEMBERS
+        if name.endswith(".xml") or "R10m" in name or "SCL" in name
+    }
+    assert result.changed is True
+    assert result.dropped_members == 3
+    manifest = trusted_manifest(archive_path)
+    assert manifest is not None
+    assert manifest.original_size == original_size
+    assert not archive_path.with_name(f"{ARCHIVE_NAME}.compact.tmp").exists()
+
+    extracted = SentinelArchive(archive_path).extract(
+        tmp_path / "output",
+        L2A_BANDS,
+    )
+    assert len(list(extracted.rglob("*.jp2"))) == 5
+
+
+def test_archive_compaction_keeps_verified_download_digest(tmp_path):
+    """Сжатая копия сохраняет проверенный дайджест исходной загрузки."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    make_l2a_zip(archive_path)
+    write_manifest(
+        archive_path,
+        build_manifest(
+            archive_path,
+            algorithm="MD5",
+            digest="ABC123",
+            verified=True,
+        ),
+    )
+
+    SentinelArchive(archive_path).compact(L2A_BANDS)
+
+    manifest = trusted_manifest(archive_path)
+    assert manifest.verified is True
+    assert (manifest.original_algorithm, manifest.original_digest) == (
+        "md5",
+        "abc123",
+    )
+    assert manifest.digest != "abc123"
+
+
+def test_archive_compaction_is_idempotent_and_keeps_original_size(tmp_path):
+    """Повторное сжатие не переписывает ZIP и сохраняет исходный размер."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    make_l2a_zip(archive_path)
+    original_size = archive_path.stat().st_size
+    SentinelArchive(archive_path).compact(L2A_BANDS)
+    compacted_mtime = archive_path.stat().st_mtime_ns
+
+    result = SentinelArchive(archive_path).compact(L2A_BANDS)
+
+    assert result.changed is False
+    assert result.original_size == original_size
+    assert archive_path.stat().st_mtime_ns == compacted_mtime
+
+
+def test_archive_compaction_refuses_incomplete_product(tmp_path):
+    """Архив без обязательного канала не переписывается."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    make_zip(archive_path)
+    content = archive_path.read_bytes()
+
+    with pytest.raises(ArchiveError, match="сжатие отменено"):
+        SentinelArchive(archive_path).compact(L2A_BANDS)
+
+    assert archive_path.read_bytes() == content
+
+
+def test_archive_compaction_dry_run_does_not_modify_zip(tmp_path):
+    """Dry-run только оценивает экономию места."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    make_l2a_zip(archive_path)
+    content = archive_path.read_bytes()
+
+    result = SentinelArchive(archive_path).compact(L2A_BANDS, dry_run=True)
+
+    assert result.changed is False
+    assert result.dropped_members == 3
+    assert result.compacted_size < result.original_size
+    assert archive_path.read_bytes() == content
+    assert trusted_manifest(archive_path) is None
+
+
+def test_pair_finder_ranks_compacted_archive_by_original_size(tmp_path):
+    """Сжатая копия сравнивается с повторной публикацией по полному размеру."""
+    compacted = tmp_path / ARCHIVE_NAME
+    make_l2a_zip(compacted)
+    SentinelArchive(compacted).compact(L2A_BANDS)
+    full_size = trusted_manifest(compacted).original_size
+    rival = tmp_path / "rival.zip"
+    rival.write_bytes(b"x" * (full_size - 1))
+
+    assert compacted.stat().st_size < rival.stat().st_size
+    assert ArchivePairFinder._archive_rank(compacted)[0] == full_size
+    assert ArchivePairFinder._archive_rank(compacted) > (
+        ArchivePairFinder._archive_rank(rival)
+    )
+
+
+def test_compaction_service_aggregates_failed_archives(tmp_path):
+    """Ошибка одного архива не прерывает сжатие остальных."""
+    good = tmp_path / ARCHIVE_NAME
+    make_l2a_zip(good)
+    bad = tmp_path / ARCHIVE_NAME.replace("20260701T120000", "20260701T130000")
+    make_zip(bad)
+    service = ArchiveCompactionService(tmp_path, workers=2)
+
+    with pytest.raises(ArchiveError, match=bad.name):
+        service.run()
+
+    assert trusted_manifest(good).compacted is True
+
+
+def write_l2a_metadata(path: Path) -> None:
+    """Создаёт L2A ZIP с metadata XML и каналами без сжатия."""
+    metadata = (
+        "<Level-2A_User_Product>"
+        '<BOA_ADD_OFFSET band_id="2">-1000</BOA_ADD_OFFSET>'
+        '<BOA_ADD_OFFSET band_id="3">-1000</BOA_ADD_OFFSET>'
+        '<BOA_ADD_OFFSET band_id="7">-1000</BOA_ADD_OFFSET>'
+        "</Level-2A_User_Product>"
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("PRODUCT.SAFE/MTD_MSIL2A.xml", metadata)
+        for name, content in L2A_MEMBERS.items():
+            if name.endswith(".jp2"):
+                archive.writestr(name, content)
+
+
+def test_archive_index_serves_offsets_without_reopening_zip(
+        tmp_path,
+        monkeypatch,
+):
+    """Повторная инспекция читает offset и каналы из sidecar-индекса."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    write_l2a_metadata(archive_path)
+    SentinelArchive(archive_path).read_band_offsets()
+
+    def forbidden(*_args, **_kwargs):
+        """Запрещает повторное чтение central directory."""
+        raise AssertionError("ZIP не должен открываться")
+
+    monkeypatch.setattr("processing.archive.zipfile.ZipFile", forbidden)
+    monkeypatch.setattr("processing.archive.zipfile.is_zipfile", forbidden)
+    archive = SentinelArchive(archive_path)
+
+    assert archive.read_band_offsets().b04 == -1000.0
+    assert archive.index().bands["SCL"].endswith("T38ULA_SCL_20m.jp2")
+    assert archive.index().bands["B04"].endswith("T38ULA_B04_10m.jp2")
+    monkeypatch.setattr(
+        SentinelArchive,
+        "_matches_band",
+        staticmethod(forbidden),
+    )
+    extracted = archive.extract(tmp_path / "output", ("B04", "SCL"))
+    assert sorted(path.name for path in extracted.rglob("*.jp2")) == [
+        "T38ULA_B04_10m.jp2",
+        "T38ULA_SCL_20m.jp2",
+    ]
+
+
+def test_indexed_extraction_detects_corrupted_member(tmp_path):
+    """Чтение по смещению проверяет CRC участника."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    write_l2a_metadata(archive_path)
+    index = SentinelArchive(archive_path).index()
+    stat = archive_path.stat()
+    content = bytearray(archive_path.read_bytes())
+    position = content.index(b"b08")
+    content[position:position + 3] = b"xxx"
+    archive_path.write_bytes(bytes(content))
+    os.utime(archive_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert index.matches(archive_path)
+
+    with pytest.raises(ArchiveError, match="CRC"):
+        SentinelArchive(archive_path).extract(tmp_path / "output", ("B08",))
+
+    assert not index_path(archive_path).exists()
+
+
+def test_archive_index_is_rebuilt_after_archive_changes(tmp_path):
+    """Изменённый ZIP не читается по устаревшему индексу."""
+    archive_path = tmp_path / ARCHIVE_NAME
+    write_l2a_metadata(archive_path)
+    SentinelArchive(archive_path).index()
+    make_zip(archive_path)
+
+    index = SentinelArchive(archive_path).index()
+
+    assert [member.name for member in index.members] == [MEMBER_NAME]
+    assert index.band_offsets is None
+
+
+def test_cloud_triage_policy_merges_tiles_and_decides_mode():
+    """Счётчики двух тайлов складываются до сравнения с порогами."""
+    policy = CloudTriagePolicy(skip_below=0.05, statistics_only_below=0.5)
+    merged = AgroCloudTriage(3, 0, 100).merge(AgroCloudTriage(3, 40, 100))
+
+    assert merged.clear_fraction == pytest.approx(0.2)
+    assert policy.decide(merged) is TriageMode.STATISTICS
+    assert policy.decide(AgroCloudTriage(3, 1, 100)) is TriageMode.SKIP
+    assert policy.decide(AgroCloudTriage(3, 90, 100)) is TriageMode.FULL
+    assert policy.decide(AgroCloudTriage(3, 0, 0)) is TriageMode.FULL
+    with pytest.raises(ValueError):
+        CloudTriagePolicy(skip_below=2)
+
+
+def test_cloud_triage_sidecar_is_invalidated_by_archive_change(tmp_path):
+    """Сохранённые счётчики действуют, пока архив не изменился."""
+    archive_path = tmp_path / "scene.zip"
+    archive_path.write_bytes(b"archive")
+    bounds = (1.0, 2.0, 3.0, 4.0)
+    write_triage(archive_path, {3: (bounds, AgroCloudTriage(3, 10, 20))})
+
+    assert read_triage(archive_path) == {3: (bounds, AgroCloudTriage(3, 10, 20))}
+
+    archive_path.write_bytes(b"archive changed")
+
+    assert read_triage(archive_path) == {}
@@ -1,5 +1,6 @@
 """Тесты поиска, авторизации и возобновляемой загрузки CDSE."""
 
+import hashlib
 import io
 import zipfile
 from datetime import date
@@ -11,12 +12,14 @@ from cdse.auth import CdseCredentials, CdseTokenProvider
 from cdse.client import CdseODataClient
 from cdse.download import ODataProductDownloader
 from cdse.exceptions import CdseAuthError, CdseDownloadError, CdseQueryError
+from cdse.integrity import StreamingDigest
 from cdse.models import ProductRecord
 from cdse.search import ODataProductSearcher
 from cdse.selection import select_complete_acquisitions
 from cdse.service import CdseService, _remaining_download_size
 from cdse.utils import build_archive_index, normalize_tile, split_date_range
 from cli.commands.download import resolve_download_range
+from core.archive_manifest import read_manifest
 from core.settings import (
     L1C_COLLECTION,
     L1C_PRODUCT_TYPE,
@@ -312,6 +315,119 @@ def test_archive_index_scans_only_requested_dates_and_tiles(tmp_path):
     ) == {selected.name}
 
 
+
+def zip_bytes() -> bytes:
+    """Возвращает содержимое минимального корректного ZIP."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("manifest.safe", b"ok")
+    return buffer.getvalue()
+
+
+def test_download_verifies_streaming_md5_and_writes_manifest(tmp_path):
+    """Загрузка сверяет MD5 по потоку и сохраняет sidecar-манифест."""
+    payload = zip_bytes()
+    checksum = hashlib.md5(payload).hexdigest()
+    record = product(
+        name="SCENE.SAFE",
+        raw={"Checksum": [{"Algorithm": "MD5", "Value": checksum.upper()}]},
+    )
+    response = FakeResponse(200, [payload[:10], payload[10:]])
+
+    result = ODataProductDownloader(
+        FakeDownloadClient(response)
+    ).download_product(record, archive_root=tmp_path)
+
+    manifest = read_manifest(result)
+    assert manifest is not None
+    assert manifest.algorithm == "md5"
+    assert manifest.digest == checksum
+    assert manifest.verified is True
+    assert manifest.matches(result)
+
+
+def test_download_rejects_checksum_mismatch(tmp_path):
+    """Архив с неверной контрольной суммой не попадает в хранилище."""
+    record = product(
+        name="SCENE.SAFE",
+        raw={"Checksum": [{"Algorithm": "MD5", "Value": "0" * 32}]},
+    )
+    response = FakeResponse(200, [zip_bytes()])
+    progress = []
+
+    with pytest.raises(CdseDownloadError, match="Контрольная сумма MD5"):
+        ODataProductDownloader(
+            FakeDownloadClient(response)
+        ).download_product(
+            record,
+            archive_root=tmp_path,
+            progress=progress.append,
+        )
+
+    target_dir = tmp_path / "2026" / "38ULA"
+    assert list(target_dir.iterdir()) == []
+    assert sum(progress) == 0
+
+
+def test_resumed_download_digest_covers_existing_prefix(tmp_path):
+    """После докачки дайджест учитывает байты, скачанные ранее."""
+    partial = tmp_path / "scene.zip.tmp"
+    partial.write_bytes(b"first-")
+    response = FakeResponse(
+        206,
+        [b"second"],
+        headers={"Content-Range": "bytes 6-11/12"},
+    )
+    digest = StreamingDigest("md5")
+
+    ODataProductDownloader(
+        FakeDownloadClient(response)
+    )._download_with_resume("id", partial, digest=digest)
+
+    assert digest.hexdigest() == hashlib.md5(b"first-second").hexdigest()
+
+
+
+def test_downloaded_archive_is_cataloged_without_failing_download(tmp_path):
+    """Ошибка построения индекса не отменяет успешную загрузку."""
+    record = product(name="SCENE.SAFE")
+    cataloged = []
+
+    def catalog(path):
+        """Запоминает архив и имитирует сбой каталогизатора."""
+        cataloged.append(path)
+        raise RuntimeError("index failed")
+
+    result = ODataProductDownloader(
+        FakeDownloadClient(FakeResponse(200, [zip_bytes()])),
+        after_download=catalog,
+    ).download_product(record, archive_root=tmp_path)
+
+    assert cataloged == [result]
+    assert result.is_file()
+
+def test_archive_index_trusts_current_manifest(tmp_path, monkeypatch):
+    """Индекс не открывает ZIP с актуальным манифестом и перепроверяет изменённый."""
+    record = product(name="SCENE.SAFE")
+    response = FakeResponse(200, [zip_bytes()])
+    archive = ODataProductDownloader(
+        FakeDownloadClient(response)
+    ).download_product(record, archive_root=tmp_path)
+    opened = []
+    monkeypatch.setattr(
+        "cdse.utils.zipfile.is_zipfile",
+        lambda path: opened.append(path) or False,
+    )
+
+    assert build_archive_index(tmp_path) == {archive.name}
+    assert opened == []
+
+    archive.write_bytes(b"replaced after verification")
+
+    assert build_archive_index(tmp_path) == set()
+    assert opened == [archive]
+
+
 def test_client_closes_unauthorized_response_before_retry():
     """Ответ 401 освобождает соединение пула до повторного запроса."""
 
@@ -0,0 +1,31 @@
+"""Тесты сравнения профилей кодирования COG."""
+from pathlib import Path
+
+from scripts.cog_benchmark import benchmark, format_results
+
+
+def test_benchmark_encodes_product_candidates_and_reports_ratio(tmp_path):
+    """Растр кодируется профилями своего продукта относительно базового."""
+    source = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
+    source.write_bytes(b"source")
+    sizes = {"deflate": 100, "int16": 50, "lerc": 25}
+    encoded = []
+
+    def encode(_source: Path, destination: Path, profile: str) -> None:
+        """Пишет файл размера, заданного профилем."""
+        encoded.append(profile)
+        destination.write_bytes(b"x" * sizes[profile])
+
+    results = benchmark(
+        [source],
+        tmp_path,
+        encode=encode,
+        measure=lambda _path: (1.5, 0.5),
+    )
+
+    assert encoded == ["deflate", "int16", "lerc"]
+    assert [result.size for result in results] == [100, 50, 25]
+    assert results[1].tile_ms == 1.5
+    lines = format_results(results)
+    assert len(lines) == 4
+    assert " 0.50 " in lines[2]
@@ -2,9 +2,11 @@
 
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
+from cli.commands.export_ndvi import Command as ExportNdviCommand
 from cli.commands.metadata import Command as MetadataCommand
 from cli.commands.processing import Command as ProcessingCommand
 from cli.commands.processing import (
@@ -12,9 +14,10 @@ from cli.commands.processing import (
     parse_field_selector,
     resolve_date_range,
 )
-from core import settings
+from core import metrics, settings
 from core.management.base import BaseCommand
 from core.management.manager import ManagementUtility, get_command_names
+from processing import composition
 
 
 class RecordingCommand(BaseCommand):
@@ -127,6 +130,10 @@ def test_ndvi_recalculation_passes_cyrillic_fieldcode_target(monkeypatch):
             """Сохраняет параметры выборочного перерасчёта."""
             calls.append(options)
 
+        def close(self):
+            """Отмечает завершение фоновых работ."""
+            calls.append("close")
+
     monkeypatch.setattr(
         "processing.composition.build_processing_service",
         lambda **_options: Service(),
@@ -149,7 +156,7 @@ def test_ndvi_recalculation_passes_cyrillic_fieldcode_target(monkeypatch):
         "end_date": datetime(2026, 8, 1),
         "target_agroids": (3,),
         "target_fieldcodes": ("A3/F100б",),
-    }]
+    }, "close"]
 
 
 def test_metadata_command_passes_normalized_period(monkeypatch):
@@ -175,11 +182,71 @@ def test_metadata_command_passes_normalized_period(monkeypatch):
     ]
 
 
+def test_export_ndvi_command_derives_agros_from_fields(monkeypatch):
+    """Выгрузка по fieldcode ограничивается хозяйствами выбранных полей."""
+    calls = []
+    monkeypatch.setattr(
+        "processing.composition.export_ndvi_series",
+        lambda output, **options: calls.append((output, options)),
+    )
+
+    ExportNdviCommand().run_from_argv([
+        "manage.py",
+        "export-ndvi",
+        "--output",
+        "/tmp/ndvi",
+        "--field",
+        "A3/F100б",
+        "--year",
+        "2025",
+        "--year",
+        "2026",
+        "--format",
+        "geojson",
+    ])
+
+    output, options = calls[0]
+    assert output == "/tmp/ndvi"
+    assert options["agroids"] == (3,)
+    assert options["fieldcodes"] == ["A3/F100б"]
+    assert options["years"] == [2025, 2026]
+    assert options["export_format"] == "geojson"
+    assert options["batch_size"] == 2000
+
+
+def test_export_ndvi_clamps_workers_to_connection_pool(monkeypatch):
+    """Потоков выгрузки не больше подключений пула процесса."""
+    services = []
+
+    class Service:
+        """Запоминает число потоков выгрузки."""
+
+        def __init__(self, _source, _output, *, export_format, workers):
+            services.append(workers)
+
+        def run(self, **_options):
+            """Ничего не выгружает."""
+
+    monkeypatch.setattr(
+        composition,
+        "get_connection_pool",
+        lambda: SimpleNamespace(max_size=4),
+    )
+    monkeypatch.setattr(composition, "NdviSeriesExportService", Service)
+
+    composition.export_ndvi_series("/tmp/ndvi", agroids=(3,), workers=8)
+    composition.export_ndvi_series("/tmp/ndvi", agroids=(3,), workers=2)
+
+    assert services == [4, 2]
+
+
 def test_management_help_discovers_commands():
     """Менеджер обнаруживает только поддерживаемые команды."""
     assert get_command_names() == [
         "clearprocessing",
+        "compact-archive",
         "download",
+        "export-ndvi",
         "metadata",
         "processing",
     ]
@@ -203,6 +270,30 @@ def test_command_passes_parsed_options_directly_to_handle():
     assert command.calls == [((), {"count": 3})]
 
 
+def test_command_logs_registered_metric_summary(monkeypatch):
+    """После команды логируется итог метрик, накопленных за запуск."""
+    registry = metrics.MetricsRegistry()
+    registry.observe("test.metric", "slow", seconds=2.0, rows=5, size=2048)
+    registry.observe("test.metric", "fast", seconds=0.5, rows=1)
+    monkeypatch.setattr(metrics, "_registry", registry)
+    monkeypatch.setattr(metrics, "_summaries", {"test.metric": "TEST"})
+    command = RecordingCommand()
+    messages = []
+    monkeypatch.setattr(
+        command.logger,
+        "info",
+        lambda message, *args: messages.append(message % args),
+    )
+
+    command.run_from_argv(["manage.py", "recording", "--count", "1"])
+
+    assert messages == [
+        "TEST SUMMARY: 2 вызовов, строк 6, 2.0 КБ | 2.50 сек.",
+        "  slow: 1 вызовов, строк 5, max 2.00 | 2.00 сек.",
+        "  fast: 1 вызовов, строк 1, max 0.50 | 0.50 сек.",
+    ]
+
+
 def test_management_without_subcommand_prints_help_successfully():
     """Запуск без подкоманды показывает общую справку с успешным кодом."""
     assert ManagementUtility(["manage.py"]).execute() == 0
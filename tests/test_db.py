@@ -2,9 +2,22 @@
 
 import json
 from datetime import UTC, date, datetime
+from types import SimpleNamespace
 
+import pytest
+
+from core.logging import get_logger
+from core.metrics import MetricsRegistry
+from db.connection import ConnectionPool, ConnectionPoolTimeout
 from db.gateway import SqlGateway
-from db.models import NdviRecord
+from db.instrumentation import (
+    CALL_SITE_METRIC,
+    STATEMENT_METRIC,
+    SqlInstrumentation,
+    redact_params,
+    statement_fingerprint,
+)
+from db.models import LayerRecord, NdviRecord
 from db.repositories import FieldRepository, LayerRepository, NdviRepository
 from domain.models import (
     Field,
@@ -37,17 +50,32 @@ def test_ndvi_repository_saves_one_batch():
 
         def __init__(self):
             self.calls = []
+            self.rollups = []
 
-        def insert_many(self, *args, **kwargs):
-            """Запоминает аргументы пакетной вставки."""
+        def copy_many(self, *args, **kwargs):
+            """Запоминает аргументы пакетной записи."""
             self.calls.append((args, kwargs))
 
+        def execute(self, query, params, **options):
+            """Запоминает пересчёт сводки качества."""
+            self.rollups.append((query, params, options))
+
     gateway = Gateway()
     repository = NdviRepository(gateway)
 
     repository.add_many([ndvi_value(1), ndvi_value(2)])
 
     assert len(gateway.calls) == 1
+    assert gateway.calls[0][1]["commit"] is False
+    # Ключи сводки блокируются отдельным запросом до её пересчёта.
+    query, params, options = gateway.rollups[0]
+    assert "pg_advisory_xact_lock" in query
+    assert params == ([date(2026, 7, 1)] * 2, [1, 2])
+    assert options == {"commit": False}
+    query, params, options = gateway.rollups[1]
+    assert "INSERT INTO gpgeo.maps_ndvi_agro_quality" in query
+    assert params == ([date(2026, 7, 1)] * 2, [1, 2])
+    assert options == {}
     assert len(gateway.calls[0][0][1]) == 2
     assert gateway.calls[0][0][1][0][1] == datetime(
         2026,
@@ -73,9 +101,9 @@ def test_ndvi_repository_atomically_replaces_selected_fields():
             """Запоминает удаление старой статистики."""
             self.calls.append(("execute", query, params, options))
 
-        def insert_many(self, *args, **kwargs):
-            """Запоминает вставку пересчитанной статистики."""
-            self.calls.append(("insert_many", args, kwargs))
+        def copy_many(self, *args, **kwargs):
+            """Запоминает запись пересчитанной статистики."""
+            self.calls.append(("copy_many", args, kwargs))
 
     gateway = Gateway()
 
@@ -91,7 +119,44 @@ def test_ndvi_repository_atomically_replaces_selected_fields():
         [1, 2],
     )
     assert gateway.calls[0][3] == {"commit": False}
-    assert gateway.calls[1][0] == "insert_many"
+    assert gateway.calls[1][0] == "copy_many"
+    assert gateway.calls[1][2]["commit"] is False
+    # Сводка качества пересчитывается последней под блокировкой ключей
+    # и фиксирует транзакцию.
+    assert "pg_advisory_xact_lock" in gateway.calls[2][1]
+    assert gateway.calls[2][3] == {"commit": False}
+    assert "INSERT INTO gpgeo.maps_ndvi_agro_quality" in gateway.calls[3][1]
+    assert gateway.calls[3][2] == ([date(2026, 7, 1)] * 2, [1, 2])
+    assert gateway.calls[3][3] == {}
+
+
+def test_ndvi_repository_creates_partitions_only_after_migration():
+    """Секции сезонов создаются, только когда функция секционирования есть."""
+
+    class Gateway:
+        """Отвечает на проверку функции и запоминает создание секций."""
+
+        def __init__(self, partitioned):
+            self.partitioned = partitioned
+            self.calls = []
+
+        def row(self, query, params):
+            """Сообщает, применена ли миграция секционирования."""
+            assert params == ("gpgeo.maps_ndvi_values_add_partition(integer)",)
+            return {"partitioned": self.partitioned}
+
+        def execute(self, query, params, **options):
+            """Запоминает вызов функции создания секций."""
+            self.calls.append((query, params))
+
+    legacy = Gateway(False)
+    NdviRepository(legacy).ensure_partitions([2026])
+    partitioned = Gateway(True)
+    NdviRepository(partitioned).ensure_partitions([2027, 2026, 2027])
+
+    assert legacy.calls == []
+    assert "maps_ndvi_values_add_partition" in partitioned.calls[0][0]
+    assert partitioned.calls[0][1] == ([2026, 2027],)
 
 
 def test_ndvi_completeness_requires_every_field():
@@ -224,11 +289,14 @@ def test_layer_metadata_refresh_uses_one_aggregate_update():
     payload = json.loads(params[0])
     assert payload[0]["source_tiles"] == ["T38ULA"]
     assert payload[0]["fallback_algorithm_version"] == "legacy"
-    assert "SUM(ndvi.cloud_pixel_count)" in query
+    assert "gpgeo.maps_ndvi_agro_quality AS rollup" in query
+    assert "SUM(ndvi.cloud_pixel_count)" not in query
     assert "UPDATE gpgeo.maps_ndvi_values AS ndvi" in query
     assert "SET acquired_at = acquisition.acquired_at" in query
     assert "COALESCE(" in query
     assert "generated_at =" not in query
+    assert query.count("ndvi.date BETWEEN %s AND %s") == 1
+    assert params[1:] == (date(2026, 7, 1),) * 2
 
 
 def test_field_repository_reads_geometry_batch_in_one_scope():
@@ -244,21 +312,99 @@ def test_field_repository_reads_geometry_batch_in_one_scope():
             """Возвращает геометрии всех запрошенных полей."""
             self.calls.append((query, params))
             return [
-                (field_id, f"geometry-{field_id}")
-                for field_id in params[0]
+                (field_id, memoryview(f"wkb-{field_id}".encode()))
+                for field_id in params[1]
             ]
 
     gateway = Gateway()
 
-    result = FieldRepository(gateway).geometries([10, 20], 2026)
+    result = FieldRepository(gateway).geometries([10, 20], 2026, srid=3857)
 
-    assert result == {10: "geometry-10", 20: "geometry-20"}
+    assert result == {10: b"wkb-10", 20: b"wkb-20"}
     assert len(gateway.calls) == 1
     query, params = gateway.calls[0]
     assert "shape.fieldid = ANY (%s)" in query
-    assert "ST_AsGeoJSON" in query
+    assert "ST_AsBinary" in query and "ST_AsGeoJSON" not in query
     assert "__geo_get_field_shape" not in query
-    assert params == ([10, 20], 2026)
+    assert params == (3857, [10, 20], 2026)
+
+
+def test_copy_many_streams_rows_into_staging_and_merges_once():
+    """COPY-запись формирует staging-таблицу, поток строк и одно слияние."""
+
+    class Cursor:
+        """Фиксирует запросы и содержимое COPY."""
+
+        def __init__(self):
+            self.queries = []
+            self.copied = b""
+
+        def execute(self, query, _params=None):
+            """Запоминает выполненный запрос."""
+            self.queries.append(query)
+
+        def copy_expert(self, query, stream, size):
+            """Читает поток порциями, как psycopg2."""
+            self.queries.append(query)
+            while chunk := stream.read(size):
+                self.copied += chunk
+
+    class Connection:
+        """Считает фиксации транзакции."""
+
+        commits = 0
+
+        def commit(self):
+            """Фиксирует транзакцию."""
+            self.commits += 1
+
+    gateway = SqlGateway.__new__(SqlGateway)
+    gateway.cursor = Cursor()
+    gateway.connection = Connection()
+    gateway.logger = get_logger("test-copy")
+    registry = MetricsRegistry()
+    gateway.instrumentation = SqlInstrumentation(registry=registry)
+    records = [
+        LayerRecord(
+            date=date(2026, 7, 1),
+            set="ndvi",
+            agroid=3,
+            name="tab\tname",
+            source_tiles=["T38ULA", 'quote"d'],
+            is_cloud_masked=True,
+        ),
+        LayerRecord(date=date(2026, 7, 1), set="tci", agroid=3, name=""),
+    ]
+
+    written = gateway.copy_many(
+        LayerRecord,
+        records,
+        conflict_fields="date, set, agroid",
+        update=True,
+    )
+
+    create, copy, merge = gateway.cursor.queries
+    lines = gateway.cursor.copied.decode("utf-8").splitlines()
+    assert written == 2
+    assert "WITH NO DATA" in create and '"id"' not in create
+    assert copy.startswith('COPY "_copy_maps_layer"')
+    assert 'ON CONFLICT ("date", "set", "agroid") DO UPDATE' in merge
+    assert '"name" = EXCLUDED."name"' in merge
+    assert '"agroid" = EXCLUDED' not in merge
+    assert lines[0].split("\t")[:6] == [
+        "2026-07-01",
+        "\\N",
+        "ndvi",
+        "3",
+        "tab\\tname",
+        "\\N",
+    ]
+    assert '{"T38ULA","quote\\\\"d"}' in lines[0]
+    assert lines[1].split("\t")[4] == ""
+    assert gateway.connection.commits == 1
+    (stats,) = registry.snapshot(STATEMENT_METRIC).values()
+    assert stats.count == 1 and stats.rows == 2
+    assert stats.size == len(gateway.cursor.copied)
 
 
 def test_dataclass_batch_excludes_generated_id():
@@ -294,3 +440,331 @@ def test_dataclass_batch_excludes_generated_id():
         True,
     )
     assert len(rows[0]) == 24
+
+
+class PooledConnection:
+    """Подключение psycopg2 с наблюдаемыми транзакциями."""
+
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=0)
+        self.events = []
+
+    def commit(self):
+        """Фиксирует транзакцию."""
+        self.events.append("commit")
+
+    def rollback(self):
+        """Откатывает транзакцию."""
+        self.events.append("rollback")
+
+    def close(self):
+        """Закрывает подключение."""
+        self.closed = 1
+
+
+def test_connection_pool_reuses_connection_per_transaction():
+    """Последовательные транзакции используют одно подключение пула."""
+    opened = []
+
+    def connect():
+        """Открывает наблюдаемое подключение."""
+        opened.append(PooledConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, max_size=2)
+
+    with pool.connection() as first:
+        pass
+    with pytest.raises(ValueError):
+        with pool.connection() as second:
+            raise ValueError("broken query")
+    second.closed = 1
+    with pool.connection() as third:
+        pass
+
+    assert first is second
+    assert first.events == ["commit", "rollback"]
+    assert third is opened[1]
+    assert pool.opened == 1
+
+
+def test_connection_pool_limits_open_connections():
+    """Пул не открывает подключений сверх предела и ждёт освобождения."""
+    pool = ConnectionPool(PooledConnection, max_size=1, timeout=0.01)
+
+    with pool.connection():
+        with pytest.raises(ConnectionPoolTimeout):
+            with pool.connection():
+                pass
+
+    with pool.connection() as connection:
+        assert connection.closed == 0
+    pool.close()
+
+    assert connection.closed == 1
+    assert pool.opened == 0
+
+
+def test_gateway_records_statement_metrics_and_logs_slow_query(
+        caplog,
+        monkeypatch,
+):
+    """Запрос учитывается по отпечатку и месту вызова, медленный журналируется."""
+    monkeypatch.setattr(get_logger("SqlGateway"), "propagate", True)
+
+    class Cursor:
+        """Возвращает две строки на любой запрос."""
+
+        query = b"SELECT 1"
+
+        def execute(self, query, params=None):
+            """Принимает запрос."""
+
+        def fetchall(self):
+            """Возвращает результат запроса."""
+            return [{"id": 1}, {"id": 2}]
+
+    class Connection:
+        """Выдаёт тестовый курсор."""
+
+        def cursor(self, cursor_factory=None):
+            """Возвращает курсор."""
+            return Cursor()
+
+    registry = MetricsRegistry()
+    gateway = SqlGateway(
+        Connection(),
+        instrumentation=SqlInstrumentation(slow_seconds=0.0, registry=registry),
+    )
+    query = """
+        SELECT id
+        FROM gpgeo.maps_field
+        WHERE agroid = %s AND name = %s
+    """
+
+    with caplog.at_level("WARNING"):
+        rows = gateway.rows(query, (3, "секретное поле"))
+
+    assert len(rows) == 2
+    fingerprint = statement_fingerprint(query)
+    assert fingerprint == statement_fingerprint(" ".join(query.split()))
+    assert registry.snapshot(STATEMENT_METRIC)[fingerprint].rows == 2
+    assert registry.snapshot(STATEMENT_METRIC)[fingerprint].size == 0
+    sites = registry.snapshot(CALL_SITE_METRIC)
+    assert list(sites) == [
+        f"{__name__}:"
+        "test_gateway_records_statement_metrics_and_logs_slow_query"
+    ]
+    assert "SQL SLOW" in caplog.text
+    assert "секретное поле" not in caplog.text
+    assert redact_params((3, "секретное поле", [1, 2])) == (
+        "<int>",
+        "<str:14>",
+        "<list[2]>",
+    )
+
+
+def test_stream_reads_server_side_cursor_in_batches():
+    """Потоковое чтение идёт именованным cursor порциями и закрывает его."""
+
+    class NamedCursor:
+        """Отдаёт строки порциями fetchmany."""
+
+        query = b"SELECT"
+
+        def __init__(self, name, rows):
+            """Сохраняет имя cursor и остаток строк."""
+            self.name = name
+            self.remaining = list(rows)
+            self.fetches = []
+            self.closed = False
+
+        def execute(self, query, params=None):
+            """Принимает запрос."""
+            self.executed = (query, params)
+
+        def fetchmany(self, size):
+            """Возвращает очередную порцию строк."""
+            self.fetches.append(size)
+            batch, self.remaining = self.remaining[:size], self.remaining[size:]
+            return batch
+
+        def close(self):
+            """Закрывает cursor на сервере."""
+            self.closed = True
+
+    class Connection:
+        """Создаёт обычный и именованный cursor."""
+
+        def __init__(self):
+            """Создаёт пустой журнал именованных cursor."""
+            self.named = []
+
+        def cursor(self, name=None, cursor_factory=None):
+            """Возвращает именованный cursor для потокового чтения."""
+            cursor = NamedCursor(name, [{"id": index} for index in range(5)])
+            if name is not None:
+                self.named.append(cursor)
+            return cursor
+
+    registry = MetricsRegistry()
+    connection = Connection()
+    gateway = SqlGateway(
+        connection,
+        instrumentation=SqlInstrumentation(registry=registry),
+    )
+
+    stream = gateway.stream("SELECT id FROM t WHERE a = %s", (1,), batch_size=2)
+    assert connection.named == []
+    rows = list(stream)
+
+    (cursor,) = connection.named
+    assert [row["id"] for row in rows] == [0, 1, 2, 3, 4]
+    assert cursor.name.startswith("stream_")
+    assert cursor.itersize == 2
+    assert cursor.fetches == [2, 2, 2, 2]
+    assert cursor.closed
+    (stats,) = registry.snapshot(STATEMENT_METRIC).values()
+    assert stats.rows == 5
+
+
+def test_ndvi_series_groups_streamed_rows_by_field_and_season():
+    """Ряды собираются из потока по полю и сезону с фильтром по годам."""
+
+    def row(fieldid, day, year=2025, geometry=None):
+        """Создаёт строку выборки рядов NDVI."""
+        return {
+            "name": f"Поле {fieldid}",
+            "fieldcode": f"A3/F{fieldid}б",
+            "year": year,
+            "date": date(year, 7, day),
+            "acquired_at": None,
+            "fieldid": fieldid,
+            "ndvimean": 0.1 * day,
+            "ndvimax": 1.0,
+            "ndvimin": 0.0,
+            "growth_percent": None,
+            "ndvi_cv": 2.0,
+            "is_uniform": True,
+            "valid_pixel_count": 10,
+            "total_pixel_count": 12,
+            "cloud_pixel_count": 2,
+            "nodata_pixel_count": 0,
+            "shadow_pixel_count": 0,
+            "snow_pixel_count": 0,
+            "valid_coverage_percent": 83.3,
+            "cloud_coverage_percent": 16.7,
+            "ndvi_stddev": 0.1,
+            "ndvi_median": 0.5,
+            "ndvi_p10": 0.2,
+            "ndvi_p90": 0.8,
+            "source_level": "L2A",
+            "algorithm_version": "3.0.0",
+            "calculated_at": None,
+            "geometry": geometry,
+        }
+
+    class StreamingGateway:
+        """Запоминает потоковый запрос и отдаёт строки генератором."""
+
+        def __init__(self, rows):
+            """Сохраняет строки результата."""
+            self.result = rows
+            self.calls = []
+
+        def stream(self, query, params, *, batch_size):
+            """Отдаёт строки по одной."""
+            self.calls.append((query, params, batch_size))
+            yield from self.result
+
+    gateway = StreamingGateway([
+        row(7, 1, geometry='{"type": "Polygon"}'),
+        row(7, 2),
+        row(7, 1, year=2026, geometry='{"type": "MultiPolygon"}'),
+        row(8, 3, geometry='{"type": "Polygon"}'),
+    ])
+
+    series = list(NdviRepository(gateway).series(
+        agroid=3,
+        years=[2026, 2025],
+        fieldcodes=["a3/f7Б "],
+        with_geometry=True,
+        batch_size=500,
+    ))
+
+    query, params, batch_size = gateway.calls[0]
+    assert batch_size == 500
+    assert "ST_AsGeoJSON" in query
+    assert "lower(field.fieldcode) = ANY" in query
+    assert "ORDER BY ndvi.fieldid, ndvi.date" in query
+    assert params == (
+        3,
+        date(2025, 1, 1),
+        date(2027, 1, 1),
+        [2025, 2026],
+        ["a3/f7б"],
+    )
+    assert [(item.field.id, item.year, len(item.points)) for item in series] == [
+        (7, 2025, 2),
+        (7, 2026, 1),
+        (8, 2025, 1),
+    ]
+    assert series[0].geometry == '{"type": "Polygon"}'
+    assert series[0].field.fieldcode == "A3/F7б"
+    assert series[0].points[1].mean == 0.2
+    assert series[0].points[1].standard_deviation == 0.1
+    assert series[1].geometry == '{"type": "MultiPolygon"}'
+
+
+def test_slow_query_explain_always_rolls_back_savepoint():
+    """План снимается в откатываемой точке сохранения, кроме stream()."""
+
+    class Cursor:
+        """Запоминает выполненные команды и отдаёт строки плана."""
+
+        query = b"SELECT"
+
+        def __init__(self, name=None):
+            """Создаёт курсор с необязательным именем server-side cursor."""
+            self.name = name
+            self.commands = []
+
+        def execute(self, query, params=None):
+            """Запоминает команду."""
+            self.commands.append(query)
+
+        def fetchall(self):
+            """Возвращает план."""
+            return [("Seq Scan on maps_field",)]
+
+    query = "SELECT id FROM gpgeo.maps_field"
+    commands = {}
+    for name, options in (
+            ("estimate", {}),
+            ("analyze", {"explain_analyze": True}),
+    ):
+        cursor = Cursor()
+        SqlInstrumentation(
+            slow_seconds=0.0,
+            explain_slow=True,
+            registry=MetricsRegistry(),
+            **options,
+        ).observe(cursor, query, None, seconds=1.0)
+        commands[name] = cursor.commands
+    named = Cursor(name="stream_1")
+    SqlInstrumentation(
+        slow_seconds=0.0,
+        explain_slow=True,
+        registry=MetricsRegistry(),
+    ).observe(named, query, None, seconds=1.0)
+
+    assert commands["estimate"] == [
+        "SAVEPOINT sql_explain",
+        f"EXPLAIN {query}",
+        "ROLLBACK TO SAVEPOINT sql_explain",
+        "RELEASE SAVEPOINT sql_explain",
+    ]
+    assert commands["analyze"][1] == f"EXPLAIN (ANALYZE, BUFFERS) {query}"
+    assert commands["analyze"][2] == "ROLLBACK TO SAVEPOINT sql_explain"
+    assert named.commands == []
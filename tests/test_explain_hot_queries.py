@@ -0,0 +1,95 @@
+"""Тесты проверки планов частых запросов PostGIS."""
+
+from datetime import date
+
+from domain.models import Field
+from scripts.explain_hot_queries import ExplainGateway, hot_queries, summarize
+
+
+class Cursor:
+    """Возвращает один и тот же план на каждый EXPLAIN."""
+
+    closed = False
+
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params):
+        """Запоминает выполненный запрос."""
+        self.queries.append(query)
+
+    def fetchone(self):
+        """Возвращает результат EXPLAIN (FORMAT JSON)."""
+        return ([{"Plan": {"Node Type": "Result", "Total Cost": 1.0}}],)
+
+    def close(self):
+        """Закрывает курсор."""
+        self.closed = True
+
+
+class Connection:
+    """Подключение, фиксирующее отсутствие commit."""
+
+    def __init__(self):
+        self.cursor_instance = Cursor()
+        self.commits = 0
+
+    def cursor(self, cursor_factory=None):
+        """Возвращает общий тестовый курсор."""
+        return self.cursor_instance
+
+    def commit(self):
+        """Считает фиксации транзакции."""
+        self.commits += 1
+
+
+def test_summary_flags_sequential_scans_and_unpruned_partitions():
+    """Сводка отмечает полное чтение NDVI и несколько оставшихся секций."""
+    plan = {
+        "Plan": {
+            "Node Type": "Append",
+            "Total Cost": 42.0,
+            "Plans": [
+                {
+                    "Node Type": "Seq Scan",
+                    "Relation Name": "maps_ndvi_values_2025",
+                },
+                {
+                    "Node Type": "Index Only Scan",
+                    "Relation Name": "maps_ndvi_values_2026",
+                },
+                {"Node Type": "Seq Scan", "Relation Name": "maps_field"},
+            ],
+        },
+    }
+
+    summary = summarize("query", plan)
+
+    assert summary.sequential == ("maps_ndvi_values_2025",)
+    assert summary.ndvi_partitions == (
+        "maps_ndvi_values_2025",
+        "maps_ndvi_values_2026",
+    )
+    assert summary.total_cost == 42.0
+    assert summary.ok is False
+
+
+def test_explain_gateway_plans_every_hot_query_without_commit():
+    """Каждый частый запрос выполняется только как EXPLAIN без фиксации."""
+    connection = Connection()
+    queries = hot_queries(
+        acquired_on=date(2026, 7, 1),
+        agroids=[3, 4],
+        fields=[Field(id=7, name="Поле 7")],
+    )
+
+    for name, run in queries:
+        gateway = ExplainGateway(connection)
+        run(gateway)
+        assert len(gateway.plans) == 1
+        assert summarize(name, gateway.plans[0]).ok
+
+    executed = connection.cursor_instance.queries
+    assert len(executed) == len(queries)
+    assert all(query.startswith("EXPLAIN (FORMAT JSON) ") for query in executed)
+    assert connection.commits == 0
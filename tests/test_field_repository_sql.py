@@ -1,5 +1,7 @@
 """Тесты SQL-контракта репозитория полей без legacy-функций БД."""
 
+from datetime import date
+
 from db.repositories import FieldRepository
 
 
@@ -52,15 +54,144 @@ def test_field_bounds_use_postgis_extent_without_legacy_function():
     assert params == (3857, 2026, None, None, 3, 3)
 
 
-def test_field_geometries_use_postgis_geojson_without_legacy_function():
-    """Геометрии пакетом преобразуются в GeoJSON прямым запросом."""
-    geometry = {"type": "Feature", "geometry": {"type": "Polygon"}}
+def test_field_tiles_are_filtered_by_buffered_field_contours():
+    """Тайлы перебираются в рамках полей и проверяются по контуру."""
+    gateway = RecordingGateway([(14, 9950, 5400), (14, 9951, 5400)])
+
+    result = FieldRepository(gateway).tiles(
+        year=2026,
+        agroid=3,
+        zoom_start=8,
+        zoom_stop=14,
+        buffer=100.0,
+    )
+
+    query, params = gateway.calls[0]
+    assert result == [(14, 9950, 5400), (14, 9951, 5400)]
+    assert "ST_TileEnvelope" in query
+    assert "ST_Buffer" in query
+    # Буфер в метрах на местности, а не в растянутых метрах EPSG:3857.
+    assert "::public.geography" in query
+    assert params == (100.0, 2026, 3, 8, 14)
+
+
+def test_field_geometries_use_binary_wkb_without_legacy_function():
+    """Геометрии пакетом передаются как WKB в системе координат NDVI."""
+    geometry = memoryview(b"\x01\x03\x00\x00\x00")
     gateway = RecordingGateway([(10, geometry), (20, geometry)])
 
-    result = FieldRepository(gateway).geometries([10, 20], 2026)
+    result = FieldRepository(gateway).geometries([10, 20], 2026, srid=3857)
 
     query, params = gateway.calls[0]
-    assert result == {10: geometry, 20: geometry}
-    assert "ST_AsGeoJSON" in query
+    assert result == {10: bytes(geometry), 20: bytes(geometry)}
+    assert "ST_AsBinary" in query and "ST_Transform" in query
+    assert "ST_AsGeoJSON" not in query
+    assert "ST_SimplifyPreserveTopology" not in query
     assert "__geo_get_field_shape" not in query
-    assert params == ([10, 20], 2026)
+    assert params == (3857, [10, 20], 2026)
+
+
+def test_field_geometries_simplify_with_tolerance():
+    """Допуск упрощения добавляет ST_SimplifyPreserveTopology в запрос."""
+    gateway = RecordingGateway([(10, b"wkb")])
+
+    FieldRepository(gateway).geometries([10], 2026, srid=3857, tolerance=0.5)
+
+    query, params = gateway.calls[0]
+    assert "ST_SimplifyPreserveTopology" in query
+    assert params == (3857, 0.5, [10], 2026)
+
+
+def test_field_snapshots_read_agro_state_in_one_query():
+    """Поля, геометрии, границы и полнота NDVI читаются одним запросом."""
+    geometry = b"\x01\x03\x00\x00\x00"
+
+    def row(field_id, has_ndvi):
+        """Создаёт строку поля хозяйства 3."""
+        return {
+            "agroid": 3,
+            "id": field_id,
+            "name": f"Поле {field_id}",
+            "fieldcode": None,
+            "geometry": geometry,
+            "xmin": 1.0,
+            "ymin": 2.0,
+            "xmax": 3.0,
+            "ymax": 4.0,
+            "has_ndvi": has_ndvi,
+        }
+
+    gateway = RecordingGateway([row(7, True), row(8, False)])
+
+    result = FieldRepository(gateway).snapshots(
+        agroids=[4, 3, 3],
+        year=2026,
+        srid=3857,
+        acquired_on=date(2026, 7, 1),
+    )
+
+    query, params = gateway.calls[0]
+    assert len(gateway.calls) == 1
+    assert [field.id for field in result[3].fields] == [7, 8]
+    assert result[3].bounds == (1.0, 2.0, 3.0, 4.0)
+    assert result[3].geometries == {7: geometry, 8: geometry}
+    assert result[3].ndvi_complete is False
+    assert result[4].fields == () and result[4].bounds is None
+    assert result[4].ndvi_complete is False
+    assert "maps_ndvi_values" in query and "ST_Extent" in query
+    assert "ST_AsBinary" in query
+    assert params == ([3, 4], 2026, 3857, 3857, date(2026, 7, 1))
+
+
+def test_field_revisions_read_versions_without_geometry():
+    """Версии полей и наличие NDVI читаются без передачи контуров."""
+    gateway = RecordingGateway([
+        {
+            "agroid": 3,
+            "id": 7,
+            "name": "Поле 7",
+            "fieldcode": None,
+            "revision": "10:11",
+            "has_ndvi": True,
+        },
+    ])
+
+    result = FieldRepository(gateway).revisions(
+        agroids=[4, 3, 3],
+        year=2026,
+        acquired_on=date(2026, 7, 1),
+    )
+
+    query, params = gateway.calls[0]
+    assert [(item.agroid, item.field_id, item.revision) for item in result] == [
+        (3, 7, "10:11")
+    ]
+    assert result[0].has_ndvi is True
+    assert (result[0].name, result[0].fieldcode) == ("Поле 7", None)
+    assert "xmin" in query and "maps_ndvi_values" in query
+    assert "fieldgeometry" not in query
+    assert params == (date(2026, 7, 1), [3, 4], 2026)
+
+
+def test_field_extents_read_every_srid_of_every_agro_in_one_query():
+    """Границы нескольких хозяйств в нескольких SRID читаются одним SQL."""
+    gateway = RecordingGateway([
+        (3, 3857, 1.0, 2.0, 3.0, 4.0),
+        (3, 4326, 5.0, 6.0, 7.0, 8.0),
+        (4, 3857, 9.0, 10.0, 11.0, 12.0),
+    ])
+
+    result = FieldRepository(gateway).extents(
+        agroids=[4, 3, 3],
+        year=2026,
+        srids=[3857, 4326, 3857],
+    )
+
+    query, params = gateway.calls[0]
+    assert len(gateway.calls) == 1
+    assert result == {
+        3: {3857: (1.0, 2.0, 3.0, 4.0), 4326: (5.0, 6.0, 7.0, 8.0)},
+        4: {3857: (9.0, 10.0, 11.0, 12.0)},
+    }
+    assert "ST_Extent" in query and "GROUP BY field.agroid, target.srid" in query
+    assert params == ([3857, 4326], [3, 4], 2026)
@@ -0,0 +1,118 @@
+"""Тесты отпечатков содержимого опубликованных растров."""
+from types import SimpleNamespace
+
+import pytest
+
+from satgeo import fingerprint as fingerprint_module
+from satgeo.fingerprint import (
+    fingerprint_path,
+    raster_fingerprint,
+    read_fingerprint,
+    write_fingerprint,
+)
+from satgeo.optimizer import COG_PROFILES
+
+
+class Band:
+    """Канал растра с байтами строк."""
+
+    def __init__(self, rows):
+        """Сохраняет строки канала."""
+        self.rows = rows
+        self.DataType = 6
+        self.reads = []
+
+    def GetNoDataValue(self):
+        """Возвращает NoData канала."""
+        return -9999.0
+
+    def GetScale(self):
+        """Возвращает масштаб канала."""
+        return None
+
+    def GetOffset(self):
+        """Возвращает смещение канала."""
+        return None
+
+    def ReadRaster(self, x, y, width, height):
+        """Возвращает байты запрошенных строк."""
+        self.reads.append((x, y, width, height))
+        return b"".join(self.rows[y:y + height])
+
+
+class Dataset:
+    """Одноканальный растр с геопривязкой."""
+
+    def __init__(self, rows, geotransform=(0.0, 10.0, 0.0, 0.0, 0.0, -10.0)):
+        """Создаёт растр из строк."""
+        self.band = Band(rows)
+        self.RasterXSize = 2
+        self.RasterYSize = len(rows)
+        self.RasterCount = 1
+        self.geotransform = geotransform
+
+    def GetGeoTransform(self):
+        """Возвращает геотрансформацию."""
+        return self.geotransform
+
+    def GetProjection(self):
+        """Возвращает WKT проекции."""
+        return "EPSG:3857"
+
+    def GetRasterBand(self, _index):
+        """Возвращает единственный канал."""
+        return self.band
+
+
+@pytest.fixture
+def open_dataset(monkeypatch):
+    """Подменяет gdal.Open словарём растров."""
+    datasets = {}
+    monkeypatch.setattr(
+        fingerprint_module,
+        "gdal",
+        SimpleNamespace(
+            GA_ReadOnly=0,
+            Open=lambda path, _mode: datasets[path],
+        ),
+    )
+    monkeypatch.setattr(fingerprint_module, "FINGERPRINT_ROWS", 2)
+    return datasets
+
+
+def test_fingerprint_covers_pixels_georeferencing_and_profile(open_dataset):
+    """Отпечаток меняется вместе с пикселями, геопривязкой и профилем."""
+    rows = [b"ab", b"cd", b"ef"]
+    open_dataset["a.tif"] = Dataset(rows)
+    open_dataset["same.tif"] = Dataset(list(rows))
+    open_dataset["pixels.tif"] = Dataset([b"ab", b"cd", b"eg"])
+    open_dataset["shifted.tif"] = Dataset(
+        rows,
+        (10.0, 10.0, 0.0, 0.0, 0.0, -10.0),
+    )
+    deflate = COG_PROFILES["deflate"]
+
+    base = raster_fingerprint("a.tif", deflate)
+
+    assert len(base) == 64
+    assert raster_fingerprint("same.tif", deflate) == base
+    assert raster_fingerprint("pixels.tif", deflate) != base
+    assert raster_fingerprint("shifted.tif", deflate) != base
+    assert raster_fingerprint("a.tif", COG_PROFILES["int16"]) != base
+    assert open_dataset["a.tif"].band.reads[:2] == [(0, 0, 2, 2), (0, 2, 2, 1)]
+
+
+def test_fingerprint_sidecar_is_written_next_to_cog(tmp_path):
+    """Отпечаток хранится рядом с COG и удаляется вместе с устареванием."""
+    cog = tmp_path / "a3_ndvi_2026-07-01.tif"
+
+    assert read_fingerprint(cog) is None
+
+    write_fingerprint(cog, "abc")
+
+    assert fingerprint_path(cog).name == "a3_ndvi_2026-07-01.tif.fingerprint"
+    assert read_fingerprint(cog) == "abc"
+
+    write_fingerprint(cog, None)
+
+    assert read_fingerprint(cog) is None
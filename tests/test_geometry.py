@@ -68,3 +68,30 @@ def test_intersection_uses_raster_extent_and_target_srid(monkeypatch):
 
     assert result == (5.0, 5.0, 25.0, 40.0)
     assert SpatialReference.imported_epsg == 3857
+
+
+def test_source_window_covers_bounds_with_margin(monkeypatch):
+    """Окно каналов охватывает границы хозяйства и обрезается экстентом."""
+    monkeypatch.setattr(
+        geometry,
+        "osr",
+        SimpleNamespace(
+            SpatialReference=SpatialReference,
+            CoordinateTransformation=lambda *_args: IdentityTransformer(),
+        ),
+    )
+
+    window = geometry.source_window(
+        (12.0, 12.0, 18.0, 28.0),
+        RasterDataset(),
+        3857,
+        margin=1,
+    )
+
+    assert window == (0, 0, 3, 4)
+    assert geometry.pixel_window(
+        [(50.0, 50.0), (60.0, 60.0)],
+        RasterDataset().GetGeoTransform(),
+        4,
+        4,
+    ) is None
@@ -0,0 +1,145 @@
+"""Тесты снимка каталога GeoServerClient."""
+from types import SimpleNamespace
+
+import pytest
+
+from satgeo.client import GeoServerClient, GeoServerConfig
+
+
+class Response:
+    """Минимальный HTTP-ответ requests."""
+
+    def __init__(self, status_code=200, payload=None):
+        """Запоминает код и JSON ответа."""
+        self.status_code = status_code
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        """Возвращает тело ответа."""
+        return self.payload
+
+
+class Http:
+    """Имитирует REST GeoServer и записывает запросы."""
+
+    def __init__(self):
+        """Создаёт каталог с одним store, слоем и слоем GWC."""
+        self.requests = []
+
+    def get(self, url, **_options):
+        """Отдаёт списки ресурсов рабочей области."""
+        self.requests.append(("GET", url))
+        if url.endswith("/coveragestores.json"):
+            return Response(payload={"coverageStores": {"coverageStore": [
+                {"name": "a3_ndvi_2026-07-01_store"},
+            ]}})
+        if url.endswith("/workspaces/sentinel/layers.json"):
+            return Response(payload={"layers": {"layer": [
+                {"name": "a3_ndvi_2026-07-01"},
+            ]}})
+        return Response(payload=[
+            "sentinel:a3_ndvi_2026-07-01",
+            "other:a3_ndvi_2026-07-01",
+        ])
+
+    def put(self, url, **_options):
+        """Принимает изменение ресурса."""
+        self.requests.append(("PUT", url))
+        return Response()
+
+    def post(self, url, **_options):
+        """Принимает изменение ресурса."""
+        self.requests.append(("POST", url))
+        return Response()
+
+    def request(self, method, url, **options):
+        """Принимает тело запроса REST."""
+        self.requests.append((method, url, options["data"].decode()))
+        return Response(201)
+
+
+def snapshot_client(monkeypatch):
+    """Создаёт клиента, которому запрещено читать каталог поштучно."""
+    http = Http()
+    client = GeoServerClient(
+        GeoServerConfig("gs", "sentinel", "admin", "secret"),
+        http=http,
+    )
+    saved = []
+    catalog = SimpleNamespace(
+        get_store=lambda **_options: pytest.fail("store читается по снимку"),
+        save=saved.append,
+        service_url="http://gs/geoserver/rest",
+        http_request=lambda *_args, **_options: Response(201),
+        _cache=SimpleNamespace(
+            clear=lambda: pytest.fail("снимок не сбрасывает кэш")
+        ),
+    )
+    monkeypatch.setattr(client, "cat", catalog)
+    return client, http, saved
+
+
+def test_snapshot_answers_existence_and_tracks_created_resources(monkeypatch):
+    """Каталог читается один раз, созданные ресурсы дописываются в снимок."""
+    client, http, saved = snapshot_client(monkeypatch)
+
+    with client.catalog_snapshot() as snapshot:
+        assert snapshot.gwc_layers == {"a3_ndvi_2026-07-01"}
+        assert client.create_coveragestore(
+            "a3_ndvi_2026-07-01_store",
+            "/data/a3.tif",
+        ) is False
+        assert client.create_coveragestore(
+            "a4_ndvi_2026-07-01_store",
+            "/data/a4.tif",
+            layer_name="a4_ndvi_2026-07-01",
+        ) is True
+        client.set_layer_style("a4_ndvi_2026-07-01", "ndvi")
+        client.enable_gwc_gridset_3857("a3_ndvi_2026-07-01")
+        client.enable_gwc_gridset_3857("a4_ndvi_2026-07-01")
+        with pytest.raises(RuntimeError, match="не найден"):
+            client.set_layer_style("a5_ndvi_2026-07-01", "ndvi")
+
+    assert "a4_ndvi_2026-07-01_store" in snapshot.stores
+    assert "a4_ndvi_2026-07-01" in snapshot.gwc_layers
+    assert len(saved) == 1
+    assert client.snapshot is None
+    assert [method for method, _url in http.requests] == [
+        "GET",
+        "GET",
+        "GET",
+        "PUT",
+        "POST",
+        "PUT",
+    ]
+
+
+def test_imagemosaic_is_created_once_and_granules_are_harvested(monkeypatch):
+    """Store мозаики создаётся по снимку один раз, гранулы добавляются POST."""
+    client, http, _saved = snapshot_client(monkeypatch)
+
+    with client.catalog_snapshot() as snapshot:
+        for day in ("01", "04"):
+            client.create_imagemosaic("a3_ndvi_mosaic", "/data/mosaic/a3/ndvi")
+            client.harvest_granule(
+                "a3_ndvi_mosaic",
+                f"/data/a3_ndvi_2026-07-{day}.tif",
+            )
+        client.configure_time_coverage("a3_ndvi_mosaic", "a3_ndvi")
+
+    assert {"a3_ndvi_mosaic"} <= snapshot.stores
+    assert "a3_ndvi" in snapshot.layers
+    sent = http.requests[3:]
+    assert [request[0] for request in sent] == [
+        "PUT",
+        "POST",
+        "POST",
+        "POST",
+    ]
+    assert sent[0][1].endswith(
+        "/a3_ndvi_mosaic/external.imagemosaic?configure=none"
+    )
+    assert sent[0][2] == "file:/data/mosaic/a3/ndvi"
+    assert sent[2][2] == "file:/data/a3_ndvi_2026-07-04.tif"
+    assert "<units>ISO8601</units>" in sent[3][2]
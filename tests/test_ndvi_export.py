@@ -0,0 +1,136 @@
+"""Тесты потоковой выгрузки рядов NDVI в CSV и GeoJSON."""
+
+import csv
+import json
+from datetime import date
+
+import pytest
+
+from domain.models import Field, FieldNdviSeries, NdviStatistics
+from processing.exceptions import ProcessingError
+from processing.ndvi_export import ExportFormat, NdviSeriesExportService
+
+
+def make_series(agroid: int, field_id: int, days: tuple[int, ...]):
+    """Создаёт сезонный ряд поля с контуром."""
+    return FieldNdviSeries(
+        agroid=agroid,
+        field=Field(
+            id=field_id,
+            name=f"Поле {field_id}",
+            fieldcode=f"A{agroid}/F{field_id}б",
+        ),
+        year=2026,
+        points=tuple(
+            NdviStatistics(
+                acquired_on=date(2026, 7, day),
+                field_id=field_id,
+                mean=0.5,
+                maximum=0.9,
+                minimum=0.1,
+                growth_percent=None,
+                coefficient_of_variation=3.0,
+                is_uniform=True,
+            )
+            for day in days
+        ),
+        geometry='{"type": "Point", "coordinates": [45.0, 52.0]}',
+    )
+
+
+class RecordingSource:
+    """Отдаёт ряды генератором и фиксирует параметры чтения."""
+
+    def __init__(self, series, failing=()):
+        """Сохраняет ряды по хозяйствам и хозяйства с ошибкой чтения."""
+        self.by_agro = series
+        self.failing = set(failing)
+        self.calls = []
+
+    def series(self, **options):
+        """Отдаёт ряды хозяйства по одному."""
+        self.calls.append(options)
+        if options["agroid"] in self.failing:
+            raise RuntimeError("cursor closed")
+        yield from self.by_agro.get(options["agroid"], ())
+
+
+def test_export_writes_csv_row_per_date_for_each_agro(tmp_path):
+    """CSV содержит строку на дату ряда и пишется файлом хозяйства."""
+    source = RecordingSource({
+        3: [make_series(3, 7, (1, 2)), make_series(3, 8, (1,))],
+        4: [],
+    })
+
+    summary = NdviSeriesExportService(source, tmp_path, workers=2).run(
+        agroids=(3, 4),
+        years=[2026],
+        fieldcodes=None,
+    )
+
+    assert summary.files == (
+        tmp_path / "ndvi_a3.csv",
+        tmp_path / "ndvi_a4.csv",
+    )
+    assert (summary.series, summary.points) == (2, 3)
+    path = tmp_path / "ndvi_a3.csv"
+    with path.open(encoding="utf-8", newline="") as stream:
+        rows = list(csv.DictReader(stream))
+    assert [(row["field_id"], row["acquired_on"]) for row in rows] == [
+        ("7", "2026-07-01"),
+        ("7", "2026-07-02"),
+        ("8", "2026-07-01"),
+    ]
+    assert rows[0]["fieldcode"] == "A3/F7б"
+    empty = (tmp_path / "ndvi_a4.csv").read_text(encoding="utf-8")
+    assert empty.count("\n") == 1
+    assert {call["agroid"] for call in source.calls} == {3, 4}
+    assert all(
+        call["years"] == [2026] and call["with_geometry"] is False
+        for call in source.calls
+    )
+    assert list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_export_writes_geojson_feature_per_season_with_geometry(tmp_path):
+    """GeoJSON содержит Feature сезонного ряда с контуром и датами."""
+    source = RecordingSource({
+        3: [make_series(3, 7, (1, 2)), make_series(3, 8, (3,))],
+    })
+
+    NdviSeriesExportService(
+        source,
+        tmp_path,
+        export_format=ExportFormat.GEOJSON,
+    ).run(agroids=(3,))
+
+    collection = json.loads(
+        (tmp_path / "ndvi_a3.geojson").read_text(encoding="utf-8")
+    )
+    assert source.calls[0]["with_geometry"] is True
+    features = collection["features"]
+    assert [feature["properties"]["field_id"] for feature in features] == [
+        7,
+        8,
+    ]
+    first = features[0]
+    assert first["geometry"]["type"] == "Point"
+    series = first["properties"]["series"]
+    assert [point["acquired_on"] for point in series] == [
+        "2026-07-01",
+        "2026-07-02",
+    ]
+
+
+def test_export_failure_keeps_previous_file_and_reports_agro(tmp_path):
+    """Ошибка чтения не заменяет прежний файл и называет хозяйство."""
+    previous = tmp_path / "ndvi_a5.csv"
+    previous.write_text("previous", encoding="utf-8")
+    source = RecordingSource({3: [make_series(3, 7, (1,))]}, failing=(5,))
+
+    with pytest.raises(ProcessingError, match="хозяйств: 5"):
+        NdviSeriesExportService(source, tmp_path).run(agroids=(3, 5))
+
+    assert previous.read_text(encoding="utf-8") == "previous"
+    assert (tmp_path / "ndvi_a3.csv").exists()
+    assert list(tmp_path.glob(".*.tmp")) == []
@@ -1,5 +1,6 @@
 """Тесты orchestration расчёта NDVI-статистики полей."""
 
+import threading
 from datetime import UTC, date, datetime
 from pathlib import Path
 
@@ -8,6 +9,8 @@ import pytest
 
 from domain.models import Field, NdviStatistics
 from processing.domain import ProductLevel, SceneContext
+from processing.exceptions import NdviWriteError
+from processing.ndvi_writer import BackgroundNdviWriter
 from processing.processors.ndvistat import NdviStatisticsProcessor
 from processing.raster import RasterClip
 
@@ -72,11 +75,11 @@ class WritingGeometryExporter:
         """Создаёт пустой журнал экспортов."""
         self.exports = []
 
-    def export(self, geometry, destination):
+    def export(self, geometry, destination, *, srid):
         """Записывает тестовую маску и фиксирует экспорт."""
         path = Path(destination)
         path.write_text(str(geometry), encoding="utf-8")
-        self.exports.append((geometry, path))
+        self.exports.append((geometry, path, srid))
         return path
 
 
@@ -191,10 +194,10 @@ def test_run_batches_missing_geometry_and_saves_statistics(
     ]
     assert field_data.field_calls == [{"agroid": 3, "year": 2026}]
     assert field_data.geometry_calls == [
-        {"field_ids": [11], "year": 2026}
+        {"field_ids": [11], "year": 2026, "srid": 3857}
     ]
     assert exporter.exports == [
-        ("geometry-11", Path(paths.field_geojson(3, "11")))
+        ("geometry-11", Path(paths.field_geojson(3, "11")), 3857)
     ]
     assert len(RASTER_READERS) == 1
     assert RASTER_READERS[0].source == paths.ndvi_source(3)
@@ -399,3 +402,104 @@ def test_save_geojsons_reports_missing_geometry(tmp_path):
             [Field(id=42, name="42")],
             3,
         )
+
+
+def make_statistics(field_id: int) -> NdviStatistics:
+    """Создаёт статистику поля для проверки фоновой записи."""
+    return NdviStatistics(
+        acquired_on=date(2026, 7, 1),
+        field_id=field_id,
+        mean=0.5,
+        maximum=1.0,
+        minimum=0.0,
+        growth_percent=0.0,
+        coefficient_of_variation=1.0,
+        is_uniform=True,
+    )
+
+
+def test_background_writer_merges_queued_batches_in_order():
+    """Накопившиеся пакеты одной даты и режима пишутся одним save_ndvi."""
+
+    class BlockingFieldData(RecordingFieldData):
+        """Задерживает первую запись, пока в очереди копятся пакеты."""
+
+        def __init__(self):
+            """Создаёт событие разблокировки первой записи."""
+            super().__init__([], {})
+            self.started = threading.Event()
+            self.release = threading.Event()
+
+        def save_ndvi(self, values, **options):
+            """Ждёт разблокировки и запоминает пакет."""
+            self.started.set()
+            self.release.wait(timeout=5)
+            super().save_ndvi(values, **options)
+
+    field_data = BlockingFieldData()
+    acquired_on = date(2026, 7, 1)
+
+    with BackgroundNdviWriter(field_data, max_pending=8) as writer:
+        for field_id, overwrite in (
+                (1, True),
+                (2, True),
+                (3, True),
+                (4, False),
+                (5, True),
+        ):
+            writer.submit(
+                [make_statistics(field_id)],
+                field_ids=[field_id],
+                acquired_on=acquired_on,
+                overwrite=overwrite,
+            )
+            field_data.started.wait(timeout=5)
+        field_data.release.set()
+        writer.flush()
+
+    assert [
+        (
+            [value.field_id for value in values],
+            options["field_ids"],
+            options["overwrite"],
+        )
+        for values, options in field_data.saved_values
+    ] == [
+        ([1], [1], True),
+        ([2, 3], [2, 3], True),
+        ([4], [4], False),
+        ([5], [5], True),
+    ]
+
+
+def test_run_surfaces_background_write_error(tmp_path, monkeypatch):
+    """Ошибка фоновой записи завершает расчёт даты исключением."""
+
+    class FailingFieldData(RecordingFieldData):
+        """Отклоняет запись статистики."""
+
+        def save_ndvi(self, values, **options):
+            """Имитирует ошибку БД."""
+            raise RuntimeError("connection lost")
+
+    paths = StatisticsPaths(tmp_path)
+    Path(paths.ndvi_source(3)).write_bytes(b"ndvi")
+    Path(paths.scl_source(3)).write_bytes(b"scl")
+    Path(paths.field_geojson(3, "10")).write_text("geometry", encoding="utf-8")
+    monkeypatch.setattr(
+        "processing.processors.ndvistat.FieldRasterReader",
+        RecordingRasterReader,
+    )
+    processor = NdviStatisticsProcessor(
+        make_scene(),
+        paths,
+        FailingFieldData([Field(id=10, name="10")], {}),
+        WritingGeometryExporter(),
+        nodata=-9999.0,
+    )
+    processor.analyzer = RecordingAnalyzer()
+
+    with pytest.raises(NdviWriteError, match="connection lost") as error:
+        processor.run()
+
+    assert error.value.acquired_on == date(2026, 7, 1)
@@ -1,11 +1,36 @@
 """Тесты атомарной COG-оптимизации растров."""
 
-import subprocess
+import errno
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
-from satgeo.optimizer import optimize_geotiff
+from core.metrics import MetricsRegistry
+from satgeo import optimizer as optimizer_module
+from satgeo.optimizer import (
+    COG_METRIC,
+    cog_threads,
+    get_cog_profile,
+    optimize_geotiff,
+    product_cog_profiles,
+)
+
+
+class WrittenDataset:
+    """Имитирует dataset, возвращённый gdal.Translate."""
+
+    def FlushCache(self):
+        """Имитирует сброс буферов на диск."""
+
+
+def fake_gdal(monkeypatch, translate):
+    """Подменяет GDAL оптимизатора функцией Translate."""
+    monkeypatch.setattr(
+        optimizer_module,
+        "gdal",
+        SimpleNamespace(Translate=translate),
+    )
 
 
 def test_optimizer_writes_temporary_cog_and_replaces_destination(
@@ -17,40 +42,48 @@ def test_optimizer_writes_temporary_cog_and_replaces_destination(
     destination = tmp_path / "result.tif"
     source.write_bytes(b"source")
     calls = []
+    registry = MetricsRegistry()
+    monkeypatch.setattr(optimizer_module, "get_metrics_registry", lambda: registry)
 
-    def run(command):
-        """Имитирует успешный gdal_translate."""
-        calls.append(command)
-        Path(command[-1]).write_bytes(b"optimized")
+    def translate(path, source, **options):
+        """Имитирует успешную запись COG в процессе."""
+        calls.append((path, source, options))
+        Path(path).write_bytes(b"optimized")
+        return WrittenDataset()
 
-    monkeypatch.setattr(subprocess, "check_call", run)
+    fake_gdal(monkeypatch, translate)
 
     optimize_geotiff(source, destination)
 
     assert destination.read_bytes() == b"optimized"
-    assert "NUM_THREADS=ALL_CPUS" in calls[0]
-    temporary = Path(calls[0][-1])
+    path, translated, options = calls[0]
+    assert translated == str(source)
+    assert options["format"] == "COG"
+    assert "NUM_THREADS=ALL_CPUS" in options["creationOptions"]
+    assert registry.snapshot(COG_METRIC)[destination.name].size == 9
+    temporary = Path(path)
     assert temporary.parent == destination.parent
     assert temporary.name.endswith(".tmp.tif")
     assert not temporary.exists()
 
 
-def test_optimizer_retries_failed_gdal_call(tmp_path, monkeypatch):
-    """Временная ошибка gdal_translate приводит к повторной попытке."""
+def test_optimizer_retries_only_busy_destination(tmp_path, monkeypatch):
+    """Повторяется занятый файл (EBUSY), ошибка GDAL поднимается сразу."""
     source = tmp_path / "source.tif"
     destination = tmp_path / "result.tif"
     source.write_bytes(b"source")
     attempts = []
     delays = []
 
-    def run(command):
-        """Падает один раз, затем создаёт оптимизированный файл."""
-        attempts.append(command)
+    def translate(path, source, **_options):
+        """Первый раз файл занят, затем создаёт оптимизированный файл."""
+        attempts.append(path)
         if len(attempts) == 1:
-            raise subprocess.CalledProcessError(1, command)
-        Path(command[-1]).write_bytes(b"optimized")
+            raise OSError(errno.EBUSY, "Device or resource busy")
+        Path(path).write_bytes(b"optimized")
+        return WrittenDataset()
 
-    monkeypatch.setattr(subprocess, "check_call", run)
+    fake_gdal(monkeypatch, translate)
     monkeypatch.setattr("satgeo.optimizer.time.sleep", delays.append)
 
     optimize_geotiff(source, destination, retries=2, delay=0.1)
@@ -59,6 +92,18 @@ def test_optimizer_retries_failed_gdal_call(tmp_path, monkeypatch):
     assert delays == [0.1]
     assert destination.is_file()
 
+    def broken(path, source, **_options):
+        """Имитирует повреждённый источник."""
+        attempts.append(path)
+        raise RuntimeError("TIFFReadEncodedTile() failed")
+
+    fake_gdal(monkeypatch, broken)
+    with pytest.raises(RuntimeError, match="TIFFReadEncodedTile"):
+        optimize_geotiff(source, destination, retries=5, delay=0.1)
+
+    assert len(attempts) == 3
+    assert delays == [0.1]
+
 
 def test_optimizer_removes_gdal_sidecars_before_retry(
         tmp_path,
@@ -70,16 +115,17 @@ def test_optimizer_removes_gdal_sidecars_before_retry(
     source.write_bytes(b"source")
     temporary_paths = []
 
-    def run(command):
+    def translate(path, source, **_options):
         """Имитирует оставленный GDAL файл обзоров после первого сбоя."""
-        temporary = Path(command[-1])
+        temporary = Path(path)
         temporary_paths.append(temporary)
         if len(temporary_paths) == 1:
             Path(f"{temporary}.ovr.tmp").write_bytes(b"stale")
-            raise subprocess.CalledProcessError(1, command)
+            raise OSError(errno.EBUSY, "Device or resource busy")
         temporary.write_bytes(b"optimized")
+        return WrittenDataset()
 
-    monkeypatch.setattr(subprocess, "check_call", run)
+    fake_gdal(monkeypatch, translate)
     monkeypatch.setattr("satgeo.optimizer.time.sleep", lambda _delay: None)
 
     optimize_geotiff(source, destination, retries=2, delay=0)
@@ -89,6 +135,30 @@ def test_optimizer_removes_gdal_sidecars_before_retry(
     assert destination.read_bytes() == b"optimized"
 
 
+def test_optimizer_limits_compression_threads(tmp_path, monkeypatch):
+    """Потоки сжатия делятся между одновременными записями COG."""
+    options = []
+
+    def translate(path, _source, **translate_options):
+        """Запоминает опции драйвера COG."""
+        options.append(translate_options["creationOptions"])
+        Path(path).write_bytes(b"optimized")
+        return WrittenDataset()
+
+    fake_gdal(monkeypatch, translate)
+    monkeypatch.setattr(optimizer_module.os, "cpu_count", lambda: 8)
+    (tmp_path / "source.tif").write_bytes(b"source")
+
+    optimize_geotiff(
+        tmp_path / "source.tif",
+        tmp_path / "result.tif",
+        threads=cog_threads(3),
+    )
+
+    assert "NUM_THREADS=2" in options[0]
+    assert cog_threads(16) == 1
+
+
 def test_optimizer_rejects_non_positive_retries(tmp_path):
     """Неположительное число попыток отклоняется до запуска GDAL."""
     with pytest.raises(ValueError, match="положительным"):
@@ -97,3 +167,77 @@ def test_optimizer_rejects_non_positive_retries(tmp_path):
             tmp_path / "result.tif",
             retries=0,
         )
+
+
+def test_optimizer_writes_cog_directly_from_open_dataset(
+        tmp_path,
+        monkeypatch,
+):
+    """Открытый dataset или VRT передаётся GDAL без промежуточного файла."""
+    destination = tmp_path / "result.tif"
+    vrt = object()
+    sources = []
+
+    def translate(path, source, **_options):
+        """Запоминает источник записи COG."""
+        sources.append(source)
+        Path(path).write_bytes(b"optimized")
+        return WrittenDataset()
+
+    fake_gdal(monkeypatch, translate)
+
+    optimize_geotiff(vrt, destination)
+
+    assert sources == [vrt]
+    assert destination.read_bytes() == b"optimized"
+
+
+def test_int16_profile_scales_index_and_records_inverse_transform(
+        tmp_path,
+        monkeypatch,
+):
+    """Профиль int16 переводит индекс в Int16 и сохраняет scale/offset."""
+    source = tmp_path / "source.tif"
+    source.write_bytes(b"float32")
+    destination = tmp_path / "ndvi.tif"
+    calls = []
+
+    def translate(path, source, **options):
+        """Запоминает аргументы записи COG."""
+        calls.append(options)
+        Path(path).write_bytes(b"optimized")
+        return WrittenDataset()
+
+    monkeypatch.setattr(
+        optimizer_module,
+        "gdal",
+        SimpleNamespace(
+            Translate=translate,
+            GetDataTypeByName={"Int16": 3}.get,
+        ),
+    )
+
+    optimize_geotiff(
+        source,
+        destination,
+        get_cog_profile("int16"),
+    )
+
+    options = calls[0]
+    assert options["outputType"] == 3
+    assert options["noData"] == -32768
+    assert options["scaleParams"] == [[-1.0, 1.0, -10000.0, 10000.0]]
+    assert options["options"] == ["-a_scale", "0.0001", "-a_offset", "0.0"]
+    assert "COMPRESS=DEFLATE" in options["creationOptions"]
+    assert "BLOCKSIZE=256" in options["creationOptions"]
+
+
+def test_product_profiles_default_scl_to_nearest_overviews():
+    """SCL по умолчанию строит обзоры ближайшим соседом."""
+    profiles = product_cog_profiles({"TCI": "jpeg"})
+
+    assert "RESAMPLING=NEAREST" in profiles["scl"].creation_options
+    assert "COMPRESS=JPEG" in profiles["tci"].creation_options
+    assert "ndvi" not in profiles
+    with pytest.raises(ValueError, match="Неизвестный профиль COG"):
+        get_cog_profile("png")
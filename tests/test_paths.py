@@ -12,6 +12,7 @@ from processing.paths import (
     L2AProductPaths,
     MosaicPaths,
     NdviStatisticsPaths,
+    PublishedRasterPaths,
     SentinelCropPaths,
 )
 from processing.workspace import WorkspacePaths
@@ -46,7 +47,7 @@ def create_file(path: Path) -> Path:
     return path
 
 
-def test_l2a_product_paths_resolve_safe_bands_and_destination(tmp_path):
+def test_l2a_product_paths_resolve_safe_bands(tmp_path):
     """L2A resolver находит каналы разного разрешения внутри SAFE."""
     paths = L2AProductPaths(
         scene(ProductLevel.L2A),
@@ -75,11 +76,6 @@ def test_l2a_product_paths_resolve_safe_bands_and_destination(tmp_path):
 
     assert paths.sources("b04") == [str(red)]
     assert paths.sources("scl") == [str(scl)]
-    assert Path(paths.destination("ndvi")) == (
-        tmp_path
-        / "intermediate"
-        / "s2a_t38ula_01_07_2026_ndvi_native.tif"
-    )
     with pytest.raises(ValueError, match="Неизвестный канал L2A"):
         paths.sources("b12")
 
@@ -102,11 +98,6 @@ def test_l1c_product_paths_resolve_safe_band_without_scl(tmp_path):
 
     assert paths.sources("b04") == [str(red)]
     assert paths.sources("scl") == []
-    assert Path(paths.destination("tci")) == (
-        tmp_path
-        / "intermediate"
-        / "s2a_t38ula_01_07_2026_tci_native.tif"
-    )
     with pytest.raises(ValueError, match="Неизвестный канал L1C"):
         paths.sources("b12")
 
@@ -118,12 +109,7 @@ def test_crop_paths_select_storage_by_agroid_and_resolution(tmp_path):
         scene(ProductLevel.L2A),
         current_workspace,
     )
-    ndvi = create_file(
-        current_workspace.intermediate
-        / "s2a_t38ula_01_07_2026_ndvi_native.tif"
-    )
 
-    assert paths.sources("ndvi") == [str(ndvi)]
     assert Path(paths.destination("ndvi", 1)) == (
         current_workspace.intermediate
         / "s2a_01_07_2026_a1_ndvi_10m_3857_t38ula.tif"
@@ -136,8 +122,6 @@ def test_crop_paths_select_storage_by_agroid_and_resolution(tmp_path):
         current_workspace.intermediate
         / "s2a_01_07_2026_a3_scl_20m_3857.tif"
     )
-    with pytest.raises(ValueError, match="Неизвестный продукт"):
-        paths.sources("b04")
     with pytest.raises(ValueError, match="Неизвестный продукт"):
         paths.destination("b04", 3)
 
@@ -251,3 +235,20 @@ def test_l2a_statistics_uses_visual_ndvi_and_separate_scl(tmp_path):
         / "processed"
         / "s2a_01_07_2026_a1_scl_10m_3857.tif"
     )
+
+
+def test_published_raster_paths_match_product_destinations(tmp_path):
+    """Манифест публикации совпадает с путями записи продуктов."""
+    l2a = scene(ProductLevel.L2A)
+    paths = workspace(tmp_path)
+
+    assert PublishedRasterPaths(l2a, paths).rasters(3) == [
+        SentinelCropPaths(l2a, paths).destination("tci", 3),
+        CloudMaskPaths(l2a, paths).ndvi(3),
+        SentinelCropPaths(l2a, paths).destination("ndwi", 3),
+        CloudMaskPaths(l2a, paths).scl_10m(3),
+    ]
+    assert PublishedRasterPaths(l2a, paths).rasters(1)[0] == (
+        MosaicPaths(l2a, paths).destination("tci")
+    )
+    assert len(PublishedRasterPaths(scene(ProductLevel.L1C), paths).rasters(3)) == 3
@@ -1,7 +1,10 @@
 """Тесты process-lifetime cache PostGIS-адаптера полевых данных."""
 
-from domain.models import Field
+from datetime import date
+
+from domain.models import AgroSnapshot, Field, FieldRevision
 from processing.adapters.postgis import PostgisFieldDataProvider
+from processing.field_store import FieldGeometryStore
 
 
 class FakeConnection:
@@ -34,9 +37,9 @@ class FakeFieldRepository:
         self.fields_calls.append((agroid, year))
         return [Field(id=10, name="field")]
 
-    def geometries(self, field_ids, year):
+    def geometries(self, field_ids, year, *, srid, tolerance=None):
         """Возвращает геометрии запрошенных полей."""
-        self.geometry_calls.append((tuple(field_ids), year))
+        self.geometry_calls.append((tuple(field_ids), year, srid, tolerance))
         return {
             field_id: f"geometry-{field_id}"
             for field_id in field_ids
@@ -47,7 +50,7 @@ def test_adapter_caches_bounds_fields_and_geometries(monkeypatch):
     """Неизменяемые сезонные данные читаются из PostGIS только один раз."""
     connections = []
 
-    def connect(**_kwargs):
+    def connect():
         """Создаёт наблюдаемое тестовое подключение."""
         connection = FakeConnection()
         connections.append(connection)
@@ -57,7 +60,7 @@ def test_adapter_caches_bounds_fields_and_geometries(monkeypatch):
     FakeFieldRepository.fields_calls = []
     FakeFieldRepository.geometry_calls = []
     monkeypatch.setattr(
-        "processing.adapters.postgis.psycopg2.connect",
+        "processing.adapters.postgis.pooled_connection",
         connect,
     )
     monkeypatch.setattr(
@@ -81,11 +84,11 @@ def test_adapter_caches_bounds_fields_and_geometries(monkeypatch):
         Field(id=10, name="field")
     ]
     provider.fields(agroid=3, year=2026)
-    assert provider.geometries(field_ids=[10, 20], year=2026) == {
+    assert provider.geometries(field_ids=[10, 20], year=2026, srid=3857) == {
         10: "geometry-10",
         20: "geometry-20",
     }
-    assert provider.geometries(field_ids=[20, 30], year=2026) == {
+    assert provider.geometries(field_ids=[20, 30], year=2026, srid=3857) == {
         20: "geometry-20",
         30: "geometry-30",
     }
@@ -93,7 +96,287 @@ def test_adapter_caches_bounds_fields_and_geometries(monkeypatch):
     assert FakeFieldRepository.bounds_calls == [(2026, 3, 3857)]
     assert FakeFieldRepository.fields_calls == [(3, 2026)]
     assert FakeFieldRepository.geometry_calls == [
-        ((10, 20), 2026),
-        ((30,), 2026),
+        ((10, 20), 2026, 3857, None),
+        ((30,), 2026, 3857, None),
     ]
     assert len(connections) == 4
+
+
+def test_adapter_serves_prefetched_snapshot_without_new_connections(
+        monkeypatch,
+):
+    """После prefetch поля, границы, геометрии и полнота NDVI не читаются."""
+    connections = []
+
+    class SnapshotRepository:
+        """Возвращает снимок одного хозяйства."""
+
+        def __init__(self, _gateway):
+            pass
+
+        def snapshots(self, *, agroids, year, srid, acquired_on, tolerance):
+            """Создаёт снимок запрошенных хозяйств."""
+            return {
+                agroid: AgroSnapshot(
+                    agroid=agroid,
+                    fields=(Field(id=10, name="field"),),
+                    bounds=(1.0, 2.0, 3.0, 4.0),
+                    geometries={10: "geometry-10"},
+                    ndvi_complete=True,
+                )
+                for agroid in agroids
+            }
+
+    def connect():
+        """Создаёт наблюдаемое тестовое подключение."""
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(
+        "processing.adapters.postgis.pooled_connection",
+        connect,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.SqlGateway",
+        lambda connection: connection,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.FieldRepository",
+        SnapshotRepository,
+    )
+    provider = PostgisFieldDataProvider()
+    acquired_on = date(2026, 7, 1)
+
+    provider.prefetch(
+        year=2026,
+        agroids=(3,),
+        srid=3857,
+        acquired_on=acquired_on,
+    )
+    provider.prefetch(
+        year=2026,
+        agroids=(3,),
+        srid=3857,
+        acquired_on=acquired_on,
+    )
+
+    assert provider.bounds(year=2026, agroid=3, srid=3857) == (
+        1.0,
+        2.0,
+        3.0,
+        4.0,
+    )
+    assert provider.fields(agroid=3, year=2026) == [Field(id=10, name="field")]
+    assert provider.geometries(field_ids=[10], year=2026, srid=3857) == {
+        10: "geometry-10"
+    }
+    assert provider.ndvi_is_complete(
+        agroid=3,
+        year=2026,
+        acquired_on=acquired_on,
+    )
+    assert len(connections) == 1
+
+
+def test_adapter_refreshes_only_changed_fields_in_geometry_store(
+        monkeypatch,
+        tmp_path,
+):
+    """Хранилище контуров перечитывает из PostGIS только изменённые поля."""
+    revisions = {10: "1:1", 20: "1:1"}
+    calls = []
+    agroids = (3, 4)
+
+    class StoreRepository:
+        """Отдаёт версии полей и фиксирует тяжёлые запросы."""
+
+        def __init__(self, _gateway):
+            pass
+
+        def revisions(self, *, agroids, year, acquired_on):
+            """Возвращает текущие версии полей хозяйства."""
+            calls.append(("revisions", tuple(agroids)))
+            return [
+                FieldRevision(
+                    agroid,
+                    agroid * 100 + field_id,
+                    revision,
+                    has_ndvi=True,
+                    name=f"Поле {field_id}",
+                )
+                for agroid in agroids
+                for field_id, revision in revisions.items()
+            ]
+
+        def geometries(self, field_ids, year, *, srid, tolerance=None):
+            """Возвращает WKB запрошенных полей."""
+            calls.append(("geometries", tuple(field_ids)))
+            return {
+                field_id: f"wkb-{field_id}-{revisions[field_id % 100]}".encode()
+                for field_id in field_ids
+            }
+
+        def extents(self, *, agroids, year, srids):
+            """Возвращает границы хозяйств во всех запрошенных SRID."""
+            calls.append(("extents", tuple(agroids)))
+            return {
+                agroid: {srid: (float(srid), 2.0, 3.0, 4.0) for srid in srids}
+                for agroid in agroids
+            }
+
+    monkeypatch.setattr(
+        "processing.adapters.postgis.pooled_connection",
+        FakeConnection,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.SqlGateway",
+        lambda connection: connection,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.FieldRepository",
+        StoreRepository,
+    )
+    store = FieldGeometryStore(tmp_path)
+    acquired_on = date(2026, 7, 1)
+
+    def run():
+        """Имитирует отдельный запуск процесса обработки."""
+        calls.clear()
+        provider = PostgisFieldDataProvider(geometry_store=store)
+        provider.prefetch(
+            year=2026,
+            agroids=agroids,
+            srid=32638,
+            acquired_on=acquired_on,
+        )
+        return provider
+
+    provider = run()
+    assert calls == [
+        ("revisions", agroids),
+        ("geometries", (310, 320, 410, 420)),
+        ("extents", agroids),
+    ]
+    assert provider.fields(agroid=4, year=2026) == [
+        Field(id=410, name="Поле 10"),
+        Field(id=420, name="Поле 20"),
+    ]
+
+    provider = run()
+    assert calls == [("revisions", agroids)]
+    assert provider.bounds(year=2026, agroid=3, srid=4326) == (
+        4326.0,
+        2.0,
+        3.0,
+        4.0,
+    )
+    assert provider.ndvi_is_complete(
+        agroid=3,
+        year=2026,
+        acquired_on=acquired_on,
+    )
+
+    revisions[20] = "2:1"
+    provider = run()
+    assert calls == [
+        ("revisions", agroids),
+        ("geometries", (320, 420)),
+        ("extents", agroids),
+    ]
+    assert provider.geometries(field_ids=[310, 320], year=2026, srid=32638) == {
+        310: b"wkb-310-1:1",
+        320: b"wkb-320-2:1",
+    }
+    assert provider.bounds(year=2026, agroid=3, srid=32638)[0] == 32638.0
+
+
+def test_save_ndvi_invalidates_only_written_agros(monkeypatch):
+    """Запись статистики сбрасывает полноту NDVI только своих хозяйств."""
+    completeness_calls = []
+    partition_calls = []
+
+    class SnapshotRepository:
+        """Возвращает снимки хозяйств с одним полем каждое."""
+
+        def __init__(self, _gateway):
+            pass
+
+        def snapshots(self, *, agroids, year, srid, acquired_on, tolerance):
+            """Поле хозяйства имеет идентификатор agroid * 10."""
+            return {
+                agroid: AgroSnapshot(
+                    agroid=agroid,
+                    fields=(Field(id=agroid * 10, name="field"),),
+                    bounds=(1.0, 2.0, 3.0, 4.0),
+                    geometries={},
+                    ndvi_complete=False,
+                )
+                for agroid in agroids
+            }
+
+    class NdviRepository:
+        """Принимает запись и отвечает на проверку полноты."""
+
+        def __init__(self, _gateway):
+            pass
+
+        def ensure_partitions(self, years):
+            """Запоминает сезоны, для которых проверяются секции."""
+            partition_calls.append(set(years))
+
+        def add_many(self, _values):
+            """Ничего не делает."""
+
+        def is_complete(self, fields, _acquired_on):
+            """Запоминает повторную проверку полноты."""
+            completeness_calls.append([field.id for field in fields])
+            return True
+
+    monkeypatch.setattr(
+        "processing.adapters.postgis.pooled_connection",
+        FakeConnection,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.SqlGateway",
+        lambda connection: connection,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.FieldRepository",
+        SnapshotRepository,
+    )
+    monkeypatch.setattr(
+        "processing.adapters.postgis.NdviRepository",
+        NdviRepository,
+    )
+    provider = PostgisFieldDataProvider()
+    acquired_on = date(2026, 7, 1)
+    provider.prefetch(
+        year=2026,
+        agroids=(3, 4),
+        srid=3857,
+        acquired_on=acquired_on,
+    )
+
+    provider.save_ndvi([], field_ids=[30], acquired_on=acquired_on)
+
+    assert provider.ndvi_is_complete(
+        agroid=3,
+        year=2026,
+        acquired_on=acquired_on,
+    )
+    assert not provider.ndvi_is_complete(
+        agroid=4,
+        year=2026,
+        acquired_on=acquired_on,
+    )
+    assert completeness_calls == [[30]]
+
+    provider.save_ndvi([], field_ids=[40], acquired_on=acquired_on)
+
+    assert provider.ndvi_is_complete(
+        agroid=4,
+        year=2026,
+        acquired_on=acquired_on,
+    )
+    # Секция сезона проверяется один раз за процесс.
+    assert partition_calls == [{2026}]
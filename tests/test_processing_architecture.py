@@ -17,6 +17,12 @@ from processing.domain import (
 )
 from processing.exceptions import ProcessingRunError
 from processing.service import ProcessingService
+from processing.triage import (
+    AgroCloudTriage,
+    CloudTriagePolicy,
+    PairProcessingResult,
+    write_triage,
+)
 from processing.workspace import ProcessingOptions, WorkspacePaths
 
 
@@ -30,6 +36,17 @@ def pair(day: int) -> ArchivePair:
     )
 
 
+class PrefetchingFieldData:
+    """Фиксирует предварительное чтение состояния хозяйств даты."""
+
+    def __init__(self):
+        self.prefetched = []
+
+    def prefetch(self, *, year, agroids, srid, acquired_on):
+        """Запоминает набор хозяйств одного запроса."""
+        self.prefetched.append((year, agroids, srid, acquired_on))
+
+
 def test_archive_pair_finder_has_single_discovery_responsibility():
     """Finder формирует только полные пары и игнорирует невалидные архивы."""
     archives = [
@@ -146,13 +163,8 @@ def test_pair_processor_runs_shared_steps_once(monkeypatch):
     monkeypatch.setattr(pair_processor_module, "SentinelArchive", Archive)
     monkeypatch.setattr(
         pair_processor_module,
-        "TileImageProcessor",
-        processor("tile"),
-    )
-    monkeypatch.setattr(
-        pair_processor_module,
-        "AgroCropProcessor",
-        processor("crop"),
+        "FootprintProductProcessor",
+        processor("footprint"),
     )
     monkeypatch.setattr(
         pair_processor_module,
@@ -169,6 +181,7 @@ def test_pair_processor_runs_shared_steps_once(monkeypatch):
         "NdviStatisticsProcessor",
         processor("statistics"),
     )
+    field_data = PrefetchingFieldData()
     workspace = WorkspacePaths(*(Path(name) for name in (
         "temporary",
         "intermediate",
@@ -179,18 +192,19 @@ def test_pair_processor_runs_shared_steps_once(monkeypatch):
         temporary_root="temporary",
         workspace=workspace,
         options=ProcessingOptions(3857, -9999.0),
-        field_data=object(),
+        field_data=field_data,
         geometry_exporter=object(),
     )
     pair_processor.process(pair(1))
 
+    assert field_data.prefetched == [
+        (2026, (1, 3, 4, 5, 6), 3857, date(2026, 7, 1)),
+    ]
     assert events == [
         ("extract", "t38ula"),
-        ("tile", "t38ula"),
-        ("crop", "t38ula"),
+        ("footprint", "t38ula"),
         ("extract", "t38ulb"),
-        ("tile", "t38ulb"),
-        ("crop", "t38ulb"),
+        ("footprint", "t38ulb"),
         ("combine", "t38ula"),
         ("rescale-scl", "t38ula"),
         ("statistics", "t38ula"),
@@ -201,12 +215,403 @@ def test_pair_processor_runs_shared_steps_once(monkeypatch):
 
     assert events == [
         ("extract", "t38ula"),
-        ("tile", "t38ula"),
-        ("crop", "t38ula"),
+        ("footprint", "t38ula"),
         ("rescale-scl", "t38ula"),
         ("statistics", "t38ula"),
     ]
 
+def test_pair_processor_skips_agros_clouded_in_both_tiles(monkeypatch):
+    """Хозяйства без ясных пикселей SCL не доходят до распаковки и публикации."""
+    events = []
+
+    class Archive:
+        """Имитирует архив L2A без чтения каналов."""
+
+        def __init__(self, path):
+            self.path = Path(path)
+            tile = "T38ULA" if "ula" in self.path.name else "T38ULB"
+            self.metadata = ArchiveMetadata(
+                satellite="S2A",
+                date=date(2026, 7, 1),
+                tile=tile,
+                level="MSIL2A",
+            )
+
+        def read_band_offsets(self):
+            """Возвращает нулевые radiometric offsets."""
+            return None
+
+        def extract(self, _root, _bands):
+            """Фиксирует распаковку архива."""
+            events.append(("extract", self.metadata.tile.lower()))
+
+    class Triage:
+        """Возвращает фиксированные счётчики SCL для тайла."""
+
+        def __init__(self, scene_context, *_args):
+            self.scene = scene_context
+
+        def run(self):
+            """Хозяйство 3 закрыто облаками, остальные ясные."""
+            return {
+                agroid: AgroCloudTriage(agroid, 0 if agroid == 3 else 90, 100)
+                for agroid in self.scene.agroids
+            }
+
+    class Processor:
+        """Запоминает хозяйства сцены каждого этапа."""
+
+        def __init__(self, scene_context, *_args, **_kwargs):
+            self.scene = scene_context
+
+        def run(self):
+            """Добавляет хозяйства сцены в журнал."""
+            events.append(("step", self.scene.agroids))
+
+    monkeypatch.setattr(pair_processor_module, "SentinelArchive", Archive)
+    monkeypatch.setattr(pair_processor_module, "CloudTriageProcessor", Triage)
+    for name in (
+            "FootprintProductProcessor",
+            "MosaicProcessor",
+            "RescaleSCLProcessor",
+            "NdviStatisticsProcessor",
+    ):
+        monkeypatch.setattr(pair_processor_module, name, Processor)
+    field_data = PrefetchingFieldData()
+    workspace = WorkspacePaths(*(Path(name) for name in (
+        "temporary",
+        "intermediate",
+        "processed",
+        "ndvi",
+    )))
+    pair_processor = pair_processor_module.SentinelPairProcessor(
+        temporary_root="temporary",
+        workspace=workspace,
+        options=ProcessingOptions(3857, -9999.0),
+        field_data=field_data,
+        geometry_exporter=object(),
+        triage_policy=CloudTriagePolicy(skip_below=0.01),
+    )
+
+    result = pair_processor.process(pair(1), target_agroids=(3,))
+
+    assert events == []
+    assert result.skipped_agroids == (3,)
+    assert result.published_agroids == ()
+
+    result = pair_processor.process(pair(1))
+
+    assert 3 not in result.processed_agroids
+    assert result.published_agroids == result.processed_agroids
+    assert all(3 not in agroids for _step, agroids in events if _step == "step")
+
+
+def test_statistics_only_agro_gets_only_ndvi_and_scl(monkeypatch, tmp_path):
+    """Хозяйство только для статистики не получает растров TCI и NDWI."""
+    extracted = []
+
+    class Archive:
+        """Имитирует архив L2A без чтения каналов."""
+
+        def __init__(self, path):
+            self.path = Path(path)
+            tile = "T38ULA" if "ula" in self.path.name else "T38ULB"
+            self.metadata = ArchiveMetadata(
+                satellite="S2A",
+                date=date(2026, 7, 1),
+                tile=tile,
+                level="MSIL2A",
+            )
+
+        def read_band_offsets(self):
+            """Возвращает нулевые radiometric offsets."""
+            return None
+
+        def extract(self, _root, bands):
+            """Запоминает распакованные каналы."""
+            extracted.append(tuple(bands))
+
+    class Triage:
+        """Хозяйство 3 облачное наполовину, остальные ясные."""
+
+        def __init__(self, scene_context, *_args):
+            self.scene = scene_context
+
+        def run(self):
+            """Возвращает счётчики SCL хозяйств тайла."""
+            return {
+                agroid: AgroCloudTriage(agroid, 30 if agroid == 3 else 90, 100)
+                for agroid in self.scene.agroids
+            }
+
+    class Footprint:
+        """Создаёт пустой растр каждого продукта хозяйства."""
+
+        def __init__(self, scene_context, *_args, products):
+            self.scene = scene_context
+            self.products = products
+
+        def run(self):
+            """Пишет файлы продуктов."""
+            for agroid in self.scene.agroids:
+                for product in self.products:
+                    (tmp_path / f"a{agroid}_{product}.tif").touch()
+
+    class Processor:
+        """Пропускает общие этапы даты."""
+
+        def __init__(self, *_args, **_kwargs):
+            pass
+
+        def run(self):
+            """Ничего не делает."""
+
+    monkeypatch.setattr(pair_processor_module, "SentinelArchive", Archive)
+    monkeypatch.setattr(pair_processor_module, "CloudTriageProcessor", Triage)
+    monkeypatch.setattr(
+        pair_processor_module,
+        "FootprintProductProcessor",
+        Footprint,
+    )
+    for name in (
+            "MosaicProcessor",
+            "RescaleSCLProcessor",
+            "NdviStatisticsProcessor",
+    ):
+        monkeypatch.setattr(pair_processor_module, name, Processor)
+    pair_processor = pair_processor_module.SentinelPairProcessor(
+        temporary_root="temporary",
+        workspace=WorkspacePaths(*(tmp_path / name for name in (
+            "temporary",
+            "intermediate",
+            "processed",
+            "ndvi",
+        ))),
+        options=ProcessingOptions(3857, -9999.0),
+        field_data=PrefetchingFieldData(),
+        geometry_exporter=object(),
+        triage_policy=CloudTriagePolicy(statistics_only_below=0.5),
+    )
+
+    result = pair_processor.process(pair(1), target_agroids=(3,))
+
+    assert result.published_agroids == ()
+    assert extracted == [("B04", "B08", "SCL")]
+    assert sorted(path.name for path in tmp_path.glob("a3_*.tif")) == [
+        "a3_ndvi.tif",
+        "a3_scl.tif",
+    ]
+
+    pair_processor.process(pair(1), target_agroids=(3, 4))
+
+    assert extracted[-1] == ("TCI", "B03", "B04", "B08", "SCL")
+    assert not (tmp_path / "a3_tci.tif").exists()
+    assert (tmp_path / "a4_tci.tif").exists()
+
+
+def test_processing_service_publishes_only_triaged_agros():
+    """Service передаёт публикатору хозяйства из результата обработки."""
+
+    class Finder:
+        """Возвращает две тестовые пары."""
+
+        def find(self, _root, **_options):
+            """Возвращает пары двух дат."""
+            return [pair(1), pair(2)]
+
+    class Status:
+        """Помечает все даты незавершёнными."""
+
+        def get_missing_agroids_many(self, acquired_dates):
+            """Возвращает незавершённое хозяйство для каждой даты."""
+            return {acquired_on: [3] for acquired_on in acquired_dates}
+
+    class Processor:
+        """Первая дата полностью облачная, вторая публикуется частично."""
+
+        def process(self, archive_pair, target_agroids=None):
+            """Возвращает результат облачной сортировки."""
+            if archive_pair.acquired_on.day == 1:
+                return PairProcessingResult((), (), skipped_agroids=(3,))
+            return PairProcessingResult((3, 4), (4,))
+
+    class Publisher:
+        """Запоминает хозяйства публикации."""
+
+        def __init__(self):
+            self.calls = []
+
+        def publish_date(self, acquired_on, _source, agroids=None):
+            """Регистрирует вызов публикации."""
+            self.calls.append((acquired_on.day, agroids))
+
+    class Cleaner:
+        """Не выполняет очистку."""
+
+        def clean(self, _acquired_on):
+            """Ничего не делает."""
+
+    publisher = Publisher()
+    ProcessingService(
+        archive_root="/archive",
+        pair_finder=Finder(),
+        status_reader=Status(),
+        pair_processor=Processor(),
+        publisher=publisher,
+        cleaner=Cleaner(),
+    ).run()
+
+    assert publisher.calls == [(2, (4,))]
+
+
+def test_pair_processor_reads_triaged_agros_from_sidecars(tmp_path):
+    """Отсортированные хозяйства берутся из счётчиков обоих тайлов пары."""
+    bounds = (0.0, 0.0, 1.0, 1.0)
+    archive_pair = ArchivePair(
+        acquired_at=datetime(2026, 7, 1, 8, 16, 11),
+        prefix="t38",
+        ula=tmp_path / "1-ula.zip",
+        ulb=tmp_path / "1-ulb.zip",
+    )
+    for archive_path in archive_pair.archives:
+        archive_path.write_bytes(b"zip")
+    # Хозяйство 1 ясно только на ULB, 5 и 6 закрыты облаками.
+    write_triage(archive_pair.ula, {
+        1: (bounds, AgroCloudTriage(1, 0, 100)),
+        3: (bounds, AgroCloudTriage(3, 0, 100)),
+        4: (bounds, AgroCloudTriage(4, 90, 100)),
+    })
+    processor = pair_processor_module.SentinelPairProcessor(
+        temporary_root=tmp_path,
+        workspace=WorkspacePaths(tmp_path, tmp_path, tmp_path, tmp_path),
+        options=ProcessingOptions(3857, -9999.0),
+        field_data=PrefetchingFieldData(),
+        geometry_exporter=object(),
+        triage_policy=CloudTriagePolicy(skip_below=0.05),
+    )
+
+    # Без счётчиков ULB хозяйство 1 не исключается.
+    assert processor.triaged_agroids(archive_pair) == (3,)
+
+    write_triage(archive_pair.ulb, {
+        1: (bounds, AgroCloudTriage(1, 90, 100)),
+        5: (bounds, AgroCloudTriage(5, 0, 100)),
+        6: (bounds, AgroCloudTriage(6, 0, 0)),
+    })
+
+    assert processor.triaged_agroids(archive_pair) == (3, 5)
+
+
+def test_processing_service_excludes_triaged_agros_from_missing():
+    """Хозяйства, отсечённые облачностью, не выбираются недостающими снова."""
+
+    class Finder:
+        """Возвращает две тестовые пары."""
+
+        def find(self, _root, **_options):
+            """Возвращает пары двух дат."""
+            return [pair(1), pair(2)]
+
+    class Status:
+        """Слоёв хозяйства 3 нет ни за одну дату."""
+
+        def get_missing_agroids_many(self, acquired_dates):
+            """Возвращает хозяйства без слоёв."""
+            return {
+                acquired_on: [3] if acquired_on.day == 1 else [3, 4]
+                for acquired_on in acquired_dates
+            }
+
+    class Processor:
+        """Запоминает выбранные хозяйства и отдаёт решения сортировки."""
+
+        def __init__(self):
+            self.targets = []
+
+        def triaged_agroids(self, _archive_pair):
+            """Хозяйство 3 отсечено облачностью за обе даты."""
+            return (3,)
+
+        def process(self, archive_pair, target_agroids=None):
+            """Регистрирует обработку пары."""
+            self.targets.append((archive_pair.acquired_on.day, target_agroids))
+            return PairProcessingResult(target_agroids, target_agroids)
+
+    class Publisher:
+        """Принимает публикацию."""
+
+        def publish_date(self, _acquired_on, _source, agroids=None):
+            """Ничего не делает."""
+
+    class Cleaner:
+        """Не выполняет очистку."""
+
+        def clean(self, _acquired_on):
+            """Ничего не делает."""
+
+    processor = Processor()
+    summary = ProcessingService(
+        archive_root="/archive",
+        pair_finder=Finder(),
+        status_reader=Status(),
+        pair_processor=processor,
+        publisher=Publisher(),
+        cleaner=Cleaner(),
+        triage_reader=processor,
+    ).run()
+
+    assert processor.targets == [(2, (4,))]
+    assert summary.skipped == 1
+
+
+def test_processing_service_hands_output_manifest_to_publisher():
+    """Service передаёт публикатору растры, записанные обработкой даты."""
+    output = Path("processed/s2a_02_07_2026_a4_ndvi_10m_3857.tif")
+
+    class Finder:
+        """Возвращает одну пару."""
+
+        def find(self, _root, **_options):
+            """Возвращает пару второго дня."""
+            return [pair(2)]
+
+    class Processor:
+        """Возвращает манифест одного растра."""
+
+        def process(self, _archive_pair, target_agroids=None):
+            """Возвращает результат с манифестом."""
+            return PairProcessingResult((4,), (4,), outputs=(output,))
+
+    class Publisher:
+        """Запоминает переданный манифест."""
+
+        def __init__(self):
+            self.files = []
+
+        def publish_date(self, _acquired_on, _source, agroids=None, files=None):
+            """Регистрирует манифест публикации."""
+            self.files.append(files)
+
+    class Cleaner:
+        """Не выполняет очистку."""
+
+        def clean(self, _acquired_on):
+            """Ничего не делает."""
+
+    publisher = Publisher()
+    ProcessingService(
+        archive_root="/archive",
+        pair_finder=Finder(),
+        status_reader=None,
+        pair_processor=Processor(),
+        publisher=publisher,
+        cleaner=Cleaner(),
+        process_completed=True,
+    ).run()
+
+    assert publisher.files == [(output,)]
+
+
 def test_processing_service_coordinates_ports_without_infrastructure():
     """Service координирует порты, не требуя реальной инфраструктуры."""
 
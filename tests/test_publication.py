@@ -1,18 +1,67 @@
 
 """Тесты планирования и пакетной публикации растров."""
 
+import os
+import threading
+from contextlib import nullcontext
 from datetime import UTC, date, datetime
+from pathlib import Path
 
 import pytest
 
 from core.logging import get_logger
 from domain.models import LayerSourceMetadata
 from satgeo import publisher as publisher_module
+from satgeo import sources
+from satgeo.fingerprint import fingerprint_path
+from satgeo.mosaic import MosaicRasterPublisher
+from satgeo.optimizer import product_cog_profiles
 from satgeo.publisher import (
     PostgisPublicationRepository,
     PublicationPlanner,
     RasterPublisher,
 )
+from satgeo.sources import PublicationSourceIndex
+
+
+class SnapshotClient:
+    """Имитирует снимок каталога GeoServer на время пакета."""
+
+    def __init__(self):
+        """Создаёт счётчик открытых снимков."""
+        self.snapshots = 0
+
+    def catalog_snapshot(self):
+        """Учитывает открытие снимка пакета."""
+        self.snapshots += 1
+        return nullcontext()
+
+
+class LayerRecorder:
+    """Фиксирует пакет слоёв, сохраняемый после публикации даты."""
+
+    def __init__(self):
+        """Создаёт пустой журнал пакетов."""
+        self.batches = []
+
+    def add_layers(self, layers):
+        """Запоминает пакет опубликованных слоёв."""
+        self.batches.append(layers)
+
+
+def bare_publisher(tmp_path, logger_name: str) -> RasterPublisher:
+    """Создаёт publisher без GeoServer с однопоточным конвейером."""
+    publisher = RasterPublisher.__new__(RasterPublisher)
+    publisher.source_root = tmp_path
+    publisher.source_index = PublicationSourceIndex(tmp_path)
+    publisher.logger = get_logger(logger_name)
+    publisher.repository = LayerRecorder()
+    publisher.client = SnapshotClient()
+    publisher.seeder = None
+    publisher.optimize_workers = 1
+    publisher.catalog_workers = 1
+    publisher._register_file = lambda plan, _source, _quality: plan.name
+    return publisher
 
 
 def test_publish_date_raises_when_a_file_was_not_published(
@@ -21,14 +70,13 @@ def test_publish_date_raises_when_a_file_was_not_published(
     """Пакетная публикация сообщает обо всех неуспешных TIFF."""
     raster = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
     raster.write_bytes(b"not-a-real-raster")
-    publisher = RasterPublisher.__new__(RasterPublisher)
-    publisher.source_root = tmp_path
-    publisher.logger = get_logger("test-publication")
-    publisher._publish_file = lambda _path, _source=None, _quality=None: (
-        False,
-        "optimize_failed",
-        None,
-    )
+    publisher = bare_publisher(tmp_path, "test-publication")
+
+    def fail_optimization(_path):
+        """Имитирует ошибку gdal_translate."""
+        raise RuntimeError("optimize_failed")
+
+    publisher._optimize_file = fail_optimization
 
     with pytest.raises(RuntimeError, match=raster.name):
         publisher.publish_date(date(2026, 7, 1))
@@ -39,8 +87,9 @@ def test_publish_date_ignores_non_tiff_files(tmp_path):
     (tmp_path / "notes.txt").write_text("metadata", encoding="utf-8")
     publisher = RasterPublisher.__new__(RasterPublisher)
     publisher.source_root = tmp_path
+    publisher.source_index = PublicationSourceIndex(tmp_path)
     publisher.logger = get_logger("test-publication-non-tiff")
-    publisher._publish_file = lambda _path, _source=None: pytest.fail(
+    publisher._optimize_file = lambda _path: pytest.fail(
         "Служебный файл не должен публиковаться"
     )
 
@@ -55,18 +104,73 @@ def test_publish_date_does_not_repeat_previous_dates(tmp_path):
     previous.write_bytes(b"previous")
     current.write_bytes(b"current")
     published = []
-    publisher = RasterPublisher.__new__(RasterPublisher)
-    publisher.source_root = tmp_path
-    publisher.logger = get_logger("test-publication-date")
-    publisher._publish_file = lambda path, _source=None, _quality=None: (
-        published.append(path) is None,
-        path.name,
-        None,
-    )
+    publisher = bare_publisher(tmp_path, "test-publication-date")
+    publisher._optimize_file = lambda path: published.append(path) or path
 
     publisher.publish_date(date(2026, 7, 1))
 
     assert published == [current]
+    assert publisher.repository.batches == [[current.name]]
+
+
+def test_publish_date_skips_agros_excluded_by_triage(tmp_path):
+    """Растры хозяйств вне списка сортировки не публикуются."""
+    clear = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
+    clouded = tmp_path / "s2a_01_07_2026_a4_ndvi_10m_3857.tif"
+    clear.write_bytes(b"clear")
+    clouded.write_bytes(b"clouded")
+    published = []
+    publisher = bare_publisher(tmp_path, "test-publication-triage")
+    publisher._optimize_file = lambda path: published.append(path) or path
+
+    publisher.publish_date(date(2026, 7, 1), agroids=(3,))
+
+    assert published == [clear]
+
+
+def test_publish_date_pipelines_cog_and_rest_stages_in_separate_pools(
+        tmp_path,
+):
+    """COG и REST идут в своих пулах, слои сохраняются одним пакетом."""
+    names = [
+        f"s2a_01_07_2026_a{agroid}_{product}_10m_3857.tif"
+        for agroid, product in ((3, "ndvi"), (3, "tci"), (4, "ndvi"), (5, "scl"))
+    ]
+    for name in names:
+        (tmp_path / name).write_bytes(b"raster")
+    threads = {"optimize": set(), "register": set()}
+    publisher = bare_publisher(tmp_path, "test-publication-pipeline")
+    publisher.optimize_workers = 2
+    publisher.catalog_workers = 3
+
+    def optimize(path):
+        """Отклоняет TCI и запоминает поток CPU-этапа."""
+        threads["optimize"].add(threading.current_thread().name)
+        if "_tci_" in path.name:
+            raise RuntimeError("gdal_translate failed")
+        return path
+
+    def register(plan, _source, _quality):
+        """Отклоняет SCL и запоминает поток REST-этапа."""
+        threads["register"].add(threading.current_thread().name)
+        if "_scl_" in plan.name:
+            raise RuntimeError("GeoServer 500")
+        return plan.name
+
+    publisher._optimize_file = optimize
+    publisher._register_file = register
+
+    with pytest.raises(RuntimeError) as error:
+        publisher.publish_date(date(2026, 7, 1))
+
+    published = sorted(name for name in names if "_ndvi_" in name)
+    assert len(publisher.repository.batches) == 1
+    assert sorted(publisher.repository.batches[0]) == published
+    assert publisher.client.snapshots == 1
+    assert names[1] in str(error.value) and names[3] in str(error.value)
+    assert all(name.startswith("publish-cog") for name in threads["optimize"])
+    assert all(name.startswith("publish-rest") for name in threads["register"])
+    assert len(threads["optimize"]) <= 2 and len(threads["register"]) <= 3
 
 
 def test_publication_planner_builds_host_and_container_paths(tmp_path):
@@ -126,7 +230,7 @@ def test_publication_persists_visual_metadata(tmp_path):
     source_file.write_bytes(b"source")
     layers = []
 
-    class Client:
+    class Client(SnapshotClient):
         """Имитирует создание нового ресурса GeoServer."""
 
         def create_coveragestore(self, **_options):
@@ -170,7 +274,7 @@ def test_publication_persists_visual_metadata(tmp_path):
         ),
         client=Client(),
         repository=Repository(),
-        optimizer=lambda src, dst: dst.parent.mkdir(parents=True)
+        optimizer=lambda src, dst, _profile: dst.parent.mkdir(parents=True)
         or dst.write_bytes(src.read_bytes()),
     )
 
@@ -224,15 +328,10 @@ def test_postgis_repository_caches_repeated_agro_bounds(monkeypatch):
             calls.append(parameters)
             return 1.0, 2.0, 3.0, 4.0
 
-    monkeypatch.setattr(
-        publisher_module.psycopg2,
-        "connect",
-        lambda **_options: Connection(),
-    )
     monkeypatch.setattr(
         publisher_module,
-        "get_database_config",
-        lambda: {},
+        "pooled_connection",
+        lambda: Connection(),
     )
     monkeypatch.setattr(publisher_module, "SqlGateway", lambda value: value)
     monkeypatch.setattr(publisher_module, "FieldRepository", Repository)
@@ -246,7 +345,7 @@ def test_postgis_repository_caches_repeated_agro_bounds(monkeypatch):
 
 
 def test_postgis_repository_reads_all_quality_in_one_query(monkeypatch):
-    """Качество нескольких хозяйств агрегируется одним подключением."""
+    """Сводка качества нескольких хозяйств читается одним подключением."""
     connections = []
 
     class Connection:
@@ -278,15 +377,10 @@ def test_postgis_repository_reads_all_quality_in_one_query(monkeypatch):
                 },
             ]
 
-    monkeypatch.setattr(
-        publisher_module.psycopg2,
-        "connect",
-        lambda **_options: Connection(),
-    )
     monkeypatch.setattr(
         publisher_module,
-        "get_database_config",
-        lambda: {},
+        "pooled_connection",
+        lambda: Connection(),
     )
     monkeypatch.setattr(publisher_module, "SqlGateway", lambda value: value)
     repository = PostgisPublicationRepository()
@@ -305,8 +399,8 @@ def test_postgis_repository_reads_all_quality_in_one_query(monkeypatch):
     assert first == {3: (10.0, 80.0), 4: (5.0, 90.0)}
     assert second == {4: (5.0, 90.0), 3: (10.0, 80.0)}
     assert len(connections) == 1
-    assert "WITH requested" in connections[0].query
-    assert connections[0].params == ([3, 4], 2026, date(2026, 7, 1))
+    assert "maps_ndvi_agro_quality" in connections[0].query
+    assert connections[0].params == (date(2026, 7, 1), [3, 4])
 
 
 def test_refresh_product_overwrites_cog_and_reseeds_cache(tmp_path):
@@ -355,15 +449,17 @@ def test_refresh_product_overwrites_cog_and_reseeds_cache(tmp_path):
         planner=planner,
         client=Client(),
         repository=Repository(),
-        optimizer=lambda src, dst: optimized.append((src, dst)),
+        optimizer=lambda src, dst, profile: optimized.append(
+            (src, dst, profile.name)
+        ),
         refresh_products={"ndvi"},
+        cog_profiles=product_cog_profiles({"ndvi": "int16"}),
     )
 
-    success, _layer_name, layer = publisher._publish_file(source)
+    layer = publisher._register_file(publisher._optimize_file(source))
 
-    assert success is True
     assert layer is not None
-    assert optimized == [(source, destination)]
+    assert optimized == [(source, destination, "int16")]
     assert seed_calls[0]["reseed"] is True
 
 
@@ -418,9 +514,319 @@ def test_existing_layer_skips_reconfiguration_and_cache_seed(tmp_path):
         ),
     )
 
-    success, _layer_name, layer = publisher._publish_file(source)
+    layer = publisher._register_file(publisher._optimize_file(source))
 
-    assert success is True
     assert layer is not None
     saved.append(layer)
     assert len(saved) == 1
+
+
+def test_mosaic_publisher_harvests_dates_into_one_time_layer(tmp_path):
+    """Даты хозяйства и продукта добавляются гранулами одной мозаики."""
+    planner = PublicationPlanner(
+        tmp_path / "geoware",
+        "/opt/geoserver_data/geoware",
+    )
+    calls = []
+
+    class Client:
+        """Имитирует мозаику, создаваемую первой датой."""
+
+        def __init__(self):
+            """Создаёт пустой каталог."""
+            self.stores = set()
+
+        def create_imagemosaic(self, store_name, container_directory):
+            """Создаёт store мозаики один раз."""
+            calls.append(("create", store_name, container_directory))
+            created = store_name not in self.stores
+            self.stores.add(store_name)
+            return created
+
+        def harvest_granule(self, store_name, container_path):
+            """Запоминает добавленный гранул."""
+            calls.append(("harvest", store_name, container_path))
+
+        def configure_time_coverage(self, store_name, layer_name):
+            """Запоминает настройку измерения TIME."""
+            calls.append(("time", store_name, layer_name))
+
+        def set_layer_style(self, layer_name, style_name):
+            """Запоминает назначение стиля."""
+            calls.append(("style", layer_name, style_name))
+
+        def enable_gwc_gridset_3857(self, layer_name, **options):
+            """Запоминает настройку GWC."""
+            calls.append(("gwc", layer_name, options))
+
+        def seed_gwc_cache(self, **options):
+            """Запоминает прогрев даты."""
+            calls.append(("seed", options["layer_name"], options["time"]))
+
+    class Repository:
+        """Возвращает границы хозяйства."""
+
+        def bounds(self, **_options):
+            """Возвращает валидные границы хозяйства."""
+            return 1.0, 2.0, 3.0, 4.0
+
+    publisher = MosaicRasterPublisher(
+        source_root=tmp_path,
+        workspace="sentinel",
+        current_year=2026,
+        planner=planner,
+        client=Client(),
+        repository=Repository(),
+    )
+
+    records = [
+        publisher._register_file(planner.build(tmp_path / name))
+        for name in (
+            "s2a_01_07_2026_a3_ndvi_10m_3857.tif",
+            "s2b_04_07_2026_a3_ndvi_10m_3857.tif",
+        )
+    ]
+
+    mosaic_dir = tmp_path / "geoware" / "mosaic" / "a3" / "ndvi"
+    assert "Name=a3_ndvi" in (mosaic_dir / "indexer.properties").read_text()
+    assert (mosaic_dir / "timeregex.properties").exists()
+    assert [record.name for record in records] == [
+        "sentinel:a3_ndvi@2026-07-01",
+        "sentinel:a3_ndvi@2026-07-04",
+    ]
+    assert [call[0] for call in calls] == [
+        "create", "harvest", "time", "style", "gwc", "seed",
+        "create", "harvest", "seed",
+    ]
+    assert calls[0][2] == "/opt/geoserver_data/geoware/mosaic/a3/ndvi"
+    assert calls[4][2] == {"time_dimension": True}
+    assert calls[-1] == ("seed", "a3_ndvi", "2026-07-04")
+
+    # Повторная публикация готового COG не добавляет гранулу и не прогревает.
+    existing = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
+    existing.write_bytes(b"raster")
+    destination = planner.build(existing).destination
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.write_bytes(b"cog")
+    calls.clear()
+
+    publisher._register_file(publisher._optimize_file(existing))
+
+    assert [call[0] for call in calls] == ["create"]
+
+
+def test_footprint_seeding_queues_merged_field_tile_ranges(tmp_path):
+    """Очередь получает прямоугольники тайлов, прочитанных раз на хозяйство."""
+    planner = PublicationPlanner(tmp_path / "geoware", "/data")
+    queued = []
+    reads = []
+
+    class Seeder:
+        """Запоминает прямоугольники прогрева."""
+
+        def add_ranges(self, **options):
+            """Сохраняет переданные прямоугольники."""
+            queued.append(options)
+
+    class Repository:
+        """Отдаёт тайлы полей вместо рамки хозяйства."""
+
+        def field_tiles(self, **options):
+            """Возвращает два соседних тайла z13 и один z14."""
+            assert options["buffer"] == 50.0
+            reads.append(options["agroid"])
+            return [(13, 4, 2), (13, 5, 2), (14, 9, 4)]
+
+        def bounds(self, **_options):
+            """Запрещает прогрев всей рамки."""
+            pytest.fail("Рамка хозяйства не нужна при прогреве по полям")
+
+    publisher = RasterPublisher(
+        source_root=tmp_path,
+        workspace="sentinel",
+        current_year=2026,
+        planner=planner,
+        client=SnapshotClient(),
+        repository=Repository(),
+        seeder=Seeder(),
+        seed_footprint_buffer=50.0,
+    )
+
+    for product in ("ndvi", "tci"):
+        publisher._seed_layer(
+            planner.build(
+                tmp_path / f"s2a_01_07_2026_a3_{product}_10m_3857.tif"
+            ),
+            f"a3_{product}_2026-07-01",
+            reseed=False,
+        )
+
+    ranges = queued[0]["ranges"]
+    assert [(item.zoom, item.tiles) for item in ranges] == [(13, 2), (14, 1)]
+    assert queued[0]["acquired_on"] == date(2026, 7, 1)
+    assert reads == [3]
+
+
+def test_local_tile_seeder_replaces_gwc_seed_and_falls_back_on_error(tmp_path):
+    """Локальный рендер заменяет прогрев GWC, а при ошибке уступает ему."""
+    planner = PublicationPlanner(tmp_path / "geoware", "/data")
+    plan = planner.build(tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif")
+    rendered = []
+    queued = []
+
+    class TileSeeder:
+        """Запоминает рендер и отказывает для второго слоя."""
+
+        @staticmethod
+        def supports(product):
+            """Поддерживает все продукты."""
+            return True
+
+        def seed(self, **options):
+            """Сохраняет параметры рендера либо отказывает."""
+            if options["layer_name"] == "broken":
+                raise RuntimeError("нет COG")
+            rendered.append(options)
+
+    class Seeder:
+        """Запоминает прямоугольники прогрева GWC."""
+
+        def add_ranges(self, **options):
+            """Сохраняет слой очереди."""
+            queued.append(options["layer_name"])
+
+    class Repository:
+        """Отдаёт тайлы полей."""
+
+        def field_tiles(self, **_options):
+            """Возвращает один тайл z13."""
+            return [(13, 4, 2)]
+
+    publisher = RasterPublisher(
+        source_root=tmp_path,
+        workspace="sentinel",
+        current_year=2026,
+        planner=planner,
+        client=SnapshotClient(),
+        repository=Repository(),
+        seeder=Seeder(),
+        seed_footprint_buffer=50.0,
+        tile_seeder=TileSeeder(),
+    )
+
+    publisher._seed_layer(plan, "a3_ndvi_2026-07-01", reseed=True)
+    publisher._seed_layer(plan, "broken", reseed=False)
+    publisher._seed_layer(plan, "a3_ndvi", reseed=False, time="2026-07-01")
+
+    assert rendered == [{
+        "layer_name": "a3_ndvi_2026-07-01",
+        "source": plan.destination,
+        "product": "ndvi",
+        "tiles": [(13, 4, 2)],
+        "reseed": True,
+    }]
+    assert queued == ["broken", "a3_ndvi"]
+
+
+def test_publish_date_uses_manifest_without_scanning_source_root(tmp_path):
+    """Манифест обработки публикуется без обхода дерева результатов."""
+    produced = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
+    leftover = tmp_path / "s2a_01_07_2026_a4_ndvi_10m_3857.tif"
+    produced.write_bytes(b"produced")
+    leftover.write_bytes(b"leftover")
+    published = []
+    publisher = bare_publisher(tmp_path, "test-publication-manifest")
+    publisher.source_index = None
+    publisher._optimize_file = lambda path: published.append(path) or path
+
+    publisher.publish_date(date(2026, 7, 1), files=[str(produced)])
+
+    assert published == [produced]
+
+
+def test_source_index_rescans_only_changed_directories(tmp_path, monkeypatch):
+    """Индекс видит новые растры и не перечитывает неизменные каталоги."""
+    archive = tmp_path / "2025"
+    archive.mkdir()
+    (archive / "s2a_01_07_2025_a3_ndvi_10m_3857.tif").write_bytes(b"old")
+    (tmp_path / "broken.tif").write_bytes(b"?")
+    # Давно изменённые каталоги не требуют повторного чтения.
+    for directory in (archive, tmp_path):
+        os.utime(directory, (1_700_000_000, 1_700_000_000))
+    index = PublicationSourceIndex(tmp_path)
+
+    assert index.files(date(2026, 7, 1)) == ([], [tmp_path / "broken.tif"])
+
+    scanned = []
+    original = os.scandir
+    monkeypatch.setattr(
+        sources.os,
+        "scandir",
+        lambda path: scanned.append(Path(path)) or original(path),
+    )
+    current = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
+    current.write_bytes(b"new")
+
+    files, _invalid = index.files(date(2026, 7, 1))
+
+    assert files == [current]
+    assert scanned == [tmp_path]
+
+
+def test_refresh_skips_unchanged_raster_by_fingerprint(tmp_path):
+    """Перерасчёт с прежним отпечатком не перекодирует COG и не греет кэш."""
+    source = tmp_path / "s2a_01_07_2026_a3_ndvi_10m_3857.tif"
+    source.write_bytes(b"same")
+    planner = PublicationPlanner(tmp_path / "geoware", "/data")
+    destination = planner.build(source).destination
+    destination.parent.mkdir(parents=True)
+    destination.write_bytes(b"published")
+    fingerprint_path(destination).write_text("abc\n", encoding="ascii")
+    optimized = []
+    seeded = []
+
+    class Client:
+        """Существующий слой GeoServer."""
+
+        def create_coveragestore(self, **_options):
+            """Сообщает, что store уже существует."""
+            return False
+
+        def seed_gwc_cache(self, **options):
+            """Запоминает прогрев."""
+            seeded.append(options["layer_name"])
+            return True
+
+    class Repository:
+        """Отдаёт рамку хозяйства."""
+
+        def bounds(self, **_options):
+            """Возвращает тестовые границы."""
+            return 1.0, 2.0, 3.0, 4.0
+
+    publisher = RasterPublisher(
+        source_root=tmp_path,
+        workspace="sentinel",
+        current_year=2026,
+        planner=planner,
+        client=Client(),
+        repository=Repository(),
+        optimizer=lambda *args: optimized.append(args),
+        refresh_products={"ndvi"},
+        fingerprinter=lambda path, _profile: (
+            "abc" if path.read_bytes() == b"same" else "def"
+        ),
+    )
+
+    layer = publisher._register_file(publisher._optimize_file(source))
+
+    assert (optimized, seeded) == ([], [])
+    assert layer.content_fingerprint == "abc"
+
+    source.write_bytes(b"changed")
+    layer = publisher._register_file(publisher._optimize_file(source))
+
+    assert len(optimized) == 1
+    assert seeded == ["a3_ndvi_2026-07-01"]
+    assert layer.content_fingerprint == "def"
+    assert fingerprint_path(destination).read_text(encoding="ascii") == "def\n"
@@ -0,0 +1,296 @@
+"""Тесты локального рендера тайлов."""
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.metrics import MetricsRegistry
+from satgeo import renderer
+from satgeo.client import GeoServerClient, GeoServerConfig
+from satgeo.renderer import (
+    COLOR_RAMPS,
+    TILE_SIZE,
+    GwcFileBlobStore,
+    LocalTileSeeder,
+    MBTilesSink,
+    TileRenderer,
+    colorize,
+    tile_blocks,
+    tiles_for_bounds,
+)
+from satgeo.seeding import TileRange
+
+
+class MemorySink:
+    """Собирает записанные тайлы в словарь."""
+
+    def __init__(self):
+        """Создаёт пустое хранилище."""
+        self.tiles = {}
+        self.lock = threading.Lock()
+
+    def write(self, zoom, x, y, data):
+        """Сохраняет тайл."""
+        with self.lock:
+            self.tiles[(zoom, x, y)] = data
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Изолирует реестр метрик рендера."""
+    metrics = MetricsRegistry()
+    monkeypatch.setattr(renderer, "get_metrics_registry", lambda: metrics)
+    return metrics
+
+
+def test_colorize_maps_ramp_classes_and_masks_invalid_pixels():
+    """Шкала NDVI и классы SCL окрашиваются таблицей, NoData прозрачен."""
+    values = np.array([[[-1.0, 1.0, 0.5]]])
+    valid = np.array([[True, True, False]])
+
+    rgba = colorize(values, valid, COLOR_RAMPS["ndvi"])
+
+    assert rgba[0, 0].tolist() == [165, 0, 38, 255]
+    assert rgba[0, 1].tolist() == [0, 104, 55, 255]
+    assert rgba[0, 2].tolist() == [0, 0, 0, 0]
+
+    classes = colorize(
+        np.array([[[0, 4, 6]]]),
+        np.ones((1, 3), dtype=bool),
+        COLOR_RAMPS["scl"],
+    )
+    assert classes[0, 0, 3] == 0
+    assert classes[0, 1].tolist() == [0, 160, 0, 255]
+    assert classes[0, 2].tolist() == [0, 0, 255, 255]
+
+
+def test_tiles_for_bounds_and_blocks_follow_xyz_grid():
+    """Рамка покрывается тайлами XYZ, а тайлы группируются в метатайлы."""
+    bounds = TileRange(4, 3, 5, 4, 6).bbox()
+
+    assert tiles_for_bounds(bounds, 4) == [(3, 5), (4, 5), (3, 6), (4, 6)]
+
+    blocks = tile_blocks([(4, 3, 5), (4, 9, 5), (4, 4, 6), (5, 3, 5)])
+    assert [(block.zoom, block.tiles) for block in blocks] == [
+        (4, ((3, 5), (4, 6))),
+        (4, ((9, 5),)),
+        (5, ((3, 5),)),
+    ]
+    assert blocks[0].extent == TileRange(4, 3, 5, 4, 6)
+
+
+def test_gwc_blob_store_uses_geowebcache_file_layout(tmp_path):
+    """Путь тайла повторяет FilePathGenerator GWC с осью y от юга."""
+    store = GwcFileBlobStore(tmp_path, "sentinel:a3_ndvi_2026-07-01")
+
+    path = store.path(13, 5000, 2000)
+
+    assert path == (
+        tmp_path
+        / "sentinel_a3_ndvi_2026-07-01"
+        / "WebMercatorQuad_13"
+        / "039_048"
+        / "005000_006191.png"
+    )
+    store.write(13, 5000, 2000, b"tile")
+    assert path.read_bytes() == b"tile"
+    assert store.path(0, 0, 0).parent.name == "0_0"
+
+
+def test_mbtiles_sink_stores_tms_rows(tmp_path):
+    """MBTiles получает строки с отсчётом от юга и метаданные."""
+    path = tmp_path / "a3.mbtiles"
+    with MBTilesSink(path, name="a3", batch_size=1) as sink:
+        sink.write(2, 1, 0, b"a")
+        sink.write(2, 1, 3, b"b")
+
+    connection = sqlite3.connect(path)
+    try:
+        assert connection.execute(
+            "SELECT zoom_level, tile_column, tile_row, tile_data "
+            "FROM tiles ORDER BY tile_row"
+        ).fetchall() == [(2, 1, 0, b"b"), (2, 1, 3, b"a")]
+        assert dict(connection.execute("SELECT * FROM metadata")) == {
+            "name": "a3",
+            "format": "png",
+            "type": "overlay",
+        }
+    finally:
+        connection.close()
+
+
+def test_renderer_reads_block_once_and_skips_empty_tiles(registry):
+    """Метатайл читается одним запросом, пустые тайлы не записываются."""
+    reads = []
+
+    def reader(source, bbox, width, height, *, categorical):
+        """Возвращает блок, где валидна только левая половина."""
+        reads.append((bbox, width, height, categorical))
+        valid = np.zeros((height, width), dtype=bool)
+        valid[:, :TILE_SIZE] = True
+        return np.full((1, height, width), 0.5), valid
+
+    sink = MemorySink()
+    summary = TileRenderer(
+        workers=2,
+        reader=reader,
+        encoder=lambda tile, image_format: f"{tile.shape}".encode(),
+    ).render(
+        Path("a3_ndvi.tif"),
+        COLOR_RAMPS["ndvi"],
+        [(10, 0, 0), (10, 1, 0)],
+        sink,
+    )
+
+    assert reads == [(TileRange(10, 0, 0, 1, 0).bbox(inset=0), 512, 256, False)]
+    assert sink.tiles == {(10, 0, 0): b"(256, 256, 4)"}
+    assert (summary.tiles, summary.empty) == (1, 1)
+    assert registry.snapshot(renderer.RENDER_METRIC)["a3_ndvi.tif"].rows == 1
+
+
+def test_renderer_aggregates_block_failures(registry):
+    """Ошибка чтения блока не прерывает остальные и поднимается итогом."""
+    def reader(source, bbox, width, height, *, categorical):
+        """Отказывает на масштабе 11."""
+        if width == TILE_SIZE and bbox[0] > 0:
+            raise RuntimeError("повреждённый обзор")
+        return np.full((3, height, width), 200), np.ones((height, width), bool)
+
+    sink = MemorySink()
+    with pytest.raises(RuntimeError, match="1 блоков"):
+        TileRenderer(reader=reader, encoder=lambda *_args: b"x").render(
+            Path("a3_tci.tif"),
+            None,
+            [(11, 0, 0), (11, 2047, 0)],
+            sink,
+        )
+    assert list(sink.tiles) == [(11, 0, 0)]
+
+
+def test_local_tile_seeder_writes_workspace_layer_directory(tmp_path, registry):
+    """Сидер пишет тайлы в каталог слоя рабочей области в blob store."""
+    seeder = LocalTileSeeder(
+        TileRenderer(
+            reader=lambda *_args, **_options: (
+                np.array([[[4]]]).repeat(TILE_SIZE, 1).repeat(TILE_SIZE, 2),
+                np.ones((TILE_SIZE, TILE_SIZE), dtype=bool),
+            ),
+            encoder=lambda *_args: b"tile",
+        ),
+        tmp_path,
+        "sentinel",
+    )
+
+    seeder.seed(
+        layer_name="a3_scl_2026-07-01",
+        source=tmp_path / "a3_scl.tif",
+        product="scl",
+        tiles=[(0, 0, 0)],
+    )
+
+    assert seeder.supports("tci") and not seeder.supports("rgb")
+    assert (
+        tmp_path
+        / "sentinel_a3_scl_2026-07-01"
+        / "WebMercatorQuad_00"
+        / "0_0"
+        / "00_00.png"
+    ).read_bytes() == b"tile"
+
+
+def test_local_tile_seeder_reseed_drops_stale_tiles_of_rendered_zooms(
+        tmp_path,
+        registry,
+):
+    """При reseed тайлы, ставшие прозрачными, не остаются в кэше слоя."""
+    seeder = LocalTileSeeder(
+        TileRenderer(
+            reader=lambda *_args, **_options: (
+                np.zeros((1, TILE_SIZE, TILE_SIZE)),
+                np.zeros((TILE_SIZE, TILE_SIZE), dtype=bool),
+            ),
+            encoder=lambda *_args: b"tile",
+        ),
+        tmp_path,
+        "sentinel",
+    )
+    store = GwcFileBlobStore(tmp_path, "sentinel:a3_ndvi_2026-07-01")
+    store.write(0, 0, 0, b"old")
+    store.write(5, 1, 1, b"old")
+
+    summary = seeder.seed(
+        layer_name="a3_ndvi_2026-07-01",
+        source=tmp_path / "a3_ndvi.tif",
+        product="ndvi",
+        tiles=[(0, 0, 0)],
+        reseed=True,
+    )
+
+    assert summary.empty == 1
+    assert not store.path(0, 0, 0).exists()
+    assert store.path(5, 1, 1).read_bytes() == b"old"
+    assert sorted(path.name for path in store.layer_dir.iterdir()) == [
+        "WebMercatorQuad_05",
+    ]
+
+
+def test_renderer_shares_one_pool_between_concurrent_rasters(registry):
+    """Растры из разных потоков рендерятся в общем пуле ``workers``."""
+    threads = set()
+
+    def reader(source, bbox, width, height, *, categorical):
+        """Запоминает поток рендера."""
+        threads.add(threading.current_thread().name)
+        return np.full((3, height, width), 200), np.ones((height, width), bool)
+
+    tile_renderer = TileRenderer(
+        workers=1,
+        reader=reader,
+        encoder=lambda *_args: b"x",
+    )
+    callers = [
+        threading.Thread(
+            target=tile_renderer.render,
+            args=(Path(f"a{agroid}_tci.tif"), None, [(12, 0, 0)], MemorySink()),
+        )
+        for agroid in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    tile_renderer.close()
+
+    assert len(threads) == 1
+    assert registry.snapshot(renderer.RENDER_METRIC)["a2_tci.tif"].rows == 1
+
+
+def test_blob_store_tiles_use_the_format_registered_for_gwc_layer(tmp_path):
+    """Рендер пишет тайлы в формате слоя GWC, а WEBP в blob store отклоняется."""
+    payloads = []
+
+    class Http:
+        """Запоминает XML слоя GWC."""
+
+        def put(self, _url, *, data, **_options):
+            """Принимает создание слоя GWC."""
+            payloads.append(data.decode())
+            return SimpleNamespace(status_code=201, text="")
+
+    GeoServerClient(
+        GeoServerConfig("gs", "sentinel", "admin", "secret"),
+        http=Http(),
+    ).enable_gwc_gridset_3857("a3_ndvi_2026-07-01")
+    registered = re.findall(
+        r"<mimeFormats>\s*<string>image/(\w+)</string>\s*</mimeFormats>",
+        payloads[0],
+    )
+    store = GwcFileBlobStore(tmp_path, "sentinel:a3_ndvi_2026-07-01")
+
+    assert registered == [store.path(0, 0, 0).suffix.lstrip(".")]
+    with pytest.raises(ValueError, match="image/png"):
+        LocalTileSeeder(TileRenderer(image_format="webp"), tmp_path, "sentinel")
@@ -0,0 +1,222 @@
+"""Тесты очереди прогрева GeoWebCache."""
+from datetime import date
+
+import pytest
+
+from core.metrics import MetricsRegistry
+from satgeo import seeding
+from satgeo.seeding import (
+    WEB_MERCATOR_ORIGIN,
+    GwcSeedQueue,
+    SeedTaskStatus,
+    TileRange,
+    merge_tiles,
+)
+
+
+class SeedClient:
+    """Имитирует GWC: задача выполняется один опрос после запуска."""
+
+    def __init__(self, failing=()):
+        """Создаёт журнал запусков и опросов."""
+        self.submitted = []
+        self.active = {}
+        self.failing = set(failing)
+        self.peak = 0
+
+    def seed_gwc_cache(self, **options):
+        """Запускает задачу слоя либо отклоняет её."""
+        layer = options["layer_name"]
+        if layer in self.failing:
+            raise RuntimeError("GWC недоступен")
+        self.submitted.append((
+            layer,
+            options["zoom_start"],
+            options["zoom_stop"],
+            options["threads"],
+            options.get("time"),
+        ))
+        self.active[layer] = 1
+        self.peak = max(self.peak, len(self.active))
+        return True
+
+    def seed_status(self, layer_name):
+        """Сообщает о выполнении задачи на первом опросе и завершении далее."""
+        polls = self.active.get(layer_name, 0)
+        if polls == 1:
+            self.active[layer_name] = 2
+            return [SeedTaskStatus(10, 40, 7, 1)]
+        self.active.pop(layer_name, None)
+        return [SeedTaskStatus(40, 40, 7, 2)]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Изолирует реестр метрик и убирает ожидание между опросами."""
+    metrics = MetricsRegistry()
+    monkeypatch.setattr(seeding, "get_metrics_registry", lambda: metrics)
+    monkeypatch.setattr(seeding.time, "sleep", lambda _seconds: None)
+    return metrics
+
+
+def test_queue_seeds_recent_dates_first_with_whole_zoom_range(registry):
+    """Свежая дата раньше архива, диапазон масштабов — одной задачей."""
+    client = SeedClient()
+    queue = GwcSeedQueue(client, max_tasks=1, task_threads=2, poll_seconds=0)
+    bbox = (1.0, 2.0, 3.0, 4.0)
+    queue.add(
+        layer_name="a3_ndvi_2025-07-01",
+        bbox=bbox,
+        acquired_on=date(2025, 7, 1),
+        zoom_start=13,
+        zoom_stop=14,
+    )
+    queue.add(
+        layer_name="a3_ndvi",
+        bbox=bbox,
+        acquired_on=date(2026, 7, 1),
+        zoom_start=13,
+        zoom_stop=14,
+        time="2026-07-01",
+    )
+
+    assert queue.run() == 0
+
+    assert client.submitted == [
+        ("a3_ndvi", 13, 14, 2, "2026-07-01"),
+        ("a3_ndvi_2025-07-01", 13, 14, 2, None),
+    ]
+    stats = registry.snapshot(seeding.SEED_METRIC)
+    assert stats["a3_ndvi"].count == 1
+    assert stats["a3_ndvi"].rows == 40
+
+
+def test_queue_caps_concurrent_threads_and_counts_failures(registry):
+    """Ограничение потоков сильнее числа задач; ошибки GWC учитываются."""
+    client = SeedClient(failing={"a5_scl_2026-07-01"})
+    queue = GwcSeedQueue(
+        client,
+        max_tasks=3,
+        max_threads=4,
+        task_threads=2,
+        poll_seconds=0,
+    )
+    for layer in ("a3_ndvi_2026-07-01", "a4_ndvi_2026-07-01", "a5_scl_2026-07-01"):
+        queue.add(
+            layer_name=layer,
+            bbox=(1.0, 2.0, 3.0, 4.0),
+            acquired_on=date(2026, 7, 1),
+            zoom_start=12,
+            zoom_stop=14,
+        )
+
+    assert queue.run() == 1
+
+    assert client.peak == 2
+    assert len(client.submitted) == 2
+    assert len(queue) == 0
+
+
+def test_background_queue_seeds_tasks_added_after_start(registry):
+    """Фоновый поток прогревает задачи всех дат и завершается в close."""
+    client = SeedClient()
+    queue = GwcSeedQueue(client, max_tasks=1, task_threads=1, poll_seconds=0)
+    queue.start()
+    for day in (1, 2):
+        queue.add(
+            layer_name=f"a3_ndvi_2026-07-0{day}",
+            bbox=(1.0, 2.0, 3.0, 4.0),
+            acquired_on=date(2026, 7, day),
+        )
+
+    assert queue.close() == 0
+
+    assert sorted(item[0] for item in client.submitted) == [
+        "a3_ndvi_2026-07-01",
+        "a3_ndvi_2026-07-02",
+    ]
+    assert len(queue) == 0
+
+
+def test_merge_tiles_covers_exactly_the_given_tiles():
+    """Тайлы сливаются в прямоугольники без лишних и пропущенных тайлов."""
+    tiles = {(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1), (5, 1), (0, 3)}
+
+    ranges = merge_tiles(14, tiles)
+
+    covered = {
+        (x, y)
+        for item in ranges
+        for x in range(item.min_x, item.max_x + 1)
+        for y in range(item.min_y, item.max_y + 1)
+    }
+    assert covered == tiles
+    assert ranges == [
+        TileRange(14, 0, 0, 2, 1),
+        TileRange(14, 5, 1, 5, 1),
+        TileRange(14, 0, 3, 0, 3),
+    ]
+    assert sum(item.tiles for item in ranges) == len(tiles)
+
+
+def test_tile_range_bbox_stays_inside_its_tiles():
+    """Рамка прямоугольника не касается границ соседних тайлов."""
+    minx, miny, maxx, maxy = TileRange(1, 1, 0, 1, 0).bbox()
+    tolerance = WEB_MERCATOR_ORIGIN * 1e-5
+
+    assert 0 < minx < tolerance
+    assert 0 < miny < tolerance
+    assert WEB_MERCATOR_ORIGIN - tolerance < maxx < WEB_MERCATOR_ORIGIN
+    assert WEB_MERCATOR_ORIGIN - tolerance < maxy < WEB_MERCATOR_ORIGIN
+
+
+def test_footprint_ranges_run_together_and_report_planned_tiles(registry):
+    """Прямоугольники одного слоя идут параллельно и дают точное число тайлов."""
+    client = SeedClient()
+    queue = GwcSeedQueue(client, max_tasks=2, task_threads=1, poll_seconds=0)
+    queue.add_ranges(
+        layer_name="a3_ndvi_2026-07-01",
+        ranges=[TileRange(14, 0, 0, 2, 1), TileRange(14, 5, 1, 5, 1)],
+        acquired_on=date(2026, 7, 1),
+    )
+
+    assert queue.run() == 0
+
+    assert [item[1] for item in client.submitted] == [14, 14]
+    stats = registry.snapshot(seeding.SEED_METRIC)["a3_ndvi_2026-07-01"]
+    assert stats.count == 1
+    assert stats.rows == 7
+
+
+def test_scattered_zooms_fall_back_to_one_bbox_task(registry):
+    """Масштабы сверх лимита прямоугольников греются одной рамкой."""
+    client = SeedClient()
+    queue = GwcSeedQueue(
+        client,
+        max_tasks=4,
+        task_threads=1,
+        poll_seconds=0,
+        max_ranges=2,
+    )
+    scattered = [
+        TileRange(zoom, x, 0, x, 0)
+        for zoom in (13, 14)
+        for x in (0, 2, 4)
+    ]
+    queue.add_ranges(
+        layer_name="a3_ndvi_2026-07-01",
+        ranges=[TileRange(12, 0, 0, 1, 0), *scattered],
+        acquired_on=date(2026, 7, 1),
+    )
+
+    assert len(queue) == 2
+    fallback, exact = queue._next_task(), queue._next_task()
+
+    assert (fallback.zoom_start, fallback.zoom_stop) == (13, 14)
+    # Рамка охватывает все прямоугольники обоих масштабов.
+    for item in scattered:
+        minx, miny, maxx, maxy = item.bbox()
+        assert fallback.bbox[0] <= minx and maxx <= fallback.bbox[2]
+        assert fallback.bbox[1] <= miny and maxy <= fallback.bbox[3]
+    assert fallback.tiles is None
+    assert (exact.zoom_start, exact.zoom_stop, exact.tiles) == (12, 12, 2)
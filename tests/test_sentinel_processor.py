@@ -2,9 +2,15 @@
 
 from contextlib import nullcontext
 from datetime import date
+from pathlib import Path
 from types import SimpleNamespace
 
-from processing.processors import sentinel
+import numpy as np
+import pytest
+
+from processing.domain import BandOffsets, ProductLevel
+from processing.processors import footprint, sentinel
+from processing.processors.footprint import FootprintProductProcessor
 from processing.processors.sentinel import AgroCropProcessor
 
 
@@ -95,3 +101,234 @@ def test_crop_uses_nearest_for_scl_and_lanczos_for_continuous_data(
         "nearest",
         "lanczos",
     ]
+
+
+class FootprintRun:
+    """Исполняет FootprintProductProcessor на каналах JP2 в памяти."""
+
+    def __init__(self, monkeypatch, tmp_path, values=None):
+        """Подменяет GDAL каналами с постоянными значениями по имени."""
+        self.tmp_path = tmp_path
+        self.values = (
+            {"b03": 1000, "b04": 1000, "b08": 3000}
+            if values is None
+            else values
+        )
+        self.reads = []
+        self.requests = []
+        self.warped = {}
+        run = self
+
+        class Band:
+            """Канал JP2 с постоянным значением."""
+
+            def __init__(self, path):
+                self.path = path
+
+            def ReadAsArray(self, x_offset, y_offset, width, height):
+                """Запоминает прочитанное окно."""
+                run.reads.append((self.path, (x_offset, y_offset, width, height)))
+                return np.full(
+                    (height, width),
+                    run.values[Path(self.path).stem],
+                    dtype=np.uint16,
+                )
+
+        class Dataset(SourceDataset):
+            """Канал JP2 размером с тайл Sentinel."""
+
+            RasterXSize = RasterYSize = 10980
+
+            def __init__(self, path):
+                self.path = path
+
+            def GetRasterBand(self, _index):
+                """Возвращает канал отражательной способности."""
+                return Band(self.path)
+
+        class MemoryDataset:
+            """Минимальный MEM dataset окна."""
+
+            def __init__(self):
+                self.values = None
+
+            def SetGeoTransform(self, transform):
+                """Запоминает геопривязку окна."""
+                self.transform = transform
+
+            def SetProjection(self, _projection):
+                """Принимает проекцию исходного канала."""
+
+            def GetRasterBand(self, _index):
+                """Возвращает канал записи значений."""
+                return SimpleNamespace(
+                    SetNoDataValue=lambda _value: None,
+                    WriteArray=lambda values: setattr(self, "values", values),
+                )
+
+        monkeypatch.setattr(footprint, "open_raster", lambda path: nullcontext(
+            Dataset(path)
+        ))
+        monkeypatch.setattr(
+            footprint,
+            "source_window",
+            lambda *_args, **_kwargs: (100, 200, 3, 2),
+        )
+        monkeypatch.setattr(
+            footprint,
+            "gdal",
+            SimpleNamespace(
+                GDT_Float32="float32",
+                GetDriverByName=lambda _name: SimpleNamespace(
+                    Create=lambda *_args: MemoryDataset()
+                ),
+            ),
+        )
+        self.monkeypatch = monkeypatch
+
+    def sources(self, band):
+        """Возвращает JP2 канала, если он задан, и запоминает запрос."""
+        self.requests.append(band)
+        present = band in self.values or band in ("tci", "scl")
+        return [f"{band}.jp2"] if present else []
+
+    def destination(self, product, agroid):
+        """Возвращает путь результата хозяйства."""
+        return str(self.tmp_path / f"{product}_a{agroid}.tif")
+
+    def processor(
+            self,
+            level=ProductLevel.L2A,
+            products=None,
+            offsets=None,
+    ) -> FootprintProductProcessor:
+        """Создаёт процессор, который не пишет растры на диск."""
+        processor = FootprintProductProcessor(
+            SimpleNamespace(
+                acquired_on=date(2026, 7, 1),
+                agroids=(3,),
+                level=level,
+                tile="t38ula",
+                band_offsets=offsets or BandOffsets(),
+            ),
+            self,
+            self,
+            field_data=object(),
+            options=SimpleNamespace(destination_srid=3857, nodata=-9999.0),
+            products=products,
+        )
+        self.monkeypatch.setattr(
+            processor,
+            "_get_bounds",
+            lambda *_args: (0.0, 0.0, 10.0, 10.0),
+        )
+        self.monkeypatch.setattr(
+            processor,
+            "_warp",
+            lambda src, dst, *_args: self.warped.setdefault(
+                Path(dst).stem,
+                src,
+            ),
+        )
+        self.monkeypatch.setattr(
+            processor,
+            "_warp_dataset",
+            lambda dataset, dst, *_args: self.warped.setdefault(
+                Path(dst).stem,
+                dataset,
+            ),
+        )
+        return processor
+
+
+def test_footprint_reads_only_agro_window_without_tile_intermediates(
+        monkeypatch,
+        tmp_path,
+):
+    """Индексы считаются на окне под хозяйством, TCI вырезается прямо из JP2."""
+    run = FootprintRun(monkeypatch, tmp_path)
+
+    run.processor(ProductLevel.L1C, products={"tci", "ndvi"}).run()
+
+    assert run.warped["tci_a3"] == "tci.jp2"
+    ndvi = run.warped["ndvi_a3"]
+    assert ndvi.transform[0] == 1000.0
+    assert np.allclose(ndvi.values, 0.5)
+    assert sorted(run.reads) == [
+        ("b04.jp2", (100, 200, 3, 2)),
+        ("b08.jp2", (100, 200, 3, 2)),
+    ]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_footprint_l2a_builds_all_products_and_applies_band_offsets(
+        monkeypatch,
+        tmp_path,
+):
+    """L2A: TCI и SCL из JP2, B08 читается раз, offset учитываются в индексах."""
+    run = FootprintRun(
+        monkeypatch,
+        tmp_path,
+        {"b03": 2000, "b04": 1000, "b08": 3000},
+    )
+
+    run.processor(
+        offsets=BandOffsets(b03=-1000.0, b04=-1000.0, b08=-1000.0),
+    ).run()
+
+    assert run.warped["tci_a3"] == "tci.jp2"
+    assert run.warped["scl_a3"] == "scl.jp2"
+    # (2000 - 0) / (2000 + 0) и (1000 - 2000) / (1000 + 2000).
+    assert np.allclose(run.warped["ndvi_a3"].values, 1.0)
+    assert np.allclose(run.warped["ndwi_a3"].values, -1.0 / 3.0)
+    assert sorted(path for path, _window in run.reads) == [
+        "b03.jp2",
+        "b04.jp2",
+        "b08.jp2",
+    ]
+
+
+def test_footprint_l1c_never_requests_scl(monkeypatch, tmp_path):
+    """L1C-сцена без SCL строит остальные продукты без обращения к маске."""
+    run = FootprintRun(monkeypatch, tmp_path)
+
+    run.processor(ProductLevel.L1C).run()
+
+    assert "scl" not in run.requests
+    assert sorted(run.warped) == ["ndvi_a3", "ndwi_a3", "tci_a3"]
+
+
+def test_footprint_ndvi_recalculation_reads_only_red_and_nir(
+        monkeypatch,
+        tmp_path,
+):
+    """NDVI-перерасчёт L1C запрашивает только B04 и B08."""
+    run = FootprintRun(monkeypatch, tmp_path)
+
+    run.processor(ProductLevel.L1C, products={"ndvi", "scl"}).run()
+
+    assert sorted(run.requests) == ["b04", "b08"]
+    assert sorted(run.warped) == ["ndvi_a3"]
+
+
+def test_footprint_resume_builds_only_missing_products(monkeypatch, tmp_path):
+    """Готовый NDWI не пересчитывается, и B03 не запрашивается."""
+    run = FootprintRun(monkeypatch, tmp_path)
+    (tmp_path / "ndwi_a3.tif").touch()
+
+    run.processor(products={"ndvi", "ndwi"}).run()
+
+    assert sorted(run.requests) == ["b04", "b08"]
+    assert sorted(run.warped) == ["ndvi_a3"]
+
+
+def test_footprint_reports_all_missing_bands_in_stable_order(
+        monkeypatch,
+        tmp_path,
+):
+    """Ошибка отсутствующих каналов перечисляет их детерминированно."""
+    run = FootprintRun(monkeypatch, tmp_path, values={})
+
+    with pytest.raises(FileNotFoundError, match=r"B03, B04, B08$"):
+        run.processor(products={"ndvi", "ndwi"}).run()
+    assert run.warped == {}
@@ -1,9 +1,13 @@
 """Тесты безопасных файловых адаптеров processing."""
 
-import geojson
+from types import SimpleNamespace
+
 import pytest
 
 from core.filesystem import clear_directory_contents
+from domain.models import Field
+from processing import storage
+from processing.field_store import FieldGeometryStore, StoredAgroFields
 from processing.storage import FieldGeometryExporter
 
 
@@ -29,13 +33,105 @@ def test_clear_directory_contents_rejects_file(tmp_path):
         clear_directory_contents(target)
 
 
-def test_geometry_exporter_atomically_writes_geojson(tmp_path):
-    """Экспортёр записывает валидный GeoJSON без временного остатка."""
+def test_geometry_exporter_atomically_writes_geojson(tmp_path, monkeypatch):
+    """Экспортёр пишет WKB через OGR с CRS и без временного остатка."""
     destination = tmp_path / "field.geojson"
-    geometry = geojson.Point((37.0, 55.0))
+    calls = []
+
+    class FakeReference:
+        """Фиксирует EPSG и порядок осей маски."""
+
+        def ImportFromEPSG(self, srid):
+            """Запоминает код системы координат."""
+            calls.append(("srid", srid))
+
+        def SetAxisMappingStrategy(self, strategy):
+            """Запоминает порядок осей."""
+            calls.append(("axis", strategy))
+
+    class FakeLayer:
+        """Слой, записывающий объект во временный файл."""
+
+        def __init__(self, path):
+            self.path = path
+
+        def GetLayerDefn(self):
+            """Возвращает описание слоя."""
+            return "definition"
+
+        def CreateFeature(self, feature):
+            """Записывает геометрию объекта в файл слоя."""
+            self.path.write_bytes(feature.geometry)
+            return 0
+
+    class FakeDataSource:
+        """Источник OGR с одним слоем."""
+
+        def __init__(self, path):
+            self.path = path
 
-    result = FieldGeometryExporter().export(geometry, destination)
+        def CreateLayer(self, name, reference, geometry_type):
+            """Создаёт слой и запоминает его параметры."""
+            calls.append(("layer", name, geometry_type))
+            return FakeLayer(self.path)
+
+    class FakeFeature:
+        """Объект OGR с геометрией."""
+
+        def __init__(self, definition):
+            self.geometry = None
+
+        def SetGeometry(self, shape):
+            """Сохраняет WKB геометрии."""
+            self.geometry = shape.wkb
+
+    monkeypatch.setattr(storage, "ogr", SimpleNamespace(
+        CreateGeometryFromWkb=lambda wkb: SimpleNamespace(
+            wkb=wkb,
+            GetGeometryType=lambda: 3,
+        ),
+        GetDriverByName=lambda name: SimpleNamespace(
+            CreateDataSource=lambda path: FakeDataSource(
+                tmp_path / path.rsplit("/", 1)[-1]
+            ),
+        ),
+        Feature=FakeFeature,
+    ))
+    monkeypatch.setattr(storage, "osr", SimpleNamespace(
+        SpatialReference=FakeReference,
+        OAMS_TRADITIONAL_GIS_ORDER=0,
+    ))
+
+    result = FieldGeometryExporter().export(
+        memoryview(b"wkb"),
+        destination,
+        srid=3857,
+    )
 
     assert result == destination
-    assert geojson.loads(destination.read_text(encoding="utf-8")) == geometry
+    assert destination.read_bytes() == b"wkb"
+    assert calls == [("srid", 3857), ("axis", 0), ("layer", "field", 3)]
     assert not destination.with_suffix(".geojson.tmp").exists()
+
+
+def test_field_geometry_store_round_trips_wkb_and_bounds(tmp_path):
+    """Хранилище контуров возвращает записанные WKB, версии и границы."""
+    store = FieldGeometryStore(tmp_path)
+    stored = StoredAgroFields(
+        agroid=3,
+        year=2026,
+        srid=3857,
+        tolerance=None,
+        fields=(Field(id=7, name="Поле 7", fieldcode="A3"),),
+        geometries={7: b"\x01\x03wkb"},
+        revisions={7: "10:11"},
+        bounds={3857: (1.0, 2.0, 3.0, 4.0)},
+    )
+
+    path = store.write(stored)
+
+    assert path == tmp_path / "2026" / "a3.fields.json.gz"
+    assert store.read(year=2026, agroid=3, srid=3857, tolerance=None) == stored
+    assert store.read(year=2026, agroid=3, srid=4326, tolerance=None) is None
+    assert store.read(year=2026, agroid=3, srid=3857, tolerance=5.0) is None
+    assert list(path.parent.iterdir()) == [path]